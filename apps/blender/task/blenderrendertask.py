@@ -7,7 +7,7 @@ from collections import OrderedDict
 
 
 import time
-from PIL import Image, ImageChops
+from PIL import Image
 
 from apps.core.task import coretask
 from golem.core.common import to_unicode
@@ -21,6 +21,8 @@ from apps.blender.resources.scenefileeditor import generate_blender_crop_file
 from apps.blender.task.verificator import BlenderVerificator
 from apps.core.task.coretask import CoreTaskTypeInfo, AcceptClientVerdict, CoreTask
 from apps.rendering.resources.imgrepr import load_as_pil
+from apps.rendering.resources.previewstore import preview_store
+from apps.rendering.resources.taskoverlay import fill_area
 from apps.rendering.resources.renderingtaskcollector import RenderingTaskCollector
 from apps.rendering.task.framerenderingtask import FrameRenderingTask, FrameRenderingTaskBuilder, FrameRendererOptions
 from apps.rendering.task.renderingtask import PREVIEW_EXT, PREVIEW_X, PREVIEW_Y
@@ -87,18 +89,16 @@ class PreviewUpdater(object):
             img = img.resize((self.preview_res_x, height),
                              resample=Image.BILINEAR)
 
-            if not os.path.exists(self.preview_file_path) \
-               or len(self.chunks) == 1:
-                img_offset = Image.new("RGB", (self.preview_res_x,
-                                               self.preview_res_y))
-                img_offset.paste(img, (0, offset))
-                img_offset.save(self.preview_file_path, PREVIEW_EXT)
-                img_offset.close()
+            # the preview is kept in memory and written by the store
+            size = (self.preview_res_x, self.preview_res_y)
+            if len(self.chunks) == 1:
+                img_current = preview_store.new(self.preview_file_path, size,
+                                                fmt=PREVIEW_EXT)
             else:
-                img_current = Image.open(self.preview_file_path)
-                img_current.paste(img, (0, offset))
-                img_current.save(self.preview_file_path, PREVIEW_EXT)
-                img_current.close()
+                img_current = preview_store.open(self.preview_file_path, size,
+                                                 fmt=PREVIEW_EXT)
+            img_current.paste(img, (0, offset))
+            preview_store.changed(self.preview_file_path)
             img.close()
         except Exception:
             logger.exception("Error in Blender update preview:")
@@ -113,10 +113,11 @@ class PreviewUpdater(object):
         self.chunks = {}
         self.perfect_match_area_y = 0
         self.perfectly_placed_subtasks = 0
-        if os.path.exists(self.preview_file_path):
-            img = Image.new("RGB", (self.preview_res_x, self.preview_res_y))
-            img.save(self.preview_file_path, PREVIEW_EXT)
-            img.close()
+        if self.preview_file_path in preview_store or \
+                os.path.exists(self.preview_file_path):
+            preview_store.new(self.preview_file_path,
+                              (self.preview_res_x, self.preview_res_y),
+                              fmt=PREVIEW_EXT)
 
 
 class BlenderTaskTypeInfo(CoreTaskTypeInfo):
@@ -135,6 +136,8 @@ class BlenderTaskTypeInfo(CoreTaskTypeInfo):
 
     @classmethod
     def get_preview(cls, task, single=False):
+        # previews are written to disk lazily
+        preview_store.flush()
         result = None
         if not task:
             pass
@@ -523,12 +526,13 @@ class BlenderRenderTask(FrameRenderingTask):
                                 resample=Image.BILINEAR)
 
             preview_task_file_path = self._get_preview_task_file_path(num)
+            preview_file_path = self._get_preview_file_path(num)
             self.last_preview_path = preview_task_file_path
 
-            scaled.save(preview_task_file_path, PREVIEW_EXT)
-            scaled.save(self._get_preview_file_path(num), PREVIEW_EXT)
-
-            scaled.close()
+            preview_store.put(preview_task_file_path, scaled, PREVIEW_EXT)
+            if preview_file_path != preview_task_file_path:
+                preview_store.put(preview_file_path, scaled.copy(),
+                                  PREVIEW_EXT)
             img.close()
         else:
             self.preview_updaters[num].update_preview(new_chunk_file_path, part)
@@ -548,29 +552,28 @@ class BlenderRenderTask(FrameRenderingTask):
                                                list(self.collected_file_names.values()), "paste")
             
     def mark_part_on_preview(self, part, img_task, color, preview_updater, frame_index=0):
+        fill_area(img_task, self._get_part_area(part, preview_updater), color)
+
+    @staticmethod
+    def _get_part_area(part, preview_updater):
         lower = preview_updater.get_offset(part)
         upper = preview_updater.get_offset(part + 1)
-        res_x = preview_updater.preview_res_x
-        for i in range(0, res_x):
-                for j in range(lower, upper):
-                    img_task.putpixel((i, j), color)
+        return 0, lower, preview_updater.preview_res_x, upper
 
-    def _mark_task_area(self, subtask, img_task, color, frame_index=0):
+    def _get_task_area(self, subtask, frame_index=0):
         if not self.use_frames:
-            self.mark_part_on_preview(subtask['start_task'], img_task, color, self.preview_updater)
+            return self._get_part_area(subtask['start_task'], self.preview_updater)
         elif self.total_tasks <= len(self.frames):
-            for i in range(0, int(math.floor(self.res_x * self.scale_factor))):
-                for j in range(0, int(math.floor(self.res_y * self.scale_factor))):
-                    img_task.putpixel((i, j), color)
+            return (0, 0, int(math.floor(self.res_x * self.scale_factor)),
+                    int(math.floor(self.res_y * self.scale_factor)))
         else:
             parts = int(self.total_tasks / len(self.frames))
             pu = self.preview_updaters[frame_index]
             part = (subtask['start_task'] - 1) % parts + 1
-            self.mark_part_on_preview(part, img_task, color, pu)
+            return self._get_part_area(part, pu)
 
     def _put_frame_together(self, frame_num, num_start):
-        directory = os.path.dirname(self.output_file)
-        output_file_name = os.path.join(directory, self._get_output_name(frame_num))
+        output_file_name = self._get_frame_output_path(frame_num)
         frame_key = str(frame_num)
         collected = self.frames_given[frame_key]
         collected = OrderedDict(sorted(collected.items()))
@@ -580,7 +583,8 @@ class BlenderRenderTask(FrameRenderingTask):
                 collector.add_img_file(file)
             collector.finalize().save(output_file_name, self.output_format)
         else:
-            self._put_collected_files_together(output_file_name, list(collected.values()), "paste")
+            if not self._put_collected_files_together(output_file_name, list(collected.values()), "paste"):
+                return
         self.collected_file_names[frame_num] = output_file_name
         self._update_frame_preview(output_file_name, frame_num, final=True)
         self._update_frame_task_preview()
@@ -614,17 +618,13 @@ class BlenderRenderTaskBuilder(FrameRenderingTaskBuilder):
 class CustomCollector(RenderingTaskCollector):
     def __init__(self, paste=False, width=1, height=1):
         RenderingTaskCollector.__init__(self, paste, width, height)
-        self.current_offset = 0
-    
-    def _paste_image(self, final_img, new_part, num):
-        img_offset = Image.new("RGB", (self.width, self.height))
-        offset = self.current_offset
-        _, new_img_res_y = new_part.size
-        self.current_offset += new_img_res_y
-        img_offset.paste(new_part, (0, offset))
-        result = ImageChops.add(final_img, img_offset)
-        img_offset.close()
-        return result
+
+    def _get_offsets(self, sizes, height=None):
+        # parts are stacked one after another
+        offsets = [0]
+        for _, res_y in sizes[:-1]:
+            offsets.append(offsets[-1] + res_y)
+        return offsets
 
 
 def generate_expected_offsets(parts, res_x, res_y):
@@ -27,15 +27,17 @@ class BlenderVerificator(FrameRenderingVerificator):
                         int(self.res_y / self.total_tasks))
             self.box_size = (box_x, box_y)
 
-    def change_scope(self, subtask_id, start_box, tr_file, subtask_info):
+    def change_scope(self, subtask_id, start_box, tr_file, subtask_info,
+                     box_size=None):
         extra_data, _ = super(BlenderVerificator, self).change_scope(subtask_id, start_box,
                                                                      tr_file, subtask_info)
+        box_size = box_size or self.verification_options.box_size
         min_x = start_box[0] / self.res_x
-        max_x = (start_box[0] + self.verification_options.box_size[0] + 1) / self.res_x
+        max_x = (start_box[0] + box_size[0] + 1) / self.res_x
         shift_y = (extra_data['start_task'] - 1) * (self.res_y / extra_data['total_tasks'])
         start_y = start_box[1] + shift_y
         max_y = (self.res_y - start_y) / self.res_y
-        shift_y = start_y + self.verification_options.box_size[1] + 1
+        shift_y = start_y + box_size[1] + 1
         min_y = max((self.res_y - shift_y) / self.res_y, 0.0)
         min_y = max(min_y, 0)
         script_src = generate_blender_crop_file(
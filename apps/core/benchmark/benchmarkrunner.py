@@ -29,7 +29,8 @@ class BenchmarkRunner(LocalComputer):
     RUNNER_WARNING = "Failed to compute benchmark"
     RUNNER_SUCCESS = "Benchmark computed successfully"
 
-    def __init__(self, task: Task, root_path, success_callback, error_callback, benchmark: CoreBenchmark):
+    def __init__(self, task: Task, root_path, success_callback, error_callback, benchmark: CoreBenchmark,
+                 low_priority=False):
         super().__init__(task,
                          root_path,
                          success_callback,
@@ -38,7 +39,8 @@ class BenchmarkRunner(LocalComputer):
                          lambda: task.query_extra_data(10000).ctd,
                          True,
                          BenchmarkRunner.RUNNER_WARNING,
-                         BenchmarkRunner.RUNNER_SUCCESS)
+                         BenchmarkRunner.RUNNER_SUCCESS,
+                         low_priority=low_priority)
         # probably this could be done differently
         self.benchmark = benchmark
 
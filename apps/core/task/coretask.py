@@ -184,6 +184,7 @@ class CoreTask(Task):
     def initialize(self, dir_manager):
         self.tmp_dir = dir_manager.get_task_temporary_dir(self.header.task_id, create=True)
         self.verificator.tmp_dir = self.tmp_dir
+        self.verificator.use_cache(dir_manager.root_path)
 
     def needs_computation(self):
         return (self.last_task != self.total_tasks) or (self.num_failed_subtasks > 0)
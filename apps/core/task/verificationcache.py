@@ -0,0 +1,124 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from threading import Lock
+
+logger = logging.getLogger("apps.core")
+
+CACHE_FILE = "verification_cache.json"
+CACHE_TTL = 24 * 60 * 60
+
+
+def file_digest(path, block_size=2 ** 20):
+    """ :return str|None: sha256 hexdigest of a file; None if it cannot be
+    read """
+    sha = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for data in iter(lambda: f.read(block_size), b""):
+                sha.update(data)
+    except (OSError, TypeError):
+        return None
+    return sha.hexdigest()
+
+
+class VerificationCache(object):
+    """
+    Verdicts of verified results, kept in a JSON file. A verdict is looked
+    up by subtask id, digests of the result files and the version of the
+    verificator, so results which are delivered again are not verified
+    again, while changed results or verificators are. Verdicts expire after
+    ttl seconds.
+    """
+
+    def __init__(self, path, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = Lock()
+        # key -> (verdict, expiry time)
+        self._entries = None
+
+    @staticmethod
+    def key(subtask_id, files, version):
+        """
+        :param str subtask_id: subtask identifier
+        :param list files: result files
+        :param str version: verificator version
+        :return str:
+        """
+        digests = sorted(str(file_digest(f)) for f in files or [])
+        return json.dumps([subtask_id, version, digests])
+
+    def get(self, key):
+        """ :return str|None: cached verdict, if it has not expired """
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None:
+                return None
+            verdict, expires = entry
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            return verdict
+
+    def put(self, key, verdict):
+        with self._lock:
+            entries = self._load()
+            entries[key] = (verdict, time.time() + self.ttl)
+            self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = dict()
+            self._save()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load())
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = dict()
+            try:
+                with open(self.path) as f:
+                    entries = json.load(f)
+            except FileNotFoundError:
+                return self._entries
+            except (OSError, ValueError) as err:
+                logger.warning("Cannot read verification cache %r: %r",
+                               self.path, err)
+                return self._entries
+            now = time.time()
+            self._entries = {key: tuple(entry)
+                             for key, entry in entries.items()
+                             if entry[1] >= now}
+        return self._entries
+
+    def _save(self):
+        now = time.time()
+        entries = {key: entry for key, entry in self._entries.items()
+                   if entry[1] >= now}
+        self._entries = entries
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            logger.warning("Cannot write verification cache %r: %r",
+                           self.path, err)
+
+
+_caches = dict()
+
+
+def get_verification_cache(directory):
+    """ :return VerificationCache: cache kept in the given directory, shared
+    by all verificators which use it """
+    path = os.path.join(os.path.abspath(directory), CACHE_FILE)
+    cache = _caches.get(path)
+    if cache is None:
+        cache = _caches[path] = VerificationCache(path)
+    return cache
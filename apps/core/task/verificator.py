@@ -5,6 +5,8 @@ from enum import Enum
 
 from golem.core.common import HandleKeyError
 
+from apps.core.task.verificationcache import get_verification_cache
+
 logger = logging.getLogger("apps.core")
 
 
@@ -23,11 +25,34 @@ class SubtaskVerificationState(Enum):
 
 class CoreVerificator(object):
     handle_key_error_for_state = HandleKeyError(state_check_log_key_error)
+    # bump when the verification method changes, so cached verdicts of
+    # the previous version are not used
+    VERSION = 1
+    CACHED_STATES = (SubtaskVerificationState.VERIFIED,
+                     SubtaskVerificationState.WRONG_ANSWER)
 
     def __init__(self, verification_options=None, advanced_verification=False):
         self.ver_states = {}
         self.advanced_verification = advanced_verification
         self.verification_options = verification_options
+        self.cache_dir = None
+
+    def use_cache(self, directory):
+        """ Keep verdicts in a verification cache in the given directory
+        :param str directory: directory of the cache; None disables it
+        """
+        self.cache_dir = directory
+
+    @property
+    def cache(self):
+        """ :return VerificationCache|None: looked up on use, since the
+        shared cache cannot be pickled with the task """
+        if not self.cache_dir:
+            return None
+        return get_verification_cache(self.cache_dir)
+
+    def get_version(self):
+        return "{}/{}".format(type(self).__name__, self.VERSION)
 
     def set_verification_options(self, verification_options):
         self.verification_options = verification_options
@@ -47,8 +72,21 @@ class CoreVerificator(object):
     # it is set in the query_extra_data function
     @handle_key_error_for_state
     def verify(self, subtask_id, subtask_info, tr_files, task):
+        key = None
+        cache = self.cache
+        if cache is not None:
+            key = cache.key(subtask_id, tr_files, self.get_version())
+            verdict = cache.get(key)
+            if verdict is not None:
+                logger.debug("Cached verdict for %r: %s", subtask_id, verdict)
+                self.ver_states[subtask_id] = SubtaskVerificationState[verdict]
+                return self.ver_states[subtask_id]
+
         self._check_files(subtask_id, subtask_info, tr_files, task)
-        return self.ver_states[subtask_id]
+        state = self.ver_states[subtask_id]
+        if key is not None and state in self.CACHED_STATES:
+            cache.put(key, state.name)
+        return state
 
     def _check_files(self, subtask_id, subtask_info, tr_files, task):
         for tr_file in tr_files:
@@ -0,0 +1,288 @@
+"""
+Reading, writing and merging LuxRender film (FLM) files without LuxRender.
+
+An FLM file is a (usually gzip compressed) little-endian stream:
+
+    uint32  magic number (0xCEBCD0F1)
+    int32   version (0)
+    int32   x resolution, int32 y resolution
+    uint32  number of buffer groups, uint32 number of buffers
+    int32   type of each buffer
+    uint32  number of parameters
+            each parameter: int32 type, int32 id, int32 index and a float32,
+            a float64 or a string (uint32 length and bytes) value
+    for each buffer group:
+        float64 number of samples
+        for each buffer, row by row:
+            float32 X, Y, Z, alpha, weight sum of each pixel
+
+Films are merged by adding the numbers of samples and the pixel values,
+which is what luxmerger does.
+"""
+import gzip
+import logging
+import os
+import struct
+import zlib
+from threading import Lock
+
+import numpy
+
+logger = logging.getLogger("apps.lux")
+
+FLM_MAGIC_NUMBER = 0xCEBCD0F1
+FLM_VERSIONS = (0,)
+PARAM_FLOAT, PARAM_STRING, PARAM_DOUBLE = 0, 1, 2
+PIXEL_CHANNELS = 5
+PIXEL_DTYPE = numpy.dtype('<f4')
+GZIP_MAGIC = b'\x1f\x8b'
+ROWS_PER_READ = 64
+
+
+class FlmError(Exception):
+    """ Film is broken or cannot be merged with other films """
+
+
+class UnsupportedFlmError(FlmError):
+    """ Film may be correct, but it is not understood here """
+
+
+class FlmHeader(object):
+
+    def __init__(self, width, height, groups, buffer_types, params,
+                 version=0):
+        self.width = width
+        self.height = height
+        self.groups = groups
+        self.buffer_types = list(buffer_types)
+        # (type, id, index, value)
+        self.params = list(params)
+        self.version = version
+
+    def compatible(self, other):
+        return (self.width, self.height, self.groups, self.buffer_types) == \
+            (other.width, other.height, other.groups, other.buffer_types)
+
+    def pixels_shape(self):
+        return (self.groups, len(self.buffer_types), self.height, self.width,
+                PIXEL_CHANNELS)
+
+    @classmethod
+    def read(cls, stream):
+        magic, version, width, height, groups, buffers = \
+            _unpack(stream, '<IiiiII')
+        if magic != FLM_MAGIC_NUMBER:
+            raise UnsupportedFlmError("Wrong magic number {:#x}".format(magic))
+        if version not in FLM_VERSIONS:
+            raise UnsupportedFlmError("Unsupported version {}".format(version))
+        # the file is a film of a known version from here on, so a layout
+        # which is not understood is left to LuxRender
+        if width <= 0 or height <= 0:
+            raise UnsupportedFlmError(
+                "Wrong resolution {}x{}".format(width, height))
+        try:
+            return cls._read_rest(stream, width, height, groups, buffers,
+                                  version)
+        except (EOFError, struct.error, ValueError) as err:
+            raise UnsupportedFlmError("Cannot parse header: {}".format(err))
+
+    @classmethod
+    def _read_rest(cls, stream, width, height, groups, buffers, version):
+        buffer_types = _unpack(stream, '<{}i'.format(buffers))
+        num_params, = _unpack(stream, '<I')
+        params = []
+        for _ in range(num_params):
+            type_, id_, index = _unpack(stream, '<iii')
+            if type_ == PARAM_FLOAT:
+                value, = _unpack(stream, '<f')
+            elif type_ == PARAM_DOUBLE:
+                value, = _unpack(stream, '<d')
+            elif type_ == PARAM_STRING:
+                size, = _unpack(stream, '<I')
+                value = _read(stream, size)
+            else:
+                raise UnsupportedFlmError(
+                    "Unknown parameter type {}".format(type_))
+            params.append((type_, id_, index, value))
+        return cls(width, height, groups, buffer_types, params, version)
+
+    def write(self, stream):
+        stream.write(struct.pack('<IiiiII', FLM_MAGIC_NUMBER, self.version,
+                                 self.width, self.height, self.groups,
+                                 len(self.buffer_types)))
+        stream.write(struct.pack('<{}i'.format(len(self.buffer_types)),
+                                 *self.buffer_types))
+        stream.write(struct.pack('<I', len(self.params)))
+        for type_, id_, index, value in self.params:
+            stream.write(struct.pack('<iii', type_, id_, index))
+            if type_ == PARAM_FLOAT:
+                stream.write(struct.pack('<f', value))
+            elif type_ == PARAM_DOUBLE:
+                stream.write(struct.pack('<d', value))
+            else:
+                stream.write(struct.pack('<I', len(value)))
+                stream.write(value)
+
+
+class Film(object):
+    """
+    Film data: a header, the number of samples of each buffer group and
+    pixels, an array of (groups, buffers, height, width, 5) floats
+    """
+
+    def __init__(self, header, samples, pixels):
+        self.header = header
+        self.samples = samples
+        self.pixels = pixels
+
+    @classmethod
+    def read(cls, path):
+        """ Read a film, decompressing it on the fly
+        :param str path: FLM file
+        :return Film:
+        :raises FlmError: if the file is broken or not understood
+        """
+        header = None
+        try:
+            with open_flm(path) as stream:
+                header = FlmHeader.read(stream)
+                samples = numpy.empty(header.groups, dtype=numpy.float64)
+                pixels = numpy.empty(header.pixels_shape(), dtype=PIXEL_DTYPE)
+                for group in range(header.groups):
+                    samples[group], = _unpack(stream, '<d')
+                    for buffer_ in range(len(header.buffer_types)):
+                        _read_rows(stream, pixels[group, buffer_])
+                if stream.read(1):
+                    raise UnsupportedFlmError("Unexpected data after pixels")
+        except (OSError, EOFError, MemoryError, ValueError, struct.error,
+                zlib.error) as err:
+            if header is None:
+                raise FlmError("Cannot read {}: {}".format(path, err))
+            # pixels of a valid header which do not match it are left
+            # to LuxRender as well
+            raise UnsupportedFlmError(
+                "Cannot read pixels of {}: {}".format(path, err))
+
+        if not numpy.isfinite(samples).all() or (samples < 0).any():
+            raise FlmError("Wrong number of samples in {}".format(path))
+        if not numpy.isfinite(pixels).all():
+            raise FlmError("Pixel values of {} are not finite".format(path))
+        return cls(header, samples, pixels)
+
+    def write(self, path):
+        """ Write the film as a gzip compressed FLM file """
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, 'wb', compresslevel=4) as stream:
+            self.header.write(stream)
+            for group in range(self.header.groups):
+                stream.write(struct.pack('<d', self.samples[group]))
+                for buffer_ in range(len(self.header.buffer_types)):
+                    stream.write(numpy.ascontiguousarray(
+                        self.pixels[group, buffer_],
+                        dtype=PIXEL_DTYPE).tobytes())
+        os.replace(tmp_path, path)
+
+
+class FlmAccumulator(object):
+    """
+    Running merge of films. Each film is added once, right after it was
+    read, so the merge of all films is ready without reading them again.
+    Sums are kept in float64; the merged film is written with float32
+    pixels, like LuxRender does.
+    """
+
+    def __init__(self, reference=None):
+        """
+        :param str reference: film which the merged films have to be
+                              compatible with
+        """
+        self.reference = reference
+        self._lock = Lock()
+        self._reference_header = None
+        self._film = None
+        self._added = set()
+
+    def __getstate__(self):
+        # merged pixels are not kept when a task is stored
+        return {'reference': self.reference}
+
+    def __setstate__(self, state):
+        self.__init__(state['reference'])
+
+    def check(self, film):
+        """ Check whether a film can be merged with the other films
+        :raises FlmError: if it cannot
+        """
+        header = self._film.header if self._film else self._get_reference()
+        if header is not None and not header.compatible(film.header):
+            raise FlmError("Film is not compatible with the task films")
+
+    def add(self, film, path):
+        """ Merge a film, unless a film from the same path was merged
+        :return bool: whether the film was merged
+        """
+        self.check(film)
+        key = os.path.normpath(path)
+        with self._lock:
+            if key in self._added:
+                return False
+            if self._film is None:
+                self._film = Film(film.header,
+                                  film.samples.astype(numpy.float64),
+                                  film.pixels.astype(numpy.float64))
+            else:
+                self._film.samples += film.samples
+                self._film.pixels += film.pixels
+            self._added.add(key)
+            return True
+
+    def contains(self, paths):
+        """ :return bool: whether exactly the given films are merged """
+        return {os.path.normpath(p) for p in paths} == self._added
+
+    def save(self, path):
+        """ Write the merged film
+        :raises FlmError: if no film was merged yet
+        """
+        with self._lock:
+            if self._film is None:
+                raise FlmError("No films merged")
+            self._film.write(path)
+
+    def _get_reference(self):
+        if self._reference_header is None and self.reference:
+            try:
+                with open_flm(self.reference) as stream:
+                    self._reference_header = FlmHeader.read(stream)
+            except (OSError, EOFError, FlmError) as err:
+                logger.warning("Cannot read reference film %r: %s",
+                               self.reference, err)
+        return self._reference_header
+
+
+def open_flm(path):
+    """ :return: binary stream of an FLM file, decompressed if needed """
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    return gzip.open(path, 'rb') if compressed else open(path, 'rb')
+
+
+def _read(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise EOFError("Unexpected end of file")
+    return data
+
+
+def _unpack(stream, fmt):
+    return struct.unpack(fmt, _read(stream, struct.calcsize(fmt)))
+
+
+def _read_rows(stream, out):
+    """ Fill an array with pixel rows read in chunks, without keeping the
+    whole compressed or decompressed buffer in memory """
+    for row in range(0, out.shape[0], ROWS_PER_READ):
+        chunk = out[row:row + ROWS_PER_READ]
+        data = _read(stream, chunk.nbytes)
+        chunk[...] = numpy.frombuffer(data, dtype=PIXEL_DTYPE) \
+            .reshape(chunk.shape)
@@ -11,10 +11,12 @@ import apps.lux.resources.scenefilereader as sfr
 from apps.core.task import coretask
 from apps.core.task.coretask import CoreTaskTypeInfo
 from apps.lux.luxenvironment import LuxRenderEnvironment
+from apps.lux.resources.flm import FlmAccumulator, FlmError
 from apps.lux.resources.scenefileeditor import regenerate_lux_file
 from apps.lux.resources.scenefilereader import make_scene_analysis
 from apps.lux.task.verificator import LuxRenderVerificator
 from apps.rendering.resources.imgrepr import load_img, blend
+from apps.rendering.resources.previewstore import preview_store
 from apps.rendering.task import renderingtask
 from apps.rendering.task import renderingtaskstate
 from apps.rendering.task.renderingtask import PREVIEW_EXT, PREVIEW_Y, PREVIEW_X
@@ -109,6 +111,8 @@ class LuxRenderTaskTypeInfo(CoreTaskTypeInfo):
 
     @classmethod
     def get_preview(cls, task, single=False):
+        if task and task.preview_file_path:
+            preview_store.flush(task.preview_file_path)
         result = to_unicode(task.preview_file_path) if task else None
         return cls._preview_result(result, single=single)
 
@@ -169,6 +173,7 @@ class LuxTask(renderingtask.RenderingTask):
         super(LuxTask, self).initialize(dir_manager)
         self.verificator.test_flm = self.__get_test_flm()
         self.verificator.merge_ctd = self.__get_merge_ctd([])
+        self.verificator.flm_accumulator = FlmAccumulator()
 
     def _write_interval_wrapper(self, halttime):
         if halttime > 0:
@@ -390,6 +395,8 @@ class LuxTask(renderingtask.RenderingTask):
                 self._update_preview(tr_file, num_start)
 
         if self.num_tasks_received == self.total_tasks:
+            if self.__generate_final_flm_from_accumulator():
+                return
             if self.verificator.advanced_verification \
                     and os.path.isfile(self.__get_test_flm()):
                 self.__generate_final_flm_advanced_verification()
@@ -452,8 +459,7 @@ class LuxTask(renderingtask.RenderingTask):
         for f in preview_files:
             self._update_preview(f, None)
         if len(preview_files) == 0:
-            img = self._open_preview()
-            img.close()
+            self._open_preview()
 
     def __update_preview_from_pil_file(self, new_chunk_file_path):
         img = Image.open(new_chunk_file_path)
@@ -464,10 +470,8 @@ class LuxTask(renderingtask.RenderingTask):
 
         img_current = self._open_preview()
         img_current = ImageChops.blend(img_current, scaled, 1.0 / self.num_add)
-        img_current.save(self.preview_file_path, PREVIEW_EXT)
-        img.close()
+        preview_store.put(self.preview_file_path, img_current, PREVIEW_EXT)
         scaled.close()
-        img_current.close()
 
     def _update_preview_from_exr(self, new_chunk_file):
         if self.preview_exr is None:
@@ -479,7 +483,7 @@ class LuxTask(renderingtask.RenderingTask):
                 1.0 / self.num_add
             )
 
-        img_current = self._open_preview()
+        self._open_preview()
         img = self.preview_exr.to_pil()
         scaled = ImageOps.fit(
             img,
@@ -489,10 +493,8 @@ class LuxTask(renderingtask.RenderingTask):
             ),
             method=Image.BILINEAR
         )
-        scaled.save(self.preview_file_path, PREVIEW_EXT)
+        preview_store.put(self.preview_file_path, scaled, PREVIEW_EXT)
         img.close()
-        scaled.close()
-        img_current.close()
 
     def create_reference_data_for_task_validation(self):
         for i in range(0, self.reference_runs):
@@ -587,6 +589,26 @@ class LuxTask(renderingtask.RenderingTask):
         logger.error("Cannot generate final flm: {}".format(error))
         # TODO What should we do in this sitution?
 
+    def __generate_final_flm_from_accumulator(self):
+        """ Write the running merge of verified films, if it contains
+        exactly the collected films, and generate the final image from it
+        :return bool: whether the running merge was used
+        """
+        accumulator = self.verificator.flm_accumulator
+        if accumulator is None or \
+                not accumulator.contains(self.collected_file_names.values()):
+            return False
+
+        new_flm = self.output_file + ".flm"
+        try:
+            accumulator.save(new_flm)
+        except (FlmError, OSError) as err:
+            logger.warning("Cannot write merged flm: %s", err)
+            return False
+        logger.debug("Merged flm written to %r", new_flm)
+        self.__generate_final_file(new_flm)
+        return True
+
     def __generate_final_flm_advanced_verification(self):
         # the file containing result of task test
         test_result_flm = self.__get_test_flm()
@@ -8,6 +8,7 @@ from golem.core.fileshelper import common_dir, find_file_with_ext, has_ext
 from golem.task.localcomputer import LocalComputer
 
 from apps.core.task.verificator import SubtaskVerificationState
+from apps.lux.resources.flm import Film, FlmError, UnsupportedFlmError
 from apps.rendering.task.verificator import RenderingVerificator
 
 from apps.rendering.resources.ImgVerificator import \
@@ -24,6 +25,7 @@ class LuxRenderVerificator(RenderingVerificator):
         self.test_flm = None
         self.merge_ctd = None
         self.verification_error = False
+        self.flm_accumulator = None
 
     def _get_test_flm(self, task):
         dm = task.dirManager
@@ -82,6 +84,8 @@ class LuxRenderVerificator(RenderingVerificator):
             self.advanced_verification = True
             if self.advanced_verification:
                 self.test_flm = self._get_test_flm(task)
+                if self.flm_accumulator is not None:
+                    self.flm_accumulator.reference = self.test_flm
 
                 img_verificator = ImgVerificator()
                 ref_imgs = self._get_reference_imgs(task)
@@ -121,14 +125,16 @@ class LuxRenderVerificator(RenderingVerificator):
                         img_verificator.is_valid_against_reference(
                             imgstat, reference_stats)
 
-                    is_flm_merging_validation_passed \
-                        = self.merge_flm_files(flm_file, task, self.test_flm)
+                    is_flm_merging_validation_passed, film \
+                        = self.check_flm_file(flm_file, task)
 
                     if is_valid_against_reference == \
                             SubtaskVerificationState.VERIFIED \
                             and is_flm_merging_validation_passed:
                                 self.ver_states[subtask_id] = \
                                     SubtaskVerificationState.VERIFIED
+                                if film is not None:
+                                    self.flm_accumulator.add(film, flm_file)
 
                     logger.info("Subtask "
                                 + str(subtask_id)
@@ -140,6 +146,25 @@ class LuxRenderVerificator(RenderingVerificator):
             logger.info("Exception during verification of subtask: "
                         + str(subtask_id) + " " + str(e))
 
+    def check_flm_file(self, new_flm, task):
+        """ Check whether a film can be merged with the films of the task.
+        The film is read here and compared with the running merge; it is
+        merged by LuxRender only if it cannot be read here
+        :return tuple: (whether the film can be merged, the film if it was
+                        read here)
+        """
+        if self.flm_accumulator is not None:
+            try:
+                film = Film.read(new_flm)
+                self.flm_accumulator.check(film)
+                return True, film
+            except UnsupportedFlmError as err:
+                logger.info("Merging %r with LuxRender: %s", new_flm, err)
+            except FlmError as err:
+                logger.info("Cannot merge %r: %s", new_flm, err)
+                return False, None
+        return self.merge_flm_files(new_flm, task, self.test_flm), None
+
     def query_extra_data_for_advanced_verification(self, new_flm):
         files = [os.path.basename(new_flm), os.path.basename(self.test_flm)]
         merge_ctd = deepcopy(self.merge_ctd)
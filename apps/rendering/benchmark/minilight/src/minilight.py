@@ -5,6 +5,7 @@
 #  http://www.hxa.name/minilight
 
 
+from multiprocessing import get_context
 from sys import argv, stdout
 from time import time
 import sys
@@ -13,7 +14,7 @@ sys.path.append("src")
 from .camera import Camera
 from .image import Image
 from .scene import Scene
-from .randommini import Random
+from .randommini import Random, SEED
 from golem.core.common import get_cpu_count
 
 BANNER = '''
@@ -64,12 +65,14 @@ with a newline. E.g.:
 '''
 MODEL_FORMAT_ID = '#MiniLight'
 
-def make_perf_test(filename, cfg_filename=None, num_cores=1):
-    model_file_pathname = filename
-    image_file_pathname = model_file_pathname + '.ppm'
+# pixels rendered by one parallel work unit
+TILE_PIXELS = 16
+
+
+def load_model(model_file_pathname):
     model_file = open(model_file_pathname, 'r')
     if model_file.readline().strip() != MODEL_FORMAT_ID:
-        raise 'invalid model file'
+        raise ValueError('invalid model file')
     for line in model_file:
         if not line.isspace():
             iterations = int(line)
@@ -78,6 +81,13 @@ def make_perf_test(filename, cfg_filename=None, num_cores=1):
     camera = Camera(model_file)
     scene = Scene(model_file, camera.view_position)
     model_file.close()
+    return image, camera, scene, iterations
+
+
+def make_perf_test(filename, cfg_filename=None, num_cores=1):
+    model_file_pathname = filename
+    image_file_pathname = model_file_pathname + '.ppm'
+    image, camera, scene, iterations = load_model(model_file_pathname)
 
     #render_orig(image, image_file_pathname, camera, scene, iterations)
     duration = render_taskable(image, image_file_pathname, camera, scene, iterations)
@@ -96,6 +106,91 @@ def make_perf_test(filename, cfg_filename=None, num_cores=1):
             cfg_file.write("{0:.1f}".format(average))
     return average
 
+
+def make_parallel_perf_test(filename, num_cores=1, cfg_filename=None):
+    """ Render the model in tiles on num_cores processes
+    :return tuple: (single core rays/s, aggregate rays/s)
+    """
+    _, single_core, aggregate = render_parallel(filename, num_cores)
+
+    print("\nSummary:")
+    print("    {} processes: {} rays/s per core, {} rays/s in total"
+          .format(num_cores, single_core, aggregate))
+    if cfg_filename:
+        with open(cfg_filename, 'w') as cfg_file:
+            cfg_file.write("{0:.1f}".format(aggregate))
+    return single_core, aggregate
+
+
+def tile_seed(round_no, tile_no):
+    return SEED + (round_no << 16) + tile_no
+
+
+def render_parallel(model_file_pathname, processes=1, rounds=None):
+    """ Render the model rounds times (by default once per process), split
+    into tiles of TILE_PIXELS pixels. Each tile of each round has its own
+    random seed and the tiles are added up in a fixed order, so the image
+    does not depend on the number of processes or on the order in which
+    tiles are finished
+    :return tuple: (image, single core rays/s, aggregate rays/s)
+    """
+    processes = max(1, processes)
+    rounds = rounds or processes
+    image, _, _, iterations = load_model(model_file_pathname)
+    num_pixels = image.width * image.height
+    work = [(round_no, tile_no, start, min(TILE_PIXELS, num_pixels - start))
+            for round_no in range(rounds)
+            for tile_no, start in enumerate(range(0, num_pixels, TILE_PIXELS))]
+
+    if processes > 1:
+        # forking a process with running threads (e.g. the reactor's) may
+        # leave locks held in the child
+        pool = get_context('spawn').Pool(processes, _init_worker,
+                                         (model_file_pathname,))
+        try:
+            results = pool.map(_render_tile, work, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        _init_worker(model_file_pathname)
+        results = list(map(_render_tile, work))
+
+    for (_, _, start, count), pixels, _, _ in results:
+        for k in range(count):
+            x, y = (start + k) % image.width, (start + k) // image.width
+            image.add_to_pixel(x, y, pixels[3 * k: 3 * k + 3])
+
+    num_rays = num_pixels * iterations * rounds
+    busy = sum(end - begin for _, _, begin, end in results)
+    wall = max(r[3] for r in results) - min(r[2] for r in results)
+    return image, num_rays / max(busy, 1e-6), num_rays / max(wall, 1e-6)
+
+
+_model = None
+
+
+def _init_worker(model_file_pathname):
+    global _model
+    _model = load_model(model_file_pathname)
+
+
+def _render_tile(work):
+    round_no, tile_no, start, count = work
+    image, camera, scene, iterations = _model
+    random = Random(tile_seed(round_no, tile_no))
+    aspect = float(image.height) / float(image.width)
+    pixels = [0.0] * 3 * count
+    begin = time()
+    for k in range(count):
+        x, y = (start + k) % image.width, (start + k) // image.width
+        r = camera.pixel_accumulated_radiance(scene, random, image.width,
+                                              image.height, x, y, aspect,
+                                              iterations)
+        pixels[3 * k: 3 * k + 3] = r.x, r.y, r.z
+    return work, pixels, begin, time()
+
+
 def timedafunc(function):
 
     def timedExecution(*args, **kwargs):
@@ -107,6 +202,7 @@ def timedafunc(function):
 
     return timedExecution
 
+
 def render_orig(image, image_file_pathname, camera, scene, iterations):
     random = Random()
 
@@ -123,6 +219,7 @@ def render_orig(image, image_file_pathname, camera, scene, iterations):
     except KeyboardInterrupt:
         print('\ninterrupted')
 
+
 @timedafunc
 def render_taskable(image, image_file_pathname, camera, scene, num_samples):
     random = Random()
@@ -159,7 +256,6 @@ def render_taskable(image, image_file_pathname, camera, scene, num_samples):
         print('\ninterrupted')
 
 
-
 def main():
     if len(argv) < 2 or argv[1] == '-?' or argv[1] == '--help':
         print(HELP)
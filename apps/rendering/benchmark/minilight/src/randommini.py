@@ -17,19 +17,21 @@ class Random(object):
     #    si = [ ui[i] if (ui[i] >= SEED_MINS[i]) else SEED for i in range(4) ]
     #    self.state0, self.state1, self.state2, self.state3 = si
     #    self.id = "%08X" % self.state3
-    def __init__(self):
-        self.state0 = self.state1 = self.state2 = self.state3 = SEED
+    def __init__(self, seed=SEED):
+        self.state0 = self.state1 = self.state2 = self.state3 = seed
 
     def int32u(self):
-        self.state0 = (((self.state0 & 0xFFFFFFFE) << 18) & 0xFFFFFFFF) ^ \
-                      ((((self.state0 <<  6) & 0xFFFFFFFF) ^ self.state0) >> 13)
-        self.state1 = (((self.state1 & 0xFFFFFFF8) <<  2) & 0xFFFFFFFF) ^ \
-                      ((((self.state1 <<  2) & 0xFFFFFFFF) ^ self.state1) >> 27)
-        self.state2 = (((self.state2 & 0xFFFFFFF0) <<  7) & 0xFFFFFFFF) ^ \
-                      ((((self.state2 << 13) & 0xFFFFFFFF) ^ self.state2) >> 21)
-        self.state3 = (((self.state3 & 0xFFFFFF80) << 13) & 0xFFFFFFFF) ^ \
-                      ((((self.state3 <<  3) & 0xFFFFFFFF) ^ self.state3) >> 12)
-        return self.state0 ^ self.state1 ^ self.state2 ^ self.state3
+        s0, s1, s2, s3 = self.state0, self.state1, self.state2, self.state3
+        s0 = (((s0 & 0xFFFFFFFE) << 18) & 0xFFFFFFFF) ^ \
+             ((((s0 <<  6) & 0xFFFFFFFF) ^ s0) >> 13)
+        s1 = (((s1 & 0xFFFFFFF8) <<  2) & 0xFFFFFFFF) ^ \
+             ((((s1 <<  2) & 0xFFFFFFFF) ^ s1) >> 27)
+        s2 = (((s2 & 0xFFFFFFF0) <<  7) & 0xFFFFFFFF) ^ \
+             ((((s2 << 13) & 0xFFFFFFFF) ^ s2) >> 21)
+        s3 = (((s3 & 0xFFFFFF80) << 13) & 0xFFFFFFFF) ^ \
+             ((((s3 <<  3) & 0xFFFFFFFF) ^ s3) >> 12)
+        self.state0, self.state1, self.state2, self.state3 = s0, s1, s2, s3
+        return s0 ^ s1 ^ s2 ^ s3
 
     def real64(self):
         int0, int1 = self.int32u(), self.int32u()
@@ -4,11 +4,13 @@
 #  http://www.hxa.name/minilight
 
 
-from .triangle import Triangle, TOLERANCE
-from .vector3f import Vector3f, MAX
+from .triangle import Triangle, TOLERANCE, intersect
+from .vector3f import Vector3f, MAX, vector
 
 MAX_LEVELS = 44
 MAX_ITEMS  =  8
+LARGE = float(2**1024 - 2**971)
+INFINITY = float(1e30000)
 
 class SpatialIndex(object):
 
@@ -55,58 +57,121 @@ class SpatialIndex(object):
                         MAX_LEVELS if q1 > 1 or q2 else level + 1)
         else:
             self.vector = [item[1] for item in items]
+        self._nodes = None
 
     def get_intersection(self, ray_origin, ray_direction, last_hit, start=None):
+        if self._nodes is None:
+            self._nodes = self.flatten()
         start = start if start else ray_origin
-        hit_object = hit_position = None
-        if self.is_branch:
-            sub_cell = 1 if start[0] >= (self.bound[0] + self.bound[3]) * 0.5 \
-                else 0
-            if start[1] >= (self.bound[1] + self.bound[4]) * 0.5:
-                sub_cell |= 2
-            if start[2] >= (self.bound[2] + self.bound[5]) * 0.5:
-                sub_cell |= 4
-            cell_position = start
-            while True:
-                if self.vector[sub_cell]:
-                    hit_object, hit_position = self.vector[sub_cell
-                        ].get_intersection(ray_origin, ray_direction, last_hit,
-                        cell_position)
-                    if hit_object:
-                        break
-                step = float(2**1024 - 2**971)
-                axis = 0
-                for i in range(3):
-                    high = (sub_cell >> i) & 1
-                    face = self.bound[i + high * 3] if (ray_direction[i] < 0.0
-                       ) ^ (0 != high) else (self.bound[i] + self.bound[i + 3]
-                       ) * 0.5
-                    try:
-                        distance = (face - ray_origin[i]) / ray_direction[i]
-                    except:
-                        distance = float(1e30000)
-                    if distance <= step:
-                        step = distance
-                        axis = i
-                if (((sub_cell >> axis) & 1) == 1) ^ (ray_direction[axis] <
-                    0.0):
+        hit_object, hx, hy, hz = _intersect(
+            self._nodes, 0, ray_origin.x, ray_origin.y, ray_origin.z,
+            ray_direction.x, ray_direction.y, ray_direction.z, last_hit,
+            start[0], start[1], start[2])
+        return hit_object, vector(hx, hy, hz) if hit_object else None
+
+    def flatten(self):
+        """ Store the tree in a list of nodes, with plain floats instead of
+        vectors. A branch node is (bound, middle, children), where children
+        are indices of nodes or None; a leaf node is (bound, None, items),
+        where items are (triangle, triangle intersection data)
+        :return list:
+        """
+        nodes = []
+
+        def add(index):
+            bound = tuple(index.bound)
+            position = len(nodes)
+            nodes.append(None)
+            if index.is_branch:
+                middle = tuple((bound[i] + bound[i + 3]) * 0.5
+                               for i in range(3))
+                children = [add(sub) if sub else None for sub in index.vector]
+                nodes[position] = (bound, middle, children)
+            else:
+                items = [(item, item.intersection_data)
+                         for item in index.vector]
+                nodes[position] = (bound, None, items)
+            return position
+
+        add(self)
+        return nodes
+
+
+def _intersect(nodes, node, ox, oy, oz, dx, dy, dz, last_hit, sx, sy, sz):
+    """ Find the nearest triangle hit by a ray in a flattened tree
+    :return tuple: (triangle or None, hit position x, y, z)
+    """
+    bound, middle, children = nodes[node]
+    hit_object = None
+    hx = hy = hz = 0.0
+    if middle is not None:
+        mx, my, mz = middle
+        sub_cell = 1 if sx >= mx else 0
+        if sy >= my:
+            sub_cell |= 2
+        if sz >= mz:
+            sub_cell |= 4
+        cx, cy, cz = sx, sy, sz
+        while True:
+            child = children[sub_cell]
+            if child is not None:
+                hit_object, hx, hy, hz = _intersect(
+                    nodes, child, ox, oy, oz, dx, dy, dz, last_hit,
+                    cx, cy, cz)
+                if hit_object:
                     break
-                cell_position = ray_origin + ray_direction * step
-                sub_cell = sub_cell ^ (1 << axis)
-        else:
-            nearest_distance = float(2**1024 - 2**971)
-            for item in self.vector:
-                if item != last_hit:
-                    distance = item.get_intersection(ray_origin, ray_direction)
-                    if distance and (distance < nearest_distance):
-                        hit = ray_origin + ray_direction * distance
-                        if (self.bound[0] - hit[0] <= TOLERANCE) and \
-                           (hit[0] - self.bound[3] <= TOLERANCE) and \
-                           (self.bound[1] - hit[1] <= TOLERANCE) and \
-                           (hit[1] - self.bound[4] <= TOLERANCE) and \
-                           (self.bound[2] - hit[2] <= TOLERANCE) and \
-                           (hit[2] - self.bound[5] <= TOLERANCE):
-                               hit_object = item
-                               hit_position = hit
-                               nearest_distance = distance
-        return hit_object, hit_position
+            step = LARGE
+            axis = 0
+            high = sub_cell & 1
+            face = bound[high * 3] if (dx < 0.0) ^ (0 != high) else mx
+            try:
+                distance = (face - ox) / dx
+            except ZeroDivisionError:
+                distance = INFINITY
+            if distance <= step:
+                step = distance
+            high = (sub_cell >> 1) & 1
+            face = bound[1 + high * 3] if (dy < 0.0) ^ (0 != high) else my
+            try:
+                distance = (face - oy) / dy
+            except ZeroDivisionError:
+                distance = INFINITY
+            if distance <= step:
+                step = distance
+                axis = 1
+            high = (sub_cell >> 2) & 1
+            face = bound[2 + high * 3] if (dz < 0.0) ^ (0 != high) else mz
+            try:
+                distance = (face - oz) / dz
+            except ZeroDivisionError:
+                distance = INFINITY
+            if distance <= step:
+                step = distance
+                axis = 2
+            direction = dx if axis == 0 else dy if axis == 1 else dz
+            if (((sub_cell >> axis) & 1) == 1) ^ (direction < 0.0):
+                break
+            cx = ox + dx * step
+            cy = oy + dy * step
+            cz = oz + dz * step
+            sub_cell = sub_cell ^ (1 << axis)
+    else:
+        nearest_distance = LARGE
+        x0, y0, z0, x1, y1, z1 = bound
+        for item, data in children:
+            if item is not last_hit:
+                distance = intersect(data, ox, oy, oz, dx, dy, dz)
+                if distance and (distance < nearest_distance):
+                    px = ox + dx * distance
+                    py = oy + dy * distance
+                    pz = oz + dz * distance
+                    if (x0 - px <= TOLERANCE) and \
+                       (px - x1 <= TOLERANCE) and \
+                       (y0 - py <= TOLERANCE) and \
+                       (py - y1 <= TOLERANCE) and \
+                       (z0 - pz <= TOLERANCE) and \
+                       (pz - z1 <= TOLERANCE):
+                           hit_object = item
+                           hx, hy, hz = px, py, pz
+                           nearest_distance = distance
+    return hit_object, hx, hy, hz
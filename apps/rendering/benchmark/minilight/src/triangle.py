@@ -35,6 +35,10 @@ class Triangle(object):
                 self.normal = self.tangent.cross(edge1).unitize()
                 pa2 = self.edge0.cross(edge1)
                 self.area = sqrt(pa2.dot(pa2)) * 0.5
+                # plain floats used by the intersection test:
+                # (edge0, edge3, vertex 0)
+                self.intersection_data = tuple(self.edge0) + \
+                    tuple(self.edge3) + tuple(self.vertexs[0])
                 return
         raise StopIteration
 
@@ -50,33 +54,9 @@ class Triangle(object):
         return bound
 
     def get_intersection(self, ray_origin, ray_direction):
-        e1x = self.edge0.x; e1y = self.edge0.y; e1z = self.edge0.z
-        e2x = self.edge3.x; e2y = self.edge3.y; e2z = self.edge3.z
-        pvx = ray_direction.y * e2z - ray_direction.z * e2y
-        pvy = ray_direction.z * e2x - ray_direction.x * e2z
-        pvz = ray_direction.x * e2y - ray_direction.y * e2x
-        det = e1x * pvx + e1y * pvy + e1z * pvz
-        if -EPSILON < det < EPSILON:
-            return None
-        inv_det = 1.0 / det
-        v0 = self.vertexs[0]
-        tvx = ray_origin.x - v0.x
-        tvy = ray_origin.y - v0.y
-        tvz = ray_origin.z - v0.z
-        u = (tvx * pvx + tvy * pvy + tvz * pvz) * inv_det
-        if u < 0.0 or u > 1.0:
-            return None
-        qvx = tvy * e1z - tvz * e1y
-        qvy = tvz * e1x - tvx * e1z
-        qvz = tvx * e1y - tvy * e1x
-        v = (ray_direction.x * qvx + ray_direction.y * qvy + ray_direction.z *
-            qvz) * inv_det
-        if v < 0.0 or u + v > 1.0:
-            return None
-        t = (e2x * qvx + e2y * qvy + e2z * qvz) * inv_det
-        if t < 0.0:
-            return None
-        return t
+        return intersect(self.intersection_data,
+                         ray_origin.x, ray_origin.y, ray_origin.z,
+                         ray_direction.x, ray_direction.y, ray_direction.z)
 
     def get_sample_point(self, random):
         sqr1 = sqrt(random.real64())
@@ -84,3 +64,33 @@ class Triangle(object):
         a = 1.0 - sqr1
         b = (1.0 - r2) * sqr1
         return self.edge0 * a + self.edge3 * b + self.vertexs[0]
+
+
+def intersect(data, ox, oy, oz, dx, dy, dz):
+    """ Distance along a ray to a triangle, given by its intersection_data
+    :return float|None: None if the ray misses the triangle
+    """
+    e1x, e1y, e1z, e2x, e2y, e2z, v0x, v0y, v0z = data
+    pvx = dy * e2z - dz * e2y
+    pvy = dz * e2x - dx * e2z
+    pvz = dx * e2y - dy * e2x
+    det = e1x * pvx + e1y * pvy + e1z * pvz
+    if -EPSILON < det < EPSILON:
+        return None
+    inv_det = 1.0 / det
+    tvx = ox - v0x
+    tvy = oy - v0y
+    tvz = oz - v0z
+    u = (tvx * pvx + tvy * pvy + tvz * pvz) * inv_det
+    if u < 0.0 or u > 1.0:
+        return None
+    qvx = tvy * e1z - tvz * e1y
+    qvy = tvz * e1x - tvx * e1z
+    qvz = tvx * e1y - tvy * e1x
+    v = (dx * qvx + dy * qvy + dz * qvz) * inv_det
+    if v < 0.0 or u + v > 1.0:
+        return None
+    t = (e2x * qvx + e2y * qvy + e2z * qvz) * inv_det
+    if t < 0.0:
+        return None
+    return t
@@ -6,7 +6,20 @@
 
 from math import sqrt
 
+_new = object.__new__
+
+
+def vector(x, y, z):
+    """ Create a vector from three floats, bypassing argument parsing """
+    v = _new(Vector3f)
+    v.x = x
+    v.y = y
+    v.z = z
+    return v
+
+
 class Vector3f(object):
+    __slots__ = ('x', 'y', 'z')
 
     def __init__(self, *args):
         if len(args) == 1 and type(args[0]) == type(''):
@@ -25,9 +38,7 @@ class Vector3f(object):
         return "({0.x}, {0.y}, {0.z})".format(self)
 
     def __iter__(self):
-        yield self.x
-        yield self.y
-        yield self.z
+        return iter((self.x, self.y, self.z))
 
     def __getitem__(self, key):
         if key == 2:
@@ -38,20 +49,20 @@ class Vector3f(object):
             return self.x
 
     def __neg__(self):
-        return Vector3f(-self.x, -self.y, -self.z)
+        return vector(-self.x, -self.y, -self.z)
 
     def __add__(self, other):
-        return Vector3f(self.x + other.x, self.y + other.y, self.z + other.z)
+        return vector(self.x + other.x, self.y + other.y, self.z + other.z)
 
     def __sub__(self, other):
-        return Vector3f(self.x - other.x, self.y - other.y, self.z - other.z)
+        return vector(self.x - other.x, self.y - other.y, self.z - other.z)
 
     def __mul__(self, other):
-        if type(other) == Vector3f:
-            return Vector3f(self.x * other.x, self.y * other.y,
+        if type(other) is Vector3f:
+            return vector(self.x * other.x, self.y * other.y,
                 self.z * other.z)
         else:
-            return Vector3f(self.x * other, self.y * other, self.z * other)
+            return vector(self.x * other, self.y * other, self.z * other)
 
     def is_zero(self):
         return self.x == 0.0 and self.y == 0.0 and self.z == 0.0
@@ -60,20 +71,21 @@ class Vector3f(object):
         return (self.x * other.x) + (self.y * other.y) + (self.z * other.z)
 
     def unitize(self):
-        length = sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+        x, y, z = self.x, self.y, self.z
+        length = sqrt(x * x + y * y + z * z)
         one_over_length = 1.0 / length if length != 0.0 else 0.0
-        return Vector3f(self.x * one_over_length, self.y * one_over_length,
-            self.z * one_over_length)
+        return vector(x * one_over_length, y * one_over_length,
+            z * one_over_length)
 
     def cross(self, other):
-        return Vector3f((self.y * other.z) - (self.z * other.y),
-                        (self.z * other.x) - (self.x * other.z),
-                        (self.x * other.y) - (self.y * other.x))
+        return vector((self.y * other.z) - (self.z * other.y),
+                      (self.z * other.x) - (self.x * other.z),
+                      (self.x * other.y) - (self.y * other.x))
 
     def clamped(self, lo, hi):
-        return Vector3f(min(max(self.x, lo.x), hi.x),
-                        min(max(self.y, lo.y), hi.y),
-                        min(max(self.z, lo.z), hi.z))
+        return vector(min(max(self.x, lo.x), hi.x),
+                      min(max(self.y, lo.y), hi.y),
+                      min(max(self.z, lo.z), hi.z))
 
 ZERO = Vector3f(0.0)
 ONE = Vector3f(1.0)
@@ -2,12 +2,12 @@ from __future__ import division
 import logging
 import math
 
+from apps.rendering.resources.imgcompare import (calculate_greyscale_mse,
+                                                 calculate_mse, calculate_ssim)
 from apps.rendering.resources.imgrepr import (ImgRepr, PILImgRepr)
 from apps.core.task.verificator \
     import SubtaskVerificationState as VerificationState
 
-from ssim import compute_ssim
-
 logger = logging.getLogger("apps.rendering")
 
 
@@ -20,7 +20,7 @@ class ImgStatistics(object):
             raise ValueError('base_img and img are of different sizes.')
 
         self.img = img
-        self.ssim = compute_ssim(base_img.to_pil(), self.img.to_pil())
+        self.ssim = calculate_ssim(base_img.to_pil(), self.img.to_pil())
         self.mse, self.norm_mse = \
             self._calculate_color_normalized_mse(base_img, self.img)
         self.mse_bw, norm_mse_bw = \
@@ -38,23 +38,7 @@ class ImgStatistics(object):
     def _calculate_greyscale_normalized_mse(self, img1: ImgRepr, img2: ImgRepr):
         (res_x, res_y) = img1.get_size()
 
-        img1_bw = img1.to_pil().convert('L')  # makes it greyscale
-        img2_bw = img2.to_pil().convert('L')  # makes it greyscale
-
-        import numpy
-        npimg1 = numpy.array(img1_bw)
-        npimg2 = numpy.array(img2_bw)
-
-        npimg1 = npimg1.astype(numpy.float32, copy=False)
-        npimg2 = npimg2.astype(numpy.float32, copy=False)
-
-        mse_bw = 0
-        for i in range(len(npimg1)):
-            for j in range(len(npimg1[0])):
-                mse_bw += (npimg1[i][j] - npimg2[i][j]) \
-                          * (npimg1[i][j] - npimg2[i][j])
-
-        mse_bw /= res_x * res_y
+        mse_bw = calculate_greyscale_mse(img1.to_pil(), img2.to_pil())
 
         # max value of pixel is 255
         max_possible_mse = res_x * res_y * 255
@@ -63,18 +47,9 @@ class ImgStatistics(object):
         return mse_bw, norm_mse
 
     def _calculate_color_normalized_mse(self, img1, img2):
-        mse = 0
         (res_x, res_y) = img1.get_size()
 
-        for i in range(0, res_x):
-            for j in range(0, res_y):
-                [r1, g1, b1] = img1.get_pixel((i, j))
-                [r2, g2, b2] = img2.get_pixel((i, j))
-                mse += (r1 - r2) * (r1 - r2) + \
-                       (g1 - g2) * (g1 - g2) + \
-                       (b1 - b2) * (b1 - b2)
-
-        mse /= res_x * res_y * 3
+        mse = calculate_mse(img1, img2)
 
         # max value of pixel is 255
         max_possible_mse = res_x * res_y * 3 * 255
@@ -2,6 +2,8 @@ from __future__ import division
 import logging
 import math
 
+import numpy
+
 from apps.rendering.resources.imgrepr import (EXRImgRepr, ImgRepr, load_img,
                                               PILImgRepr)
 logger = logging.getLogger("apps.rendering")
@@ -31,7 +33,6 @@ def calculate_mse(img1, img2, start1=(0, 0), start2=(0, 0), box=None):
     :param box: describes side lengths of the box
     :return:
     """
-    mse = 0
     if not isinstance(img1, ImgRepr) or not isinstance(img2, ImgRepr):
         raise TypeError("img1 and img2 must be ImgRepr")
 
@@ -45,19 +46,98 @@ def calculate_mse(img1, img2, start1=(0, 0), start2=(0, 0), box=None):
                  'img1 and img2 are of different sizes '
                  'and there is no cropping box provided.')
 
-    for i in range(0, res_x):
-        for j in range(0, res_y):
-            [r1, g1, b1] = img1.get_pixel((start1[0] + i, start1[1] + j))
-            [r2, g2, b2] = img2.get_pixel((start2[0] + i, start2[1] + j))
-            mse += (r1 - r2) * (r1 - r2) + \
-                   (g1 - g2) * (g1 - g2) + \
-                   (b1 - b2) * (b1 - b2)
-
     if res_x <= 0 or res_y <= 0:
         raise ValueError("Image or box resolution must be greater than 0")
 
-    mse /= res_x * res_y * 3
-    return mse
+    arr1 = _region_array(img1, start1, (res_x, res_y))
+    arr2 = _region_array(img2, start2, (res_x, res_y))
+    return mean_squared_error(arr1, arr2)
+
+
+def mean_squared_error(arr1, arr2):
+    """ Mean of squared differences of all values of two arrays
+    :param numpy.ndarray arr1:
+    :param numpy.ndarray arr2: array of the same shape as arr1
+    :return float:
+    """
+    diff = numpy.subtract(arr1, arr2, dtype=numpy.float64).ravel()
+    return float(numpy.dot(diff, diff) / diff.size)
+
+
+def calculate_greyscale_mse(pil_img1, pil_img2):
+    """ MSE of greyscale versions of two PIL images """
+    return mean_squared_error(_greyscale_array(pil_img1),
+                              _greyscale_array(pil_img2))
+
+
+def calculate_ssim(pil_img1, pil_img2, gaussian_kernel_sigma=1.5,
+                   gaussian_kernel_width=11, dynamic_range=255,
+                   k_1=0.01, k_2=0.03):
+    """ Structural similarity index of greyscale versions of two PIL images.
+    Values match compute_ssim from the pyssim package.
+    :return float: SSIM value in the range (-1, 1)
+    """
+    kernel = _gaussian_kernel(gaussian_kernel_width, gaussian_kernel_sigma)
+    c_1 = (k_1 * dynamic_range) ** 2
+    c_2 = (k_2 * dynamic_range) ** 2
+
+    gray1 = _greyscale_array(pil_img1)
+    gray2 = _greyscale_array(pil_img2)
+
+    mu1 = _gaussian_blur(gray1, kernel)
+    mu2 = _gaussian_blur(gray2, kernel)
+    mu1_sq = mu1 ** 2
+    mu2_sq = mu2 ** 2
+    mu12 = mu1 * mu2
+
+    sigma1_sq = _gaussian_blur(gray1 ** 2, kernel) - mu1_sq
+    sigma2_sq = _gaussian_blur(gray2 ** 2, kernel) - mu2_sq
+    sigma12 = _gaussian_blur(gray1 * gray2, kernel) - mu12
+
+    num_ssim = (2 * mu12 + c_1) * (2 * sigma12 + c_2)
+    den_ssim = (mu1_sq + mu2_sq + c_1) * (sigma1_sq + sigma2_sq + c_2)
+    return float(numpy.average(num_ssim / den_ssim))
+
+
+def _region_array(img, start, box):
+    (x, y), (res_x, res_y) = start, box
+    (width, height) = img.get_size()
+    if x < 0 or y < 0 or x + res_x > width or y + res_y > height:
+        raise IndexError("Box {} at {} exceeds the image".format(box, start))
+    return img.to_array((x, y, x + res_x, y + res_y))
+
+
+def _greyscale_array(pil_img):
+    return numpy.asarray(pil_img.convert('L'), dtype=numpy.float64)
+
+
+def _gaussian_kernel(width, sigma):
+    kernel = numpy.arange(0, width, 1.) - width / 2
+    kernel = numpy.exp(-0.5 * kernel ** 2 / sigma ** 2)
+    return kernel / numpy.sum(kernel)
+
+
+def _gaussian_blur(arr, kernel):
+    return _correlate(_correlate(arr, kernel, 0), kernel, 1)
+
+
+def _correlate(arr, kernel, axis):
+    """ 1-D correlation along an axis, with the input extended by
+    reflecting it about its edges (as in scipy.ndimage.correlate1d) """
+    size = len(kernel)
+    before = size // 2
+    pad = [(0, 0)] * arr.ndim
+    pad[axis] = (before, size - before - 1)
+    padded = numpy.pad(arr, pad, mode='symmetric')
+
+    result = numpy.zeros(arr.shape, dtype=numpy.float64)
+    product = numpy.empty_like(result)
+    index = [slice(None)] * arr.ndim
+    for i, weight in enumerate(kernel):
+        index[axis] = slice(i, i + arr.shape[axis])
+        numpy.multiply(padded[tuple(index)], weight, out=product)
+        result += product
+    return result
 
 
 def compare_imgs(img1, img2, max_col=255, start1=(0, 0),
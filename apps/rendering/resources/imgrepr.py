@@ -4,6 +4,7 @@ import logging
 from copy import deepcopy
 import OpenEXR
 import Imath
+import numpy
 from PIL import Image
 
 logger = logging.getLogger("apps.rendering")
@@ -34,6 +35,16 @@ class ImgRepr(object, metaclass=abc.ABCMeta):
     def to_pil(self):
         return
 
+    def to_array(self, box=None):
+        """ Pixel values as a (height, width, 3) float array; RGB values of
+        the pixel at (x, y) are stored at [y, x]
+        :param tuple box: (left, upper, right, lower) region to return
+        """
+        img = self.to_pil().convert('RGB')
+        if box is not None:
+            img = img.crop(box)
+        return numpy.asarray(img, dtype=numpy.float64)
+
 
 class PILImgRepr(ImgRepr):
     def __init__(self):
@@ -79,41 +90,129 @@ class PILImgRepr(ImgRepr):
 
 
 class EXRImgRepr(ImgRepr):
+    """ OpenEXR image. Channels are kept as float32 numpy arrays: rgb of
+    shape (height, width, 3) and alpha of shape (height, width), or None
+    if the file has no alpha channel. Pixel data is read from the file
+    when it is first accessed, so regions of large images can be read
+    with to_array(box) without loading the whole image.
+    """
+
     def __init__(self):
         self.img = None
         self.type = "EXR"
         self.dw = None
         self.pt = Imath.PixelType(Imath.PixelType.FLOAT)
-        self.rgb = None
         self.min = 0.0
         self.max = 1.0
         self.file_path = None
+        self._rgb = None
+        self._alpha = None
+
+    @property
+    def rgb(self):
+        if self._rgb is None and self.img is not None:
+            self._rgb, self._alpha = self._read_channels()
+        return self._rgb
+
+    @rgb.setter
+    def rgb(self, rgb):
+        self._rgb = rgb
+
+    @property
+    def alpha(self):
+        if self.rgb is None:
+            return None
+        return self._alpha
 
     def load_from_file(self, file_):
         self.img = OpenEXR.InputFile(file_)
         self.dw = self.img.header()['dataWindow']
-        self.rgb = [Image.frombytes("F", self.get_size(),
-                                    self.img.channel(c, self.pt))
-                    for c in "RGB"]
+        self._rgb = None
+        self._alpha = None
         self.file_path = file_
         self.name = os.path.basename(file_)
 
+    def load_from_arrays(self, rgb, alpha=None, name="noname.exr"):
+        """
+        :param numpy.ndarray rgb: (height, width, 3) array of RGB values
+        :param numpy.ndarray alpha: (height, width) array of alpha values
+        :param str name: image name
+        """
+        self.img = None
+        self.dw = None
+        self.file_path = None
+        self._rgb = numpy.array(rgb, dtype=numpy.float32)
+        self._alpha = None if alpha is None \
+            else numpy.array(alpha, dtype=numpy.float32)
+        self.name = name
+
     def get_size(self):
-        return self.dw.max.x - self.dw.min.x + 1, \
-               self.dw.max.y - self.dw.min.y + 1
+        if self._rgb is not None:
+            height, width = self._rgb.shape[:2]
+            return width, height
+        return (self.dw.max.x - self.dw.min.x + 1,
+                self.dw.max.y - self.dw.min.y + 1)
 
     def get_pixel(self, xy):
-        return [c.getpixel(xy) for c in self.rgb]
+        x, y = self._check_xy(xy)
+        return [float(c) for c in self.rgb[y, x]]
 
     def set_pixel(self, xy, color):
-        for c in range(0, len(self.rgb)):
-            self.rgb[c].putpixel(xy, max(min(self.max, color[c]), self.min))
+        x, y = self._check_xy(xy)
+        self.rgb[y, x] = numpy.clip(numpy.asarray(color[:3], dtype=float),
+                                    self.min, self.max)
+
+    def to_array(self, box=None):
+        """
+        :param tuple box: (left, upper, right, lower) region to return;
+                          only the scanlines it covers are read from a file
+                          which has not been loaded yet
+        :return numpy.ndarray: (height, width, 3) float64 array
+        """
+        if box is None:
+            return self.rgb.astype(numpy.float64)
+
+        left, upper, right, lower = box
+        if self._rgb is not None:
+            region = self._rgb[upper:lower, left:right]
+        else:
+            region, _ = self._read_channels(upper, lower)
+            region = region[:, left:right]
+        return region.astype(numpy.float64)
+
+    def crop(self, box):
+        """
+        :param tuple box: (left, upper, right, lower) region to copy
+        :return EXRImgRepr: new image
+        """
+        left, upper, right, lower = box
+        alpha = self.alpha
+        if alpha is not None:
+            alpha = alpha[upper:lower, left:right]
+
+        e = EXRImgRepr()
+        e.load_from_arrays(self.rgb[upper:lower, left:right], alpha,
+                           self.name)
+        e.min = self.min
+        e.max = self.max
+        return e
+
+    def paste(self, img, xy=(0, 0)):
+        """ Copy pixels of another EXRImgRepr into this image; the part
+        of img outside of this image is ignored
+        :param EXRImgRepr img: image to paste
+        :param tuple xy: position of img's top left corner in this image
+        """
+        x, y = xy
+        width, height = self.get_size()
+        src = img.rgb[max(0, -y):height - y, max(0, -x):width - x]
+        if src.size:
+            top, left = max(0, y), max(0, x)
+            self.rgb[top:top + src.shape[0], left:left + src.shape[1]] = src
 
     def get_rgbf_extrema(self):
-        extrema = [im.getextrema() for im in self.rgb]
-        darkest = min([lo for (lo, hi) in extrema])
-        lightest = max([hi for (lo, hi) in extrema])
-        return lightest, darkest
+        rgb = self.rgb
+        return float(rgb.max()), float(rgb.min())
 
     def to_pil(self, use_extremas=False):
         if use_extremas:
@@ -126,10 +225,13 @@ class EXRImgRepr(ImgRepr):
             lightest = 0.1 + darkest
         scale = 255.0 / (lightest - darkest)
 
-        def normalize_0_255(v):
-            return v * scale
-
-        rgb8 = [im.point(normalize_0_255).convert("L") for im in self.rgb]
+        # scaled in double precision and stored as float32, as by
+        # Image.point on "F" images; conversion to "L" is left to PIL
+        scaled = (self.rgb.astype(numpy.float64) * scale) \
+            .astype(numpy.float32)
+        rgb8 = [Image.fromarray(numpy.ascontiguousarray(scaled[:, :, c]),
+                                "F").convert("L")
+                for c in range(3)]
         return Image.merge("RGB", rgb8)
 
     def to_l_image(self):
@@ -138,13 +240,47 @@ class EXRImgRepr(ImgRepr):
 
     def copy(self):
         e = EXRImgRepr()
-        e.load_from_file(self.file_path)
+        e.img = self.img
         e.dw = deepcopy(self.dw)
-        e.rgb = deepcopy(self.rgb)
+        e.file_path = self.file_path
+        e.name = getattr(self, 'name', None)
         e.min = self.min
         e.max = self.max
+        if self._rgb is not None:
+            e.rgb = self._rgb.copy()
+            e._alpha = None if self._alpha is None else self._alpha.copy()
         return e
 
+    def _read_channels(self, upper=None, lower=None):
+        width, height = self.get_size()
+        upper = 0 if upper is None else upper
+        lower = height if lower is None else lower
+        if lower <= upper:
+            return numpy.zeros((0, width, 3), dtype=numpy.float32), None
+
+        names = ["R", "G", "B"]
+        has_alpha = "A" in self.img.header()['channels']
+        if has_alpha:
+            names.append("A")
+
+        # scanline numbers are absolute and inclusive
+        first = self.dw.min.y + upper
+        data = self.img.channels(names, self.pt, first,
+                                 first + lower - upper - 1)
+        channels = [numpy.frombuffer(d, dtype=numpy.float32)
+                    .reshape(lower - upper, width) for d in data]
+
+        rgb = numpy.dstack(channels[:3])
+        alpha = channels[3].copy() if has_alpha else None
+        return rgb, alpha
+
+    def _check_xy(self, xy):
+        x, y = xy
+        width, height = self.get_size()
+        if not (0 <= x < width and 0 <= y < height):
+            raise IndexError("image index out of range")
+        return x, y
+
 
 def load_img(file_):
     """
@@ -197,12 +333,14 @@ def blend(img1, img2, alpha):
         return
 
     img = img1.copy()
+    blended = img1.to_array() * (1 - alpha) + img2.to_array() * alpha
 
-    for x in range(0, res_x):
-        for y in range(0, res_y):
-            p1 = img1.get_pixel((x, y))
-            p2 = img2.get_pixel((x, y))
-            p = list(map(lambda c1, c2: c1 * (1 - alpha) + c2 * alpha, p1, p2))
-            img.set_pixel((x, y), p)
+    if isinstance(img, EXRImgRepr):
+        img.rgb = numpy.clip(blended, img.min, img.max) \
+            .astype(numpy.float32)
+    else:
+        # truncated towards zero, as by int()
+        img.img = Image.fromarray(blended.astype(numpy.uint8), "RGB")
+        img.img.name = img1.img.name
 
     return img
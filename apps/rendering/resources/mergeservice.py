@@ -0,0 +1,295 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Lock
+
+import Imath
+import numpy
+import OpenEXR
+from PIL import Image
+
+from apps.rendering.resources.imgrepr import EXRImgRepr
+
+logger = logging.getLogger("apps.rendering")
+
+PASTE = "paste"
+ADD = "add"
+MAX_WORKERS = 4
+
+
+def is_alpha_file(path):
+    """ Alpha parts are recognised by their names, as in the taskcollector """
+    return "Alpha" in os.path.basename(path)
+
+
+def load_part(path):
+    """ Decode an image part
+    :param str path: image file path
+    :return tuple: (height, width, 3) float32 RGB array and (height, width)
+                   float32 alpha array or None
+    """
+    _, ext = os.path.splitext(path)
+    if ext.upper() == ".EXR":
+        img = EXRImgRepr()
+        img.load_from_file(path)
+        return img.rgb, img.alpha
+
+    # 8-bit images are stored in [0, 1], like after conversion to float
+    with Image.open(path) as img:
+        alpha = None
+        if 'A' in img.getbands():
+            alpha = numpy.asarray(img.getchannel('A'),
+                                  dtype=numpy.float32) / 255
+        rgb = numpy.asarray(img.convert('RGB'), dtype=numpy.float32) / 255
+    return rgb, alpha
+
+
+def write_exr(output_path, rgb, alpha=None):
+    """ Save float32 arrays as a float EXR file
+    :param str output_path: output file path
+    :param numpy.ndarray rgb: (height, width, 3) RGB array
+    :param numpy.ndarray alpha: (height, width) alpha array
+    """
+    height, width, _ = rgb.shape
+    channels = {c: rgb[:, :, i] for i, c in enumerate("RGB")}
+    if alpha is not None:
+        channels['A'] = alpha
+
+    header = OpenEXR.Header(width, height)
+    pixel_type = Imath.PixelType(Imath.PixelType.FLOAT)
+    header['channels'] = {c: Imath.Channel(pixel_type) for c in channels}
+
+    output = OpenEXR.OutputFile(output_path, header)
+    try:
+        output.writePixels({c: data.astype(numpy.float32).tobytes()
+                            for c, data in channels.items()})
+    finally:
+        output.close()
+
+
+class MergeJob(object):
+    """
+    Parts of a single output image. Each part is decoded by the worker pool
+    as soon as it is added. In add mode it is summed up right away, so only
+    the running total is kept. In paste mode the decoded part is kept until
+    the image is saved, since the vertical offsets of parts depend on the
+    complete list of parts; saving then only copies the parts into the
+    output and writes it.
+    """
+
+    def __init__(self, executor, mode=PASTE, width=None, height=None,
+                 owner=None):
+        if mode not in (PASTE, ADD):
+            raise ValueError("Unknown merge mode: {}".format(mode))
+
+        self.mode = mode
+        self.width = width
+        self.height = height
+        self.owner = owner
+
+        self._executor = executor
+        self._lock = Lock()
+        # part path -> Future; the result of a paste mode future is the
+        # decoded part
+        self._parts = dict()
+        # add mode: paths of parts included in the running total
+        self._summed = set()
+        self._rgb = None
+        self._alpha = None
+
+    def add_part(self, path):
+        """ Add a part, which is decoded in the background. Adding the same
+        part twice has no effect
+        :param str path: image file path
+        :return concurrent.futures.Future: decoding of the part
+        """
+        with self._lock:
+            future = self._parts.get(path)
+            if future is None:
+                load = self._load if self.mode == ADD else load_part
+                future = self._parts[path] = \
+                    self._executor.submit(load, path)
+        return future
+
+    def save(self, output_path, files):
+        """ Merge files and save the result as a float EXR file. Files which
+        have not been added yet are decoded now; parts added before, but not
+        listed in files, are left out
+        :param str output_path: output file path
+        :param list files: paths of all parts of the image; in paste mode
+                           parts are stacked in this order
+        """
+        img_files = [f for f in files if not is_alpha_file(f)]
+        # alpha parts are only used when adding, as in the taskcollector
+        alpha_files = [f for f in files if is_alpha_file(f)]
+        if not img_files:
+            raise ValueError("No image parts to merge")
+
+        if self.mode == PASTE:
+            rgb, alpha = self._paste(img_files)
+        else:
+            files = img_files + alpha_files
+            with self._lock:
+                pending = list(self._parts.values())
+            wait(pending)
+            self._wait(files)
+            if self._summed != set(files):
+                # a part was replaced, so the total has to be computed again
+                self._reset()
+                self._wait(files)
+            rgb, alpha = self._rgb, self._alpha
+
+        write_exr(output_path, rgb, alpha)
+
+    def _wait(self, files):
+        futures = [self.add_part(f) for f in files]
+        return [future.result() for future in futures]
+
+    def _reset(self):
+        with self._lock:
+            self._parts = dict()
+            self._summed = set()
+            self._rgb = None
+            self._alpha = None
+
+    def _load(self, path):
+        rgb, alpha = load_part(path)
+        self._add(path, rgb, alpha)
+
+    def _paste(self, files):
+        parts = self._wait(files)
+        with self._lock:
+            # decoded parts are not needed after they are copied
+            self._parts = dict()
+
+        width = self.width or parts[0][0].shape[1]
+        height = self.height or sum(rgb.shape[0] for rgb, _ in parts)
+        rgb = numpy.zeros((height, width, 3), dtype=numpy.float32)
+        alpha = None
+
+        offset = 0
+        for part_rgb, part_alpha in parts:
+            part_height, part_width = part_rgb.shape[:2]
+            rows = max(0, min(height, offset + part_height) - offset)
+            cols = min(width, part_width)
+            rgb[offset:offset + rows, :cols] = part_rgb[:rows, :cols]
+            if part_alpha is not None:
+                if alpha is None:
+                    alpha = numpy.zeros((height, width), dtype=numpy.float32)
+                alpha[offset:offset + rows, :cols] = part_alpha[:rows, :cols]
+            offset += part_height
+        return rgb, alpha
+
+    def _add(self, path, rgb, alpha):
+        with self._lock:
+            if self._rgb is None:
+                width = self.width or rgb.shape[1]
+                height = self.height or rgb.shape[0]
+                # float64 keeps the total independent of the arrival order
+                self._rgb = numpy.zeros((height, width, 3))
+
+            height, width = self._rgb.shape[:2]
+            rows = min(height, rgb.shape[0])
+            cols = min(width, rgb.shape[1])
+
+            if is_alpha_file(path):
+                values = rgb[:rows, :cols].sum(axis=2, dtype=numpy.float64)
+                self._add_alpha(values, rows, cols)
+            else:
+                self._rgb[:rows, :cols] += rgb[:rows, :cols]
+                if alpha is not None:
+                    self._add_alpha(alpha[:rows, :cols], rows, cols)
+            self._summed.add(path)
+
+    def _add_alpha(self, values, rows, cols):
+        if self._alpha is None:
+            self._alpha = numpy.zeros(self._rgb.shape[:2])
+        self._alpha[:rows, :cols] += values
+
+
+class MergeService(object):
+    """
+    Merges collected result parts in-process, using a persistent pool of
+    worker threads. Parts may be added as soon as they are accepted, so
+    they are decoded while the rest of the image is still being computed;
+    merging an image only has to wait for its last parts.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or min(MAX_WORKERS, os.cpu_count() or 1)
+        self._executor = None
+        self._lock = Lock()
+        # normalized output path -> MergeJob
+        self._jobs = dict()
+
+    def add_part(self, output_path, part_path, mode=PASTE, width=None,
+                 height=None, owner=None):
+        """ Start decoding a part of an output image
+        :param str output_path: path of the merged image
+        :param str part_path: path of the part
+        :param str mode: "paste" to stack parts vertically in the order in
+                         which they are passed to merge, "add" to sum them
+                         up
+        :param int width: width of the merged image
+        :param int height: height of the merged image
+        :param owner: identifier of the job owner, see discard_owner
+        """
+        job = self._get_job(output_path, mode, width, height, owner)
+        job.add_part(part_path)
+
+    def merge(self, output_path, files, mode=PASTE, width=None, height=None,
+              owner=None):
+        """ Merge parts of an image and save it as a float EXR file. Blocks
+        until the image is saved. Parameters are the same as in add_part
+        :param list files: paths of all parts of the image
+        """
+        job = self._get_job(output_path, mode, width, height, owner)
+        try:
+            job.save(output_path, files)
+        finally:
+            self.discard(output_path)
+
+    def discard(self, output_path):
+        """ Drop parts collected for an output image """
+        with self._lock:
+            self._jobs.pop(self._norm(output_path), None)
+
+    def discard_owner(self, owner):
+        """ Drop parts of all images of the given owner """
+        with self._lock:
+            for key, job in list(self._jobs.items()):
+                if job.owner == owner:
+                    del self._jobs[key]
+
+    def pending(self):
+        """ :return list: output paths with parts waiting to be merged """
+        with self._lock:
+            return list(self._jobs)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._jobs = dict()
+        if executor:
+            executor.shutdown(wait=True)
+
+    def _get_job(self, output_path, mode, width, height, owner):
+        key = self._norm(output_path)
+        with self._lock:
+            if not self._executor:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers)
+
+            job = self._jobs.get(key)
+            if job is None or (job.mode, job.width, job.height) != \
+                    (mode, width, height):
+                job = MergeJob(self._executor, mode, width, height, owner)
+                self._jobs[key] = job
+            return job
+
+    @staticmethod
+    def _norm(path):
+        return os.path.normpath(os.path.abspath(path))
+
+
+merge_service = MergeService()
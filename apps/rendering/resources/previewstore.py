@@ -0,0 +1,205 @@
+import itertools
+import logging
+import os
+from collections import OrderedDict
+from threading import RLock
+
+from PIL import Image
+
+logger = logging.getLogger("apps.rendering")
+
+FLUSH_DELAY = 2.0
+BYTE_BUDGET = 256 * 1024 * 1024
+
+
+def image_nbytes(img):
+    width, height = img.size
+    return width * height * len(img.getbands())
+
+
+_versions = itertools.count(1)
+
+
+class PreviewCanvas(object):
+    __slots__ = ('img', 'fmt', 'dirty', 'stat', 'version')
+
+    def __init__(self, img, fmt, dirty):
+        self.img = img
+        self.fmt = fmt
+        self.dirty = dirty
+        self.stat = None
+        self.version = next(_versions)
+
+
+class PreviewStore(object):
+    """
+    Keeps preview images in memory, keyed by their file paths. Updates are
+    applied to the canvases in place; changed canvases are written to disk
+    at most once per flush_delay seconds, or when a reader asks for them.
+    When canvases take more than budget bytes, the least recently used
+    ones are written to disk and dropped from memory. A preview file which
+    was modified or removed by someone else is loaded again.
+    """
+
+    def __init__(self, budget=BYTE_BUDGET, flush_delay=FLUSH_DELAY):
+        self.budget = budget
+        self.flush_delay = flush_delay
+        self._lock = RLock()
+        # path -> PreviewCanvas, least recently used first
+        self._canvases = OrderedDict()
+        self._nbytes = 0
+        self._call = None
+        self._shutdown_trigger = False
+
+    def open(self, path, size=None, mode="RGB", fmt="PNG"):
+        """ Return the canvas of a preview. It is loaded from the preview
+        file or, if there is no file, a new black canvas is created. The
+        canvas stays owned by the store, so call changed() after drawing on
+        it instead of saving or closing it
+        :param str path: preview file path
+        :param tuple size: (width, height) of a new canvas
+        :param str mode: mode of a new canvas
+        :param str fmt: format of the preview file
+        :return Image.Image:
+        :raises OSError: if the file cannot be read and size is not given
+        """
+        with self._lock:
+            canvas = self._get(path)
+            if canvas is None:
+                if size is not None and not os.path.exists(path):
+                    return self.new(path, size, mode, fmt)
+                img = Image.open(path)
+                img.load()
+                canvas = self._add(path, img, fmt, dirty=False)
+                self._spill()
+            self._canvases.move_to_end(path)
+            return canvas.img
+
+    def new(self, path, size, mode="RGB", fmt="PNG"):
+        """ Replace a preview with a black canvas
+        :return Image.Image: new canvas
+        """
+        return self.put(path, Image.new(mode, size), fmt)
+
+    def put(self, path, img, fmt="PNG"):
+        """ Replace a preview with the given image, which is taken over by
+        the store
+        :return Image.Image: img
+        """
+        with self._lock:
+            self._drop(path)
+            self._add(path, img, fmt, dirty=True)
+        self._changed()
+        return img
+
+    def changed(self, path):
+        """ Report that a canvas returned by open() was modified """
+        with self._lock:
+            canvas = self._canvases.get(path)
+            if canvas is None:
+                return
+            canvas.dirty = True
+            canvas.version = next(_versions)
+            self._canvases.move_to_end(path)
+        self._changed()
+
+    def flush(self, path=None):
+        """ Write modified previews to disk
+        :param str path: preview to write; all previews if not given
+        """
+        with self._lock:
+            paths = [path] if path else list(self._canvases)
+            for path_ in paths:
+                canvas = self._canvases.get(path_)
+                if canvas and canvas.dirty:
+                    self._write(path_, canvas)
+
+    def discard(self, path):
+        """ Drop a preview from memory, without writing it """
+        with self._lock:
+            self._drop(path)
+
+    def peek(self, path):
+        """ :return Image.Image|None: canvas kept in memory, if any """
+        canvas = self._canvases.get(path)
+        return canvas.img if canvas else None
+
+    def version(self, path):
+        """ :return int|None: number which changes whenever the canvas of
+        a preview changes; None if the preview is not kept in memory """
+        canvas = self._canvases.get(path)
+        return canvas.version if canvas else None
+
+    def nbytes(self):
+        return self._nbytes
+
+    def __contains__(self, path):
+        return path in self._canvases
+
+    def _get(self, path):
+        canvas = self._canvases.get(path)
+        if canvas is None or canvas.dirty:
+            return canvas
+        try:
+            stat = os.stat(path)
+            stat = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stat = None
+        if stat != canvas.stat:
+            self._drop(path)
+            return None
+        return canvas
+
+    def _add(self, path, img, fmt, dirty):
+        canvas = PreviewCanvas(img, fmt, dirty)
+        if not dirty:
+            stat = os.stat(path)
+            canvas.stat = (stat.st_mtime_ns, stat.st_size)
+        self._canvases[path] = canvas
+        self._nbytes += image_nbytes(img)
+        return canvas
+
+    def _drop(self, path):
+        canvas = self._canvases.pop(path, None)
+        if canvas:
+            self._nbytes -= image_nbytes(canvas.img)
+
+    def _write(self, path, canvas):
+        try:
+            canvas.img.save(path, canvas.fmt)
+            stat = os.stat(path)
+        except Exception as err:
+            logger.error("Cannot save preview %r: %r", path, err)
+            return
+        canvas.dirty = False
+        canvas.stat = (stat.st_mtime_ns, stat.st_size)
+
+    def _changed(self):
+        self._spill()
+        self._schedule_flush()
+
+    def _spill(self):
+        with self._lock:
+            # the most recently used canvas is kept, even if it is too big
+            while self._nbytes > self.budget and len(self._canvases) > 1:
+                path, canvas = next(iter(self._canvases.items()))
+                if canvas.dirty:
+                    self._write(path, canvas)
+                self._drop(path)
+
+    def _schedule_flush(self):
+        from twisted.internet import reactor
+
+        if not reactor.running:
+            self.flush()
+            return
+
+        with self._lock:
+            if not self._shutdown_trigger:
+                reactor.addSystemEventTrigger('before', 'shutdown', self.flush)
+                self._shutdown_trigger = True
+            if not (self._call and self._call.active()):
+                self._call = reactor.callLater(self.flush_delay, self.flush)
+
+
+preview_store = PreviewStore()
@@ -3,6 +3,9 @@ import logging
 import math
 import os
 
+import Imath
+import numpy
+import OpenEXR
 from PIL import Image, ImageChops
 
 from apps.rendering.resources.imgrepr import EXRImgRepr, load_img
@@ -73,29 +76,86 @@ class RenderingTaskCollector(object):
         final_alpha.close()
 
     def finalize_exr(self, exr_repr):
-
-        final_img = exr_repr.to_pil()
-
-        if self.paste:
-            if not self.width or not self.height:
-                self.width, self.height = final_img.size
-                self.height *= len(self.accepted_img_files)
-            img = Image.new('RGB', (self.width, self.height))
-            final_img = self._paste_image(img, final_img, 0)
-            img.close()
-
-        for i, img_path in enumerate(self.accepted_img_files[1:], start=1):
-            img = load_img(img_path)
-            rgb8_im = img.to_pil()
-            if not self.paste:
+        """
+        Connect collected EXR files. In paste mode the output image is
+        allocated once and each part is added to its own row range;
+        parts are loaded one at a time.
+        :param EXRImgRepr exr_repr: first collected image
+        :return Image.Image:
+        """
+        if not self.paste:
+            final_img = exr_repr.to_pil()
+            for img_path in self.accepted_img_files[1:]:
+                rgb8_im = load_img(img_path).to_pil()
                 final_img = ImageChops.add(final_img, rgb8_im)
-            else:
-                final_img = self._paste_image(final_img, rgb8_im, i)
-                
+                rgb8_im.close()
+            return final_img
+
+        if not self.width or not self.height:
+            self.width, self.height = exr_repr.get_size()
+            self.height *= len(self.accepted_img_files)
+
+        # EXR files are read lazily, so only headers are loaded here
+        parts = [exr_repr] + [load_img(img_path)
+                              for img_path in self.accepted_img_files[1:]]
+        offsets = self._get_offsets([part.get_size() for part in parts])
+        final_img = Image.new('RGB', (self.width, self.height))
+
+        for i, offset in enumerate(offsets):
+            rgb8_im = parts[i].to_pil()
+            parts[i] = None
+            self._paste_image(final_img, rgb8_im, offset)
             rgb8_im.close()
 
         return final_img
-        
+
+    def save_exr(self, output_path, band_height=256):
+        """
+        Connect collected EXR files and write the result as a float EXR
+        file, band by band. Only the rows of a single band are kept in
+        memory, and only the matching rows of each part are read. Rendering
+        tasks merge their EXR outputs with the merge service; this is
+        meant for callers which need a float EXR of a very large image.
+        :param str output_path: output file path
+        :param int band_height: number of rows written at once
+        """
+        parts = [load_img(img_path) for img_path in self.accepted_img_files]
+        sizes = [part.get_size() for part in parts]
+
+        if self.paste:
+            width = self.width or sizes[0][0]
+            height = self.height or sum(size[1] for size in sizes)
+            offsets = self._get_offsets(sizes, height)
+        else:
+            width, height = sizes[0]
+            offsets = [0] * len(parts)
+
+        header = OpenEXR.Header(width, height)
+        header['channels'] = {c: Imath.Channel(parts[0].pt) for c in "RGB"}
+        output = OpenEXR.OutputFile(output_path, header)
+
+        try:
+            for top in range(0, height, band_height):
+                bottom = min(height, top + band_height)
+                band = numpy.zeros((bottom - top, width, 3),
+                                   dtype=numpy.float32)
+
+                for part, (part_x, part_y), offset in zip(parts, sizes,
+                                                           offsets):
+                    upper = max(top, offset)
+                    lower = min(bottom, offset + part_y)
+                    right = min(width, part_x)
+                    if upper >= lower or right <= 0:
+                        continue
+                    band[upper - top:lower - top, :right] += part.to_array(
+                        (0, upper - offset, right, lower - offset))
+
+                output.writePixels({c: band[:, :, i].tobytes()
+                                    for i, c in enumerate("RGB")},
+                                   bottom - top)
+        finally:
+            output.close()
+
     def finalize_pil(self):
         res_x, res_y = 0, 0
 
@@ -115,6 +175,7 @@ class RenderingTaskCollector(object):
             band += b
         final_img = Image.new(band, (res_x, res_y))
         offset = 0
+        # parts are read one at a time and pasted straight into the output
         for img_path in self.accepted_img_files:
             img = Image.open(img_path)
             if not self.paste:
@@ -123,11 +184,33 @@ class RenderingTaskCollector(object):
                 final_img.paste(img, (0, offset))
                 _, img_y = img.size
                 offset += img_y
-                img.close()
+            img.close()
         return final_img
 
-    def _paste_image(self, final_img, new_part, num):
-        img_offset = Image.new("RGB", (self.width, self.height))
-        offset = int(math.floor(num * float(self.height) / float(len(self.accepted_img_files))))
-        img_offset.paste(new_part, (0, offset))
-        return ImageChops.add(final_img, img_offset)
+    def _get_offsets(self, sizes, height=None):
+        """
+        Vertical offsets of parts in the final image
+        :param list sizes: (width, height) sizes of collected images
+        :param int height: height of the final image
+        :return list: offsets in pixels
+        """
+        height = height or self.height
+        return [int(math.floor(num * float(height) / float(len(sizes))))
+                for num in range(len(sizes))]
+
+    def _paste_image(self, final_img, new_part, offset):
+        """ Add new_part to final_img at the given vertical offset, in
+        place. Only the covered region is copied, instead of a whole
+        canvas """
+        width, height = final_img.size
+        box = (0, offset, min(width, new_part.size[0]),
+               min(height, offset + new_part.size[1]))
+        if box[2] <= 0 or box[3] <= box[1]:
+            return final_img
+
+        region = final_img.crop(box)
+        part = new_part.crop((0, 0, box[2], box[3] - box[1]))
+        final_img.paste(ImageChops.add(region, part), box)
+        region.close()
+        part.close()
+        return final_img
@@ -0,0 +1,51 @@
+import math
+
+
+def false_accept_bound(wrong_fraction, samples):
+    """ Probability that none of the sampled boxes lands on a wrong part of
+    a result, if boxes are placed uniformly at random and a box which covers
+    wrong pixels is rejected
+    :param float wrong_fraction: fraction of the result area which is wrong
+    :param int samples: number of boxes
+    :return float: upper bound of the false accept probability
+    """
+    if not 0 <= wrong_fraction <= 1:
+        raise ValueError("Wrong fraction must be in [0, 1]")
+    if samples < 0:
+        raise ValueError("Number of samples must not be negative")
+    return (1. - wrong_fraction) ** samples
+
+
+def samples_for_bound(wrong_fraction, false_accept):
+    """ Number of boxes which keeps the false accept probability for
+    results with at least wrong_fraction of wrong area below false_accept
+    :param float wrong_fraction: smallest fraction of a wrong result which
+                                 should be detected, in (0, 1]
+    :param float false_accept: accepted probability of a false accept,
+                               in (0, 1)
+    :return int:
+    """
+    if not 0 < wrong_fraction <= 1:
+        raise ValueError("Wrong fraction must be in (0, 1]")
+    if not 0 < false_accept < 1:
+        raise ValueError("False accept probability must be in (0, 1)")
+    if wrong_fraction == 1:
+        return 1
+    samples = math.log(false_accept) / math.log(1. - wrong_fraction)
+    # guard against rounding up an exact integer
+    return max(1, int(math.ceil(samples - 1e-9)))
+
+
+def sample_boxes(area, box_size, samples, rng):
+    """ Pick upper left corners of boxes placed uniformly in an area
+    :param tuple area: (x0, y0, x1, y1) area of the result
+    :param tuple box_size: (width, height) of a box; clipped to the area
+    :param int samples: number of boxes
+    :param random.Random rng: random number generator
+    :return list: (x, y) corners
+    """
+    x0, y0, x1, y1 = area
+    box_x = min(box_size[0], x1 - x0)
+    box_y = min(box_size[1], y1 - y0)
+    return [(rng.randint(x0, x1 - box_x), rng.randint(y0, y1 - box_y))
+            for _ in range(samples)]
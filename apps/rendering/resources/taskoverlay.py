@@ -0,0 +1,130 @@
+import weakref
+
+
+def clip_box(box, size):
+    """ Clip a (left, upper, right, lower) box to an image
+    :return tuple|None: clipped box; None if nothing is left
+    """
+    left, upper, right, lower = box
+    width, height = size
+    box = (max(0, left), max(0, upper), min(width, right), min(height, lower))
+    if box[0] >= box[2] or box[1] >= box[3]:
+        return None
+    return box
+
+
+def fill_area(img, box, color):
+    """ Paint a rectangular area of an image with a single colour
+    :param Image.Image img: image to paint on
+    :param tuple box: (left, upper, right, lower) area; clipped to the image
+    :param tuple color: colour
+    """
+    box = clip_box(box, img.size)
+    if box:
+        img.paste(color, box)
+
+
+class TaskAreaOverlay(object):
+    """
+    Subtask status colours painted over a preview image. Areas of subtasks
+    are computed once and painted colours are remembered, so an update only
+    repaints the areas whose colour changed, as long as the painted image
+    has not been changed by anyone else in the meantime.
+    """
+
+    def __init__(self):
+        # key -> (left, upper, right, lower)
+        self._areas = dict()
+        # box -> colour
+        self._painted = dict()
+        self._img = None
+        self._version = None
+
+    def area(self, key, compute):
+        """
+        :param key: subtask identifier
+        :param compute: function returning the area box of the subtask
+        :return tuple: cached area box
+        """
+        box = self._areas.get(key)
+        if box is None:
+            box = self._areas[key] = compute()
+        return box
+
+    def compose(self, base, base_version, colors):
+        """ Paint colours over a copy of base. The copy is kept (weakly) and
+        reused while base stays the same; then only areas whose colour has
+        changed are repainted, and unmarked areas are copied back from base
+        :param Image.Image base: image to mark
+        :param base_version: value which changes whenever base changes
+        :param dict colors: box -> colour of marked areas
+        :return tuple: (composed image, whether it is a new image,
+                        number of repainted areas)
+        """
+        img = self._image()
+        fresh = img is None or base_version != self._version or \
+            img.size != base.size or img.mode != base.mode
+        if fresh:
+            img = base.copy()
+            self._painted = dict()
+
+        repainted = 0
+        for box in set(self._painted) - set(colors):
+            clipped = clip_box(box, img.size)
+            if clipped:
+                img.paste(base.crop(clipped), clipped)
+            repainted += 1
+        repainted += self._paint(img, colors)
+
+        self._painted = dict(colors)
+        self._img = weakref.ref(img)
+        self._version = base_version
+        return img, fresh, repainted
+
+    def paint(self, img, version, colors):
+        """ Paint colours directly on img. All areas are painted if img is
+        not the image painted last time, or if it was changed since then;
+        otherwise only areas whose colour changed are repainted
+        :param Image.Image img: image to paint on
+        :param version: value which changes whenever img changes
+        :param dict colors: box -> colour of marked areas
+        :return int: number of repainted areas
+        """
+        if img is not self._image() or version != self._version:
+            self._painted = dict()
+        repainted = self._paint(img, colors)
+        self._painted.update(colors)
+        self._img = weakref.ref(img)
+        self._version = version
+        return repainted
+
+    def painted(self, version):
+        """ Report the version of the painted image after the changes made
+        by paint() were recorded """
+        self._version = version
+
+    def _paint(self, img, colors):
+        repainted = 0
+        for box, color in colors.items():
+            if self._painted.get(box) != color:
+                fill_area(img, box, color)
+                repainted += 1
+        return repainted
+
+    def _image(self):
+        return self._img() if self._img else None
+
+
+_overlays = dict()
+
+
+def get_overlay(key):
+    """ :return TaskAreaOverlay: overlay for the given preview """
+    overlay = _overlays.get(key)
+    if overlay is None:
+        overlay = _overlays[key] = TaskAreaOverlay()
+    return overlay
+
+
+def discard_overlay(key):
+    _overlays.pop(key, None)
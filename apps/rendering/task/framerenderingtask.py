@@ -6,12 +6,14 @@ import os
 from bisect import insort
 from collections import OrderedDict, defaultdict
 
-from PIL import Image, ImageChops
+from PIL import Image
 from copy import deepcopy
 
 from apps.core.task.coretask import CoreTask
 from apps.core.task.coretaskstate import Options
 from apps.rendering.resources.imgrepr import load_as_pil
+from apps.rendering.resources.previewstore import preview_store
+from apps.rendering.resources.taskoverlay import fill_area, get_overlay
 from apps.rendering.resources.renderingtaskcollector import \
     RenderingTaskCollector
 from apps.rendering.task.renderingtask import (RenderingTask,
@@ -187,21 +189,23 @@ class FrameRenderingTask(RenderingTask):
 
     def _update_frame_preview(self, new_chunk_file_path, frame_num, part=1, final=False):
         num = self.frames.index(frame_num)
+        preview_file_path = self._get_preview_file_path(num)
         preview_task_file_path = self._get_preview_task_file_path(num)
         img = load_as_pil(new_chunk_file_path)
 
-        if not final:
-            img = self._paste_new_chunk(img, self._get_preview_file_path(num), part,
-                                        int(self.total_tasks / len(self.frames)))
-
         img_x, img_y = img.size
         img = img.resize((int(round(self.scale_factor * img_x)),
                           int(round(self.scale_factor * img_y))),
                          resample=Image.BILINEAR)
-        img.save(self._get_preview_file_path(num), PREVIEW_EXT)
-        img.save(preview_task_file_path, PREVIEW_EXT)
 
-        img.close()
+        if final:
+            preview_store.put(preview_file_path, img, PREVIEW_EXT)
+        else:
+            # only the chunk is scaled; the stored canvas is updated in place
+            img = self._paste_new_chunk(img, preview_file_path, part,
+                                        int(self.total_tasks / len(self.frames)))
+        preview_store.put(preview_task_file_path, img.copy(), PREVIEW_EXT)
+
         self.last_preview_path = preview_task_file_path
 
     @CoreTask.handle_key_error
@@ -240,54 +244,67 @@ class FrameRenderingTask(RenderingTask):
         # Otherwise, do not change frame's status.
 
     def _paste_new_chunk(self, img_chunk, preview_file_path, chunk_num, all_chunks_num):
+        """ Paste a scaled chunk into the stored preview of a frame
+        :return Image.Image: preview canvas, owned by the preview store
+        """
+        size = (int(round(self.res_x * self.scale_factor)),
+                int(round(self.res_y * self.scale_factor)))
         try:
-            img_offset = Image.new("RGB", (int(round(self.res_x * self.scale_factor)),
-                                           int(round(self.res_y * self.scale_factor))))
-            offset = math.floor((chunk_num - 1) * self.res_y * self.scale_factor / all_chunks_num)
-            offset = int(offset)
-            img_offset.paste(img_chunk, (0, offset))
+            img = preview_store.open(preview_file_path, size, fmt=PREVIEW_EXT)
         except Exception as err:
-            logger.error("Can't generate preview {}".format(err))
-            img_offset = None
-
-        if not os.path.exists(preview_file_path):
-            return img_offset
+            logger.error("Can't add new chunk to preview{}".format(err))
+            img = preview_store.new(preview_file_path, size, fmt=PREVIEW_EXT)
+        if img.size != size:
+            # left from a different resolution or scale
+            img = preview_store.new(preview_file_path, size, fmt=PREVIEW_EXT)
 
         try:
-            img = Image.open(preview_file_path)
-            if img_offset:
-                img = ImageChops.add(img, img_offset)
-            return img
+            offset = math.floor((chunk_num - 1) * self.res_y * self.scale_factor / all_chunks_num)
+            img.paste(img_chunk, (0, int(offset)))
         except Exception as err:
-            logger.error("Can't add new chunk to preview{}".format(err))
-            return img_offset
-
-    def _update_frame_task_preview(self):
-        sent_color = (0, 255, 0)
-        failed_color = (255, 0, 0)
+            logger.error("Can't generate preview {}".format(err))
+            return img
 
-        for sub in self.subtasks_given.values():
-            if SubtaskStatus.is_computed(sub['status']):
-                for frame in sub['frames']:
-                    self.__mark_sub_frame(sub, frame, sent_color)
+        preview_store.changed(preview_file_path)
+        return img
 
-            if sub['status'] in [SubtaskStatus.failure, SubtaskStatus.restarted]:
-                for frame in sub['frames']:
-                    self.__mark_sub_frame(sub, frame, failed_color)
+    def _update_frame_task_preview(self):
+        # frame index -> area -> colour
+        colors = defaultdict(dict)
+
+        for subtask_id, sub in self.subtasks_given.items():
+            color = self._get_status_color(sub)
+            if not color:
+                continue
+            for frame in sub['frames']:
+                idx = self.frames.index(frame)
+                overlay = get_overlay(self._get_preview_task_file_path(idx))
+                box = overlay.area(subtask_id,
+                                   lambda: self._get_task_area(sub, idx))
+                colors[idx][box] = color
+
+        # marks are painted on the frame previews; only areas whose status
+        # changed are repainted, unless the preview itself changed
+        for idx, frame_colors in colors.items():
+            preview_task_file_path = self._get_preview_task_file_path(idx)
+            img_task = self._open_frame_preview(preview_task_file_path)
+            overlay = get_overlay(preview_task_file_path)
+            version = preview_store.version(preview_task_file_path)
+            if overlay.paint(img_task, version, frame_colors):
+                preview_store.changed(preview_task_file_path)
+            overlay.painted(preview_store.version(preview_task_file_path))
 
     def _open_frame_preview(self, preview_file_path):
-
-        if not os.path.exists(preview_file_path):
-            img = Image.new("RGB", (int(round(self.res_x * self.scale_factor)), 
-                                    int(round(self.res_y * self.scale_factor))))
-            img.save(preview_file_path, PREVIEW_EXT)
-
-        return Image.open(preview_file_path)
+        size = (int(round(self.res_x * self.scale_factor)),
+                int(round(self.res_y * self.scale_factor)))
+        return preview_store.open(preview_file_path, size, fmt=PREVIEW_EXT)
 
     def _mark_task_area(self, subtask, img_task, color, frame_index=0):
+        fill_area(img_task, self._get_task_area(subtask, frame_index), color)
+
+    def _get_task_area(self, subtask, frame_index=0):
         if not self.use_frames:
-            RenderingTask._mark_task_area(self, subtask, img_task, color)
-            return
+            return RenderingTask._get_task_area(self, subtask)
 
         lower_x = 0
         upper_x = int(round(self.res_x * self.scale_factor))
@@ -300,9 +317,7 @@ class FrameRenderingTask(RenderingTask):
             upper_y = int(math.ceil(part_height) * ((subtask['start_task'] - 1) % parts))
             lower_y = int(math.floor(part_height) * ((subtask['start_task'] - 1) % parts + 1))
 
-        for i in range(lower_x, upper_x):
-            for j in range(upper_y, lower_y):
-                img_task.putpixel((i, j), color)
+        return lower_x, upper_y, upper_x, lower_y
 
     def _choose_frames(self, frames, start_task, total_tasks):
         if total_tasks <= len(frames):
@@ -327,8 +342,7 @@ class FrameRenderingTask(RenderingTask):
                                                list(self.collected_file_names.values()), "paste")
 
     def _put_frame_together(self, frame_num, num_start):
-        directory = os.path.dirname(self.output_file)
-        output_file_name = os.path.join(directory, self._get_output_name(frame_num))
+        output_file_name = self._get_frame_output_path(frame_num)
         frame_key = str(frame_num)
         collected = self.frames_given[frame_key]
         collected = OrderedDict(sorted(collected.items()))
@@ -338,14 +352,21 @@ class FrameRenderingTask(RenderingTask):
                 collector.add_img_file(file)
             collector.finalize().save(output_file_name, self.output_format)
         else:
-            self._put_collected_files_together(output_file_name, list(collected.values()), "paste")
+            if not self._put_collected_files_together(output_file_name, list(collected.values()), "paste"):
+                return
 
         self.collected_file_names[frame_num] = output_file_name
         self._update_frame_preview(output_file_name, frame_num, final=True)
         self._update_frame_task_preview()
 
+    def _get_frame_output_path(self, frame_num):
+        directory = os.path.dirname(self.output_file)
+        return os.path.join(directory, self._get_output_name(frame_num))
+
     def _collect_image_part(self, num_start, tr_file):
         self.collected_file_names[num_start] = tr_file
+        self._schedule_collected_file(
+            os.path.join(self.tmp_dir, self.output_file), tr_file)
         self._update_preview(tr_file, num_start)
         self._update_task_preview()
 
@@ -361,6 +382,8 @@ class FrameRenderingTask(RenderingTask):
         frame_key = str(frame_num)
         part = self._count_part(num_start, parts)
         self.frames_given[frame_key][part] = tr_file
+        self._schedule_collected_file(
+            self._get_frame_output_path(frame_num), tr_file)
 
         self._update_frame_preview(tr_file, frame_num, part)
 
@@ -378,7 +401,7 @@ class FrameRenderingTask(RenderingTask):
         preview_task_file_path = self._get_preview_task_file_path(idx)
         img_task = self._open_frame_preview(preview_task_file_path)
         self._mark_task_area(sub, img_task, color, idx)
-        img_task.save(preview_task_file_path, PREVIEW_EXT)
+        preview_store.changed(preview_task_file_path)
 
     def _get_subtask_file_path(self, subtask_dir_list, name_dir, num):
         if subtask_dir_list[num] is None:
@@ -7,16 +7,19 @@ from abc import abstractproperty, abstractmethod
 from copy import deepcopy
 from typing import Type
 
-from PIL import Image, ImageChops
+from PIL import ImageChops
 from pathlib import Path
 
 from apps.core.task.coretask import CoreTask, CoreTaskBuilder
 from apps.rendering.resources.imgrepr import load_as_pil
+from apps.rendering.resources.mergeservice import merge_service
+from apps.rendering.resources.previewstore import preview_store
+from apps.rendering.resources.taskoverlay import discard_overlay, fill_area, \
+    get_overlay
 from apps.rendering.task.renderingtaskstate import RendererDefaults
 from apps.rendering.task.verificator import RenderingVerificator
 from golem.core.common import get_golem_path, timeout_to_deadline
-from golem.core.fileshelper import format_cmd_line_path
-from golem.core.simpleexccmd import is_windows, exec_cmd
+from golem.core.simpleexccmd import is_windows
 from golem.docker.environment import DockerEnvironment
 from golem.docker.job import DockerJob
 from golem.task.taskbase import ComputeTaskDef
@@ -78,6 +81,8 @@ class RenderingTask(CoreTask):
         self.preview_task_file_path = None
 
         self.collected_file_names = {}
+        # output path -> error of the merge which should have written it
+        self.output_errors = {}
 
         preview_x = PREVIEW_X
         preview_y = PREVIEW_Y
@@ -105,6 +110,20 @@ class RenderingTask(CoreTask):
     def restart(self):
         super().restart()
         self.collected_file_names = {}
+        self.output_errors = {}
+        merge_service.discard_owner(self.header.task_id)
+        # areas and colours of the old subtasks are no longer valid
+        for path in self._get_preview_paths(self.preview_task_file_path):
+            discard_overlay(path)
+
+    def abort(self):
+        merge_service.discard_owner(self.header.task_id)
+        for path in self._get_preview_paths(self.preview_file_path,
+                                            self.preview_task_file_path):
+            # written first, so that the last state stays available
+            preview_store.flush(path)
+            preview_store.discard(path)
+            discard_overlay(path)
 
     @CoreTask.handle_key_error
     def restart_subtask(self, subtask_id):
@@ -133,6 +152,8 @@ class RenderingTask(CoreTask):
         pass
 
     def get_preview_file_path(self):
+        if self.preview_file_path:
+            preview_store.flush(self.preview_file_path)
         return self.preview_file_path
 
     def _update_preview(self, new_chunk_file_path, num_start):
@@ -140,7 +161,7 @@ class RenderingTask(CoreTask):
 
         img_current = self._open_preview()
         img_current = ImageChops.add(img_current, img)
-        img_current.save(self.preview_file_path, PREVIEW_EXT)
+        preview_store.put(self.preview_file_path, img_current, PREVIEW_EXT)
         img.close()
 
     @CoreTask.handle_key_error
@@ -148,49 +169,101 @@ class RenderingTask(CoreTask):
         empty_color = (0, 0, 0)
         img = self._open_preview()
         self._mark_task_area(self.subtasks_given[subtask_id], img, empty_color)
-        img.save(self.preview_file_path, PREVIEW_EXT)
+        preview_store.changed(self.preview_file_path)
 
     def _update_task_preview(self):
-        sent_color = (0, 255, 0)
-        failed_color = (255, 0, 0)
-
         preview_name = "current_task_preview.{}".format(PREVIEW_EXT)
         preview_task_file_path = "{}".format(os.path.join(self.tmp_dir,
                                                           preview_name))
 
-        img_task = self._open_preview()
-
-        for sub in self.subtasks_given.values():
-            if SubtaskStatus.is_computed(sub['status']):
-                self._mark_task_area(sub, img_task, sent_color)
-            if sub['status'] in [SubtaskStatus.failure,
-                                 SubtaskStatus.restarted]:
-                self._mark_task_area(sub, img_task, failed_color)
-
-        img_task.save(preview_task_file_path, PREVIEW_EXT)
+        img = self._open_preview()
+        overlay = get_overlay(preview_task_file_path)
+        colors = dict()
+
+        for subtask_id, sub in self.subtasks_given.items():
+            color = self._get_status_color(sub)
+            if color:
+                box = overlay.area(subtask_id,
+                                   lambda: self._get_task_area(sub))
+                colors[box] = color
+
+        # only areas whose status changed are repainted, unless the
+        # preview itself changed
+        img_task, fresh, repainted = overlay.compose(
+            img, preview_store.version(self.preview_file_path), colors)
+        if fresh or preview_store.peek(preview_task_file_path) is not img_task:
+            preview_store.put(preview_task_file_path, img_task, PREVIEW_EXT)
+        elif repainted:
+            preview_store.changed(preview_task_file_path)
         self._update_preview_task_file_path(preview_task_file_path)
 
     def _update_preview_task_file_path(self, preview_task_file_path):
         self.preview_task_file_path = preview_task_file_path
 
-    def _mark_task_area(self, subtask, img_task, color):
+    @staticmethod
+    def _get_preview_paths(*paths):
+        """ :return list: preview file paths which were set, from paths and
+        lists of paths of single frames """
+        result = []
+        for path in paths:
+            if isinstance(path, list):
+                result.extend(p for p in path if p)
+            elif path:
+                result.append(path)
+        return result
+
+    @staticmethod
+    def _get_status_color(subtask):
+        """ :return tuple|None: colour marking the subtask on the task preview """
+        color = None
+        if SubtaskStatus.is_computed(subtask['status']):
+            color = (0, 255, 0)
+        if subtask['status'] in [SubtaskStatus.failure,
+                                 SubtaskStatus.restarted]:
+            color = (255, 0, 0)
+        return color
+
+    def _get_task_area(self, subtask, frame_index=0):
+        """ :return tuple: (left, upper, right, lower) area of the subtask on the preview """
         x = int(round(self.res_x * self.scale_factor))
         y = int(round(self.res_y * self.scale_factor))
         upper = max(0, int(math.floor(y / self.total_tasks * (subtask['start_task'] - 1))))
         lower = min(int(math.floor(y / self.total_tasks * (subtask['end_task']))), y)
-        for i in range(0, x):
-            for j in range(upper, lower):
-                img_task.putpixel((i, j), color)
+        return 0, upper, x, lower
 
-    def _put_collected_files_together(self, output_file_name, files, arg):
-        task_collector_path = self._get_task_collector_path()
+    def _mark_task_area(self, subtask, img_task, color):
+        fill_area(img_task, self._get_task_area(subtask), color)
 
-        cmd = ["{}".format(task_collector_path),
-               "{}".format(arg),
-               "{}".format(self.res_x),
-               "{}".format(self.res_y),
-               format_cmd_line_path(output_file_name)] + [format_cmd_line_path(f) for f in files]
-        exec_cmd(cmd)
+    def verify_task(self):
+        return super().verify_task() and not self.output_errors
+
+    def _put_collected_files_together(self, output_file_name, files, arg):
+        """ Merge collected results in the merge service. A failed merge
+        is recorded, so that the task is not accepted without its output
+        :return bool: whether the output was written
+        """
+        try:
+            merge_service.merge(output_file_name, files, arg,
+                                self.res_x, self.res_y,
+                                owner=self.header.task_id)
+        except Exception as err:
+            logger.error("Cannot merge results into %r: %r",
+                         output_file_name, err)
+            self.output_errors[output_file_name] = repr(err)
+            return False
+        return True
+
+    def _schedule_collected_file(self, output_file_name, tr_file, arg="paste"):
+        """ Start decoding a collected result in the merge service, so
+        only the last parts have to be read when the output is put together
+        :param str output_file_name: path of the merged image
+        :param str tr_file: path of the collected part
+        :param str arg: merge mode
+        """
+        if self._use_outer_task_collector():
+            merge_service.add_part(output_file_name, tr_file, arg,
+                                   self.res_x, self.res_y,
+                                   owner=self.header.task_id)
 
     def _get_next_task(self):
         if self.last_task != self.total_tasks:
@@ -238,20 +311,21 @@ class RenderingTask(CoreTask):
                "outfilebasename: {outfilebasename}, scene_file: {scene_file}".format(**l)
 
     def _open_preview(self, mode="RGB", ext=PREVIEW_EXT):
-        """ If preview file doesn't exist create a new empty one with given mode and extension.
-        Extension should be compatibile with selected mode. """
-        if self.preview_file_path is None or not os.path.exists(
-                self.preview_file_path):
+        """ If preview doesn't exist create a new empty one with given mode and extension.
+        Extension should be compatibile with selected mode. The returned canvas is kept
+        in memory by the preview store; report changes with preview_store.changed() """
+        size = (int(round(self.res_x * self.scale_factor)),
+                int(round(self.res_y * self.scale_factor)))
+        if self.preview_file_path is None or \
+                (self.preview_file_path not in preview_store and
+                 not os.path.exists(self.preview_file_path)):
             preview_name = "current_preview.{}".format(ext)
             self.preview_file_path = "{}".format(os.path.join(self.tmp_dir,
                                                               preview_name))
-            img = Image.new(mode, (int(round(self.res_x * self.scale_factor)),
-                                   int(round(self.res_y * self.scale_factor))))
-            logger.debug('Saving new preview: %r', self.preview_file_path)
-            img.save(self.preview_file_path, ext)
-            img.close()
+            logger.debug('Creating new preview: %r', self.preview_file_path)
+            return preview_store.new(self.preview_file_path, size, mode, ext)
 
-        return Image.open(self.preview_file_path)
+        return preview_store.open(self.preview_file_path, size, mode, ext)
 
     def _use_outer_task_collector(self):
         unsupported_formats = ['EXR', 'EPS']
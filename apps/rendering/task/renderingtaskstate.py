@@ -64,3 +64,9 @@ class AdvanceRenderingVerificationOptions(AdvanceVerificationOptions):
         AdvanceVerificationOptions.__init__(self)
         self.box_size = (5, 5)
         self.probability = 0.01
+        # compare many random boxes instead of one; enough boxes are used to
+        # accept a result with at least wrong_fraction of wrong area with
+        # probability lower than false_accept
+        self.sampled = False
+        self.wrong_fraction = 0.1
+        self.false_accept = 0.01
@@ -13,10 +13,15 @@ from golem.task.localcomputer import LocalComputer
 
 from apps.core.task.verificator import CoreVerificator, SubtaskVerificationState
 from apps.rendering.resources.imgcompare import advance_verify_img, check_size
+from apps.rendering.resources.sampling import sample_boxes, samples_for_bound
 
 
 logger = logging.getLogger("apps.rendering")
 
+# boxes of a sampled verification are rendered together only while the
+# covering area is at most this many times the area of the boxes
+COVER_FACTOR = 4
+
 
 class RenderingVerificator(CoreVerificator):
     def __init__(self, verification_options=None, advanced_verification=False):
@@ -60,17 +65,110 @@ class RenderingVerificator(CoreVerificator):
 
     def make_advance_verification(self,
                                   img_file, subtask_info, subtask_id, task):
+        if getattr(self.verification_options, 'sampled', False):
+            return self.make_sampled_verification(img_file, subtask_info,
+                                                  subtask_id, task)
         start_box = self._get_box_start(*self._get_part_img_size(subtask_info))
+        return self._verify_box(img_file, start_box,
+                                self.verification_options.box_size,
+                                subtask_info, subtask_id, task)
+
+    def make_sampled_verification(self,
+                                  img_file, subtask_info, subtask_id, task):
+        """ Compare a number of small boxes, placed at random, with boxes
+        rendered locally. The number of boxes follows from the wrong_fraction
+        and false_accept verification options. Nearby boxes are cut from a
+        single local render of the area which covers them, so the rendered
+        area stays below COVER_FACTOR times the area of the boxes. If any
+        box differs, the whole part is rendered and compared before the
+        result is rejected
+        :return bool: whether the result is correct
+        """
+        options = self.verification_options
+        samples = samples_for_bound(options.wrong_fraction,
+                                    options.false_accept)
+        seed = get_random()
+        logger.debug("Sampled verification of %r: %r boxes, seed %r",
+                     subtask_id, samples, seed)
+
+        part = self._get_part_img_size(subtask_info)
+        boxes = sample_boxes(part, options.box_size, samples,
+                             random.Random(seed))
+        start_box = self._verify_boxes(img_file, boxes, part, subtask_info,
+                                       subtask_id, task)
+        if start_box is None:
+            return True
+
+        logger.info("Box %r of %r differs, verifying the whole part",
+                    start_box, subtask_id)
+        x0, y0, x1, y1 = part
+        return self._verify_box(img_file, (x0, y0), (x1 - x0, y1 - y0),
+                                subtask_info, subtask_id, task)
+
+    def _verify_boxes(self, img_file, boxes, area, subtask_info, subtask_id,
+                      task):
+        """ :return tuple|None: corner of the first box which differs """
+        box_size = self.verification_options.box_size
+        res_x, res_y = self._get_part_size(subtask_info)
+        for group in self._group_boxes(boxes, box_size, area):
+            start, size = self._get_covering_box(group, box_size, area)
+            cmp_file, cmp_start = self._get_cmp_file(img_file, start,
+                                                     subtask_id, subtask_info,
+                                                     task, size)
+            for start_box in group:
+                cmp_start_box = (cmp_start[0] + start_box[0] - start[0],
+                                 cmp_start[1] + start_box[1] - start[1])
+                if not advance_verify_img(img_file, res_x, res_y, start_box,
+                                          box_size, cmp_file, cmp_start_box):
+                    return start_box
+        return None
+
+    @classmethod
+    def _group_boxes(cls, boxes, box_size, area):
+        """ Group boxes so that the box covering a group is at most
+        COVER_FACTOR times larger than the boxes in it
+        :return list: lists of box corners
+        """
+        x0, y0, x1, y1 = area
+        box_area = min(box_size[0], x1 - x0) * min(box_size[1], y1 - y0)
+        groups = []
+        for box in sorted(boxes, key=lambda b: (b[1], b[0])):
+            for group in groups:
+                _, (width, height) = cls._get_covering_box(group + [box],
+                                                           box_size, area)
+                if width * height <= COVER_FACTOR * box_area * \
+                        (len(group) + 1):
+                    group.append(box)
+                    break
+            else:
+                groups.append([box])
+        return groups
+
+    @staticmethod
+    def _get_covering_box(boxes, box_size, area):
+        """ :return tuple: ((x, y), (width, height)) of the smallest box
+        which covers all boxes placed at the given corners in the area """
+        x0, y0, x1, y1 = area
+        box_x = min(box_size[0], x1 - x0)
+        box_y = min(box_size[1], y1 - y0)
+        start_x = min(x for x, _ in boxes)
+        start_y = min(y for _, y in boxes)
+        end_x = max(x for x, _ in boxes) + box_x
+        end_y = max(y for _, y in boxes) + box_y
+        return (start_x, start_y), (end_x - start_x, end_y - start_y)
+
+    def _verify_box(self, img_file, start_box, box_size,
+                    subtask_info, subtask_id, task):
         logger.debug('testBox: {}'.format(start_box))
         cmp_file, cmp_start_box = self._get_cmp_file(img_file, start_box,
                                                      subtask_id,
-                                                     subtask_info, task)
+                                                     subtask_info, task,
+                                                     box_size)
         logger.debug('cmp_start_box {}'.format(cmp_start_box))
         res_x, res_y = self._get_part_size(subtask_info)
 
         return advance_verify_img(img_file, res_x, res_y, start_box,
-                                  self.verification_options.box_size, cmp_file,
-                                  cmp_start_box)
+                                  box_size, cmp_file, cmp_start_box)
 
     def _check_size(self, file_, res_x, res_y):
         return check_size(file_, res_x, res_y)
@@ -106,14 +204,17 @@ class RenderingVerificator(CoreVerificator):
         img_height = int(math.floor(self.res_y / self.total_tasks))
         return 0, (num_task - 1) * img_height, self.res_x, num_task * img_height
 
-    def _get_cmp_file(self, tr_file, start_box, subtask_id, subtask_info, task):
+    def _get_cmp_file(self, tr_file, start_box, subtask_id, subtask_info, task,
+                      box_size=None):
         extra_data, new_start_box = \
-            self.change_scope(subtask_id, start_box, tr_file, subtask_info)
+            self.change_scope(subtask_id, start_box, tr_file, subtask_info,
+                              box_size)
         cmp_file = self._run_task(extra_data, task)
 
         return cmp_file, new_start_box
 
-    def change_scope(self, subtask_id, start_box, tr_file, subtask_info):
+    def change_scope(self, subtask_id, start_box, tr_file, subtask_info,
+                     box_size=None):
         extra_data = copy(subtask_info)
         extra_data['outfilebasename'] = str(uuid.uuid4())
         extra_data['tmp_path'] = \
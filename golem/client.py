@@ -20,11 +20,13 @@ from golem.clientconfigdescriptor import ClientConfigDescriptor, ConfigApprover
 from golem.config.presets import HardwarePresetsMixin
 from golem.core.async import AsyncRequest, async_run
 from golem.core.common import to_unicode
-from golem.core.fileshelper import du
+from golem.core.dirsize import size_accountant
+from golem.core.fileshelper import format_size
 from golem.core.hardware import HardwarePresets
 from golem.core.keysauth import EllipticalKeysAuth
 from golem.core.simpleenv import get_local_datadir
 from golem.core.simpleserializer import DictSerializer
+from golem.core.statskeeper import stats_registry
 from golem.core.threads import callback_wrapper
 from golem.core.variables import APP_VERSION
 from golem.diag.service import DiagnosticsService, DiagnosticsOutputFormat
@@ -115,6 +117,7 @@ class Client(HardwarePresetsMixin):
 
         # Initialize database
         self.db = Database(datadir)
+        db_worker.start()
 
         # Hardware configuration
         HardwarePresets.initialize(self.datadir)
@@ -222,6 +225,9 @@ class Client(HardwarePresetsMixin):
 
         self.do_work_task.start(1, False)
         self.publish_task.start(1, True)
+        # resource directories are scanned in the background right away
+        self._track_res_dirs()
+        size_accountant.start()
 
     @report_calls(Component.client, 'stop', stage=Stage.post)
     def stop(self):
@@ -230,6 +236,7 @@ class Client(HardwarePresetsMixin):
             self.do_work_task.stop()
         if self.publish_task.running:
             self.publish_task.stop()
+        size_accountant.stop()
         if self.task_server:
             self.task_server.task_computer.quit()
         if self.use_monitor and self.monitor:
@@ -397,6 +404,9 @@ class Client(HardwarePresetsMixin):
 
         dispatcher.send(signal='golem.monitor', event='shutdown')
 
+        if self.ranking:
+            self.ranking.flush()
+        stats_registry.flush()
         if self.db:
             self.db.close()
         self._unlock_datadir()
@@ -803,9 +813,25 @@ class Client(HardwarePresetsMixin):
                 "distributed": self.get_distributed_files_dir()}
 
     def get_res_dirs_sizes(self):
-        return {str(name): str(du(d))
+        return {str(name): format_size(size) if size is not None else "-1"
+                for name, size in self.get_res_dirs_totals().items()}
+
+    def get_res_dirs_totals(self):
+        """ Sizes of resource directories in bytes, kept up to date by
+        the directory size accountant. The size of a directory is None
+        until it is scanned in the background.
+        """
+        self._track_res_dirs()
+        return {str(name): size_accountant.total(d, scan=False)
+                if path.isdir(d) else None
                 for name, d in list(self.get_res_dirs().items())}
 
+    def _track_res_dirs(self):
+        if not self.task_server:
+            return
+        for d in self.get_res_dirs().values():
+            size_accountant.track(d)
+
     def get_res_dir(self, dir_type):
         if dir_type == DirectoryType.COMPUTED:
             return self.get_computed_files_dir()
@@ -835,7 +861,11 @@ class Client(HardwarePresetsMixin):
 
     def remove_computed_files(self):
         dir_manager = DirManager(self.datadir)
-        dir_manager.clear_dir(self.get_computed_files_dir())
+        computed_dir = self.get_computed_files_dir()
+        dir_manager.clear_dir(computed_dir)
+        # chunks of the removed resources can no longer be offered
+        resource_manager = self.task_server.task_computer.resource_manager
+        resource_manager.chunk_store.remove_dir(computed_dir)
 
     def remove_distributed_files(self):
         dir_manager = DirManager(self.datadir)
@@ -875,7 +905,8 @@ class Client(HardwarePresetsMixin):
             benchmark_manager = self.task_server.benchmark_manager
             benchmark_manager.run_benchmark_for_env_id(env_id,
                                                        deferred.callback,
-                                                       deferred.errback)
+                                                       deferred.errback,
+                                                       force=True)
             result = yield deferred
             returnValue(result)
         else:
@@ -1007,6 +1038,7 @@ class Client(HardwarePresetsMixin):
             self.check_payments()
         except Exception:
             log.exception("check_payments failed")
+        stats_registry.flush_if_due()
 
     @inlineCallbacks
     def __publish_events(self):
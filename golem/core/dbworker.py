@@ -0,0 +1,121 @@
+import logging
+import queue
+from threading import Thread
+
+from twisted.internet.defer import Deferred, fail, succeed
+from twisted.python.failure import Failure
+
+logger = logging.getLogger(__name__)
+
+# writes committed together at most
+MAX_BATCH = 100
+
+
+class DatabaseWorker(object):
+    """
+    Runs database writes on a dedicated thread. Writes queued while the
+    previous ones were committed are run in a single transaction (a group
+    commit), each in its own savepoint, so a burst of writes waits for one
+    commit and a failed write does not roll back the others. Reads do not
+    go through the worker; with a WAL journal they are not blocked by the
+    writes.
+
+    Until the worker is started writes are run at once in the calling
+    thread.
+    """
+
+    def __init__(self, database, max_batch=MAX_BATCH, reactor=None):
+        """
+        :param database: peewee database
+        :param int max_batch: writes committed together at most
+        :param reactor: reactor which fires the Deferreds of writes; the
+                        global one by default
+        """
+        self.database = database
+        self.max_batch = max_batch
+        self.reactor = reactor
+        self._queue = queue.Queue()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = Thread(target=self._run, name="DatabaseWorker")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """ Commit all queued writes and stop the thread """
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def write(self, func, *args, **kwargs):
+        """ Run func(*args, **kwargs) in a transaction of the worker
+        :return Deferred: fired with the result of func
+        """
+        if not self.running:
+            try:
+                with self.database.atomic():
+                    return succeed(func(*args, **kwargs))
+            except Exception:
+                return fail()
+
+        deferred = Deferred()
+        self._queue.put((deferred, func, args, kwargs))
+        return deferred
+
+    def _run(self):
+        try:
+            stop = False
+            while not stop:
+                batch = [self._queue.get()]
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    stop = True
+                    batch = [write for write in batch if write is not None]
+                if batch:
+                    self._commit(batch)
+        finally:
+            if not self.database.is_closed():
+                self.database.close()
+
+    def _commit(self, batch):
+        results = []
+        try:
+            with self.database.atomic():
+                for deferred, func, args, kwargs in batch:
+                    try:
+                        with self.database.atomic():
+                            results.append((deferred, func(*args, **kwargs)))
+                    except Exception:
+                        results.append((deferred, Failure()))
+        except Exception:
+            failure = Failure()
+            logger.error("Group commit of %d writes failed: %r", len(batch),
+                         failure.value)
+            results = [(write[0], failure) for write in batch]
+
+        for deferred, result in results:
+            if isinstance(result, Failure):
+                self._fire(deferred.errback, result)
+            else:
+                self._fire(deferred.callback, result)
+
+    def _fire(self, method, result):
+        reactor = self.reactor
+        if reactor is None:
+            # not imported earlier, so that it can be chosen by the app
+            from twisted.internet import reactor
+        if reactor.running:
+            reactor.callFromThread(method, result)
+        else:
+            method(result)
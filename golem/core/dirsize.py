@@ -0,0 +1,227 @@
+import logging
+import os
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_INTERVAL = 600.
+
+
+def scan_dir_size(path):
+    """ Sum sizes of all files in a directory tree. Files hardlinked more
+    than once within the tree are counted once.
+    :param str path: directory path
+    :return int: size in bytes
+    """
+    size = 0
+    stack = [path]
+    linked = set()
+
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        if st.st_nlink > 1 and st.st_ino:
+                            inode = st.st_dev, st.st_ino
+                            if inode in linked:
+                                continue
+                            linked.add(inode)
+                        size += st.st_size
+                except OSError:
+                    pass
+
+    return size
+
+
+def path_size(path):
+    """ Size of a file or of a directory tree; 0 if it does not exist """
+    try:
+        if os.path.isdir(path):
+            return scan_dir_size(path)
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class DirSizeAccountant(object):
+    """
+    Keeps running totals of file sizes in tracked directories. Components
+    which add or remove files report the change, so a total can be read
+    without walking the tree. Totals may drift (e.g. when files are
+    modified by external processes); they are corrected by a periodic
+    reconciliation scan, run in a background thread.
+    """
+
+    def __init__(self, reconcile_interval=RECONCILE_INTERVAL):
+        self.reconcile_interval = reconcile_interval
+        self._lock = Lock()
+        self._totals = dict()
+        # directory -> changes reported during each running scan
+        self._scans = dict()
+        self._loop = None
+
+    def track(self, path):
+        """ Start tracking a directory. Its total is unknown until the
+        first scan.
+        :param str path: directory path
+        """
+        with self._lock:
+            self._totals.setdefault(self._norm(path), None)
+
+    def untrack(self, path):
+        with self._lock:
+            self._totals.pop(self._norm(path), None)
+
+    def tracked(self):
+        return list(self._totals)
+
+    def total(self, path, scan=True):
+        """
+        :param str path: tracked directory
+        :param bool scan: scan the directory if its total is not known yet
+        :return int|None: total size of files in the directory
+        """
+        path = self._norm(path)
+        total = self._totals.get(path)
+        if total is None and scan:
+            if path not in self._totals:
+                self.track(path)
+            total = self._reconcile(path)
+        return total
+
+    def totals(self):
+        """ :return dict: directory -> known total """
+        with self._lock:
+            return dict(self._totals)
+
+    def add(self, path, size):
+        """ Report size bytes written at path """
+        if not size:
+            return
+
+        path = self._norm(path)
+        with self._lock:
+            for root, scans in self._scans.items():
+                if self._contains(root, path):
+                    for scan in scans:
+                        if scan[0] is not None:
+                            scan[0] += size
+                elif self._contains(path, root):
+                    for scan in scans:
+                        scan[0] = None
+
+            for root, total in self._totals.items():
+                if total is None:
+                    continue
+                if self._contains(root, path):
+                    self._totals[root] = max(0, total + size)
+                elif self._contains(path, root):
+                    # the change spans more than this directory
+                    self._totals[root] = None
+
+    def remove(self, path, size):
+        """ Report size bytes removed from path """
+        self.add(path, -size)
+
+    def added(self, path):
+        """ Report a file or a directory tree which has just been created """
+        if self.covers(path):
+            self.add(path, path_size(path))
+
+    def removing(self, path):
+        """ Report a file or a directory tree which is about to be removed """
+        if self.covers(path):
+            self.remove(path, path_size(path))
+
+    def covers(self, path):
+        """ :return bool: whether changes at path affect any known total """
+        if not self._totals:
+            return False
+        path = self._norm(path)
+        return any(total is not None and (self._contains(root, path) or
+                                          self._contains(path, root))
+                   for root, total in list(self._totals.items()))
+
+    def reconcile(self):
+        """ Rescan all tracked directories """
+        for path in self.tracked():
+            self._reconcile(path)
+
+    def start(self):
+        from twisted.internet.task import LoopingCall
+
+        if not self._loop:
+            self._loop = LoopingCall(self._reconcile_in_background)
+        if not self._loop.running:
+            self._loop.start(self.reconcile_interval, now=True)
+
+    def stop(self):
+        if self._loop and self._loop.running:
+            self._loop.stop()
+
+    def _reconcile_in_background(self):
+        from twisted.internet.threads import deferToThread
+
+        deferred = deferToThread(self.reconcile)
+        deferred.addErrback(lambda failure: logger.warning(
+            "Directory size reconciliation failed: %s", failure))
+        return deferred
+
+    def _reconcile(self, path):
+        # changes reported while the directory is scanned are applied to
+        # the result, since the scan may have missed them
+        scan = [0]
+        with self._lock:
+            self._scans.setdefault(path, []).append(scan)
+
+        try:
+            size = scan_dir_size(path)
+        except Exception:
+            with self._lock:
+                self._finish_scan(path, scan)
+            raise
+
+        with self._lock:
+            delta = self._finish_scan(path, scan)
+            if path not in self._totals:
+                return None
+            if delta is not None:
+                size = max(0, size + delta)
+            else:
+                size = None
+            previous = self._totals[path]
+            self._totals[path] = size
+
+        if previous is not None and previous != size:
+            logger.debug("Directory size of %s corrected: %r -> %r",
+                         path, previous, size)
+        return size
+
+    def _finish_scan(self, path, scan):
+        """ :return int|None: changes reported during the scan; None if
+        they cannot be applied to its result """
+        scans = self._scans[path]
+        scans.remove(scan)
+        if not scans:
+            del self._scans[path]
+        return scan[0]
+
+    @staticmethod
+    def _contains(root, path):
+        return path == root or path.startswith(root + os.sep)
+
+    @staticmethod
+    def _norm(path):
+        return os.path.normpath(os.path.abspath(path))
+
+
+size_accountant = DirSizeAccountant()
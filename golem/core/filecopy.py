@@ -0,0 +1,206 @@
+import errno
+import logging
+import os
+import shutil
+import stat
+from enum import Enum
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# Errors which mean that the method is not available for a given pair of
+# file systems, as opposed to errors caused by a particular file (e.g. EPERM
+# when linking a file owned by another user)
+UNSUPPORTED_ERRNOS = frozenset(filter(None, [
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.ENOSYS,
+    getattr(errno, 'EOPNOTSUPP', None),
+    getattr(errno, 'ENOTSUP', None),
+]))
+
+WRITE_BITS = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+
+
+class CopyMethod(Enum):
+    reflink = 'reflink'
+    hardlink = 'hardlink'
+    copy = 'copy'
+
+
+def reflink(src, dst):
+    """ Clone file contents with the FICLONE ioctl. Both files share data
+    blocks until either of them is modified (copy-on-write).
+    :param str src: source file path
+    :param str dst: destination file path; must not exist
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.ENOSYS, "reflink is not supported")
+
+    with open(src, 'rb') as src_file:
+        with open(dst, 'xb') as dst_file:
+            try:
+                fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+            except OSError:
+                dst_file.close()
+                os.remove(dst)
+                raise
+    shutil.copystat(src, dst)
+
+
+def hardlink(src, dst):
+    os.link(src, dst)
+
+
+def copy(src, dst):
+    shutil.copy2(src, dst)
+
+
+class CopyStrategy(object):
+    """
+    Copies files with the cheapest method available: reflink, then
+    hardlink, then a regular copy. A hardlink shares the inode, and so the
+    permissions, with the source, so it is only used for read-only copies
+    of files which are already read-only and owned by the caller (see
+    link_root). Methods not supported by a pair of file systems are
+    detected on the first failure and skipped afterwards.
+    """
+
+    METHODS = (
+        (CopyMethod.reflink, reflink),
+        (CopyMethod.hardlink, hardlink),
+        (CopyMethod.copy, copy),
+    )
+
+    def __init__(self):
+        self._lock = Lock()
+        # (source device, destination device) -> unsupported methods
+        self._unsupported = dict()
+
+    def copy_file(self, src, dst, read_only=False, link_root=None):
+        """ Copy a single file, replacing the destination file
+        :param str src: source file path
+        :param str dst: destination file path
+        :param bool read_only: make the copy read-only; otherwise the copy
+                               is writable. Permissions of the source are
+                               never changed
+        :param str|None link_root: directory owned by the caller; a
+                               read-only copy of a read-only file from this
+                               directory may share the inode with it
+        :return CopyMethod: method used
+        """
+        if os.path.lexists(dst):
+            os.remove(dst)
+
+        link = read_only and self._immutable(src, link_root)
+        method = self._copy(src, dst, link)
+        if method == CopyMethod.hardlink:
+            return method
+
+        mode = stat.S_IMODE(os.stat(dst).st_mode)
+        if read_only:
+            os.chmod(dst, mode & ~WRITE_BITS)
+        elif not mode & stat.S_IWUSR:
+            os.chmod(dst, mode | stat.S_IWUSR)
+        return method
+
+    def copy_tree(self, src, dst, exclude=None, read_only=False,
+                  link_root=None):
+        """ Copy directory contents. Files already present in the
+        destination directory are kept unless overwritten.
+        :param str src: source directory
+        :param str dst: destination directory
+        :param list|None exclude: don't copy files with this extensions
+        :param bool read_only: see copy_file
+        :param str|None link_root: see copy_file
+        """
+        exclude = exclude or []
+        src = os.path.normpath(src)
+
+        for src_dir, _, files in os.walk(src):
+            rel_dir = os.path.relpath(src_dir, src)
+            dst_dir = os.path.normpath(os.path.join(dst, rel_dir))
+            if not os.path.isdir(dst_dir):
+                os.makedirs(dst_dir)
+
+            for file_ in files:
+                _, ext = os.path.splitext(file_)
+                if ext in exclude:
+                    continue
+                self.copy_file(os.path.join(src_dir, file_),
+                               os.path.join(dst_dir, file_),
+                               read_only=read_only, link_root=link_root)
+
+    def _copy(self, src, dst, link):
+        key = self._device_pair(src, dst)
+        unsupported = self._unsupported.get(key, ())
+
+        for method, fn in self.METHODS:
+            if method in unsupported:
+                continue
+            if method == CopyMethod.hardlink and not link:
+                continue
+            if method == CopyMethod.copy:
+                fn(src, dst)
+                return method
+
+            try:
+                fn(src, dst)
+                return method
+            except OSError as exc:
+                if exc.errno in UNSUPPORTED_ERRNOS:
+                    self._mark_unsupported(key, method)
+                else:
+                    logger.debug("%s of %s failed: %s", method.value,
+                                 src, exc)
+
+    def supported(self, src, dst):
+        """
+        :return list: methods not yet known to fail for the given paths
+        """
+        unsupported = self._unsupported.get(self._device_pair(src, dst), ())
+        return [m for m, _ in self.METHODS if m not in unsupported]
+
+    def _mark_unsupported(self, key, method):
+        with self._lock:
+            self._unsupported.setdefault(key, set()).add(method)
+        logger.debug("%s is not supported between devices %r",
+                     method.value, key)
+
+    @staticmethod
+    def _immutable(src, link_root):
+        """ :return bool: whether src is a read-only file in link_root """
+        if not link_root:
+            return False
+        root = os.path.realpath(link_root)
+        path = os.path.realpath(src)
+        try:
+            if os.path.commonpath([root, path]) != root:
+                return False
+        except ValueError:  # paths on different drives
+            return False
+        return not os.stat(path).st_mode & WRITE_BITS
+
+    @staticmethod
+    def _device_pair(src, dst):
+        dst_dir = os.path.dirname(os.path.abspath(dst))
+        return os.stat(src).st_dev, os.stat(dst_dir).st_dev
+
+
+_strategy = CopyStrategy()
+
+
+def copy_file(src, dst, read_only=False, link_root=None):
+    return _strategy.copy_file(src, dst, read_only=read_only,
+                               link_root=link_root)
+
+
+def copy_tree(src, dst, exclude=None, read_only=False, link_root=None):
+    return _strategy.copy_tree(src, dst, exclude=exclude, read_only=read_only,
+                               link_root=link_root)
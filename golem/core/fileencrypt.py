@@ -1,11 +1,24 @@
 import abc
+import hmac
+import shutil
+import struct
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from hashlib import sha256
+from multiprocessing import cpu_count
 from Crypto.Cipher import AES
 from Crypto import Random
 from Crypto.Random.random import StrongRandom
+from Crypto.Util import Counter
 from threading import Lock
 
-from io import IOBase
+from io import IOBase, SEEK_SET, SEEK_CUR, SEEK_END
+
+# Upper bound of segments being encrypted or decrypted at the same time
+MAX_PENDING_SEGMENTS = min(2 * cpu_count(), 16)
+# Decrypted segments kept by a reader, so interleaved reads of a few
+# members of an archive do not decrypt the same segment again
+CACHED_SEGMENTS = 4
 
 
 class abstractclassmethod(classmethod):
@@ -69,15 +82,7 @@ class AESFileEncryptor(FileEncryptor):
 
     @classmethod
     def get_key_and_iv(cls, secret, salt, key_len, iv_len):
-
-        total_len = key_len + iv_len
-        digest = chunk = bytes()
-
-        while len(digest) < total_len:
-            chunk = sha256(chunk + secret + salt).digest()
-            digest += chunk
-
-        return digest[:key_len], digest[key_len:total_len]
+        return _sha256_key_and_iv(secret, salt, key_len, iv_len)
 
     @classmethod
     def encrypt(cls, file_in, file_out, secret, key_len=32):
@@ -131,3 +136,438 @@ class AESFileEncryptor(FileEncryptor):
                     working = False
 
                 dst.write(chunk)
+
+
+class DecryptionError(ValueError):
+    pass
+
+
+def _sha256_key_and_iv(secret, salt, key_len, iv_len):
+    total_len = key_len + iv_len
+    digest = chunk = bytes()
+
+    while len(digest) < total_len:
+        chunk = sha256(chunk + secret + salt).digest()
+        digest += chunk
+
+    return digest[:key_len], digest[key_len:total_len]
+
+
+def _hkdf_sha256(secret, salt, labels):
+    prk = hmac.new(salt, secret, sha256).digest()
+    return tuple(hmac.new(prk, label, sha256).digest() for label in labels)
+
+
+class SegmentCipher(object):
+    """ Encrypts and authenticates segments of a stream independently of each
+    other. Each segment is encrypted with AES-CTR, with the counter starting
+    at the segment's offset, and followed by an HMAC-SHA256 tag computed over
+    the stream header, segment index, final segment flag and ciphertext.
+    """
+
+    mac_len = sha256().digest_size
+
+    def __init__(self, enc_key, mac_key, nonce, header, segment_size):
+        self.enc_key = enc_key
+        self.mac_key = mac_key
+        self.nonce = nonce
+        self.header = header
+        self.segment_size = segment_size
+        self.segment_blocks = segment_size // AES.block_size
+
+    def encrypt(self, index, data, final):
+        ciphertext = self._cipher(index).encrypt(data)
+        return ciphertext + self._tag(index, ciphertext, final)
+
+    def decrypt(self, index, blob, final):
+        ciphertext, tag = blob[:-self.mac_len], blob[-self.mac_len:]
+        if len(tag) != self.mac_len or \
+                not hmac.compare_digest(tag, self._tag(index, ciphertext,
+                                                       final)):
+            raise DecryptionError("Invalid segment {} authentication tag"
+                                  .format(index))
+        return self._cipher(index).decrypt(ciphertext)
+
+    def _cipher(self, index):
+        counter = Counter.new(64, prefix=self.nonce,
+                              initial_value=index * self.segment_blocks)
+        return AES.new(self.enc_key, AES.MODE_CTR, counter=counter)
+
+    def _tag(self, index, ciphertext, final):
+        mac = hmac.new(self.mac_key, self.header, sha256)
+        mac.update(struct.pack('>QB', index, 1 if final else 0))
+        mac.update(ciphertext)
+        return mac.digest()
+
+
+class AESStreamEncryptor(FileEncryptor):
+    """ Authenticated, streaming file format. Data is split into segments
+    which are encrypted and verified independently, so a file can be written
+    in a single pass and read back at random offsets without decrypting it
+    to a temporary file first.
+
+    Layout: header (magic, version, segment size, salt), followed by
+    segments of segment_size bytes of ciphertext plus a MAC tag each.
+    The last segment may be shorter (or empty) and is marked as final.
+    """
+
+    magic = b'GOLEMAES'
+    version = 1
+    header_format = '>8sBI16s'
+    header_len = struct.calcsize(header_format)
+    salt_len = 16
+    key_len = 32
+    nonce_len = 8
+    segment_size = 64 * 1024
+
+    @classmethod
+    def gen_salt(cls):
+        return Random.new().read(cls.salt_len)
+
+    @classmethod
+    def derive_keys(cls, secret, salt):
+        """ Derive encryption key, MAC key and CTR nonce (HKDF-SHA256).
+        :param bytes secret: shared secret
+        :param bytes salt: per-file salt
+        :return tuple: enc_key, mac_key, nonce
+        """
+        enc_key, mac_key, nonce = _hkdf_sha256(
+            secret, salt, (b'enc\x01', b'mac\x01', b'nonce\x01'))
+        return enc_key[:cls.key_len], mac_key, nonce[:cls.nonce_len]
+
+    @classmethod
+    def pack_header(cls, segment_size, salt):
+        return struct.pack(cls.header_format, cls.magic, cls.version,
+                           segment_size, salt)
+
+    @classmethod
+    def unpack_header(cls, header):
+        if len(header) != cls.header_len:
+            raise DecryptionError("Invalid header length")
+
+        magic, version, segment_size, salt = struct.unpack(cls.header_format,
+                                                           header)
+        if magic != cls.magic:
+            raise DecryptionError("Invalid file format")
+        if version != cls.version:
+            raise DecryptionError("Unsupported version {}".format(version))
+        if not segment_size or segment_size % AES.block_size:
+            raise DecryptionError("Invalid segment size {}"
+                                  .format(segment_size))
+        return segment_size, salt
+
+    @classmethod
+    def segment_cipher(cls, secret, header):
+        segment_size, salt = cls.unpack_header(header)
+        enc_key, mac_key, nonce = cls.derive_keys(secret, salt)
+        return SegmentCipher(enc_key, mac_key, nonce, header, segment_size)
+
+    @classmethod
+    def recognizes(cls, file_in):
+        """ Check whether file starts with this format's magic bytes
+        :param str file_in: file path
+        :return bool:
+        """
+        with open(file_in, 'rb') as src:
+            return src.read(len(cls.magic)) == cls.magic
+
+    @classmethod
+    def writer(cls, file_out, secret, segment_size=None, executor=None):
+        """ Return a file-like object that encrypts data written to it
+        :param str|IOBase file_out: output file path or binary file object
+        :param bytes secret: shared secret
+        :param int segment_size: plaintext segment size, multiple of
+                                 the AES block size
+        :param Executor executor: encrypt segments concurrently using
+                                  this executor
+        :return EncryptingWriter:
+        """
+        segment_size = segment_size or cls.segment_size
+        header = cls.pack_header(segment_size, cls.gen_salt())
+        return EncryptingWriter(file_out, header,
+                                cls.segment_cipher(secret, header),
+                                executor=executor)
+
+    @classmethod
+    def reader(cls, file_in, secret):
+        """ Return a seekable file-like object that decrypts file contents
+        :param str|IOBase file_in: input file path or binary file object
+        :param bytes secret: shared secret
+        :return DecryptingReader:
+        """
+        return DecryptingReader(file_in, cls, secret)
+
+    @classmethod
+    def encrypt(cls, file_in, file_out, secret):
+        with FileHelper(file_in, 'rb') as src, \
+                cls.writer(file_out, secret) as dst:
+            shutil.copyfileobj(src, dst, cls.segment_size)
+
+    @classmethod
+    def decrypt(cls, file_in, file_out, secret):
+        with cls.reader(file_in, secret) as src, \
+                FileHelper(file_out, 'wb') as dst:
+            shutil.copyfileobj(src, dst, src.segment_size)
+
+
+class AESParallelFileEncryptor(AESStreamEncryptor):
+    """ AESStreamEncryptor format with large segments, which are encrypted
+    and decrypted concurrently in a thread pool. Files written by either
+    class can be read by both. """
+
+    segment_size = 4 * 1024 * 1024
+
+    @classmethod
+    def writer(cls, file_out, secret, segment_size=None, executor=None):
+        if executor is None:
+            executor = _executor()
+        return super(AESParallelFileEncryptor, cls).writer(
+            file_out, secret, segment_size, executor)
+
+    @classmethod
+    def decrypt(cls, file_in, file_out, secret):
+        with cls.reader(file_in, secret) as src, \
+                FileHelper(file_out, 'wb') as dst:
+            _ordered_map(_executor(), src.decrypt_segment,
+                         range(src.segments), dst.write)
+
+
+def _executor():
+    global _shared_executor
+    with _executor_lock:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(max_workers=cpu_count())
+        return _shared_executor
+
+
+_shared_executor = None
+_executor_lock = Lock()
+
+
+def _ordered_map(executor, fn, args, consumer, window=None):
+    """ Run fn over args in the executor and pass results to consumer in
+    order, keeping at most window calls in flight """
+    window = window or MAX_PENDING_SEGMENTS
+    pending = deque()
+
+    for arg in args:
+        pending.append(executor.submit(fn, arg))
+        while len(pending) >= window or (pending and pending[0].done()):
+            consumer(pending.popleft().result())
+    while pending:
+        consumer(pending.popleft().result())
+
+
+class _StreamWrapper(object):
+
+    def __init__(self, file_, mode):
+        if isinstance(file_, (str, bytes)):
+            self._file = open(file_, mode)
+            self._owned = True
+        else:
+            self._file = file_
+            self._owned = False
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self._owned:
+            self._file.close()
+
+
+class EncryptingWriter(_StreamWrapper):
+    """ Write-only, non-seekable encrypting stream """
+
+    def __init__(self, file_out, header, cipher, executor=None):
+        super(EncryptingWriter, self).__init__(file_out, 'wb')
+        self._cipher = cipher
+        self._executor = executor
+        self._pending = deque()
+        self._window = MAX_PENDING_SEGMENTS
+        self._buffer = bytearray()
+        self._index = 0
+        self._position = 0
+        self._file.write(header)
+
+    @staticmethod
+    def writable():
+        return True
+
+    @staticmethod
+    def seekable():
+        return False
+
+    def tell(self):
+        return self._position
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+
+        self._buffer += data
+        self._position += len(data)
+
+        segment_size = self._cipher.segment_size
+        # Keep at least one byte buffered, the final segment is flagged
+        # when the stream is closed
+        if len(self._buffer) > segment_size:
+            count = (len(self._buffer) - 1) // segment_size
+            for i in range(count):
+                start = i * segment_size
+                self._write_segment(
+                    bytes(self._buffer[start:start + segment_size]), False)
+            del self._buffer[:count * segment_size]
+        return len(data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._write_segment(bytes(self._buffer), True)
+            self._buffer = bytearray()
+            while self._pending:
+                self._file.write(self._pending.popleft().result())
+            self._file.flush()
+        finally:
+            super(EncryptingWriter, self).close()
+
+    def _write_segment(self, data, final):
+        index = self._index
+        self._index += 1
+
+        if not self._executor:
+            self._file.write(self._cipher.encrypt(index, data, final))
+            return
+
+        pending = self._pending
+        pending.append(self._executor.submit(self._cipher.encrypt,
+                                             index, data, final))
+        while len(pending) >= self._window or \
+                (pending and pending[0].done()):
+            self._file.write(pending.popleft().result())
+
+
+class DecryptingReader(_StreamWrapper):
+    """ Read-only, seekable decrypting stream. Segments are authenticated
+    before any of their data is returned. """
+
+    def __init__(self, file_in, encryptor_class, secret):
+        super(DecryptingReader, self).__init__(file_in, 'rb')
+        try:
+            header = self._file.read(encryptor_class.header_len)
+            self._cipher = encryptor_class.segment_cipher(secret, header)
+            self._layout(encryptor_class.header_len)
+        except Exception:
+            self.close()
+            raise
+        self._position = 0
+        # index -> plaintext, least recently used first
+        self._cached = OrderedDict()
+        self._cache_lock = Lock()
+        self._lock = Lock()
+
+    @property
+    def segment_size(self):
+        return self._cipher.segment_size
+
+    @property
+    def segments(self):
+        return self._segments
+
+    @property
+    def size(self):
+        return self._size
+
+    @staticmethod
+    def readable():
+        return True
+
+    @staticmethod
+    def seekable():
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=SEEK_SET):
+        if whence == SEEK_SET:
+            position = offset
+        elif whence == SEEK_CUR:
+            position = self._position + offset
+        elif whence == SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError("Invalid whence {}".format(whence))
+
+        if position < 0:
+            raise ValueError("Negative seek position {}".format(position))
+        self._position = position
+        return position
+
+    def read(self, size=-1):
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+
+        end = self._size if size is None or size < 0 \
+            else min(self._size, self._position + size)
+        chunks = []
+
+        while self._position < end:
+            index, offset = divmod(self._position, self.segment_size)
+            segment = self._segment(index)
+            chunk = segment[offset:offset + end - self._position]
+            chunks.append(chunk)
+            self._position += len(chunk)
+
+        return b''.join(chunks)
+
+    def _layout(self, header_len):
+        self._data_offset = header_len
+        self._blob_size = self.segment_size + SegmentCipher.mac_len
+
+        self._file.seek(0, SEEK_END)
+        body_len = self._file.tell() - header_len
+        self._segments = -(-body_len // self._blob_size)
+        last_len = body_len - (self._segments - 1) * self._blob_size \
+            - SegmentCipher.mac_len
+
+        if self._segments < 1 or last_len < 0:
+            raise DecryptionError("Truncated file")
+        self._size = (self._segments - 1) * self.segment_size + last_len
+
+    def decrypt_segment(self, index):
+        """ Read, verify and decrypt a single segment. Safe to call from
+        multiple threads.
+        :param int index: segment index
+        :return bytes: plaintext
+        """
+        with self._lock:
+            self._file.seek(self._data_offset + index * self._blob_size)
+            blob = self._file.read(self._blob_size)
+        final = index == self._segments - 1
+        return self._cipher.decrypt(index, blob, final)
+
+    def _segment(self, index):
+        with self._cache_lock:
+            segment = self._cached.get(index)
+            if segment is not None:
+                self._cached.move_to_end(index)
+                return segment
+
+        segment = self.decrypt_segment(index)
+        with self._cache_lock:
+            self._cached[index] = segment
+            while len(self._cached) > CACHED_SEGMENTS:
+                self._cached.popitem(last=False)
+        return segment
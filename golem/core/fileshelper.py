@@ -1,39 +1,26 @@
 import ctypes
 import os
-import shutil
 
 import subprocess
 
 from golem.core.common import is_windows
+from golem.core.filecopy import copy_tree
 
 from golem.tools import memoryhelper
 
 
-def copy_file_tree(src, dst, exclude=None):
+def copy_file_tree(src, dst, exclude=None, read_only=False):
     """Copy directory and it's content from src to dst. Doesn't copy files
        with extensions from excluded. Don't remove additional files from
-       destination directory.
+       destination directory. Files are reflinked or hardlinked if possible,
+       see golem.core.filecopy.
     :param str src: source directory (copy this directory)
     :param str dst: destination directory (copy source directory here)
     :param list|None exclude: don't copy files with this extensions
+    :param bool read_only: make copied files read-only, so that they may
+                           be hardlinked
     """
-    if exclude is None:
-        exclude = []
-    if not os.path.isdir(dst):
-        os.mkdir(dst)
-    for src_dir, dirs, files in os.walk(src):
-        dst_dir = src_dir.replace(src, dst)
-        if not os.path.exists(dst_dir):
-            os.mkdir(dst_dir)
-        for file_ in files:
-            _, ext = os.path.splitext(file_)
-            if ext in exclude:
-                continue
-            src_file = os.path.join(src_dir, file_)
-            dst_file = os.path.join(dst_dir, file_)
-            if os.path.exists(dst_file):
-                os.remove(dst_file)
-            shutil.copy2(src_file, dst_dir)
+    copy_tree(src, dst, exclude=exclude, read_only=read_only)
 
 
 def get_dir_size(dir_, report_error=lambda _: ()):
@@ -198,6 +185,14 @@ def du(path):
             logging.getLogger('golem.core')\
                 .info("Can't open dir {}: {}".format(path, str(err)))
             return "-1"
+    return format_size(size)
+
+
+def format_size(size):
+    """Format size in human readable format (eg. 1 Mb)
+    :param int size: size in bytes
+    :return str: formatted size
+    """
     human_readable_size, idx = memoryhelper.dir_size_to_display(size)
     return "{} {}".format(
         human_readable_size,
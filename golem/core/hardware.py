@@ -1,3 +1,5 @@
+import platform
+
 import psutil
 from psutil import virtual_memory
 
@@ -31,6 +33,20 @@ def cpu_cores_available():
         return list(range(0, num_cores - 1)) or [0]
 
 
+def cpu_model():
+    """
+    :return str: processor model name; empty if it cannot be read
+    """
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
 def memory_available():
     """
     :return int: 3/4 of total available memory
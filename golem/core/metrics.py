@@ -0,0 +1,154 @@
+import bisect
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+# upper bounds of histogram buckets used when none are given
+DEFAULT_BUCKETS = (0.01, 0.1, 1, 10, 100, 1000)
+
+
+class Counter(object):
+    """ Integer counter which remembers how much it was increased since its
+    value was last saved """
+
+    def __init__(self, value=0):
+        self._lock = Lock()
+        self._value = value
+        self._unsaved = 0
+
+    @property
+    def value(self):
+        return self._value
+
+    def increase(self, increment=1):
+        """ :return int: value after the increase """
+        with self._lock:
+            self._value += increment
+            self._unsaved += increment
+            return self._value
+
+    def take_unsaved(self):
+        """ :return int: increase since the last call; it is then
+        considered saved """
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, 0
+            return unsaved
+
+    def restore_unsaved(self, unsaved):
+        """ Mark an increase returned by take_unsaved as not saved again """
+        with self._lock:
+            self._unsaved += unsaved
+
+    def rebase(self, base):
+        """ Add a base value, which is not an unsaved increase """
+        with self._lock:
+            self._value += base
+
+    def snapshot(self):
+        return self._value
+
+
+class Timer(object):
+    """ Number, total, shortest and longest duration of timed events """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.min = seconds if self.min is None else min(self.min, seconds)
+            self.max = seconds if self.max is None else max(self.max, seconds)
+
+    @contextmanager
+    def time(self):
+        """ Record the duration of a with block """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record(time.time() - start)
+
+    def snapshot(self):
+        with self._lock:
+            mean = self.total / self.count if self.count else None
+            return {'count': self.count, 'total': self.total,
+                    'min': self.min, 'max': self.max, 'mean': mean}
+
+
+class Histogram(object):
+    """ Counts of observed values in buckets with the given upper bounds;
+    the last bucket counts values above all bounds """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._lock = Lock()
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'buckets': self.buckets, 'counts': list(self.counts)}
+
+
+class MetricsRegistry(object):
+    """ Named counters, timers and histograms kept in memory. Metrics are
+    created on first use and shared by everyone who asks for the same name
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._metrics = dict()
+
+    def counter(self, name):
+        """ :return Counter: """
+        return self._get(name, Counter, lambda: self._new_counter(name))
+
+    def timer(self, name):
+        """ :return Timer: """
+        return self._get(name, Timer, Timer)
+
+    def histogram(self, name, buckets=DEFAULT_BUCKETS):
+        """ :return Histogram: buckets are only used when the histogram is
+        created """
+        return self._get(name, Histogram, lambda: Histogram(buckets))
+
+    def counters(self):
+        """ :return dict: name -> Counter """
+        with self._lock:
+            return {name: metric for name, metric in self._metrics.items()
+                    if isinstance(metric, Counter)}
+
+    def snapshot(self):
+        """ :return dict: name -> value of counters and statistics of timers
+        and histograms """
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {name: metric.snapshot() for name, metric in metrics.items()}
+
+    def _new_counter(self, name):
+        return Counter()
+
+    def _get(self, name, cls, create):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = create()
+        if not isinstance(metric, cls):
+            raise TypeError("Metric {!r} is a {}".format(
+                name, type(metric).__name__))
+        return metric
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,350 @@
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import cpu_count
+
+logger = logging.getLogger(__name__)
+
+# Extensions of formats that are already compressed. Deflating them again
+# costs CPU time and does not make the archive any smaller.
+STORED_EXTENSIONS = frozenset([
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.jp2',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.lzma', '.7z', '.rar', '.zst',
+    '.mp3', '.mp4', '.mkv', '.avi', '.mov', '.webm', '.ogg',
+])
+
+PROBE_SIZE = 64 * 1024
+STORE_RATIO = 0.95
+READ_SIZE = 1024 * 1024
+BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def is_incompressible(sample, ratio=STORE_RATIO):
+    """ Entropy probe. Compress a sample of the file with the fastest
+    deflate level and check whether the gain is worth the effort.
+    :param bytes sample: leading bytes of the file
+    :param float ratio: compressed / raw size ratio above which the data is
+                        considered incompressible
+    :return bool: True if the data should be stored without compression
+    """
+    if not sample:
+        return False
+    compressed = zlib.compress(sample, 1)
+    return len(compressed) >= len(sample) * ratio
+
+
+def should_store(file_name, sample, ratio=STORE_RATIO):
+    """ Decide whether a member should be written with ZIP_STORED
+    :param str file_name: member file name, used for extension lookup
+    :param bytes sample: leading bytes of the member
+    :param float ratio: see is_incompressible
+    :return bool: True if the member should not be compressed
+    """
+    _, ext = os.path.splitext(file_name)
+    if ext.lower() in STORED_EXTENSIONS:
+        return True
+    return is_incompressible(sample, ratio)
+
+
+class _Member(object):
+    """ Archive member prepared by a worker thread """
+
+    def __init__(self, zinfo, data=None, source=None):
+        self.zinfo = zinfo
+        self.data = data
+        self.source = source
+
+
+class ParallelZipFile(object):
+    """ Write-only zip archive which prepares its members in worker threads.
+    Workers read the members ahead and decide whether they are worth
+    compressing; the archive itself is built by the writing thread with
+    the public ZipFile API, where zlib runs without the GIL. Members are
+    written in the order they were added. Files that are already
+    compressed are written with ZIP_STORED. Source files are read by the
+    paths given, so the current working directory is never used nor
+    changed.
+    """
+
+    def __init__(self, output_path, workers=None, store_ratio=STORE_RATIO,
+                 buffer_size=BUFFER_SIZE):
+        """ Create new archive
+        :param str|IOBase output_path: path of the archive to create or
+                                       a writable binary file object
+        :param int workers: number of worker threads; defaults to
+                            the number of CPUs
+        :param float store_ratio: compression ratio above which a member
+                                  is stored instead of deflated
+        :param int buffer_size: files up to this size are read into memory
+                                by the workers; larger files are streamed
+                                from disk when written
+        """
+        self.output_path = output_path
+        self.workers = workers or cpu_count()
+        self.store_ratio = store_ratio
+        self.buffer_size = buffer_size
+
+        self._zf = zipfile.ZipFile(output_path, 'w',
+                                   compression=zipfile.ZIP_DEFLATED,
+                                   allowZip64=True)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._pending = deque()
+        self._max_pending = 2 * self.workers
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, file_path, arcname=None):
+        """ Add a file from disk to the archive
+        :param str file_path: path to the file
+        :param str arcname: name of the file in the archive; defaults to
+                            the base name of file_path
+        """
+        if arcname is None:
+            arcname = os.path.basename(file_path)
+        self._submit(self._pack_file, file_path, arcname)
+
+    def writestr(self, arcname, data):
+        """ Add in-memory data to the archive
+        :param str arcname: name of the file in the archive
+        :param bytes|str data: file contents
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._submit(self._pack_bytes, arcname, data)
+
+    def namelist(self):
+        return self._zf.namelist()
+
+    def close(self):
+        """ Wait for all members to be prepared, write them and finalize
+        the archive """
+        if self._closed:
+            return
+        try:
+            while self._pending:
+                self._append_next()
+        except BaseException:
+            self.abort()
+            raise
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        self._zf.close()
+
+    def abort(self):
+        """ Discard pending members and close the archive """
+        if self._closed:
+            return
+        self._closed = True
+        while self._pending:
+            self._pending.popleft().cancel()
+        self._executor.shutdown(wait=True)
+        self._zf.close()
+
+    def _submit(self, fn, *args):
+        if self._closed:
+            raise ValueError("Attempt to write to a closed archive")
+
+        self._pending.append(self._executor.submit(fn, *args))
+        # Write members that are already done; apply backpressure when too
+        # many prepared members wait for the head of the queue
+        while self._pending and (self._pending[0].done() or
+                                 len(self._pending) > self._max_pending):
+            self._append_next()
+
+    def _append_next(self):
+        member = self._pending.popleft().result()
+        if member.data is not None:
+            self._zf.writestr(member.zinfo, member.data)
+        else:
+            self._zf.write(member.source, member.zinfo.filename,
+                           member.zinfo.compress_type)
+
+    def _pack_file(self, file_path, arcname):
+        zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+
+        with open(file_path, 'rb') as src:
+            sample = src.read(PROBE_SIZE)
+            zinfo.compress_type = self._compress_type(arcname, sample)
+
+            if zinfo.file_size > self.buffer_size:
+                return _Member(zinfo, source=file_path)
+            return _Member(zinfo, data=sample + src.read())
+
+    def _pack_bytes(self, arcname, data):
+        zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+        zinfo.external_attr = 0o600 << 16
+        zinfo.compress_type = self._compress_type(arcname, data[:PROBE_SIZE])
+        return _Member(zinfo, data=data)
+
+    def _compress_type(self, arcname, sample):
+        if should_store(arcname, sample, self.store_ratio):
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+
+
+class ExtractedFiles(object):
+    """ Outcome of ParallelZipExtractor.extract """
+
+    def __init__(self):
+        # names of all extracted files, in archive order
+        self.names = []
+        self.written = []
+        self.skipped = []
+        # bytes added to the output directory; negative if files shrank
+        self.size_delta = 0
+
+
+class ParallelZipExtractor(object):
+    """ Extracts zip archive members in worker threads. Member paths are
+    validated before anything is written, so a malicious archive can not
+    write outside of the output directory. Each member is written to
+    a temporary file which replaces the destination once the data is
+    complete and verified, so readers never see partially written files.
+    Files already on disk with the member's size and CRC-32 are left
+    untouched.
+    """
+
+    def __init__(self, input_path, workers=None, skip_unchanged=True):
+        """
+        :param str|IOBase input_path: archive path or a seekable binary
+                                      file object
+        :param int workers: number of extraction threads; defaults to
+                            the number of CPUs
+        :param bool skip_unchanged: do not rewrite files matching members
+        """
+        self.input_path = input_path
+        self.workers = workers or cpu_count()
+        self.skip_unchanged = skip_unchanged
+
+    def extract(self, output_dir, members=None):
+        """ Extract the archive
+        :param str output_dir: extraction directory
+        :param members: names of members to extract; all by default
+        :return ExtractedFiles:
+        :raises ValueError: if a member path points outside of output_dir
+        """
+        output_dir = os.path.abspath(output_dir)
+        result = ExtractedFiles()
+
+        with zipfile.ZipFile(self.input_path, 'r', allowZip64=True) as zf:
+            infos = zf.infolist()
+            if members is not None:
+                members = set(members)
+                infos = [i for i in infos if i.filename in members]
+
+            targets = [(info, member_path(output_dir, info.filename))
+                       for info in infos]
+
+            for info, path in targets:
+                if info.is_dir():
+                    os.makedirs(path, exist_ok=True)
+            files = [(i, p) for i, p in targets if not i.is_dir()]
+
+            local = threading.local()
+            opened = []
+
+            def archive():
+                # file objects are shared, while archives opened by path
+                # need a handle per thread; ZipFile reference counts the
+                # path handle without a lock
+                if not isinstance(self.input_path, str):
+                    return zf
+                if not hasattr(local, 'zf'):
+                    local.zf = zipfile.ZipFile(self.input_path, 'r',
+                                               allowZip64=True)
+                    opened.append(local.zf)
+                return local.zf
+
+            def extract_member(info, path):
+                return self._extract_member(archive(), info, path)
+
+            try:
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    futures = [executor.submit(extract_member, i, p)
+                               for i, p in files]
+                    outcomes = [f.result() for f in futures]
+            finally:
+                for handle in opened:
+                    handle.close()
+
+        for (info, _), (written, size_delta) in zip(files, outcomes):
+            result.names.append(info.filename)
+            if written:
+                result.written.append(info.filename)
+            else:
+                result.skipped.append(info.filename)
+            result.size_delta += size_delta
+
+        return result
+
+    def _extract_member(self, zf, info, path):
+        previous_size = _file_size(path)
+        if self.skip_unchanged and previous_size == info.file_size \
+                and file_crc32(path) == info.CRC:
+            return False, 0
+
+        dst_dir = os.path.dirname(path)
+        os.makedirs(dst_dir, exist_ok=True)
+        tmp_path = os.path.join(dst_dir, '.{}.tmp'.format(uuid.uuid4()))
+        # permissions follow the umask, as with ZipFile.extract
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | \
+            getattr(os, 'O_BINARY', 0)
+        fd = os.open(tmp_path, flags, 0o666)
+        try:
+            # ZipExtFile verifies the CRC-32 once all data has been read
+            with os.fdopen(fd, 'wb') as dst, zf.open(info) as src:
+                shutil.copyfileobj(src, dst, READ_SIZE)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return True, info.file_size - (previous_size or 0)
+
+
+def member_path(output_dir, name):
+    """ Destination path of an archive member
+    :param str output_dir: absolute extraction directory
+    :param str name: member name
+    :raises ValueError: if the member would be written outside output_dir
+    """
+    parts = name.replace('\\', '/').split('/')
+    if name.startswith(('/', '\\')) or '..' in parts or \
+            os.path.splitdrive(name)[0]:
+        raise ValueError("Invalid archive member name: {}".format(name))
+
+    path = os.path.normpath(os.path.join(output_dir, *parts))
+    if not path.startswith(os.path.join(output_dir, '')):
+        raise ValueError("Invalid archive member name: {}".format(name))
+    return path
+
+
+def file_crc32(path):
+    crc = 0
+    with open(path, 'rb') as src:
+        for chunk in iter(lambda: src.read(READ_SIZE), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path) if os.path.isfile(path) else None
+    except OSError:
+        return None
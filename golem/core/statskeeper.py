@@ -1,11 +1,18 @@
 import logging
+import time
 from threading import Lock
 
+from twisted.internet.defer import succeed
+
 from golem.core.common import HandleAttributeError
-from golem.model import Stats
+from golem.core.metrics import Counter, MetricsRegistry
+from golem.model import Stats, db, db_worker
 
 logger = logging.getLogger(__name__)
 
+# save increased stats at least that often (seconds)
+FLUSH_INTERVAL = 30
+
 
 def log_attr_error(*args, **kwargs):
     logger.warning("Unknown stats %r", args[1])
@@ -48,28 +55,131 @@ class StatsKeeper(object):
         return getattr(self.session_stats, name), getattr(self.global_stats, name)
 
 
+class StatsRegistry(MetricsRegistry):
+    """
+    Metrics registry whose counters are global stats kept in the Stats
+    table. A counter is read from the database on first use and then only
+    increased in memory; increased counters are saved in a single
+    transaction by flush(). A counter whose stored value could not be read
+    is not saved until the value is read, so it does not overwrite the
+    stored stat.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        super(StatsRegistry, self).__init__()
+        self.flush_interval = flush_interval
+        self._database = None
+        self._last_flush = time.time()
+        # names of counters whose stored values are not known
+        self._unloaded = set()
+
+    def counter(self, name):
+        # the database may be initialized again, e.g. with another file
+        if self._database != db.database:
+            with self._lock:
+                for key in list(self._metrics):
+                    if isinstance(self._metrics[key], Counter):
+                        del self._metrics[key]
+                self._unloaded.clear()
+                self._database = db.database
+        return super(StatsRegistry, self).counter(name)
+
+    def flush_if_due(self):
+        if time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """ Save all counters increased since the last flush in a single
+        transaction of the database worker
+        :return Deferred: fired when the counters are saved
+        """
+        self._last_flush = time.time()
+        if self._database != db.database:
+            return succeed(None)
+        counters = self.counters()
+        self._load_unloaded(counters)
+        increased = [(name, counter, counter.take_unsaved())
+                     for name, counter in counters.items()
+                     if name not in self._unloaded]
+        increased = [entry for entry in increased if entry[2]]
+        if not increased:
+            return succeed(None)
+        values = {name: counter.value for name, counter, _ in increased}
+        deferred = db_worker.write(_save_stats, values)
+        deferred.addErrback(self._flush_failed, increased)
+        return deferred
+
+    @staticmethod
+    def _flush_failed(failure, increased):
+        logger.error("Exception occured while saving stats: %r",
+                     failure.value)
+        # saved again by the next flush
+        for _, counter, unsaved in increased:
+            counter.restore_unsaved(unsaved)
+
+    def _new_counter(self, name):
+        value = self._load(name)
+        if value is None:
+            self._unloaded.add(name)
+            return Counter()
+        return Counter(value)
+
+    def _load_unloaded(self, counters):
+        """ Read stored values of counters which could not be read before;
+        increases made meanwhile are added to them """
+        for name in list(self._unloaded):
+            counter = counters.get(name)
+            value = self._load(name) if counter else None
+            if value is not None:
+                counter.rebase(value)
+                self._unloaded.discard(name)
+
+    @staticmethod
+    def _load(name):
+        """ :return int|None: stored value of a stat; None if it cannot be
+        read """
+        try:
+            stat, _ = Stats.get_or_create(name=name, defaults={'value': '0'})
+            return int(stat.value)
+        except (ValueError, TypeError) as err:
+            logger.warning("Wrong stat %r format: %r", name, err)
+        except Exception:
+            logger.warning("Cannot retrieve %r from  database:", name,
+                           exc_info=True)
+        return None
+
+
+def _save_stats(values):
+    for name, value in values.items():
+        Stats.update(value="{}".format(value)) \
+            .where(Stats.name == name).execute()
+
+
+stats_registry = StatsRegistry()
+
+
 class IntStatsKeeper(StatsKeeper):
+    """ Integer stats; global values are counters of a StatsRegistry, so
+    increasing a stat does not touch the database """
 
-    def __init__(self, stat_class):
+    def __init__(self, stat_class, registry=None):
+        self.registry = registry or stats_registry
         super(IntStatsKeeper, self).__init__(stat_class, '0')
 
     @StatsKeeper.handle_attribute_error
     def increase_stat(self, stat_name, increment=1):
         with self._lock:
             val = getattr(self.session_stats, stat_name)
-            setattr(self.session_stats, stat_name, val + 1)
-            global_val = self._retrieve_stat(stat_name)
-            if global_val is not None:
-                setattr(self.global_stats, stat_name, global_val + increment)
-                try:
-                    Stats.update(value="{}".format(global_val+increment)) \
-                        .where(Stats.name == stat_name).execute()
-                except Exception as err:
-                    logger.error("Exception occured while updating stat %r: %r", stat_name, err)
+            setattr(self.session_stats, stat_name, val + increment)
+            global_val = self.registry.counter(stat_name).increase(increment)
+            setattr(self.global_stats, stat_name, global_val)
+
+    @StatsKeeper.handle_attribute_error
+    def _get_stat(self, name):
+        getattr(self.global_stats, name)
+        global_val = self.registry.counter(name).value
+        setattr(self.global_stats, name, global_val)
+        return getattr(self.session_stats, name), global_val
 
     def _retrieve_stat(self, name):
-        try:
-            stat_val = StatsKeeper._retrieve_stat(self, name)
-            return int(stat_val)
-        except (ValueError, TypeError) as err:
-            logger.warning("Wrong stat %r format: %r", name, err)
+        return self.registry.counter(name).value
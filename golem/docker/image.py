@@ -21,6 +21,16 @@ class DockerImage(object):
     def __repr__(self):
         return "DockerImage(repository=%r, image_id=%r, tag=%r)" % (self.repository, self.id, self.tag)
 
+    def get_local_id(self):
+        """ :return str|None: id of the local image, which changes whenever
+        the image is built or pulled again; None if it is not available """
+        client = local_client()
+        try:
+            return client.inspect_image(self.id or self.name)["Id"]
+        except (NotFound, APIError, ValueError):
+            log.debug('DockerImage cannot be inspected', exc_info=True)
+            return None
+
     def is_available(self):
         client = local_client()
         try:
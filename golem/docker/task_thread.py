@@ -9,6 +9,9 @@ from golem.vm.memorychecker import MemoryChecker
 
 logger = logging.getLogger(__name__)
 
+# relative CPU weight of low priority containers; docker's default is 1024
+LOW_PRIORITY_CPU_SHARES = 2
+
 
 class TimeoutException(Exception):
     pass
@@ -25,7 +28,8 @@ class DockerTaskThread(TaskThread):
 
     def __init__(self, task_computer, subtask_id, docker_images,
                  orig_script_dir, src_code, extra_data, short_desc,
-                 res_path, tmp_path, timeout, check_mem=False):
+                 res_path, tmp_path, timeout, check_mem=False,
+                 low_priority=False):
 
         if not docker_images:
             raise AttributeError("docker images is None")
@@ -44,6 +48,7 @@ class DockerTaskThread(TaskThread):
         self.job = None
         self.mc = None
         self.check_mem = check_mem
+        self.low_priority = low_priority
 
     def run(self):
         if not self.image:
@@ -65,6 +70,9 @@ class DockerTaskThread(TaskThread):
                 host_config = self.docker_manager.container_host_config
             else:
                 host_config = None
+            if self.low_priority:
+                host_config = dict(host_config or {},
+                                   cpu_shares=LOW_PRIORITY_CPU_SHARES)
 
             with DockerJob(self.image, self.src_code, self.extra_data,
                            self.res_path, work_dir, output_dir,
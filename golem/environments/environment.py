@@ -2,7 +2,8 @@ import enum
 
 from os import path
 
-from apps.rendering.benchmark.minilight.src.minilight import make_perf_test
+from apps.rendering.benchmark.minilight.src.minilight import \
+    make_parallel_perf_test
 
 from golem.core.common import get_golem_path
 from golem.model import Performance
@@ -106,6 +107,18 @@ class Environment():
             return 0.0
         return perf.value
 
+    @classmethod
+    def get_single_core_performance(cls):
+        """ Return performance index of a single core. Return 0.0 if
+        performance is unknown
+        :return float:
+        """
+        try:
+            perf = Performance.get(Performance.environment_id == cls.get_id())
+        except Performance.DoesNotExist:
+            return 0.0
+        return perf.single_core_value
+
     def description(self):
         """ Return long description of this environment
         :return str:
@@ -134,9 +147,14 @@ class Environment():
 
     @classmethod
     def run_default_benchmark(cls, num_cores=1, save=False):
+        """ Run the minilight benchmark on num_cores processes
+        :return float: aggregate performance of all cores
+        """
         test_file = path.join(get_golem_path(), 'apps', 'rendering',
                               'benchmark', 'minilight', 'cornellbox.ml.txt')
-        estimated_performance = make_perf_test(test_file, num_cores=1)
+        single_core, estimated_performance = make_parallel_perf_test(
+            test_file, num_cores=num_cores or 1)
         if save:
-            Performance.update_or_create(cls.get_id(), estimated_performance)
+            Performance.update_or_create(cls.get_id(), estimated_performance,
+                                         single_core)
         return estimated_performance
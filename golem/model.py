@@ -12,6 +12,7 @@ from peewee import (BooleanField, CharField, CompositeKey, DateTimeField,
                     FloatField, IntegerField, Model, SmallIntegerField,
                     SqliteDatabase, TextField)
 
+from golem.core.dbworker import DatabaseWorker
 from golem.core.simpleserializer import DictSerializable
 from golem.network.p2p.node import Node
 from golem.ranking.helper.trust_const import NEUTRAL_TRUST
@@ -21,13 +22,45 @@ log = logging.getLogger('golem.db')
 
 # Indicates how many KnownHosts can be stored in the DB
 MAX_STORED_HOSTS = 4
+# WAL lets readers work while a write is committed; with WAL, synchronous
+# NORMAL only syncs on checkpoints and is still safe against corruption.
+# Negative cache_size is in KiB.
 db = SqliteDatabase(None, threadlocals=True,
-                    pragmas=(('foreign_keys', True), ('busy_timeout', 30000)))
+                    pragmas=(('foreign_keys', True), ('busy_timeout', 30000),
+                             ('journal_mode', 'wal'), ('synchronous', 'normal'),
+                             ('cache_size', -16000)))
+# Writes which should not block the reactor; started by the client
+db_worker = DatabaseWorker(db)
 
 
 class Database:
-    # Database user schema version, bump to recreate the database
-    SCHEMA_VERSION = 5
+    # Database user schema version, bump to recreate the database or add
+    # a migration from the previous version
+    SCHEMA_VERSION = 8
+    # version -> statements which bring a database of that version to the
+    # next one; databases of versions without a migration are recreated
+    MIGRATIONS = {
+        5: [
+            'ALTER TABLE "performance" ADD COLUMN "single_core_value" '
+            'REAL NOT NULL DEFAULT 0.0',
+        ],
+        6: [
+            'ALTER TABLE "performance" ADD COLUMN "fingerprint" '
+            'VARCHAR(255) NOT NULL DEFAULT \'\'',
+        ],
+        7: [
+            'CREATE INDEX IF NOT EXISTS "expectedincome_subtask" '
+            'ON "expectedincome" ("subtask")',
+            'CREATE INDEX IF NOT EXISTS "expectedincome_modified_date" '
+            'ON "expectedincome" ("modified_date")',
+            'CREATE INDEX IF NOT EXISTS "expectedincome_sender_node_subtask" '
+            'ON "expectedincome" ("sender_node", "subtask")',
+            'CREATE INDEX IF NOT EXISTS "income_subtask" '
+            'ON "income" ("subtask")',
+            'CREATE INDEX IF NOT EXISTS "income_transaction" '
+            'ON "income" ("transaction")',
+        ],
+    }
 
     def __init__(self, datadir):
         # TODO: Global database is bad idea. Check peewee for other solutions.
@@ -64,11 +97,33 @@ class Database:
         if version != Database.SCHEMA_VERSION:
             log.info("New database version {}, previous {}".format(
                 Database.SCHEMA_VERSION, version))
-            db.drop_tables(tables, safe=True)
+            if not Database._migrate(version):
+                db.drop_tables(tables, safe=True)
             Database._set_user_version(Database.SCHEMA_VERSION)
         db.create_tables(tables, safe=True)
 
+    @staticmethod
+    def _migrate(version: int) -> bool:
+        """ Bring the database to the current version, keeping its data
+        :return: whether it was migrated; if not, it should be recreated
+        """
+        statements = []
+        while version != Database.SCHEMA_VERSION:
+            if version not in Database.MIGRATIONS:
+                return False
+            statements += Database.MIGRATIONS[version]
+            version += 1
+        try:
+            with db.atomic():
+                for statement in statements:
+                    db.execute_sql(statement)
+        except Exception as err:
+            log.warning("Cannot migrate database: %r", err)
+            return False
+        return True
+
     def close(self):
+        db_worker.stop()
         if not self.db.is_closed():
             self.db.close()
 
@@ -240,8 +295,16 @@ class ExpectedIncome(BaseModel):
     sender_node = CharField()
     sender_node_details = NodeField()
     task = CharField()
-    subtask = CharField()
+    subtask = CharField(index=True)
     value = BigIntegerField()
+    # looked up when expected incomes are checked
+    modified_date = DateTimeField(default=datetime.datetime.now, index=True)
+
+    class Meta:
+        database = db
+        indexes = (
+            (('sender_node', 'subtask'), False),
+        )
 
     def __repr__(self):
         return "<ExpectedIncome: {!r} v:{:.3f}>"\
@@ -255,13 +318,14 @@ class Income(BaseModel):
     """Payments received from other nodes."""
     sender_node = CharField()
     task = CharField()
-    subtask = CharField()
-    transaction = CharField()
+    subtask = CharField(index=True)
+    transaction = CharField(index=True)
     block_number = BigIntegerField()
     value = BigIntegerField()
 
     class Meta:
         database = db
+        # also the index of lookups by sender_node
         primary_key = CompositeKey('sender_node', 'subtask')
 
     def __repr__(self):
@@ -398,17 +462,28 @@ class TaskPreset(BaseModel):
 class Performance(BaseModel):
     """ Keeps information about benchmark performance """
     environment_id = CharField(null=False, index=True, unique=True)
+    # performance of all cores used for computation
     value = FloatField(default=0.0)
+    # performance of a single core; 0.0 if unknown
+    single_core_value = FloatField(default=0.0)
+    # hardware and software the benchmark was run on; empty if unknown
+    fingerprint = CharField(default='')
 
     class Meta:
         database = db
 
     @classmethod
-    def update_or_create(cl, env_id, performance):
+    def update_or_create(cl, env_id, performance, single_core_performance=0.0,
+                         fingerprint=''):
         try:
             perf = Performance.get(Performance.environment_id == env_id)
             perf.value = performance
+            perf.single_core_value = single_core_performance
+            perf.fingerprint = fingerprint
+            perf.modified_date = datetime.datetime.now()
             perf.save()
         except Performance.DoesNotExist:
-            perf = Performance(environment_id=env_id, value=performance)
+            perf = Performance(environment_id=env_id, value=performance,
+                               single_core_value=single_core_performance,
+                               fingerprint=fingerprint)
             perf.save()
@@ -1,10 +1,12 @@
 import collections
 import json
 import logging
+from threading import Lock
 
 import requests
 from copy import deepcopy
 from ipaddress import AddressValueError, ip_address
+from requests.adapters import HTTPAdapter
 
 from golem.resource.client import IClient, ClientOptions
 
@@ -16,6 +18,13 @@ class HyperdriveClient(IClient):
     CLIENT_ID = 'hyperg'
     VERSION = 1.1
 
+    # max. number of keep-alive connections to a single daemon
+    pool_size = 16
+
+    # sessions shared by all client instances, by API URL
+    _sessions = dict()
+    _sessions_lock = Lock()
+
     def __init__(self, port=3292, host='localhost', timeout=None):
         super(HyperdriveClient, self).__init__()
 
@@ -28,6 +37,7 @@ class HyperdriveClient(IClient):
         # default POST request headers
         self._url = 'http://{}:{}/api'.format(self.host, self.port)
         self._headers = {'content-type': 'application/json'}
+        self._session = self._get_session(self._url)
 
     @classmethod
     def build_options(cls, peers=None, **kwargs):
@@ -92,15 +102,27 @@ class HyperdriveClient(IClient):
         return response['hash']
 
     def _request(self, **data):
-        response = requests.post(url=self._url,
-                                 headers=self._headers,
-                                 data=json.dumps(data),
-                                 timeout=self.timeout)
+        response = self._session.post(url=self._url,
+                                      headers=self._headers,
+                                      data=json.dumps(data),
+                                      timeout=self.timeout)
         response.raise_for_status()
 
         if response.content:
             return json.loads(response.content.decode('utf-8'))
 
+    @classmethod
+    def _get_session(cls, url):
+        with cls._sessions_lock:
+            session = cls._sessions.get(url)
+            if not session:
+                adapter = HTTPAdapter(pool_connections=1,
+                                      pool_maxsize=cls.pool_size)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                cls._sessions[url] = session
+            return session
+
 
 class HyperdriveClientOptions(ClientOptions):
 
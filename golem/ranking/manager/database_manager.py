@@ -1,101 +1,158 @@
 import datetime
 import logging
+import time
+from threading import RLock
 
 from peewee import IntegrityError
+from twisted.internet.defer import succeed
 
-from golem.model import LocalRank, GlobalRank, NeighbourLocRank, db
+from golem.model import LocalRank, GlobalRank, NeighbourLocRank, db, \
+    db_worker
 
 logger = logging.getLogger(__name__)
 
 
+# flush unsaved local ranks at least that often (seconds)
+FLUSH_INTERVAL = 10
+# flush at once when that many updates are not saved
+MAX_UNSAVED_UPDATES = 100
+# LocalRank fields saved by a flush
+RANK_FIELDS = ('positive_computed', 'negative_computed', 'wrong_computed',
+               'positive_requested', 'negative_requested',
+               'positive_payment', 'negative_payment',
+               'positive_resource', 'negative_resource', 'modified_date')
+
+
+class LocalRankCache(object):
+    """
+    Write-behind cache of all local ranks. Ranks are read from the database
+    once and then updated in memory; changed ranks are saved in a single
+    transaction every FLUSH_INTERVAL seconds, or at once when
+    MAX_UNSAVED_UPDATES updates are waiting, which bounds what is lost if
+    the node crashes.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL,
+                 max_unsaved_updates=MAX_UNSAVED_UPDATES):
+        self.flush_interval = flush_interval
+        self.max_unsaved_updates = max_unsaved_updates
+        self._lock = RLock()
+        # node_id -> LocalRank
+        self._ranks = None
+        self._database = None
+        self._dirty = set()
+        self._unsaved_updates = 0
+        self._last_flush = time.time()
+
+    def get(self, node_id):
+        """ :return LocalRank|None: rank of the node; must not be changed """
+        with self._lock:
+            return self._load().get(node_id)
+
+    def get_all(self):
+        with self._lock:
+            return list(self._load().values())
+
+    def increase(self, node_id, field, trust_mod):
+        with self._lock:
+            ranks = self._load()
+            rank = ranks.get(node_id)
+            if rank is None:
+                rank = ranks[node_id] = LocalRank(node_id=node_id)
+            setattr(rank, field, getattr(rank, field) + trust_mod)
+            rank.modified_date = datetime.datetime.now()
+            self._dirty.add(node_id)
+            self._unsaved_updates += 1
+            if self._unsaved_updates >= self.max_unsaved_updates:
+                self.flush()
+
+    def flush_if_due(self):
+        """ Save changed ranks if they were not saved for flush_interval """
+        if time.time() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """ Save all changed ranks in a single transaction of the database
+        worker
+        :return Deferred: fired when the ranks are saved
+        """
+        with self._lock:
+            self._last_flush = time.time()
+            if not self._dirty or self._database != db.database:
+                return succeed(None)
+            values = {node_id: {field: getattr(self._ranks[node_id], field)
+                                for field in RANK_FIELDS}
+                      for node_id in self._dirty}
+            self._dirty = set()
+            self._unsaved_updates = 0
+        deferred = db_worker.write(_save_local_ranks, values)
+        deferred.addErrback(self._flush_failed, self._database, values)
+        return deferred
+
+    def _flush_failed(self, failure, database, values):
+        logger.warning("Cannot save local ranks: %r", failure.value)
+        with self._lock:
+            # saved again by the next flush
+            if database == self._database:
+                self._dirty.update(values)
+
+    def _load(self):
+        # the database may be initialized again, e.g. with another file
+        if self._ranks is None or self._database != db.database:
+            if self._dirty:
+                logger.warning("Dropping %d unsaved local ranks",
+                               len(self._dirty))
+            self._ranks = {rank.node_id: rank for rank in LocalRank.select()}
+            self._database = db.database
+            self._dirty = set()
+            self._unsaved_updates = 0
+        return self._ranks
+
+
+def _save_local_ranks(values):
+    for node_id, fields in values.items():
+        if not LocalRank.update(**fields) \
+                .where(LocalRank.node_id == node_id).execute():
+            LocalRank.create(node_id=node_id, **fields)
+
+
+local_ranks = LocalRankCache()
+
+
 def increase_positive_computed(node_id, trust_mod):
-    try:
-        with db.transaction():
-            LocalRank.create(node_id=node_id, positive_computed=trust_mod)
-    except IntegrityError:
-        LocalRank.update(positive_computed=LocalRank.positive_computed + trust_mod,
-                         modified_date=str(datetime.datetime.now())) \
-            .where(LocalRank.node_id == node_id).execute()
+    local_ranks.increase(node_id, 'positive_computed', trust_mod)
 
 
 def increase_negative_computed(node_id, trust_mod):
-    try:
-        with db.transaction():
-            LocalRank.create(node_id=node_id, negative_computed=trust_mod)
-    except IntegrityError:
-        LocalRank.update(negative_computed=LocalRank.negative_computed + trust_mod,
-                         modified_date=str(datetime.datetime.now())) \
-            .where(LocalRank.node_id == node_id).execute()
+    local_ranks.increase(node_id, 'negative_computed', trust_mod)
 
 
 def increase_wrong_computed(node_id, trust_mod):
-    try:
-        with db.transaction():
-            LocalRank.create(node_id=node_id, wrong_computed=trust_mod)
-    except IntegrityError:
-        LocalRank.update(wrong_computed=LocalRank.wrong_computed + trust_mod,
-                         modified_date=str(datetime.datetime.now())) \
-            .where(LocalRank.node_id == node_id).execute()
+    local_ranks.increase(node_id, 'wrong_computed', trust_mod)
 
 
 def increase_positive_requested(node_id, trust_mod):
-    try:
-        with db.transaction():
-            LocalRank.create(node_id=node_id, positive_requested=trust_mod)
-    except IntegrityError:
-        LocalRank.update(positive_requested=LocalRank.positive_requested + trust_mod,
-                         modified_date=str(datetime.datetime.now())) \
-            .where(LocalRank.node_id == node_id).execute()
+    local_ranks.increase(node_id, 'positive_requested', trust_mod)
 
 
 def increase_negative_requested(node_id, trust_mod):
-    try:
-        with db.transaction():
-            LocalRank.create(node_id=node_id, negative_requested=trust_mod)
-    except IntegrityError:
-        LocalRank.update(negative_requested=LocalRank.negative_requested + trust_mod,
-                         modified_date=str(datetime.datetime.now())) \
-            .where(LocalRank.node_id == node_id).execute()
+    local_ranks.increase(node_id, 'negative_requested', trust_mod)
 
 
 def increase_positive_payment(node_id, trust_mod):
-    try:
-        with db.transaction():
-            LocalRank.create(node_id=node_id, positive_payment=trust_mod)
-    except IntegrityError:
-        LocalRank.update(positive_payment=LocalRank.positive_payment + trust_mod,
-                         modified_date=str(datetime.datetime.now())) \
-            .where(LocalRank.node_id == node_id).execute()
+    local_ranks.increase(node_id, 'positive_payment', trust_mod)
 
 
 def increase_negative_payment(node_id, trust_mod):
-    try:
-        with db.transaction():
-            LocalRank.create(node_id=node_id, negative_payment=trust_mod)
-    except IntegrityError:
-        LocalRank.update(negative_payment=LocalRank.negative_payment + trust_mod,
-                         modified_date=str(datetime.datetime.now())) \
-            .where(LocalRank.node_id == node_id).execute()
+    local_ranks.increase(node_id, 'negative_payment', trust_mod)
 
 
 def increase_positive_resource(node_id, trust_mod):
-    try:
-        with db.transaction():
-            LocalRank.create(node_id=node_id, positive_resource=trust_mod)
-    except IntegrityError:
-        LocalRank.update(positive_resource=LocalRank.positive_resource + trust_mod,
-                         modified_date=str(datetime.datetime.now())) \
-            .where(LocalRank.node_id == node_id).execute()
+    local_ranks.increase(node_id, 'positive_resource', trust_mod)
 
 
 def increase_negative_resource(node_id, trust_mod):
-    try:
-        with db.transaction():
-            LocalRank.create(node_id=node_id, negative_resource=trust_mod)
-    except IntegrityError:
-        LocalRank.update(negative_resource=LocalRank.negative_resource + trust_mod,
-                         modified_date=str(datetime.datetime.now())) \
-            .where(LocalRank.node_id == node_id).execute()
+    local_ranks.increase(node_id, 'negative_resource', trust_mod)
 
 
 def get_global_rank(node_id):
@@ -115,11 +172,15 @@ def upsert_global_rank(node_id, comp_trust, req_trust, comp_weight, req_weight):
 
 
 def get_local_rank(node_id):
-    return LocalRank.select().where(LocalRank.node_id == node_id).first()
+    return local_ranks.get(node_id)
 
 
 def get_local_rank_for_all():
-    return LocalRank.select()
+    return local_ranks.get_all()
+
+
+def flush_local_ranks():
+    local_ranks.flush()
 
 
 def get_neighbour_loc_rank(neighbour_id, about_id):
@@ -185,6 +185,12 @@ class Ranking(object):
         for [neighbour_id, about_id, loc_rank] in neighbours_loc_ranks:
             with self.lock:
                 dm.upsert_neighbour_loc_rank(neighbour_id, about_id, loc_rank)
+        dm.local_ranks.flush_if_due()
+
+    @staticmethod
+    def flush():
+        """ Save local ranks which are only kept in memory """
+        dm.flush_local_ranks()
 
     def __push_local_ranks(self):
         for loc_rank in dm.get_local_rank_for_all():
@@ -3,13 +3,17 @@ import logging
 import os
 import re
 import shutil
-from collections import deque
 from threading import Lock
 
 from golem.core.common import to_unicode
+from golem.core.dirsize import size_accountant
+from golem.core.filecopy import copy_file
 from golem.core.fileshelper import copy_file_tree, common_dir
+from golem.resource.base.resourcestore import ResourceStore
+from golem.resource.base.scheduler import DownloadScheduler, \
+    DownloadPriority
 from golem.resource.client import IClientHandler, ClientCommands, \
-    ClientHandler, ClientConfig, TestClient
+    ClientHandler, ClientConfig, TestClient, AdaptiveConcurrency
 from golem.core.async import AsyncRequest, async_run
 
 logger = logging.getLogger(__name__)
@@ -42,6 +46,12 @@ def dir_files(directory):
     return result
 
 
+def path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(f) for f in dir_files(path))
+
+
 class Resource(object):
 
     def __init__(self, resource_hash, task_id=None, path=None):
@@ -69,6 +79,13 @@ class Resource(object):
     def exists(self):
         return self.path and os.path.exists(self.path)
 
+    @property
+    def size(self):
+        try:
+            return path_size(self.path)
+        except (OSError, TypeError):
+            return 0
+
     def contains_file(self, name):
         raise NotImplementedError()
 
@@ -123,6 +140,16 @@ class ResourceBundle(Resource):
     def files_split(self):
         return self._files_split[:]
 
+    @property
+    def size(self):
+        size = 0
+        for file_name in self._files or []:
+            try:
+                size += path_size(os.path.join(self.path, file_name))
+            except (OSError, TypeError):
+                pass
+        return size
+
     def contains_file(self, name):
         if self._files:
             return any([os.path.basename(f) == name
@@ -194,10 +221,21 @@ class ResourceCache(object):
 
 class ResourceStorage(object):
 
-    def __init__(self, dir_manager, resource_dir_method):
+    def __init__(self, dir_manager, resource_dir_method,
+                 store_size=ResourceStore.DEFAULT_MAX_SIZE):
         self.dir_manager = dir_manager
         self.resource_dir_method = resource_dir_method
         self.cache = ResourceCache()
+        self.store_size = store_size
+        self._store = None
+
+    @property
+    def store(self):
+        if not self._store:
+            store_dir = self.dir_manager.get_resource_store_dir() \
+                if self.store_size else None
+            self._store = ResourceStore(store_dir, self.store_size)
+        return self._store
 
     def list_dir(self, dir_name):
         return self.dir_manager.list_dir_names(dir_name)
@@ -250,6 +288,7 @@ class ResourceStorage(object):
         src_path = norm_path(src_path)
 
         make_path_dirs(dst_path)
+        size_accountant.removing(dst_path)
 
         if os.path.isfile(dst_path):
             os.remove(dst_path)
@@ -257,27 +296,63 @@ class ResourceStorage(object):
             shutil.rmtree(dst_path)
 
         if os.path.isfile(src_path):
-            shutil.copyfile(src_path, dst_path)
+            copy_file(src_path, dst_path)
         elif os.path.isdir(src_path):
             copy_file_tree(src_path, dst_path)
         else:
             raise ValueError("Error reading source path: '{}'"
                              .format(src_path))
 
+        size_accountant.added(dst_path)
+
+    def store_resource(self, resource):
+        """ Keep a copy of the resource in the shared store """
+        src_dir, files = self._resource_files(resource)
+        return self.store.put(resource.hash, src_dir, files)
+
+    def restore_resource(self, resource):
+        """
+        Copy a resource from the shared store to its task directory
+        :return: True if the resource was found in the store
+        """
+        if not self.store.enabled:
+            return False
+
+        entry_path = self.store.get(resource.hash)
+        if not entry_path:
+            return False
+
+        dst_dir, _ = self._resource_files(resource)
+        make_path_dirs(os.path.join(dst_dir, ''))
+        copy_file_tree(entry_path, dst_dir)
+        size_accountant.add(dst_dir, self.store.entry_size(resource.hash))
+        return True
+
+    @staticmethod
+    def _resource_files(resource):
+        if isinstance(resource, ResourceBundle):
+            return resource.path, resource.files
+        return os.path.dirname(resource.path), [os.path.basename(resource.path)]
+
     def clear_cache(self):
         self.cache.clear()
 
 
 class AbstractResourceManager(IClientHandler, metaclass=abc.ABCMeta):
     lock = Lock()
-    queue_lock = Lock()
 
-    def __init__(self, dir_manager, resource_dir_method=None):
+    def __init__(self, dir_manager, resource_dir_method=None,
+                 store_size=ResourceStore.DEFAULT_MAX_SIZE):
 
-        self.download_queue = deque()
-        self.current_downloads = 0
+        self._download_concurrency = None
+        self._download_scheduler = None
+        self._throttled = False
+        self._queue_lock = Lock()
+        self._queue_processing = False
+        self._queue_changed = False
         self.storage = ResourceStorage(dir_manager, resource_dir_method
-                                       or dir_manager.get_task_resource_dir)
+                                       or dir_manager.get_task_resource_dir,
+                                       store_size=store_size)
         self.index_resources(self.storage.get_root())
 
         if not hasattr(self, 'commands'):
@@ -325,6 +400,7 @@ class AbstractResourceManager(IClientHandler, metaclass=abc.ABCMeta):
     def remove_task(self, task_id,
                     client=None, client_options=None):
 
+        self.storage.store.unpin_all(task_id)
         resources = self.storage.cache.remove(task_id)
         if resources:
             for resource in resources:
@@ -403,25 +479,50 @@ class AbstractResourceManager(IClientHandler, metaclass=abc.ABCMeta):
     def copy_files(self, from_dir):
         self.storage.copy_dir(from_dir)
         AbstractResourceManager.__init__(self, self.storage.dir_manager,
-                                         self.storage.resource_dir_method)
+                                         self.storage.resource_dir_method,
+                                         self.storage.store_size)
 
     def pull_resource(self, entry, task_id,
                       success, error,
-                      client=None, client_options=None, async=True, pin=True):
+                      client=None, client_options=None, async=True, pin=True,
+                      priority=DownloadPriority.subtask):
+
+        resource = self._wrap_resource(entry, task_id)
+
+        if self.storage.has_resource(resource):
+            success(entry, task_id)
+            return
+
+        self.download_scheduler.push(priority, (
+            entry, task_id, success, error,
+            client, client_options, async, pin, priority
+        ))
+        self.__process_queue()
+
+    def __download(self, entry, task_id,
+                   success, error,
+                   client, client_options, async, pin, priority):
 
         resource = self._wrap_resource(entry, task_id)
 
         if self.storage.has_resource(resource):
+            self.download_scheduler.finished(priority)
             success(entry, task_id)
             return
 
-        def success_wrapper(response, **_):
-            self.__dec_downloads()
+        def success_wrapper(response, downloaded=True, size=0, **_):
+            size = size if downloaded else 0
+            self.download_scheduler.finished(priority, size)
             self._clear_retry(self.commands.get, resource.hash)
 
+            if downloaded:
+                self.download_concurrency.record(size)
+                size_accountant.add(resource.path, size)
+
             if pin:
                 self._cache_resource(resource)
                 self.pin_resource(resource.hash)
+                self.__store_resource(resource, task_id, downloaded, async)
 
             logger.debug("Resource manager: {} ({}) downloaded"
                          .format(resource.path, resource.hash))
@@ -430,7 +531,7 @@ class AbstractResourceManager(IClientHandler, metaclass=abc.ABCMeta):
             self.__process_queue()
 
         def error_wrapper(exception, **_):
-            self.__dec_downloads()
+            self.download_scheduler.finished(priority)
 
             if self._can_retry(exception, self.commands.get, resource.hash):
                 self.pull_resource(entry, task_id,
@@ -438,7 +539,8 @@ class AbstractResourceManager(IClientHandler, metaclass=abc.ABCMeta):
                                    success=success,
                                    error=error,
                                    async=async,
-                                   pin=pin)
+                                   pin=pin,
+                                   priority=priority)
             else:
                 logger.error("Resource manager: error downloading {} ({}): {}"
                              .format(resource.path, resource.hash, exception))
@@ -451,28 +553,33 @@ class AbstractResourceManager(IClientHandler, metaclass=abc.ABCMeta):
 
         if local:
 
-            self.__inc_downloads()
             try:
                 self.storage.copy(local.path, resource.path, task_id)
             except Exception as exc:
                 error_wrapper(exc)
             else:
-                success_wrapper(entry)
+                success_wrapper(entry, downloaded=False)
 
-        else:
+            return
 
-            if self.__can_download():
-                self.__inc_downloads()
-                self.__pull(resource, task_id,
-                            success=success_wrapper,
-                            error=error_wrapper,
-                            client=client,
-                            client_options=client_options,
-                            async=async)
+        def pull():
+            self.__pull(resource, task_id,
+                        success=success_wrapper,
+                        error=error_wrapper,
+                        client=client,
+                        client_options=client_options,
+                        async=async)
+
+        def restored(result):
+            if result:
+                success_wrapper(entry, downloaded=False)
             else:
-                self.__push_to_queue(entry, task_id,
-                                     success, error,
-                                     client, client_options, async, pin)
+                pull()
+
+        if pin:
+            self.__restore_resource(resource, restored, error_wrapper, async)
+        else:
+            pull()
 
     def command_failed(self, exc, cmd, obj_id, **kwargs):
         logger.error("Resource manager: Error executing command '{}': {}"
@@ -531,43 +638,135 @@ class AbstractResourceManager(IClientHandler, metaclass=abc.ABCMeta):
             client_options=client_options
         )
 
+        def get_file(**kw):
+            # size is measured in the download thread, not on the reactor
+            return client.get_file(**kw), resource.size
+
+        def success_size(result):
+            data, size = result
+            success(data, size=size)
+
         if async:
-            self._async_call(client.get_file,
-                             success, error,
+            self._async_call(get_file,
+                             success_size, error,
                              **kwargs)
         else:
             try:
-                data = client.get_file(**kwargs)
-                success(data)
+                success_size(get_file(**kwargs))
             except Exception as e:
                 error(e)
 
-    def __can_download(self):
-        max_dl = self.config.max_concurrent_downloads
-        with self.lock:
-            return max_dl < 1 or self.current_downloads < max_dl
+    @property
+    def download_concurrency(self):
+        if not self._download_concurrency:
+            self._download_concurrency = AdaptiveConcurrency(
+                self.config.max_concurrent_downloads,
+                maximum=self.config.max_concurrent_downloads_limit)
+        return self._download_concurrency
 
-    def __inc_downloads(self):
-        with self.lock:
-            self.current_downloads += 1
+    def get_store_stats(self):
+        return self.storage.store.stats()
 
-    def __dec_downloads(self):
-        with self.lock:
-            self.current_downloads -= 1
+    def __store_resource(self, resource, task_id, downloaded, async=True):
+
+        def store():
+            if downloaded:
+                self.storage.store_resource(resource)
+            self.storage.store.pin(resource.hash, task_id)
+
+        def error(exc):
+            logger.warning("Resource manager: cannot store %s: %s",
+                           resource.hash, getattr(exc, 'value', exc))
 
-    def __push_to_queue(self, *params):
-        with self.queue_lock:
-            self.download_queue.append(params)
+        if async:
+            self._async_call(store, None, error)
+        else:
+            try:
+                store()
+            except Exception as exc:  # pylint: disable=broad-except
+                error(exc)
+
+    def __restore_resource(self, resource, success, error, async=True):
+
+        def restore():
+            try:
+                restored = self.storage.restore_resource(resource)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning("Resource manager: cannot restore %s: %s",
+                               resource.hash, exc)
+                return False
+
+            if restored:
+                logger.debug("Resource manager: %s restored from the store",
+                             resource.hash)
+            return restored
+
+        if async:
+            self._async_call(restore, success, error)
+        else:
+            success(restore())
+
+    @property
+    def download_scheduler(self):
+        # an empty scheduler is falsy
+        if self._download_scheduler is None:
+            self._download_scheduler = DownloadScheduler(
+                self.download_concurrency,
+                class_limits=self.config.download_class_limits,
+                bandwidth=self.config.download_bandwidth,
+                class_bandwidth=self.config.download_class_bandwidth)
+        return self._download_scheduler
+
+    @property
+    def current_downloads(self):
+        return self.download_scheduler.active
 
     def __process_queue(self):
-        params = None
+        # Downloads served locally finish before __download returns and
+        # ask for the queue to be processed again; instead of recursing,
+        # the call which is already processing the queue loops once more
+        with self._queue_lock:
+            self._queue_changed = True
+            if self._queue_processing:
+                return
+            self._queue_processing = True
+
+        try:
+            while True:
+                with self._queue_lock:
+                    if not self._queue_changed:
+                        self._queue_processing = False
+                        break
+                    self._queue_changed = False
+
+                while True:
+                    params = self.download_scheduler.pop()
+                    if not params:
+                        break
+                    self.__download(*params)
+        except Exception:
+            with self._queue_lock:
+                self._queue_processing = False
+            raise
+
+        delay = self.download_scheduler.delay()
+        if delay:
+            self.__resume_later(delay)
+
+    def __resume_later(self, delay):
+        from twisted.internet import reactor
 
-        with self.queue_lock:
-            if self.download_queue:
-                params = self.download_queue.popleft()
+        with self.lock:
+            if self._throttled:
+                return
+            self._throttled = True
+
+        def resume():
+            with self.lock:
+                self._throttled = False
+            self.__process_queue()
 
-        if params:
-            self.pull_resource(*params)
+        reactor.callFromThread(reactor.callLater, delay, resume)
 
 
 class TestResourceManager(AbstractResourceManager, ClientHandler):
@@ -0,0 +1,291 @@
+import logging
+import os
+import shutil
+import stat
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from urllib.parse import quote, unquote
+
+from golem.core.dirsize import size_accountant
+from golem.core.filecopy import copy_file, copy_tree
+
+logger = logging.getLogger(__name__)
+
+TMP_PREFIX = '.tmp-'
+
+
+def _entry_size(path):
+    size = 0
+    for src_dir, _, files in os.walk(path):
+        for f in files:
+            try:
+                size += os.path.getsize(os.path.join(src_dir, f))
+            except OSError:
+                pass
+    return size
+
+
+def _remove_read_only(func, path, _):
+    """ shutil.rmtree error handler; read-only files cannot be removed on
+    Windows """
+    try:
+        os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
+        func(path)
+    except OSError:
+        pass
+
+
+class _Entry(object):
+
+    __slots__ = ('path', 'size', 'pins')
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.pins = set()
+
+
+class ResourceStore(object):
+    """
+    Content-addressed resource store shared by all tasks. Each entry is
+    a directory named after the resource hash, holding the resource files
+    under their task-relative paths. The store is kept within a byte budget
+    by evicting the least recently used entries. Entries pinned by a task
+    are never evicted. Entry files are read-only and may be hardlinked to
+    the files they were stored from.
+    """
+
+    DEFAULT_MAX_SIZE = 2 * 1024 ** 3
+
+    def __init__(self, root_dir, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param str root_dir: store directory
+        :param int max_size: byte budget; 0 disables the store
+        """
+        self.root_dir = root_dir
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+        if self.enabled:
+            self._load()
+
+    @property
+    def enabled(self):
+        return bool(self.max_size and self.max_size > 0)
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, resource_hash):
+        return resource_hash in self._entries
+
+    def get(self, resource_hash):
+        """
+        Look up an entry and mark it as the most recently used one.
+        :param str resource_hash: resource hash
+        :return: entry directory or None
+        """
+        with self._lock:
+            entry = self._entries.get(resource_hash)
+            if not entry or not os.path.isdir(entry.path):
+                self.misses += 1
+                if entry:
+                    self._drop(resource_hash)
+                return None
+
+            self.hits += 1
+            self._touch(resource_hash, entry)
+            return entry.path
+
+    def put(self, resource_hash, src_dir, files):
+        """
+        Copy resource files to the store, evicting old entries if needed.
+        :param str resource_hash: resource hash
+        :param str src_dir: directory the file paths are relative to
+        :param list files: relative paths of resource files
+        :return: True if the resource is present in the store
+        """
+        if not self.enabled or not resource_hash or not files:
+            return False
+
+        with self._lock:
+            entry = self._entries.get(resource_hash)
+            if entry:
+                self._touch(resource_hash, entry)
+                return True
+
+        size = 0
+        for f in files:
+            path = os.path.join(src_dir, f)
+            if not os.path.exists(path):
+                return False
+            size += os.path.getsize(path) if os.path.isfile(path) \
+                else _entry_size(path)
+
+        if size > self.max_size:
+            logger.debug("Resource store: %s exceeds the store size",
+                         resource_hash)
+            return False
+
+        with self._lock:
+            if not self._reserve(size):
+                logger.debug("Resource store: no space for %s",
+                             resource_hash)
+                return False
+
+        tmp_path = os.path.join(self.root_dir, TMP_PREFIX + str(uuid.uuid4()))
+        entry_path = self._entry_path(resource_hash)
+
+        try:
+            for f in files:
+                self._copy(os.path.join(src_dir, f), os.path.join(tmp_path, f))
+            os.rename(tmp_path, entry_path)
+        except OSError as exc:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.isdir(entry_path):
+                logger.warning("Resource store: cannot store %s: %s",
+                               resource_hash, exc)
+                with self._lock:
+                    self._size -= size
+                return False
+            # the same resource was stored concurrently
+
+        with self._lock:
+            if resource_hash in self._entries:
+                # registered by the concurrent put
+                self._size -= size
+                return True
+            self._entries[resource_hash] = _Entry(entry_path, size)
+        size_accountant.add(entry_path, size)
+        return True
+
+    def pin(self, resource_hash, owner):
+        """
+        Protect an entry from eviction
+        :param str resource_hash: resource hash
+        :param owner: pinning party, e.g. task id
+        """
+        with self._lock:
+            entry = self._entries.get(resource_hash)
+            if entry:
+                entry.pins.add(owner)
+                return True
+            return False
+
+    def unpin(self, resource_hash, owner):
+        with self._lock:
+            entry = self._entries.get(resource_hash)
+            if entry:
+                entry.pins.discard(owner)
+
+    def unpin_all(self, owner):
+        """ Remove all pins of the given owner """
+        with self._lock:
+            for entry in self._entries.values():
+                entry.pins.discard(owner)
+
+    def entry_size(self, resource_hash):
+        entry = self._entries.get(resource_hash)
+        return entry.size if entry else 0
+
+    def is_pinned(self, resource_hash):
+        entry = self._entries.get(resource_hash)
+        return bool(entry and entry.pins)
+
+    def remove(self, resource_hash):
+        with self._lock:
+            entry = self._entries.get(resource_hash)
+            if entry:
+                self._drop(resource_hash)
+
+    def stats(self):
+        """
+        :return dict: hit and eviction counters, size and usage
+        """
+        lookups = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / lookups if lookups else 0.,
+            evictions=self.evictions,
+            entries=len(self._entries),
+            size=self._size,
+            max_size=self.max_size,
+        )
+
+    def _reserve(self, size):
+        """ Evict unpinned entries until size bytes are available """
+        if self._size + size > self.max_size:
+            for resource_hash, entry in list(self._entries.items()):
+                if entry.pins:
+                    continue
+                self._drop(resource_hash)
+                self.evictions += 1
+                logger.debug("Resource store: evicted %s (%d B)",
+                             resource_hash, entry.size)
+                if self._size + size <= self.max_size:
+                    break
+
+        if self._size + size > self.max_size:
+            return False
+        self._size += size
+        return True
+
+    def _touch(self, resource_hash, entry):
+        self._entries.move_to_end(resource_hash)
+        try:
+            os.utime(entry.path)
+        except OSError:
+            pass
+
+    def _drop(self, resource_hash):
+        entry = self._entries.pop(resource_hash)
+        self._size -= entry.size
+        shutil.rmtree(entry.path, onerror=_remove_read_only)
+        size_accountant.remove(entry.path, entry.size)
+
+    def _entry_path(self, resource_hash):
+        return os.path.join(self.root_dir, quote(resource_hash, safe=''))
+
+    def _load(self):
+        """ Index entries left by previous runs, oldest first """
+        if not os.path.isdir(self.root_dir):
+            os.makedirs(self.root_dir)
+
+        found = []
+        for name in os.listdir(self.root_dir):
+            path = os.path.join(self.root_dir, name)
+            if name.startswith(TMP_PREFIX):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.isdir(path):
+                found.append((os.path.getmtime(path), unquote(name), path))
+
+        for _, resource_hash, path in sorted(found):
+            size = _entry_size(path)
+            self._entries[resource_hash] = _Entry(path, size)
+            self._size += size
+
+        if self._size > self.max_size:
+            self._reserve(0)
+
+    def _copy(self, src, dst):
+        dst_dir = os.path.dirname(dst)
+        if not os.path.isdir(dst_dir):
+            os.makedirs(dst_dir)
+        # files of other entries may be shared; files of tasks are copied
+        if os.path.isdir(src):
+            copy_tree(src, dst, read_only=True, link_root=self.root_dir)
+        else:
+            copy_file(src, dst, read_only=True, link_root=self.root_dir)
@@ -0,0 +1,197 @@
+import time
+from collections import deque
+from enum import IntEnum
+from threading import Lock
+
+# handshake downloads which may run over the global concurrency limit, so
+# that new tasks are not held back by downloads of other classes
+HANDSHAKE_SLOTS = 1
+
+
+class DownloadPriority(IntEnum):
+    """ Download classes, from the most to the least urgent """
+    handshake = 0
+    subtask = 1
+    results = 2
+
+
+class TokenBucket(object):
+    """
+    Bandwidth limit. Transfer sizes are known only after a download has
+    finished, so the bucket is allowed to go into debt; no new transfers
+    should be started until the debt is paid off.
+    """
+    def __init__(self, rate, burst=None, clock=time.time):
+        """
+        :param rate: bytes per second
+        :param burst: bucket capacity in bytes, defaults to rate
+        """
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._tokens = self.burst
+        self._clock = clock
+        self._last = clock()
+
+    def consume(self, size):
+        self._refill()
+        self._tokens -= size
+
+    def delay(self):
+        """ Seconds to wait until the debt is paid off """
+        self._refill()
+        if self._tokens >= 0:
+            return 0.
+        return -self._tokens / self.rate
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+
+class DownloadScheduler(object):
+    """
+    Orders queued downloads by their priority class. Entries age while
+    waiting: every aging_interval seconds spent in the queue promote an
+    entry by one class, so low priority downloads are never starved.
+    Downloads are started only if the global limit, the limit of their
+    class and the bandwidth limits allow it; HANDSHAKE_SLOTS handshake
+    downloads are exempt from the global limit.
+    """
+    def __init__(self, concurrency, class_limits=None, bandwidth=None,
+                 class_bandwidth=None, aging_interval=30.,
+                 clock=time.time):
+        """
+        :param AdaptiveConcurrency concurrency: global concurrency limit
+        :param dict class_limits: DownloadPriority -> max. concurrent
+                                  downloads of that class
+        :param bandwidth: global bandwidth limit in bytes per second
+        :param dict class_bandwidth: DownloadPriority -> bandwidth limit
+        :param aging_interval: waiting time which promotes an entry by one
+                               priority class
+        """
+        self.concurrency = concurrency
+        self.class_limits = dict(class_limits or {})
+        self.aging_interval = aging_interval
+
+        self._clock = clock
+        self._lock = Lock()
+        self._queues = {p: deque() for p in DownloadPriority}
+        self._active = {p: 0 for p in DownloadPriority}
+
+        self._bandwidth = TokenBucket(bandwidth, clock=clock) \
+            if bandwidth else None
+        self._class_bandwidth = {
+            p: TokenBucket(rate, clock=clock)
+            for p, rate in (class_bandwidth or {}).items() if rate
+        }
+
+    def __len__(self):
+        return sum(len(q) for q in self._queues.values())
+
+    @property
+    def active(self):
+        return sum(self._active.values())
+
+    def active_in(self, priority):
+        return self._active[priority]
+
+    def push(self, priority, item):
+        with self._lock:
+            self._queues[DownloadPriority(priority)].append(
+                (self._clock(), item))
+
+    def pop(self):
+        """
+        Take the most urgent entry which can be started now and mark it as
+        active.
+        :return: queued item or None
+        """
+        with self._lock:
+            if not any(self._queues.values()):
+                return None
+
+            limit = self.concurrency.limit
+            saturated = 0 < limit <= self.active
+            if saturated and not self._handshake_slot():
+                self.concurrency.saturated()
+                return None
+            if self._bandwidth and self._bandwidth.delay():
+                return None
+
+            priority = DownloadPriority.handshake if saturated \
+                else self._select()
+            if priority is None:
+                return None
+
+            _, item = self._queues[priority].popleft()
+            self._active[priority] += 1
+            return item
+
+    def finished(self, priority, size=0):
+        """
+        Mark a transfer as finished
+        :param priority: transfer class
+        :param size: number of bytes transferred
+        """
+        with self._lock:
+            self._active[priority] = max(0, self._active[priority] - 1)
+
+            if size:
+                if self._bandwidth:
+                    self._bandwidth.consume(size)
+                if priority in self._class_bandwidth:
+                    self._class_bandwidth[priority].consume(size)
+
+    def delay(self):
+        """
+        :return: seconds until a queued, bandwidth-throttled entry can be
+                 started; None if no entry is throttled
+        """
+        with self._lock:
+            queued = [p for p, q in self._queues.items() if q]
+            if not queued:
+                return None
+
+            delays = []
+            if self._bandwidth:
+                delays.append(self._bandwidth.delay())
+            for priority in queued:
+                if priority in self._class_bandwidth:
+                    delays.append(self._class_bandwidth[priority].delay())
+
+            delays = [d for d in delays if d > 0]
+            return min(delays) if delays else None
+
+    def _select(self):
+        now = self._clock()
+        selected, selected_rank = None, None
+
+        for priority, queue in self._queues.items():
+            if not queue or not self._can_start(priority):
+                continue
+
+            waited = now - queue[0][0]
+            rank = priority - waited / self.aging_interval
+            if selected is None or (rank, priority) < (selected_rank,
+                                                       selected):
+                selected, selected_rank = priority, rank
+
+        return selected
+
+    def _handshake_slot(self):
+        """ :return bool: whether a handshake can start over the global
+        limit """
+        handshake = DownloadPriority.handshake
+        return bool(self._queues[handshake]) \
+            and self._active[handshake] < HANDSHAKE_SLOTS \
+            and self._can_start(handshake)
+
+    def _can_start(self, priority):
+        limit = self.class_limits.get(priority)
+        if limit and self._active[priority] >= limit:
+            return False
+
+        bucket = self._class_bandwidth.get(priority)
+        return not (bucket and bucket.delay())
@@ -0,0 +1,386 @@
+import hashlib
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from functools import lru_cache
+from threading import Lock
+
+import numpy
+
+logger = logging.getLogger(__name__)
+
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+# 20 mask bits give ~1 MiB of average distance between boundaries. The bits
+# are taken from the top of the hash, which depends on the last WINDOW bytes
+CHUNK_MASK = ((1 << 20) - 1) << 12
+WINDOW = 32
+READ_SIZE = 8 * 1024 * 1024
+# chunk ids sent in a resource header at most
+MAX_ADVERTISED_CHUNKS = 4096
+
+CHUNK_DIR = '.chunks'
+MANIFEST_NAME = CHUNK_DIR + '/manifest.json'
+
+
+def _gear_table():
+    return [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], 'big')
+            for i in range(256)]
+
+
+GEAR = _gear_table()
+_GEAR = numpy.array(GEAR, dtype=numpy.uint32)
+
+
+def rolling_hashes(data, history=b''):
+    """ Gear hash values after each byte of data. The 32-bit gear hash
+    h = (h << 1) + GEAR[byte] depends only on the last 32 bytes, so it can
+    be computed for all positions at once as a sum of shifted table values.
+    :param bytes data: data to hash
+    :param bytes history: bytes preceding data in the stream
+    :return numpy.ndarray: uint32 hash values
+    """
+    history = history[-(WINDOW - 1):]
+    buf = numpy.frombuffer(history + data, dtype=numpy.uint8)
+    gear = _GEAR[buf]
+    size, offset = len(data), len(history)
+    hashes = numpy.zeros(size, dtype=numpy.uint32)
+
+    for k in range(WINDOW):
+        shift = numpy.uint32(k)
+        start = offset - k
+        if start >= 0:
+            hashes += gear[start:start + size] << shift
+        elif size + start > 0:
+            hashes[-start:] += gear[:size + start] << shift
+
+    return hashes
+
+
+def iter_chunks(src, read_size=READ_SIZE):
+    """ Split a stream into content-defined chunks. A chunk ends after
+    a byte at which the rolling hash matches CHUNK_MASK, so an insertion
+    or removal only changes the chunks around it.
+    :param src: readable binary file object
+    :param int read_size: read block size
+    :return: generator of (offset, bytes) tuples
+    """
+    chunk_start = 0
+    pending = bytearray()
+    candidates = deque()
+    history = b''
+    eof = False
+
+    while not eof:
+        data = src.read(read_size)
+        if data:
+            base = chunk_start + len(pending)
+            hashes = rolling_hashes(data, history)
+            cuts = numpy.flatnonzero((hashes & CHUNK_MASK) == 0) + base + 1
+            candidates.extend(cuts.tolist())
+            history = (history + data[-WINDOW:])[-WINDOW:]
+            pending += data
+        else:
+            eof = True
+
+        while pending:
+            end = chunk_start + len(pending)
+            while candidates and candidates[0] < chunk_start + MIN_CHUNK_SIZE:
+                candidates.popleft()
+
+            if candidates and \
+                    candidates[0] <= chunk_start + MAX_CHUNK_SIZE:
+                cut = candidates.popleft()
+            elif len(pending) >= MAX_CHUNK_SIZE:
+                cut = chunk_start + MAX_CHUNK_SIZE
+            elif eof:
+                cut = end
+            else:
+                break
+
+            size = cut - chunk_start
+            yield chunk_start, bytes(pending[:size])
+            del pending[:size]
+            chunk_start = cut
+
+
+def chunk_id(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_chunks(path):
+    """ Content-defined chunks of a file. Results are cached as long as
+    the file size and modification time do not change.
+    :param str path: file path
+    :return list: [chunk id, offset, size] lists
+    """
+    stat = os.stat(path)
+    return _file_chunks(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=1024)
+def _file_chunks(path, size, mtime):
+    with open(path, 'rb') as src:
+        return [[chunk_id(data), offset, len(data)]
+                for offset, data in iter_chunks(src)]
+
+
+def read_range(path, offset, size):
+    with open(path, 'rb') as src:
+        src.seek(offset)
+        return src.read(size)
+
+
+def _in_dir(path, dir_path):
+    return path.startswith(os.path.join(dir_path, ''))
+
+
+class MissingChunkError(KeyError):
+    """ A chunk is not available locally """
+
+
+class ChunkStore(object):
+    """
+    Index of chunks available locally. Chunks are read from the indexed
+    files they belong to, so they are not stored twice; chunks received
+    from the network are kept as loose files until the files built from
+    them are indexed. A chunk may be found in several files (e.g. in
+    resources of different tasks); every location is kept, so the chunk
+    stays available while any of these files is. The index survives
+    restarts.
+    """
+
+    INDEX_NAME = 'index.json'
+    LOOSE_DIR = 'loose'
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self._lock = Lock()
+        # path -> (size, mtime, chunks)
+        self._files = dict()
+        # chunk id -> set of (path, offset, size)
+        self._chunks = dict()
+        self._load()
+
+    def __contains__(self, chunk_id_):
+        return chunk_id_ in self._chunks
+
+    def chunk_ids(self, dir_path=None, limit=None):
+        """
+        :param str dir_path: only chunks of files in this directory tree
+                             which have not changed since they were indexed
+        :param int limit: max. number of chunk ids
+        :return set: chunk ids
+        """
+        if dir_path is None:
+            ids = set(self._chunks)
+        else:
+            ids = set()
+            for path, (size, mtime, chunks) in self._dir_files(dir_path):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    stat = None
+                if not stat or (stat.st_size, stat.st_mtime_ns) != \
+                        (size, mtime):
+                    self._drop_file(path)
+                    continue
+                ids.update(c[0] for c in chunks if c[0] in self._chunks)
+
+        if limit is not None and len(ids) > limit:
+            ids = set(sorted(ids)[:limit])
+        return ids
+
+    def index_file(self, path):
+        """ Add chunks of a file to the index
+        :param str path: file path
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return self._drop_file(path)
+
+        entry = self._files.get(path)
+        if entry and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            return
+
+        chunks = file_chunks(path)
+        self._add_file(path, stat, chunks)
+
+    def index_dir(self, dir_path):
+        """ Index all files in a directory tree, skipping the unchanged """
+        for src_dir, _, files in os.walk(dir_path):
+            for f in files:
+                self.index_file(os.path.join(src_dir, f))
+        self.save()
+
+    def add_chunk(self, chunk_id_, data):
+        """ Keep a chunk received from the network
+        :raises ValueError: if data does not match the chunk id
+        """
+        if chunk_id(data) != chunk_id_:
+            raise ValueError("Invalid chunk data: {}".format(chunk_id_))
+
+        loose_dir = os.path.join(self.root_dir, self.LOOSE_DIR)
+        if not os.path.isdir(loose_dir):
+            os.makedirs(loose_dir)
+
+        path = os.path.join(loose_dir, chunk_id_)
+        with open(path, 'wb') as dst:
+            dst.write(data)
+
+        with self._lock:
+            self._add_location(chunk_id_, (path, 0, len(data)))
+
+    def read_chunk(self, chunk_id_):
+        """
+        :return bytes: chunk data
+        :raises MissingChunkError: if the chunk is not available
+        """
+        with self._lock:
+            locations = list(self._chunks.get(chunk_id_, ()))
+
+        for location in locations:
+            path, offset, size = location
+            try:
+                data = read_range(path, offset, size)
+            except OSError:
+                data = None
+            if data is not None and chunk_id(data) == chunk_id_:
+                return data
+
+            # the file was modified after being indexed
+            with self._lock:
+                self._drop_file_chunks(path)
+                self._discard_location(chunk_id_, location)
+
+        raise MissingChunkError(chunk_id_)
+
+    def assemble(self, path, chunks):
+        """ Build a file from chunks. The file is replaced atomically
+        :param str path: destination file path
+        :param list chunks: [chunk id, size] lists
+        """
+        path = os.path.abspath(path)
+        dst_dir = os.path.dirname(path)
+        if not os.path.isdir(dst_dir):
+            os.makedirs(dst_dir)
+
+        tmp_path = os.path.join(dst_dir, '.{}.tmp'.format(uuid.uuid4()))
+        located = []
+        offset = 0
+
+        try:
+            with open(tmp_path, 'wb') as dst:
+                for chunk_id_, size in chunks:
+                    data = self.read_chunk(chunk_id_)
+                    dst.write(data)
+                    located.append([chunk_id_, offset, size])
+                    offset += size
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._add_file(path, os.stat(path), located)
+
+    def remove_dir(self, dir_path):
+        """ Remove index entries of files in a directory tree, e.g. after
+        the directory was cleared """
+        dir_path = os.path.abspath(dir_path)
+        with self._lock:
+            for path, _ in self._dir_files(dir_path):
+                self._drop_file_chunks(path)
+            for chunk_id_, locations in list(self._chunks.items()):
+                for location in list(locations):
+                    if _in_dir(location[0], dir_path):
+                        self._discard_location(chunk_id_, location)
+        self.save()
+
+    def remove_loose(self):
+        """ Remove loose chunks which are available in indexed files """
+        loose_dir = os.path.join(self.root_dir, self.LOOSE_DIR)
+        if not os.path.isdir(loose_dir):
+            return
+
+        with self._lock:
+            for name in os.listdir(loose_dir):
+                path = os.path.join(loose_dir, name)
+                locations = self._chunks.get(name, set())
+                if {location[0] for location in locations} == {path}:
+                    continue
+                os.remove(path)
+                for location in list(locations):
+                    if location[0] == path:
+                        self._discard_location(name, location)
+
+    def save(self):
+        if not os.path.isdir(self.root_dir):
+            os.makedirs(self.root_dir)
+
+        index_path = os.path.join(self.root_dir, self.INDEX_NAME)
+        tmp_path = index_path + '.tmp'
+
+        with self._lock:
+            files = {path: list(entry) for path, entry in self._files.items()}
+        with open(tmp_path, 'w') as dst:
+            json.dump(files, dst)
+        os.replace(tmp_path, index_path)
+
+    def _add_file(self, path, stat, chunks):
+        with self._lock:
+            self._drop_file_chunks(path)
+            self._files[path] = (stat.st_size, stat.st_mtime_ns, chunks)
+            for chunk_id_, offset, size in chunks:
+                self._add_location(chunk_id_, (path, offset, size))
+
+    def _dir_files(self, dir_path):
+        dir_path = os.path.abspath(dir_path)
+        return [(path, entry) for path, entry in list(self._files.items())
+                if _in_dir(path, dir_path)]
+
+    def _drop_file(self, path):
+        with self._lock:
+            self._drop_file_chunks(path)
+
+    def _drop_file_chunks(self, path):
+        entry = self._files.pop(path, None)
+        if not entry:
+            return
+        for chunk_id_, offset, size in entry[2]:
+            self._discard_location(chunk_id_, (path, offset, size))
+
+    def _add_location(self, chunk_id_, location):
+        self._chunks.setdefault(chunk_id_, set()).add(location)
+
+    def _discard_location(self, chunk_id_, location):
+        locations = self._chunks.get(chunk_id_)
+        if locations is None:
+            return
+        locations.discard(location)
+        if not locations:
+            del self._chunks[chunk_id_]
+
+    def _load(self):
+        index_path = os.path.join(self.root_dir, self.INDEX_NAME)
+        loose_dir = os.path.join(self.root_dir, self.LOOSE_DIR)
+
+        try:
+            with open(index_path) as src:
+                files = json.load(src)
+        except (OSError, ValueError):
+            files = dict()
+
+        for path, (size, mtime, chunks) in files.items():
+            self._files[path] = (size, mtime, chunks)
+            for chunk_id_, offset, chunk_size in chunks:
+                self._add_location(chunk_id_, (path, offset, chunk_size))
+
+        if os.path.isdir(loose_dir):
+            for name in os.listdir(loose_dir):
+                path = os.path.join(loose_dir, name)
+                self._add_location(name, (path, 0, os.path.getsize(path)))
@@ -5,6 +5,7 @@ import logging
 import os
 import shutil
 import socket
+import time
 import uuid
 from enum import Enum
 from threading import Lock
@@ -107,15 +108,100 @@ class ClientConfig(object):
     """
     Initial configuration for classes implementing the IClient interface
     """
-    def __init__(self, max_concurrent_downloads=3, max_retries=3, timeout=None):
-
+    def __init__(self, max_concurrent_downloads=3, max_retries=3, timeout=None,
+                 max_concurrent_downloads_limit=16,
+                 download_class_limits=None, download_bandwidth=None,
+                 download_class_bandwidth=None):
+        """
+        :param dict download_class_limits: DownloadPriority -> max. number
+                                           of concurrent downloads
+        :param download_bandwidth: total download bandwidth limit [B/s]
+        :param dict download_class_bandwidth: DownloadPriority -> bandwidth
+                                              limit [B/s]
+        """
         self.max_concurrent_downloads = max_concurrent_downloads
+        self.max_concurrent_downloads_limit = max_concurrent_downloads_limit
+        self.download_class_limits = download_class_limits
+        self.download_bandwidth = download_bandwidth
+        self.download_class_bandwidth = download_class_bandwidth
         self.max_retries = max_retries
         self.client = dict(
             timeout=timeout or (12000, 12000)
         )
 
 
+class AdaptiveConcurrency(object):
+    """
+    Concurrency limit which follows the measured throughput. Throughput is
+    sampled over time windows; the limit keeps moving in the same direction
+    while throughput improves and reverses direction when it drops.
+    The limit is raised only if it was actually reached within the window.
+    """
+    def __init__(self, initial, minimum=1, maximum=16, window=5.,
+                 tolerance=0.05, clock=time.time):
+
+        self.minimum = minimum
+        self.maximum = max(maximum, initial)
+        self.window = window
+        self.tolerance = tolerance
+
+        self._limit = initial
+        self._clock = clock
+        self._lock = Lock()
+
+        self._direction = 1
+        self._throughput = None
+        self._window_start = clock()
+        self._window_bytes = 0
+        self._saturated = False
+
+    @property
+    def limit(self):
+        return self._limit
+
+    def saturated(self):
+        """ Notify that a transfer had to wait for a free slot """
+        self._saturated = True
+
+    def record(self, size):
+        """
+        Account for a finished transfer.
+        :param size: number of bytes transferred
+        """
+        if self._limit < 1:
+            return
+
+        with self._lock:
+            self._window_bytes += size
+            now = self._clock()
+            elapsed = now - self._window_start
+
+            if elapsed >= self.window:
+                self._adjust(self._window_bytes / elapsed)
+                self._window_start = now
+                self._window_bytes = 0
+                self._saturated = False
+
+    def _adjust(self, throughput):
+        previous = self._throughput
+        self._throughput = throughput
+
+        if previous is None:
+            step = self._direction
+        elif throughput > previous * (1. + self.tolerance):
+            step = self._direction
+        elif throughput < previous * (1. - self.tolerance):
+            self._direction = -self._direction
+            step = self._direction
+        else:
+            return
+
+        if step > 0 and not self._saturated:
+            return
+
+        self._limit = min(self.maximum, max(self.minimum, self._limit + step))
+
+
 class ClientOptions(object):
     """
     Runtime parameters for classes implementing the IClient interface
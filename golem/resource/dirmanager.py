@@ -2,6 +2,9 @@ import logging
 import os
 import shutil
 
+from golem.core.dirsize import size_accountant
+from golem.core.filecopy import copy_file, copy_tree
+
 logger = logging.getLogger(__name__)
 
 
@@ -13,13 +16,12 @@ def symlink_or_copy(source, target):
     try:
         os.symlink(source, target)
     except OSError:
+        # like a symlink, the copy shares contents with the source if the
+        # file system supports reflinks
         if os.path.isfile(source):
-            if os.path.exists(target):
-                os.remove(target)
-            shutil.copy(source, target)
+            copy_file(source, target)
         else:
-            from distutils import dir_util
-            dir_util.copy_tree(source, target, update=1)
+            copy_tree(source, target)
 
 # complementary to symlink_or_copy
 def rmlink_or_rmtree(target):
@@ -56,13 +58,16 @@ def find_task_script(task_dir, script_name):
 
 class DirManager(object):
     """ Manage working directories for application. Return paths, create them if it's needed """
-    def __init__(self, root_path, tmp="tmp", res="resources", output="output", global_resource="golemres", reference_data_dir="reference_data", test="test"):
+    def __init__(self, root_path, tmp="tmp", res="resources", output="output", global_resource="golemres", reference_data_dir="reference_data", test="test",
+                 store="store", chunks="chunks"):
         """ Creates new dir manager instance
         :param str root_path: path to the main directory where all other working directories are placed
         :param str tmp: temporary directory name
         :param res: resource directory name
         :param output: output directory name
         :param global_resource: global resources directory name
+        :param store: resource store directory name, placed in the global resources directory
+        :param chunks: chunk store directory name, placed in the global resources directory
         """
         self.root_path = root_path
         self.tmp = tmp
@@ -71,6 +76,8 @@ class DirManager(object):
         self.global_resource = global_resource
         self.ref = reference_data_dir
         self.test = test
+        self.store = store
+        self.chunks = chunks
 
     def get_file_extension(self, fullpath):
         filename, file_extension = os.path.splitext(fullpath)
@@ -81,16 +88,23 @@ class DirManager(object):
         """ Remove everything from given directory
         :param str d: directory that should be cleared
         """
+        size_accountant.remove(d, self.__clear_dir(d))
+
+    def __clear_dir(self, d):
+        removed = 0
         if not os.path.isdir(d):
-            return
+            return removed
         for i in os.listdir(d):
             path = os.path.join(d, i)
             if os.path.isfile(path):
+                size = os.path.getsize(path)
                 os.remove(path)
+                removed += size
             if os.path.isdir(path):
-                self.clear_dir(path)
+                removed += self.__clear_dir(path)
                 if not os.listdir(path):
                     shutil.rmtree(path, ignore_errors=True)
+        return removed
 
     def create_dir(self, full_path):
         """ Create new directory, remove old directory if it exists.
@@ -135,6 +149,22 @@ class DirManager(object):
         full_path = self.__get_global_resource_path()
         return self.get_dir(full_path, create, "resource dir does not exist")
 
+    def get_resource_store_dir(self, create=True):
+        """ Get the directory of resources shared between tasks
+        :param bool create: *Default: True* should directory be created if it doesn't exist
+        :return str: path to directory
+        """
+        full_path = os.path.join(self.__get_global_resource_path(), self.store)
+        return self.get_dir(full_path, create, "resource store dir does not exist")
+
+    def get_chunk_store_dir(self, create=True):
+        """ Get the directory of the content-defined chunk index
+        :param bool create: *Default: True* should directory be created if it doesn't exist
+        :return str: path to directory
+        """
+        full_path = os.path.join(self.__get_global_resource_path(), self.chunks)
+        return self.get_dir(full_path, create, "chunk store dir does not exist")
+
     def get_task_temporary_dir(self, task_id, create=True):
         """ Get temporary directory
         :param task_id:
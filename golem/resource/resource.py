@@ -1,10 +1,16 @@
+import json
 import logging
 import os
 import string
 import unicodedata
 import zipfile
 
+from golem.core.dirsize import size_accountant
+from golem.core.parallelzip import ParallelZipExtractor, ParallelZipFile, \
+    member_path
 from golem.core.simplehash import SimpleHash
+from golem.resource.chunking import CHUNK_DIR, MANIFEST_NAME, \
+    MIN_CHUNK_SIZE, file_chunks, read_range
 from golem.resource.dirmanager import split_path
 
 
@@ -12,6 +18,10 @@ logger = logging.getLogger(__name__)
 
 
 class TaskResourceHeader(object):
+    # ids of content-defined chunks which the sender of the header already
+    # has; None if the sender does not support chunked transfers
+    chunks = None
+
     def __init__(self, dir_name):
         self.sub_dir_headers = []
         self.files_data = []
@@ -431,38 +441,145 @@ def compress_dir(root_path, header, output_dir):
 
     output_file = os.path.join(output_dir, output_file)
 
-    zipf = zipfile.ZipFile(output_file, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+    with ParallelZipFile(output_file) as zipf:
+        compress_dir_impl(os.path.abspath(root_path), header, zipf)
 
-    cur_working_dir = os.getcwd()
-    os.chdir(root_path)
-    logger.debug("Working directory {}".format(os.getcwd()))
+    return output_file
 
-    try:
-        compress_dir_impl("", header, zipf)
 
-        zipf.close()
-    finally:
-        os.chdir(cur_working_dir)
-        logger.debug("Return to prev working directory {}".format(os.getcwd()))
+def compress_dir_chunked(root_path, header, output_dir, known_chunks):
+    """ Compress files described by the header. Large files are split into
+    content-defined chunks; only chunks missing from known_chunks are
+    written, along with a manifest describing how to rebuild the files.
+    :param str root_path: resource directory
+    :param TaskResourceHeader header: files to send
+    :param str output_dir: directory to write the archive in
+    :param set known_chunks: chunk ids available to the receiver
+    :return str: archive path
+    """
+    root_path = os.path.abspath(root_path)
+    known_chunks = set(known_chunks)
+    manifest = dict()
+    missing = []
+    plain = []
+
+    for file_path, arc_name in header_files(root_path, header):
+        if os.path.getsize(file_path) < MIN_CHUNK_SIZE:
+            plain.append((file_path, arc_name))
+            continue
+
+        chunks = file_chunks(file_path)
+        manifest[arc_name.replace(os.sep, '/')] = \
+            [[chunk_id, size] for chunk_id, _, size in chunks]
+
+        for chunk in chunks:
+            if chunk[0] not in known_chunks:
+                known_chunks.add(chunk[0])
+                missing.append((file_path, chunk))
+
+    name = header.hash() + ''.join(c[0] for _, c in missing).encode()
+    output_file = remove_disallowed_filename_chars(
+        SimpleHash.hash_base64(name).strip().decode('unicode-escape') +
+        ".zip")
+    output_file = os.path.join(output_dir, output_file)
+
+    with ParallelZipFile(output_file) as zipf:
+        for file_path, arc_name in plain:
+            zipf.write(file_path, arc_name)
+        for file_path, (chunk_id, offset, size) in missing:
+            zipf.writestr(CHUNK_DIR + '/' + chunk_id,
+                          read_range(file_path, offset, size))
+        zipf.writestr(MANIFEST_NAME, json.dumps(manifest))
 
     return output_file
 
 
-def decompress_dir(root_path, zip_file):
-    zipf = zipfile.ZipFile(zip_file, 'r', allowZip64=True)
+def decompress_dir(root_path, zip_file, chunk_store=None):
+    """ Extract a resource archive. Members are extracted in parallel and
+    files which are already up to date are not rewritten. Files split into
+    chunks are rebuilt from chunks in the archive and the ones available
+    in chunk_store.
+    :param str root_path: output directory
+    :param str zip_file: archive path
+    :param ChunkStore chunk_store: local chunks; required for archives
+                                   created by compress_dir_chunked
+    :return list: names of files written
+    :raises ValueError: on invalid member paths
+    :raises MissingChunkError: if a file cannot be rebuilt from the chunks
+                               available; the resources should be sent
+                               again without chunking
+    """
+    root_path = os.path.abspath(root_path)
+    chunk_prefix = CHUNK_DIR + '/'
+    manifest = dict()
+
+    with zipfile.ZipFile(zip_file, 'r', allowZip64=True) as zipf:
+        names = zipf.namelist()
+
+        if MANIFEST_NAME in names:
+            if chunk_store is None:
+                raise ValueError("Chunk store is required to extract {}"
+                                 .format(zip_file))
+
+            manifest = json.loads(zipf.read(MANIFEST_NAME).decode('utf-8'))
+            for name in names:
+                if name.startswith(chunk_prefix) and name != MANIFEST_NAME:
+                    chunk_store.add_chunk(name[len(chunk_prefix):],
+                                          zipf.read(name))
+
+    # validate all paths before writing anything
+    chunked = [(member_path(root_path, arc_name), chunks)
+               for arc_name, chunks in manifest.items()]
+
+    extracted = ParallelZipExtractor(zip_file).extract(
+        root_path, [n for n in names if not n.startswith(chunk_prefix)])
+    size_accountant.add(root_path, extracted.size_delta)
+    written = extracted.written
 
-    zipf.extractall(root_path)
+    try:
+        for file_path, chunks in chunked:
+            if os.path.isfile(file_path) and \
+                    [[c[0], c[2]] for c in file_chunks(file_path)] == chunks:
+                continue
+            size_accountant.removing(file_path)
+            try:
+                chunk_store.assemble(file_path, chunks)
+            finally:
+                size_accountant.added(file_path)
+            written.append(os.path.relpath(file_path, root_path))
+    finally:
+        # chunks received so far are kept for the next transfer
+        if chunk_store is not None and manifest:
+            chunk_store.remove_loose()
+            chunk_store.save()
+
+    return written
 
 
-def compress_dir_impl(root_path, header, zipf):
+def header_files(root_path, header, arc_path=""):
+    """ Files described by a resource header
+    :return: generator of (file path, archive name) tuples
+    """
     for sdh in header.sub_dir_headers:
-        compress_dir_impl(os.path.join(root_path, sdh.dir_name), sdh, zipf)
+        yield from header_files(os.path.join(root_path, sdh.dir_name), sdh,
+                                os.path.join(arc_path, sdh.dir_name))
 
     for fdata in header.files_data:
-        zipf.write(os.path.join(root_path, fdata[0]))
+        yield (os.path.join(root_path, fdata[0]),
+               os.path.join(arc_path, fdata[0]))
+
+
+def compress_dir_impl(root_path, header, zipf, arc_path=""):
+    for file_path, arc_name in header_files(root_path, header, arc_path):
+        zipf.write(file_path, arc_name)
 
 
 def prepare_delta_zip(root_dir, header, output_dir, chosen_files=None):
     # delta_header = TaskResourceHeader.build_header_delta_from_header(header, root_dir, chosen_files)
     delta_header = TaskResourceHeader.build_header_delta_from_chosen(header, root_dir, chosen_files)
-    return compress_dir(root_dir, delta_header, output_dir)
+
+    known_chunks = getattr(header, 'chunks', None)
+    if known_chunks is None:
+        return compress_dir(root_dir, delta_header, output_dir)
+    return compress_dir_chunked(root_dir, delta_header, output_dir,
+                                known_chunks)
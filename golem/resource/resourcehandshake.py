@@ -7,6 +7,7 @@ from golem.core.async import AsyncRequest, async_run
 from golem.network.transport.message import MessageWantToComputeTask, \
     MessageResourceHandshakeVerdict, MessageResourceHandshakeNonce, \
     MessageResourceHandshakeStart
+from golem.resource.base.scheduler import DownloadPriority
 
 logger = logging.getLogger('golem.resources')
 
@@ -254,7 +255,8 @@ class ResourceHandshakeSessionMixin:
             entry, self.NONCE_TASK,
             success=lambda res, _: self._nonce_downloaded(key_id, res, path),
             error=lambda exc, *_: self._handshake_error(key_id, exc),
-            client_options=self.task_server.get_download_options(key_id)
+            client_options=self.task_server.get_download_options(key_id),
+            priority=DownloadPriority.handshake
         )
 
     def _nonce_downloaded(self, key_id, result, path):
@@ -5,6 +5,7 @@ import logging
 
 from golem.core.databuffer import DataBuffer
 from golem.core.fileshelper import copy_file_tree
+from golem.resource.chunking import ChunkStore, MAX_ADVERTISED_CHUNKS
 from golem.resource.resourcehash import ResourceHash
 
 logger = logging.getLogger(__name__)
@@ -60,6 +61,14 @@ class ResourcesManager:
         self.last_prct = 0
         self.buff_size = 4 * 1024 * 1024
         self.buff = DataBuffer()
+        self._chunk_store = None
+
+    @property
+    def chunk_store(self):
+        if not self._chunk_store:
+            self._chunk_store = ChunkStore(
+                self.dir_manager.get_chunk_store_dir())
+        return self._chunk_store
 
     def get_resource_header(self, task_id):
 
@@ -67,8 +76,13 @@ class ResourcesManager:
 
         if os.path.exists(dir_name):
             task_res_header = TaskResourceHeader.build("resources", dir_name)
+            self.chunk_store.index_dir(dir_name)
+            # only chunks which can be read from this task's resources
+            task_res_header.chunks = sorted(self.chunk_store.chunk_ids(
+                dir_name, limit=MAX_ADVERTISED_CHUNKS))
         else:
             task_res_header = TaskResourceHeader("resources")
+            task_res_header.chunks = []
 
         return task_res_header
 
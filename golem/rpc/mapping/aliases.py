@@ -112,6 +112,7 @@ class Resources:
 
     directories             = 'res.dirs'
     directories_size        = 'res.dirs.size'
+    directories_totals      = 'res.dirs.totals'
     directory               = 'res.dir'
 
     clear_directory         = 'res.dir.clear'
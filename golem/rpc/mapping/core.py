@@ -70,6 +70,7 @@ CORE_METHOD_MAP = dict(
     get_res_dirs=           Resources.directories,
     get_res_dir=            Resources.directory,
     get_res_dirs_sizes=     Resources.directories_size,
+    get_res_dirs_totals=    Resources.directories_totals,
     clear_dir=              Resources.clear_directory,
 
     get_status=             Computation.status,
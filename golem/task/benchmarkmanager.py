@@ -1,10 +1,16 @@
-from copy import copy
+import hashlib
+import json
 import logging
 import os
+import time
+
+from psutil import virtual_memory
 
 from apps.core.benchmark.benchmarkrunner import BenchmarkRunner
 from apps.core.task.coretaskstate import TaskDesc
 
+from golem.core.common import get_cpu_count
+from golem.core.hardware import cpu_model
 from golem.model import Performance
 from golem.resource.dirmanager import DirManager
 from golem.task.taskbase import Task
@@ -12,6 +18,23 @@ from golem.task.taskstate import TaskStatus
 
 logger = logging.getLogger(__name__)
 
+# age in seconds of a cached benchmark result which is re-validated, once
+# per start of the node, while it does not compute
+REVALIDATION_AGE = 3 * 24 * 60 * 60
+
+
+def benchmark_fingerprint(config_desc, image_ids):
+    """ Describe what a benchmark result depends on: the processor, the
+    memory, the active hardware preset and the docker images
+    :param ClientConfigDescriptor config_desc: active configuration
+    :param list image_ids: local ids of the environment docker images
+    :return str: sha256 hexdigest
+    """
+    data = [cpu_model(), get_cpu_count(), virtual_memory().total,
+            config_desc.hardware_preset_name, config_desc.num_cores,
+            config_desc.max_memory_size, sorted(str(i) for i in image_ids)]
+    return hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
 
 class BenchmarkManager(object):
     def __init__(self, node_name, task_server, root_path, benchmarks=None):
@@ -19,19 +42,67 @@ class BenchmarkManager(object):
         self.node_name = node_name
         self.task_server = task_server
         self.dir_manager = DirManager(root_path)
+        # ids of environments with results to re-validate, oldest last;
+        # None until the first call of revalidate_benchmarks
+        self._to_revalidate = None
+        # id of the environment whose benchmark is being re-validated
+        self._revalidation = None
+        self._revalidation_runner = None
+
+    def get_fingerprint(self, env_id):
+        """ :return str: fingerprint of the hardware and software which
+        the benchmark of the environment would run on now """
+        image_ids = []
+        env = self.task_server.get_environment_by_id(env_id)
+        for image in getattr(env, 'docker_images', None) or []:
+            try:
+                image_ids.append(image.get_local_id())
+            except Exception as err:  # docker may be unavailable
+                logger.debug("Cannot read id of %r: %r", image, err)
+                image_ids.append(None)
+        return benchmark_fingerprint(self.task_server.config_desc, image_ids)
+
+    def get_cached_performance(self, env_id):
+        """ :return float|None: stored benchmark result, if it was computed
+        on the current hardware and software """
+        try:
+            perf = Performance.get(Performance.environment_id == env_id)
+        except Performance.DoesNotExist:
+            return None
+        if perf.fingerprint and perf.fingerprint == \
+                self.get_fingerprint(env_id):
+            return perf.value
+        return None
+
+    def cached_benchmarks(self):
+        """ :return set: ids of environments with cached results """
+        return {env_id for env_id in self.benchmarks or []
+                if self.get_cached_performance(env_id) is not None}
 
     def benchmarks_needed(self):
         if self.benchmarks:
-            query = Performance.select(Performance.environment_id)
-            data = set(benchmark.environment_id for benchmark in query)
-            return not set(self.benchmarks.keys()).issubset(data)
+            cached = self.cached_benchmarks()
+            return not set(self.benchmarks.keys()).issubset(cached)
         return False
 
+    def get_result_age(self, env_id):
+        """ :return float|None: age in seconds of the stored benchmark
+        result, if it was computed on the current hardware and software """
+        if self.get_cached_performance(env_id) is None:
+            return None
+        perf = Performance.get(Performance.environment_id == env_id)
+        return time.time() - perf.modified_date.timestamp()
+
     def run_benchmark(self, benchmark, task_builder, env_id, success=None,
-                      error=None):
+                      error=None, low_priority=False):
+        """ :param bool low_priority: run the benchmark at the lowest CPU
+        share, so that it gives way to computed tasks
+        :return BenchmarkRunner: """
+        fingerprint = self.get_fingerprint(env_id)
 
         def success_callback(performance):
-            Performance.update_or_create(env_id, performance)
+            Performance.update_or_create(env_id, performance,
+                                         fingerprint=fingerprint)
             if success:
                 success(performance)
 
@@ -51,12 +122,69 @@ class BenchmarkManager(object):
         t = Task.build_task(builder)
         br = BenchmarkRunner(t, self.task_server.client.datadir,
                              success_callback, error_callback,
-                             benchmark)
+                             benchmark, low_priority=low_priority)
         br.run()
+        return br
 
     def run_all_benchmarks(self):
-        benchmarks_copy = copy(self.benchmarks)
-        self.run_benchmarks(benchmarks_copy)
+        """ Run benchmarks without results cached for the current hardware
+        and software; cached results are re-validated later, when the node
+        is idle """
+        cached = self.cached_benchmarks()
+        for env_id in cached:
+            logger.info("Using cached result of %s benchmark", env_id)
+        benchmarks = {env_id: data
+                      for env_id, data in (self.benchmarks or {}).items()
+                      if env_id not in cached}
+        self.run_benchmarks(benchmarks)
+
+    def revalidate_benchmarks(self):
+        """ Re-run the benchmark with the oldest cached result, if it is
+        older than REVALIDATION_AGE. Every result is re-validated at most
+        once per start of the node, one at a time, at a low priority.
+        Meant to be called periodically while the node does not compute """
+        if self._revalidation or not self.benchmarks:
+            return
+
+        if self._to_revalidate is None:
+            ages = {env_id: self.get_result_age(env_id)
+                    for env_id in self.benchmarks}
+            self._to_revalidate = sorted(
+                (env_id for env_id, age in ages.items()
+                 if age is not None and age > REVALIDATION_AGE),
+                key=ages.get)
+        if not self._to_revalidate:
+            return
+
+        env_id = self._to_revalidate.pop()
+
+        def done(_):
+            if self._revalidation == env_id:
+                self._revalidation = None
+
+        logger.info("Re-validating %s benchmark", env_id)
+        self._revalidation = env_id
+        benchmark, builder_class = self.benchmarks[env_id]
+        try:
+            self._revalidation_runner = self.run_benchmark(
+                benchmark, builder_class, env_id, done, done,
+                low_priority=True)
+        except Exception as err:
+            logger.warning("Cannot re-validate %s benchmark: %r", env_id, err)
+            self._revalidation = None
+
+    def stop_revalidation(self):
+        """ Stop the benchmark being re-validated, e.g. when a task is
+        computed, so that its result is not lowered by the task. The
+        benchmark is re-validated again later """
+        env_id, runner = self._revalidation, self._revalidation_runner
+        if not env_id:
+            return
+        self._revalidation = self._revalidation_runner = None
+        logger.info("Stopping re-validation of %s benchmark", env_id)
+        self._to_revalidate.append(env_id)
+        if runner:
+            runner.end_comp()
 
     def run_benchmarks(self, benchmarks):
         # Next benchmark ran only if previous completed successfully
@@ -74,9 +202,15 @@ class BenchmarkManager(object):
             return False
         return True
 
-    def run_benchmark_for_env_id(self, env_id, callback, errback):
+    def run_benchmark_for_env_id(self, env_id, callback, errback,
+                                 force=False):
         benchmark_data = self.benchmarks.get(env_id)
         if benchmark_data:
+            if not force:
+                performance = self.get_cached_performance(env_id)
+                if performance is not None:
+                    callback(performance)
+                    return
             self.run_benchmark(benchmark_data[0], benchmark_data[1],
                                env_id, callback, errback)
         else:
@@ -29,7 +29,8 @@ class LocalComputer(object):
                  comp_failed_warning=DEFAULT_WARNING,
                  comp_success_message=DEFAULT_SUCCESS,
                  use_task_resources=True,
-                 additional_resources=None):
+                 additional_resources=None,
+                 low_priority=False):
         # TODO remove this isinstance
         if not isinstance(task, Task):
             raise TypeError("Incorrect task type: {}. Should be: Task".format(type(task)))
@@ -50,6 +51,7 @@ class LocalComputer(object):
         if additional_resources is None:
             additional_resources = []
         self.additional_resources = additional_resources
+        self.low_priority = low_priority
 
         self.start_time = None
         self.end_time = None
@@ -151,4 +153,5 @@ class LocalComputer(object):
                                 self.test_task_res_path,
                                 self.tmp_dir,
                                 0,
-                                check_mem=self.check_mem)
+                                check_mem=self.check_mem,
+                                low_priority=self.low_priority)
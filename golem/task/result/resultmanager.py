@@ -2,8 +2,10 @@ import abc
 import logging
 import os
 
+from golem.core.dirsize import size_accountant
 from golem.core.fileencrypt import FileEncryptor
 from golem.core.async import AsyncRequest, async_run
+from golem.resource.base.scheduler import DownloadPriority
 from .resultpackage import EncryptingTaskResultPackager
 
 logger = logging.getLogger(__name__)
@@ -54,6 +56,7 @@ class EncryptedResultPackageManager(TaskResultPackageManager):
 
         def package_extracted(extracted_pkg, *args, **kwargs):
             success(extracted_pkg, multihash, task_id, subtask_id)
+            size_accountant.removing(file_path)
             os.remove(file_path)
 
         resource = self.resource_manager.wrap_file((file_name, multihash))
@@ -62,7 +65,8 @@ class EncryptedResultPackageManager(TaskResultPackageManager):
                                             success=package_downloaded,
                                             error=error,
                                             async=async,
-                                            pin=False)
+                                            pin=False,
+                                            priority=DownloadPriority.results)
 
     def create(self, node, task_result, client_options=None, key_or_secret=None):
         if not key_or_secret:
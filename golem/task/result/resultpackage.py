@@ -1,9 +1,11 @@
 import abc
 import os
 import uuid
-import zipfile
+from contextlib import contextmanager
 
-from golem.core.fileencrypt import AESFileEncryptor
+from golem.core.dirsize import size_accountant
+from golem.core.fileencrypt import AESFileEncryptor, AESParallelFileEncryptor
+from golem.core.parallelzip import ParallelZipExtractor, ParallelZipFile
 from golem.core.simpleserializer import CBORSerializer
 from golem.task.taskbase import ResultType
 
@@ -49,6 +51,12 @@ class Packager(object):
 class ZipPackager(Packager):
 
     def extract(self, input_path, output_dir=None, **kwargs):
+        """ Extract the archive
+        :param str|IOBase input_path: archive path or a seekable binary
+                                      file object; output_dir is required
+                                      for the latter
+        :param str output_dir: extraction directory
+        """
 
         if not output_dir:
             output_dir = os.path.dirname(input_path)
@@ -56,14 +64,13 @@ class ZipPackager(Packager):
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        with zipfile.ZipFile(input_path, 'r') as zf:
-            zf.extractall(output_dir)
-            extracted = zf.namelist()
+        extracted = ParallelZipExtractor(input_path).extract(output_dir)
+        size_accountant.add(output_dir, extracted.size_delta)
 
-        return extracted, output_dir
+        return extracted.names, output_dir
 
     def generator(self, output_path):
-        return zipfile.ZipFile(output_path, mode='w')
+        return ParallelZipFile(output_path)
 
     def write_disk_file(self, obj, file_path, file_name):
         obj.write(file_path, file_name)
@@ -75,42 +82,48 @@ class ZipPackager(Packager):
 class EncryptingPackager(Packager):
 
     creator_class = ZipPackager
-    encryptor_class = AESFileEncryptor
+    encryptor_class = AESParallelFileEncryptor
+    legacy_encryptor_class = AESFileEncryptor
 
     def __init__(self, key_or_secret):
 
         self._creator = self.creator_class()
         self.key_or_secret = key_or_secret
 
-    def create(self, output_path, disk_files=None, cbor_files=None, **kwargs):
+    def extract(self, input_path, output_dir=None, **kwargs):
 
-        output_dir = os.path.dirname(output_path)
-        pkg_file_path = os.path.join(output_dir, str(uuid.uuid4()) + ".pkg")
-        out_file_path = super(EncryptingPackager, self).create(pkg_file_path,
-                                                               disk_files=disk_files,
-                                                               cbor_files=cbor_files)
+        if not output_dir:
+            output_dir = os.path.dirname(input_path)
 
-        self.encryptor_class.encrypt(out_file_path,
-                                     output_path,
-                                     self.key_or_secret)
-        return output_path
+        if not self.encryptor_class.recognizes(input_path):
+            return self._extract_legacy(input_path, output_dir)
 
-    def extract(self, input_path, output_dir=None, **kwargs):
+        with self.encryptor_class.reader(input_path,
+                                         self.key_or_secret) as src:
+            return self._creator.extract(src, output_dir=output_dir)
+
+    def _extract_legacy(self, input_path, output_dir):
 
         input_dir = os.path.dirname(input_path)
         tmp_file_path = os.path.join(input_dir, str(uuid.uuid4()) + ".dec")
 
-        self.encryptor_class.decrypt(input_path,
-                                     tmp_file_path,
-                                     self.key_or_secret)
+        self.legacy_encryptor_class.decrypt(input_path,
+                                            tmp_file_path,
+                                            self.key_or_secret)
 
         os.remove(input_path)
         os.rename(tmp_file_path, input_path)
 
         return self._creator.extract(input_path, output_dir=output_dir)
 
+    @contextmanager
     def generator(self, output_path):
-        return self._creator.generator(output_path)
+        # Zip output is encrypted as it is written, no plaintext copy of
+        # the package ever reaches the disk
+        with self.encryptor_class.writer(output_path,
+                                         self.key_or_secret) as dst:
+            with self._creator.generator(dst) as obj:
+                yield obj
 
     def write_disk_file(self, obj, file_path, file_name):
         self._creator.write_disk_file(obj, file_path, file_name)
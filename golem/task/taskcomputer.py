@@ -127,6 +127,21 @@ class TaskComputer(object):
                 return True
             return False
 
+    def request_full_resource(self, task_id):
+        """ Request resources of a task again, without chunks, e.g. when
+        chunks of the previous transfer are not available any more
+        :return bool: whether the resources were requested
+        """
+        subtask_id = self.task_to_subtask_mapping.get(task_id)
+        ctd = self.assigned_subtasks.get(subtask_id)
+        if ctd is None:
+            return False
+        resource_header = self.resource_manager.get_resource_header(task_id)
+        resource_header.chunks = None
+        self.__request_resource(task_id, resource_header, ctd.return_address,
+                                ctd.return_port, ctd.key_id, ctd.task_owner)
+        return True
+
     def task_resource_failure(self, task_id, reason):
         if task_id in self.task_to_subtask_mapping:
             subtask_id = self.task_to_subtask_mapping.pop(task_id)
@@ -205,6 +220,7 @@ class TaskComputer(object):
         self.counting_task = None
 
     def run(self):
+        benchmark_manager = self.task_server.benchmark_manager
         if self.counting_task:
             if self.counting_thread is not None:
                 self.counting_thread.check_timeout()
@@ -220,6 +236,12 @@ class TaskComputer(object):
                 if self.waiting_ttl < 0:
                     self.reset()
 
+        # benchmarks run at a low priority, so they are re-validated even
+        # while tasks are requested
+        if not self.counting_task and not self.assigned_subtasks \
+                and self.runnable:
+            benchmark_manager.revalidate_benchmarks()
+
     def get_progresses(self):
         ret = {}
         if self.counting_thread is None:
@@ -378,6 +400,7 @@ class TaskComputer(object):
             return
 
         self.counting_thread = tt
+        self.task_server.benchmark_manager.stop_revalidation()
         tt.start()
 
     def quit(self):
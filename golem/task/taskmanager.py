@@ -389,7 +389,11 @@ class TaskManager(TaskEventListener):
                     logger.debug("Task {} accepted".format(task_id))
                     self.tasks_states[task_id].status = TaskStatus.finished
                 else:
-                    logger.debug("Task {} not accepted".format(task_id))
+                    # all subtasks are finished, so the task cannot
+                    # continue without an output
+                    logger.warning("Task %s not accepted", task_id)
+                    self.tasks[task_id].task_status = TaskStatus.aborted
+                    self.tasks_states[task_id].status = TaskStatus.aborted
         self.notice_task_updated(task_id)
         return True
 
@@ -445,6 +449,7 @@ class TaskManager(TaskEventListener):
             cur_time = get_timestamp_utc()
             if cur_time > th.deadline:
                 logger.info("Task {} dies".format(th.task_id))
+                t.abort()
                 t.task_status = TaskStatus.timeout
                 self.tasks_states[th.task_id].status = TaskStatus.timeout
                 self.notice_task_updated(th.task_id)
@@ -546,6 +551,7 @@ class TaskManager(TaskEventListener):
             del self.subtask2task_mapping[sub.subtask_id]
         self.tasks_states[task_id].subtask_states.clear()
 
+        self.tasks[task_id].abort()
         self.tasks[task_id].unregister_listener(self)
         del self.tasks[task_id]
         del self.tasks_states[task_id]
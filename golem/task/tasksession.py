@@ -15,6 +15,7 @@ from golem.model import db
 from golem.network.transport import message
 from golem.network.transport import tcpnetwork
 from golem.network.transport.session import MiddlemanSafeSession
+from golem.resource.chunking import MissingChunkError
 from golem.resource.resource import decompress_dir
 from golem.resource.resourcehandshake import ResourceHandshakeSessionMixin
 from golem.task.taskbase import ComputeTaskDef, ResultType, ResourceType
@@ -219,15 +220,39 @@ class TaskSession(MiddlemanSafeSession, ResourceHandshakeSessionMixin):
             self.dropped()
         file_size = file_sizes[0]
         tmp_file = extra_data.get('file_received')[0]
-        if file_size > 0:
-            decompress_dir(extra_data.get('output_dir'), tmp_file)
         task_id = extra_data.get('task_id')
-        if task_id:
-            self.task_computer.resource_given(task_id)
-        else:
-            logger.error("No task_id in extra_data for received File")
-        self.conn.producer = None
-        self.dropped()
+
+        def success(*_):
+            if task_id:
+                self.task_computer.resource_given(task_id)
+            else:
+                logger.error("No task_id in extra_data for received File")
+            self.conn.producer = None
+            self.dropped()
+
+        def error(failure):
+            if task_id and failure.check(MissingChunkError) and \
+                    self.task_computer.request_full_resource(task_id):
+                logger.info("Chunk %s of task %r is missing, requesting "
+                            "resources without chunks",
+                            failure.getErrorMessage(), task_id)
+            else:
+                logger.error("Cannot extract resources of task %r: %s",
+                             task_id, failure.getErrorMessage())
+                if task_id:
+                    self.task_computer.task_resource_failure(
+                        task_id, failure.getErrorMessage())
+            self.conn.producer = None
+            self.dropped()
+
+        if file_size <= 0:
+            return success()
+
+        # large scenes take a while to unpack; keep the reactor responsive
+        request = AsyncRequest(decompress_dir, extra_data.get('output_dir'),
+                               tmp_file,
+                               self.task_computer.resource_manager.chunk_store)
+        return async_run(request, success=success, error=error)
 
     @dropped_after()
     def result_received(self, extra_data, decrypt=True):
@@ -4,7 +4,7 @@ import logging
 import peewee
 from pydispatch import dispatcher
 
-from golem.model import db
+from golem.model import db, db_worker
 from golem.model import ExpectedIncome
 from golem.model import Income
 
@@ -22,31 +22,51 @@ class IncomesKeeper(object):
         pass
 
     def run_once(self):
+        """ Drop expected incomes which were received and announce the ones
+        which are still expected. The database is updated by the database
+        worker
+        :return Deferred: fired when the incomes are checked
+        """
+        deferred = db_worker.write(self._check_expected_incomes)
+        deferred.addCallbacks(self._notify_expected, self._check_failed)
+        return deferred
+
+    @staticmethod
+    def _check_expected_incomes():
+        """ :return list: incomes which are still expected """
         delta = datetime.datetime.now() - datetime.timedelta(minutes=10)
-        with db.atomic():
-            for expected_income in ExpectedIncome\
-                    .select()\
-                    .where(ExpectedIncome.modified_date < delta)\
-                    .order_by(-ExpectedIncome.id).limit(50):
-                try:
-                    with db.atomic():
-                        Income.get(
-                            sender_node=expected_income.sender_node,
-                            task=expected_income.task,
-                            subtask=expected_income.subtask,
-                        )
-                except Income.DoesNotExist:
-                    # Income is still expected.
-                    with db.atomic():
-                        expected_income.modified_date = datetime.datetime.now()
-                        expected_income.save()
-                    dispatcher.send(
-                        signal="golem.transactions",
-                        event="expected_income",
-                        expected_income=expected_income
-                    )
-                    continue
-                expected_income.delete_instance()
+        expected = []
+        for expected_income in ExpectedIncome\
+                .select()\
+                .where(ExpectedIncome.modified_date < delta)\
+                .order_by(-ExpectedIncome.id).limit(50):
+            try:
+                Income.get(
+                    sender_node=expected_income.sender_node,
+                    task=expected_income.task,
+                    subtask=expected_income.subtask,
+                )
+            except Income.DoesNotExist:
+                # Income is still expected.
+                expected_income.modified_date = datetime.datetime.now()
+                expected_income.save()
+                expected.append(expected_income)
+                continue
+            expected_income.delete_instance()
+        return expected
+
+    @staticmethod
+    def _notify_expected(expected):
+        for expected_income in expected:
+            dispatcher.send(
+                signal="golem.transactions",
+                event="expected_income",
+                expected_income=expected_income
+            )
+
+    @staticmethod
+    def _check_failed(failure):
+        logger.error("Cannot check expected incomes: %r", failure.value)
 
     def received(self, sender_node_id,
                  task_id,
@@ -0,0 +1,83 @@
+"""
+Compare plain copying with golem.core.filecopy methods.
+
+Run it with source and destination directories located on the file systems
+of interest, e.g. tmpfs (/dev/shm) and ext4 / btrfs / xfs (/tmp or /var):
+
+    python scripts/copybenchmark.py --src-dir /dev/shm --dst-dir /var/tmp
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import click
+
+from golem.core.filecopy import CopyStrategy
+
+
+def _create_files(directory, count, size):
+    chunk = os.urandom(min(size, 1024 * 1024))
+    for i in range(count):
+        with open(os.path.join(directory, 'file_{}'.format(i)), 'wb') as f:
+            written = 0
+            while written < size:
+                f.write(chunk[:size - written])
+                written += len(chunk)
+
+
+def _timed(fn, src, dst):
+    started = time.time()
+    fn(src, dst)
+    return time.time() - started
+
+
+@click.command()
+@click.option('--src-dir', default=None, help="Parent of the source dir")
+@click.option('--dst-dir', default=None, help="Parent of the target dirs")
+@click.option('--count', default=16, help="Number of files")
+@click.option('--size', default=64, help="File size in MiB")
+def run_benchmark(src_dir, dst_dir, count, size):
+    src = tempfile.mkdtemp(dir=src_dir)
+    targets = []
+
+    try:
+        _create_files(src, count, size * 1024 * 1024)
+        total = count * size
+
+        def target():
+            path = tempfile.mkdtemp(dir=dst_dir)
+            targets.append(path)
+            return path
+
+        def copytree(src_path, dst_path):
+            for name in os.listdir(src_path):
+                shutil.copy2(os.path.join(src_path, name), dst_path)
+
+        cases = [
+            ('shutil.copy2', copytree),
+            ('strategy', lambda s, d: CopyStrategy().copy_tree(s, d)),
+            ('strategy (read-only)',
+             lambda s, d: CopyStrategy().copy_tree(s, d, read_only=True)),
+        ]
+
+        strategy = CopyStrategy()
+        probe = target()
+        method = strategy.copy_file(os.path.join(src, 'file_0'),
+                                    os.path.join(probe, 'file_0'),
+                                    read_only=True)
+
+        print("{} -> {}: {} x {} MiB, best method: {}".format(
+            src, probe, count, size, method.value))
+
+        for name, fn in cases:
+            elapsed = _timed(fn, src, target())
+            print("{:24} {:8.3f} s {:10.1f} MiB/s".format(
+                name, elapsed, total / elapsed if elapsed else float('inf')))
+    finally:
+        for path in [src] + targets:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -1,4 +1,6 @@
-from mock import Mock
+import pickle
+
+from mock import Mock, patch
 
 from golem.testutils import TempDirFixture
 from golem.tools.assertlogs import LogTestCase
@@ -68,3 +70,38 @@ class TestCoreVerificator(TempDirFixture, LogTestCase):
 
         cv._check_files("SUBTASK Z", dict(), ["not a file"], Mock())
         assert cv.get_verification_state("SUBTASK Z") == SubtaskVerificationState.WRONG_ANSWER
+
+    def test_verify_cached(self):
+        cv = CoreVerificator()
+        cv.use_cache(self.path)
+        files = self.additional_dir_content([2])
+        with patch.object(cv, '_check_files',
+                          wraps=cv._check_files) as check_files:
+            assert cv.verify("SUBTASK X", dict(), files, Mock()) == \
+                SubtaskVerificationState.VERIFIED
+            # results delivered again are not verified again
+            cv.ver_states.clear()
+            assert cv.verify("SUBTASK X", dict(), files, Mock()) == \
+                SubtaskVerificationState.VERIFIED
+            assert check_files.call_count == 1
+
+            # a new verificator version verifies again
+            cv.VERSION = 2
+            assert cv.verify("SUBTASK X", dict(), files, Mock()) == \
+                SubtaskVerificationState.VERIFIED
+            assert check_files.call_count == 2
+
+            cv.use_cache(None)
+            cv.verify("SUBTASK X", dict(), files, Mock())
+            assert check_files.call_count == 3
+
+    def test_pickle_with_cache(self):
+        cv = CoreVerificator()
+        cv.use_cache(self.path)
+        cv.ver_states["SUBTASK X"] = SubtaskVerificationState.VERIFIED
+        cache = cv.cache
+
+        restored = pickle.loads(pickle.dumps(cv))
+        assert restored.cache_dir == self.path
+        assert restored.cache is cache
+        assert restored.is_verified("SUBTASK X")
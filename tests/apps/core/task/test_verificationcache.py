@@ -0,0 +1,77 @@
+import os
+
+from mock import patch
+
+from golem.testutils import TempDirFixture
+
+from apps.core.task.verificationcache import CACHE_FILE, VerificationCache, \
+    file_digest, get_verification_cache
+
+
+class TestVerificationCache(TempDirFixture):
+
+    def setUp(self):
+        super(TestVerificationCache, self).setUp()
+        self.cache_path = os.path.join(self.tempdir, CACHE_FILE)
+        self.file1 = self.temp_file_name('result1')
+        self.file2 = self.temp_file_name('result2')
+        for path, data in [(self.file1, "result 1"), (self.file2, "result 2")]:
+            with open(path, 'w') as f:
+                f.write(data)
+
+    def test_file_digest(self):
+        assert file_digest(self.file1) != file_digest(self.file2)
+        assert file_digest(os.path.join(self.tempdir, 'missing')) is None
+
+    def test_key(self):
+        key = VerificationCache.key("id", [self.file1, self.file2], "V/1")
+        assert key == VerificationCache.key("id", [self.file2, self.file1],
+                                            "V/1")
+        assert key != VerificationCache.key("id", [self.file1, self.file2],
+                                            "V/2")
+        assert key != VerificationCache.key("id2", [self.file1, self.file2],
+                                            "V/1")
+        with open(self.file2, 'w') as f:
+            f.write("changed")
+        assert key != VerificationCache.key("id", [self.file1, self.file2],
+                                            "V/1")
+
+    def test_persistence(self):
+        cache = VerificationCache(self.cache_path)
+        key = cache.key("id", [self.file1], "V/1")
+        assert cache.get(key) is None
+        cache.put(key, "VERIFIED")
+        assert cache.get(key) == "VERIFIED"
+
+        cache = VerificationCache(self.cache_path)
+        assert cache.get(key) == "VERIFIED"
+        cache.clear()
+        assert VerificationCache(self.cache_path).get(key) is None
+
+    def test_ttl(self):
+        cache = VerificationCache(self.cache_path, ttl=10)
+        key = cache.key("id", [self.file1], "V/1")
+        with patch('apps.core.task.verificationcache.time.time',
+                   return_value=100):
+            cache.put(key, "WRONG_ANSWER")
+        with patch('apps.core.task.verificationcache.time.time',
+                   return_value=105):
+            assert cache.get(key) == "WRONG_ANSWER"
+        with patch('apps.core.task.verificationcache.time.time',
+                   return_value=111):
+            assert VerificationCache(self.cache_path).get(key) is None
+            assert cache.get(key) is None
+            assert len(cache) == 0
+
+    def test_broken_file(self):
+        with open(self.cache_path, 'w') as f:
+            f.write("{not json")
+        cache = VerificationCache(self.cache_path)
+        assert len(cache) == 0
+        cache.put("key", "VERIFIED")
+        assert VerificationCache(self.cache_path).get("key") == "VERIFIED"
+
+    def test_shared_cache(self):
+        cache = get_verification_cache(self.tempdir)
+        assert cache.path == self.cache_path
+        assert get_verification_cache(self.tempdir) is cache
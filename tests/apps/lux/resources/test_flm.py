@@ -0,0 +1,139 @@
+import gzip
+import os
+import pickle
+import struct
+
+import numpy
+
+from golem.testutils import TempDirFixture
+
+from apps.lux.resources.flm import Film, FlmAccumulator, FlmError, \
+    FlmHeader, PARAM_DOUBLE, PARAM_FLOAT, PARAM_STRING, UnsupportedFlmError
+
+
+def make_film(seed, width=4, height=3, groups=2, buffer_types=(0, 1)):
+    rng = numpy.random.RandomState(seed)
+    header = FlmHeader(width, height, groups, buffer_types,
+                       [(PARAM_FLOAT, 1, 0, 2.5),
+                        (PARAM_DOUBLE, 2, 0, 0.125),
+                        (PARAM_STRING, 3, 1, b"tonemap")])
+    samples = rng.randint(1, 100, size=groups).astype(numpy.float64)
+    pixels = rng.rand(*header.pixels_shape()).astype(numpy.float32)
+    return Film(header, samples, pixels)
+
+
+class TestFilm(TempDirFixture):
+
+    def test_write_read(self):
+        film = make_film(1)
+        path = os.path.join(self.tempdir, 'film.flm')
+        film.write(path)
+        with open(path, 'rb') as f:
+            assert f.read(2) == b'\x1f\x8b'
+
+        read = Film.read(path)
+        assert read.header.compatible(film.header)
+        assert read.header.params == film.header.params
+        assert numpy.array_equal(read.samples, film.samples)
+        assert numpy.array_equal(read.pixels, film.pixels)
+
+        # uncompressed films are read as well
+        with gzip.open(path, 'rb') as f:
+            data = f.read()
+        raw_path = os.path.join(self.tempdir, 'raw.flm')
+        with open(raw_path, 'wb') as f:
+            f.write(data)
+        assert numpy.array_equal(Film.read(raw_path).pixels, film.pixels)
+
+        # truncated, but with a valid header
+        with open(raw_path, 'wb') as f:
+            f.write(data[:-7])
+        with self.assertRaises(UnsupportedFlmError):
+            Film.read(raw_path)
+
+        # too short to be a film
+        with open(raw_path, 'wb') as f:
+            f.write(data[:7])
+        with self.assertRaises(FlmError) as ctx:
+            Film.read(raw_path)
+        assert not isinstance(ctx.exception, UnsupportedFlmError)
+
+        # with trailing data
+        with open(raw_path, 'wb') as f:
+            f.write(data + b'\0' * 4)
+        with self.assertRaises(UnsupportedFlmError):
+            Film.read(raw_path)
+
+    def test_unsupported(self):
+        path = os.path.join(self.tempdir, 'film.flm')
+        make_film(1).write(path)
+        with gzip.open(path, 'rb') as f:
+            data = f.read()
+
+        # magic, version, resolution, number of buffers, parameter type
+        for offset, value in [(0, 0x12345678), (4, 7), (8, 0),
+                              (20, 100000), (36, 9)]:
+            with open(path, 'wb') as f:
+                f.write(data[:offset] + struct.pack('<I', value) +
+                        data[offset + 4:])
+            with self.assertRaises(UnsupportedFlmError):
+                Film.read(path)
+
+    def test_broken_values(self):
+        film = make_film(1)
+        film.pixels[0, 0, 0, 0, 0] = numpy.nan
+        path = os.path.join(self.tempdir, 'film.flm')
+        film.write(path)
+        with self.assertRaises(FlmError):
+            Film.read(path)
+
+        with self.assertRaises(FlmError):
+            Film.read(os.path.join(self.tempdir, 'missing.flm'))
+
+
+class TestFlmAccumulator(TempDirFixture):
+
+    def test_add(self):
+        films = [make_film(i) for i in range(3)]
+        paths = [os.path.join(self.tempdir, 'film{}.flm'.format(i))
+                 for i in range(3)]
+        accumulator = FlmAccumulator()
+        with self.assertRaises(FlmError):
+            accumulator.save(os.path.join(self.tempdir, 'merged.flm'))
+
+        for film, path in zip(films, paths):
+            assert accumulator.add(film, path)
+        assert not accumulator.add(films[0], paths[0])
+        assert accumulator.contains(reversed(paths))
+        assert not accumulator.contains(paths[:2])
+
+        merged_path = os.path.join(self.tempdir, 'merged.flm')
+        accumulator.save(merged_path)
+        merged = Film.read(merged_path)
+        assert numpy.array_equal(merged.samples,
+                                 sum(f.samples for f in films))
+        expected = sum(f.pixels.astype(numpy.float64) for f in films)
+        assert numpy.allclose(merged.pixels, expected, rtol=1e-6)
+
+    def test_check(self):
+        reference = os.path.join(self.tempdir, 'reference.flm')
+        make_film(0).write(reference)
+        accumulator = FlmAccumulator(reference)
+        accumulator.check(make_film(1))
+        with self.assertRaises(FlmError):
+            accumulator.check(make_film(1, width=5))
+        with self.assertRaises(FlmError):
+            accumulator.add(make_film(1, buffer_types=(0,)), 'film.flm')
+
+        accumulator = FlmAccumulator()
+        accumulator.check(make_film(1, width=5))
+        accumulator.add(make_film(1, width=5), 'film.flm')
+        with self.assertRaises(FlmError):
+            accumulator.check(make_film(2))
+
+    def test_pickle(self):
+        accumulator = FlmAccumulator('reference.flm')
+        accumulator.add(make_film(1), 'film.flm')
+        accumulator = pickle.loads(pickle.dumps(accumulator))
+        assert accumulator.reference == 'reference.flm'
+        assert accumulator.contains([])
@@ -1,10 +1,14 @@
 import os
+import struct
+
+import numpy
 from mock import patch, Mock
 
 from golem.testutils import PEP8MixIn, TempDirFixture
 from golem.tools.assertlogs import LogTestCase
 
 from apps.core.task.verificator import SubtaskVerificationState
+from apps.lux.resources.flm import Film, FlmAccumulator, FlmHeader
 from apps.lux.task.verificator import LuxRenderVerificator, logger
 from apps.rendering.task.renderingtaskstate import AdvanceRenderingVerificationOptions
 
@@ -51,6 +55,35 @@ class TestLuxRenderVerificator(TempDirFixture, LogTestCase, PEP8MixIn):
 
         assert not lrv.merge_flm_files("flm_file", Mock(), "flm_output")
 
+    def test_check_flm_file(self):
+        lrv = LuxRenderVerificator(AdvanceRenderingVerificationOptions)
+        lrv.flm_accumulator = FlmAccumulator()
+        flm_file = os.path.join(self.path, "result.flm")
+        Film(FlmHeader(2, 2, 1, [0], []), numpy.ones(1),
+             numpy.ones((1, 1, 2, 2, 5), dtype=numpy.float32)).write(flm_file)
+
+        with patch.object(lrv, 'merge_flm_files') as merge_flm_files:
+            passed, film = lrv.check_flm_file(flm_file, Mock())
+            assert passed and film.header.width == 2
+            assert not merge_flm_files.called
+
+            with open(flm_file, 'wb') as f:
+                f.write(b"not a film" * 4)
+            assert lrv.check_flm_file(flm_file, Mock())[1] is None
+            assert merge_flm_files.called
+
+            with open(flm_file, 'wb') as f:
+                f.write(b"\xf1\xd0\xbc\xce")
+            assert lrv.check_flm_file(flm_file, Mock()) == (False, None)
+
+            # a film of a known version which cannot be parsed here is
+            # merged by LuxRender
+            merge_flm_files.reset_mock()
+            with open(flm_file, 'wb') as f:
+                f.write(struct.pack('<IiiiII', 0xCEBCD0F1, 0, 2, 2, 1, 1))
+            assert lrv.check_flm_file(flm_file, Mock())[1] is None
+            assert merge_flm_files.called
+
     def test_flm_verify_failure(self):
         lrv = LuxRenderVerificator(AdvanceRenderingVerificationOptions)
         with self.assertLogs(logger, level="INFO"):
@@ -0,0 +1,65 @@
+import hashlib
+import os
+import struct
+from unittest import TestCase
+
+from mock import patch
+
+from apps.rendering.benchmark.minilight.src import minilight
+from apps.rendering.benchmark.minilight.src.camera import Camera
+from apps.rendering.benchmark.minilight.src.image import Image
+from apps.rendering.benchmark.minilight.src.scene import Scene
+from apps.rendering.benchmark.minilight.src.vector3f import Vector3f
+from golem.core.common import get_golem_path
+
+SCENE_FILE = os.path.join(get_golem_path(), 'apps', 'rendering', 'benchmark',
+                          'minilight', 'cornellbox.ml.txt')
+
+# sha256 of the little-endian doubles of the cornell box rendered with
+# 2 samples per pixel; the renderer must produce exactly the same image
+CORNELLBOX_2_SAMPLES = \
+    'f14cd95d1a08ed7f7507dbbaf83d345e9e9f23eede768ef854b2400495d8e215'
+
+
+def load_scene():
+    with open(SCENE_FILE) as model_file:
+        assert model_file.readline().strip() == minilight.MODEL_FORMAT_ID
+        for line in model_file:
+            if not line.isspace():
+                break
+        image = Image(model_file)
+        camera = Camera(model_file)
+        scene = Scene(model_file, camera.view_position)
+    return image, camera, scene
+
+
+class TestMinilight(TestCase):
+
+    def test_vector(self):
+        v = Vector3f("(1 2 3)")
+        assert list(v * 2.0 - Vector3f(1.0)) == [1.0, 3.0, 5.0]
+        assert list(-v) == [-1.0, -2.0, -3.0]
+        assert v.dot(Vector3f(1.0, 0, 1)) == 4.0
+        assert list(v.cross(Vector3f(v))) == [0.0, 0.0, 0.0]
+        assert v[2] == 3.0 and v[0] == 1.0
+        with self.assertRaises(AttributeError):
+            v.w = 1.0
+
+    def test_render_is_deterministic(self):
+        image, camera, scene = load_scene()
+        with patch.object(minilight, 'stdout'), patch('builtins.print'):
+            minilight.render_taskable(image, None, camera, scene, 2)
+
+        data = struct.pack('<{}d'.format(len(image.pixels)), *image.pixels)
+        assert hashlib.sha256(data).hexdigest() == CORNELLBOX_2_SAMPLES
+
+    def test_render_parallel(self):
+        image1, single1, aggregate1 = minilight.render_parallel(
+            SCENE_FILE, processes=1, rounds=2)
+        image2, single2, aggregate2 = minilight.render_parallel(
+            SCENE_FILE, processes=2, rounds=2)
+        # the image does not depend on the number of processes
+        assert image1.pixels == image2.pixels
+        assert single1 > 0.0 and aggregate1 > 0.0
+        assert single2 > 0.0 and aggregate2 > 0.0
+        assert minilight.tile_seed(0, 1) != minilight.tile_seed(1, 0)
@@ -1,6 +1,8 @@
 import os
 
+import numpy
 from PIL import Image
+from ssim import compute_ssim
 
 from apps.rendering.resources.imgcompare import *
 
@@ -8,8 +10,10 @@ from apps.rendering.resources.imgcompare import (advance_verify_img,
                                                  check_size, compare_exr_imgs,
                                                  compare_imgs,
                                                  compare_pil_imgs,
+                                                 calculate_greyscale_mse,
                                                  calculate_mse,
-                                                 calculate_psnr, logger)
+                                                 calculate_psnr,
+                                                 calculate_ssim, logger)
 from apps.rendering.resources.imgrepr import load_img, PILImgRepr
 
 from golem.testutils import TempDirFixture, PEP8MixIn
@@ -236,3 +240,69 @@ class TestCompareImgFunctions(TempDirFixture, LogTestCase, PEP8MixIn):
                                       exr_path, (0, 0))
 
 
+def _pixel_mse(img1, img2, start1=(0, 0), start2=(0, 0), box=None):
+    """ Per-pixel reference implementation """
+    (res_x, res_y) = box or img1.get_size()
+    mse = 0
+    for i in range(0, res_x):
+        for j in range(0, res_y):
+            p1 = img1.get_pixel((start1[0] + i, start1[1] + j))
+            p2 = img2.get_pixel((start2[0] + i, start2[1] + j))
+            mse += sum((c1 - c2) * (c1 - c2) for c1, c2 in zip(p1, p2))
+    return mse / (res_x * res_y * 3)
+
+
+def _random_pil_img_repr(seed, size=(40, 30)):
+    data = numpy.random.RandomState(seed).randint(
+        0, 256, (size[1], size[0], 3)).astype(numpy.uint8)
+    img = PILImgRepr()
+    img.load_from_pil_object(Image.fromarray(data, 'RGB'))
+    return img
+
+
+class TestMetricParity(TempDirFixture):
+
+    def setUp(self):
+        super(TestMetricParity, self).setUp()
+        self.img1 = _random_pil_img_repr(0)
+        self.img2 = _random_pil_img_repr(1)
+
+    def test_mse(self):
+        assert calculate_mse(self.img1, self.img2) == \
+            _pixel_mse(self.img1, self.img2)
+
+        args = dict(start1=(3, 5), start2=(10, 2), box=(20, 17))
+        assert calculate_mse(self.img1, self.img2, **args) == \
+            _pixel_mse(self.img1, self.img2, **args)
+
+        with self.assertRaises(IndexError):
+            calculate_mse(self.img1, self.img2, start1=(30, 0),
+                          box=(20, 17))
+
+    def test_mse_exr(self):
+        exr1 = get_exr_img_repr()
+        exr2 = get_exr_img_repr(alt=True)
+        self.assertAlmostEqual(calculate_mse(exr1, exr2),
+                               _pixel_mse(exr1, exr2), places=12)
+
+    def test_greyscale_mse(self):
+        gray1 = self.img1.to_pil().convert('L')
+        gray2 = self.img2.to_pil().convert('L')
+        (res_x, res_y) = gray1.size
+        expected = sum((gray1.getpixel((x, y)) - gray2.getpixel((x, y))) ** 2
+                       for x in range(res_x) for y in range(res_y))
+
+        assert calculate_greyscale_mse(gray1, gray2) == \
+            expected / (res_x * res_y)
+
+    def test_ssim(self):
+        pil1, pil2 = self.img1.to_pil(), self.img2.to_pil()
+        self.assertAlmostEqual(calculate_ssim(pil1, pil2),
+                               compute_ssim(pil1, pil2), places=12)
+        self.assertAlmostEqual(calculate_ssim(pil1, pil1), 1.0, places=12)
+
+        blurred = Image.fromarray(
+            (numpy.asarray(pil1, dtype=numpy.float64) * 0.9 + 10)
+            .astype(numpy.uint8), 'RGB')
+        self.assertAlmostEqual(calculate_ssim(pil1, blurred),
+                               compute_ssim(pil1, blurred), places=12)
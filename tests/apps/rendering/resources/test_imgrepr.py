@@ -197,6 +197,56 @@ class TestExrImgRepr(TempDirFixture, PEP8MixIn):
         e = get_exr_img_repr()
         assert e.get_rgbf_extrema() == (3.71875, 0.10687255859375)
 
+    def test_to_pil_parity(self):
+        import OpenEXR
+        e = get_exr_img_repr()
+        exr = OpenEXR.InputFile(get_test_exr())
+
+        # channels converted one by one by PIL, as before
+        channels = [Image.frombytes("F", e.get_size(), exr.channel(c, e.pt))
+                    for c in "RGB"]
+        lightest = max(c.getextrema()[1] for c in channels)
+        darkest = min(c.getextrema()[0] for c in channels)
+        for use_extremas, scale in [(False, 255.0),
+                                    (True, 255.0 / (lightest - darkest))]:
+            expected = Image.merge("RGB", [
+                c.point(lambda v: v * scale).convert("L") for c in channels])
+            assert e.to_pil(use_extremas).tobytes() == expected.tobytes()
+
+    def test_lazy_region(self):
+        e = get_exr_img_repr()
+        region = e.to_array((2, 3, 7, 9))
+        assert e._rgb is None
+
+        assert region.shape == (6, 5, 3)
+        assert (region == e.to_array()[3:9, 2:7]).all()
+        assert region[0, 0].tolist() == e.get_pixel((2, 3))
+
+    def test_alpha(self):
+        e = get_exr_img_repr()
+        assert e.alpha.shape == (10, 10)
+
+    def test_crop_and_paste(self):
+        e = get_exr_img_repr()
+        cropped = e.crop((2, 3, 7, 9))
+        assert cropped.get_size() == (5, 6)
+        assert cropped.get_pixel((0, 0)) == e.get_pixel((2, 3))
+        assert cropped.alpha.shape == (6, 5)
+
+        target = get_exr_img_repr(alt=True)
+        target.paste(cropped, (-1, 8))
+        assert target.get_pixel((0, 8)) == e.get_pixel((3, 3))
+        assert target.get_pixel((3, 9)) == e.get_pixel((6, 4))
+        assert target.get_pixel((4, 9)) == [0, 0, 0]
+        assert target.get_pixel((0, 7)) == [0, 0, 0]
+
+    def test_copy_loaded(self):
+        e = get_exr_img_repr()
+        e.set_pixel((0, 0), [0.5, 0.5, 0.5])
+        e_copy = e.copy()
+        e.set_pixel((0, 0), [0.1, 0.1, 0.1])
+        assert e_copy.get_pixel((0, 0)) == [0.5, 0.5, 0.5]
+
 
 class TestImgFunctions(TempDirFixture, LogTestCase):
     def test_load_img(self):
@@ -252,6 +302,31 @@ class TestImgFunctions(TempDirFixture, LogTestCase):
         img = blend(img1, img2, 0.1)
         assert img.get_pixel((3, 2)) == [229, 25, 3]
 
+    def test_blend_parity(self):
+        def blend_pixels(img1, img2, alpha):
+            img = img1.copy()
+            (res_x, res_y) = img1.get_size()
+            for x in range(0, res_x):
+                for y in range(0, res_y):
+                    p1 = img1.get_pixel((x, y))
+                    p2 = img2.get_pixel((x, y))
+                    img.set_pixel((x, y), [c1 * (1 - alpha) + c2 * alpha
+                                           for c1, c2 in zip(p1, p2)])
+            return img
+
+        exr1 = get_exr_img_repr()
+        exr2 = get_exr_img_repr(alt=True)
+        exr2.set_pixel((3, 3), [0.2, 0.9, 1.0])
+
+        img_path = self.temp_file_name("img.png")
+        pil1 = get_pil_img_repr(img_path, color=(255, 10, 0))
+        pil2 = load_as_PILImgRepr(get_test_exr())
+
+        for img1, img2 in [(exr1, exr2), (exr2, exr1), (pil1, pil2)]:
+            for alpha in [0, 0.1, 0.5, 0.77, 1]:
+                assert (blend(img1, img2, alpha).to_array() ==
+                        blend_pixels(img1, img2, alpha).to_array()).all()
+
     def test_blend_exr(self):
         exr1 = get_exr_img_repr()
         exr2 = get_exr_img_repr(alt=True)
@@ -135,7 +135,8 @@ class TestImgVerificator(LogTestCase, testutils.PEP8MixIn):
         print(reference_stats.get_stats())
 
         # assert
-        assert reference_stats.ssim == 0.73004640056084347
+        self.assertAlmostEqual(reference_stats.ssim, 0.73004640056084347,
+                               places=12)
         assert reference_stats.mse == 113.1829861111111
         assert reference_stats.mse_bw == 87.142291666666665
         assert reference_stats.psnr == 27.59299213109294
@@ -0,0 +1,167 @@
+import os
+
+import numpy
+from mock import patch
+from PIL import Image
+
+from apps.rendering.resources.imgrepr import EXRImgRepr
+from apps.rendering.resources.mergeservice import ADD, PASTE, MergeService, \
+    load_part, write_exr
+from golem.testutils import TempDirFixture
+
+
+def _read_exr(path):
+    img = EXRImgRepr()
+    img.load_from_file(path)
+    return img.rgb, img.alpha
+
+
+class TestMergeService(TempDirFixture):
+
+    def setUp(self):
+        super(TestMergeService, self).setUp()
+        self.service = MergeService(workers=2)
+        self.random = numpy.random.RandomState(0)
+        self.output = os.path.join(self.tempdir, 'out.exr')
+
+    def tearDown(self):
+        self.service.shutdown()
+        super(TestMergeService, self).tearDown()
+
+    def _part(self, name, height, width=8, alpha=False):
+        rgb = self.random.rand(height, width, 3).astype(numpy.float32)
+        alpha = self.random.rand(height, width).astype(numpy.float32) \
+            if alpha else None
+        path = os.path.join(self.tempdir, name)
+        write_exr(path, rgb, alpha)
+        return path, rgb, alpha
+
+    def test_paste(self):
+        parts = [self._part('part_{}.exr'.format(i), 3 + i, alpha=True)
+                 for i in range(3)]
+
+        # parts are stacked in the order in which they are merged
+        for path, _, _ in reversed(parts):
+            self.service.add_part(self.output, path, PASTE, 8, 12)
+        assert self.service.pending() == [self.output]
+
+        self.service.merge(self.output, [p[0] for p in parts], PASTE, 8, 12)
+        assert self.service.pending() == []
+
+        rgb, alpha = _read_exr(self.output)
+        assert rgb.shape == (12, 8, 3)
+        assert numpy.array_equal(rgb, numpy.vstack([p[1] for p in parts]))
+        assert numpy.array_equal(alpha, numpy.vstack([p[2] for p in parts]))
+
+    def test_paste_decodes_on_add(self):
+        path, rgb, _ = self._part('part.exr', 4)
+
+        with patch('apps.rendering.resources.mergeservice.load_part',
+                   wraps=load_part) as load_part_mock:
+            self.service.add_part(self.output, path)
+            self.service.add_part(self.output, path)
+            self.service.merge(self.output, [path])
+        load_part_mock.assert_called_once_with(path)
+        assert numpy.array_equal(_read_exr(self.output)[0], rgb)
+
+    def test_paste_order(self):
+        # the order of paths differs from the order of bands
+        names = [os.path.join('e3f{}'.format(9 - i), 'out_{}.exr'.format(i))
+                 for i in (1, 2, 10)]
+        for name in names:
+            os.mkdir(os.path.join(self.tempdir, os.path.dirname(name)))
+        parts = [self._part(name, 2) for name in names]
+        files = [p[0] for p in parts]
+        assert sorted(files) != files
+
+        for path in sorted(files):
+            self.service.add_part(self.output, path)
+        self.service.merge(self.output, files)
+
+        rgb, _ = _read_exr(self.output)
+        assert numpy.array_equal(rgb, numpy.vstack([p[1] for p in parts]))
+
+    def test_paste_clips(self):
+        parts = [self._part('part_{}.exr'.format(i), 4, width=10)
+                 for i in range(3)]
+        self.service.merge(self.output, [p[0] for p in parts], PASTE, 8, 10)
+
+        rgb, alpha = _read_exr(self.output)
+        expected = numpy.vstack([p[1] for p in parts])[:10, :8]
+        assert numpy.array_equal(rgb, expected)
+        assert alpha is None
+
+    def test_paste_replaced_part(self):
+        first, _, _ = self._part('part_0.exr', 4)
+        second, rgb_2, _ = self._part('part_1.exr', 4)
+        third, rgb_3, _ = self._part('part_2.exr', 4)
+        for path in (first, second):
+            self.service.add_part(self.output, path)
+
+        self.service.merge(self.output, [second, third])
+        rgb, _ = _read_exr(self.output)
+        assert numpy.array_equal(rgb, numpy.vstack([rgb_2, rgb_3]))
+
+    def test_add(self):
+        parts = [self._part('part_{}.exr'.format(i), 6) for i in range(3)]
+        alpha_path, alpha_rgb, _ = self._part('part.Alpha.exr', 6)
+
+        for path, _, _ in parts[:2]:
+            self.service.add_part(self.output, path, ADD)
+        files = [p[0] for p in parts] + [alpha_path]
+        self.service.merge(self.output, files, ADD)
+
+        rgb, alpha = _read_exr(self.output)
+        expected = sum(p[1].astype(numpy.float64) for p in parts)
+        assert numpy.array_equal(rgb, expected.astype(numpy.float32))
+        expected_alpha = alpha_rgb.astype(numpy.float64).sum(axis=2)
+        assert numpy.array_equal(alpha, expected_alpha.astype(numpy.float32))
+
+    def test_add_replaced_part(self):
+        parts = [self._part('part_{}.exr'.format(i), 6) for i in range(3)]
+        for path, _, _ in parts:
+            self.service.add_part(self.output, path, ADD)
+
+        self.service.merge(self.output, [parts[0][0], parts[2][0]], ADD)
+        rgb, _ = _read_exr(self.output)
+        expected = parts[0][1].astype(numpy.float64) + parts[2][1]
+        assert numpy.array_equal(rgb, expected.astype(numpy.float32))
+
+    def test_png_parts(self):
+        paths = []
+        for i in range(2):
+            path = os.path.join(self.tempdir, 'part_{}.png'.format(i))
+            Image.new('RGB', (8, 4), (255, 0, 51 * i)).save(path)
+            paths.append(path)
+
+        rgb, alpha = load_part(paths[1])
+        assert rgb.dtype == numpy.float32 and alpha is None
+        assert numpy.allclose(rgb[0, 0], [1., 0., 0.2])
+
+        self.service.merge(self.output, paths)
+        rgb, _ = _read_exr(self.output)
+        assert rgb.shape == (8, 8, 3)
+        assert numpy.allclose(rgb[4:, :, 2], 0.2)
+        assert numpy.allclose(rgb[:4, :, 2], 0.)
+
+    def test_errors(self):
+        missing = os.path.join(self.tempdir, 'missing.exr')
+        self.service.add_part(self.output, missing)
+        with self.assertRaises(Exception):
+            self.service.merge(self.output, [missing])
+        assert not self.service.pending()
+
+        with self.assertRaises(ValueError):
+            self.service.merge(self.output, [])
+        with self.assertRaises(ValueError):
+            self.service.add_part(self.output, missing, 'unknown')
+
+    def test_discard_owner(self):
+        path, _, _ = self._part('part.exr', 4)
+        self.service.add_part(self.output, path, owner='task')
+        self.service.add_part(self.output + '2', path, owner='other')
+
+        self.service.discard_owner('task')
+        assert self.service.pending() == [self.output + '2']
+        self.service.discard(self.output + '2')
+        assert self.service.pending() == []
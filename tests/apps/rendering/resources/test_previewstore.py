@@ -0,0 +1,103 @@
+import os
+from unittest.mock import Mock, patch
+
+from PIL import Image
+
+from apps.rendering.resources.previewstore import PreviewStore
+from golem.testutils import TempDirFixture
+
+
+class TestPreviewStore(TempDirFixture):
+
+    def setUp(self):
+        super(TestPreviewStore, self).setUp()
+        self.store = PreviewStore()
+        self.path = os.path.join(self.tempdir, 'preview.png')
+
+    def test_open_new(self):
+        canvas = self.store.open(self.path, (10, 20))
+        assert canvas.size == (10, 20)
+        assert canvas.mode == "RGB"
+        # without a running reactor changes are written immediately
+        assert os.path.isfile(self.path)
+        assert self.store.nbytes() == 10 * 20 * 3
+
+        with self.assertRaises(OSError):
+            self.store.open(os.path.join(self.tempdir, 'missing.png'))
+
+    def test_update_in_place(self):
+        canvas = self.store.open(self.path, (10, 10))
+        canvas.paste((255, 0, 0), (0, 0, 10, 5))
+        self.store.changed(self.path)
+
+        assert self.store.open(self.path) is canvas
+        with Image.open(self.path) as img:
+            assert img.getpixel((0, 0)) == (255, 0, 0)
+            assert img.getpixel((0, 9)) == (0, 0, 0)
+
+    def test_external_changes(self):
+        self.store.open(self.path, (10, 10))
+        Image.new("RGB", (4, 4), (0, 0, 255)).save(self.path)
+
+        canvas = self.store.open(self.path, (10, 10))
+        assert canvas.size == (4, 4)
+        assert canvas.getpixel((0, 0)) == (0, 0, 255)
+
+        os.remove(self.path)
+        canvas = self.store.open(self.path, (10, 10), mode="RGBA")
+        assert canvas.mode == "RGBA"
+
+    @patch('twisted.internet.reactor', create=True)
+    def test_delayed_flush(self, reactor):
+        reactor.running = True
+        call = Mock()
+        call.active.return_value = True
+        reactor.callLater.return_value = call
+
+        self.store.new(self.path, (10, 10))
+        canvas = self.store.open(self.path)
+        canvas.paste((0, 255, 0), (0, 0, 10, 10))
+        self.store.changed(self.path)
+
+        assert reactor.callLater.call_count == 1
+        assert reactor.addSystemEventTrigger.call_count == 1
+        assert not os.path.exists(self.path)
+        # a preview which is not written yet is not reloaded
+        assert self.store.open(self.path) is canvas
+
+        self.store.flush(self.path)
+        with Image.open(self.path) as img:
+            assert img.getpixel((5, 5)) == (0, 255, 0)
+
+    def test_budget(self):
+        self.store.budget = 10 * 10 * 3 * 2
+        paths = [os.path.join(self.tempdir, 'preview{}.png'.format(i))
+                 for i in range(3)]
+
+        with patch('twisted.internet.reactor', create=True) as reactor:
+            reactor.running = True
+            for i, path in enumerate(paths):
+                canvas = self.store.new(path, (10, 10))
+                canvas.paste((i, 0, 0), (0, 0, 10, 10))
+                self.store.changed(path)
+            self.store.open(paths[1])
+            self.store.new(paths[0], (10, 10))
+
+        # the least recently used preview was written and dropped
+        assert paths[2] not in self.store
+        assert paths[1] in self.store and paths[0] in self.store
+        assert self.store.nbytes() == self.store.budget
+        with Image.open(paths[2]) as img:
+            assert img.getpixel((0, 0)) == (2, 0, 0)
+        assert not os.path.exists(paths[1])
+
+        assert self.store.open(paths[2]).getpixel((0, 0)) == (2, 0, 0)
+        assert paths[1] not in self.store
+        with Image.open(paths[1]) as img:
+            assert img.getpixel((0, 0)) == (1, 0, 0)
+
+    def test_discard(self):
+        self.store.open(self.path, (10, 10))
+        self.store.discard(self.path)
+        assert self.path not in self.store
+        assert self.store.nbytes() == 0
@@ -1,6 +1,7 @@
 import os
 
-from PIL import Image
+import numpy
+from PIL import Image, ImageChops
 
 from golem.tools.testdirfixture import TestDirFixture
 
@@ -8,7 +9,7 @@ from golem.tools.testdirfixture import TestDirFixture
 from apps.rendering.resources.renderingtaskcollector import RenderingTaskCollector
 from apps.rendering.resources.imgcompare import (advance_verify_img,
                                                  compare_pil_imgs)
-from apps.rendering.resources.imgrepr import load_img
+from apps.rendering.resources.imgrepr import EXRImgRepr, load_img
 
 
 def make_test_img(img_path, size=(10, 10), color=(255, 0, 0)):
@@ -103,3 +104,48 @@ class TestRenderingTaskCollector(TestDirFixture):
         img = collector.finalize()
         assert isinstance(img, Image.Image)
         assert img.size == (10, 20)
+
+    def test_finalize_exr_parity(self):
+        files = [_get_test_exr(), _get_test_exr(alt=True), _get_test_exr()]
+
+        def composite(width, height):
+            # whole canvas per part, as done before
+            final_img = Image.new('RGB', (width, height))
+            for num, img_path in enumerate(files):
+                part = load_img(img_path).to_pil()
+                canvas = Image.new('RGB', (width, height))
+                canvas.paste(part, (0, num * height // len(files)))
+                final_img = ImageChops.add(final_img, canvas)
+            return final_img
+
+        for width, height in [(10, 30), (8, 25), (12, 40)]:
+            collector = RenderingTaskCollector(paste=True, width=width,
+                                               height=height)
+            for img_path in files:
+                collector.add_img_file(img_path)
+
+            assert collector.finalize().tobytes() == \
+                composite(width, height).tobytes()
+
+    def test_save_exr(self):
+        files = [_get_test_exr(), _get_test_exr(alt=True), _get_test_exr()]
+        expected = numpy.concatenate([load_img(f).to_array() for f in files])
+        output_path = self.temp_file_name("out.exr")
+
+        collector = RenderingTaskCollector(paste=True)
+        for img_path in files:
+            collector.add_img_file(img_path)
+        collector.save_exr(output_path, band_height=7)
+
+        result = EXRImgRepr()
+        result.load_from_file(output_path)
+        assert result.get_size() == (10, 30)
+        assert (result.to_array() == expected).all()
+
+        collector = RenderingTaskCollector(paste=False)
+        collector.add_img_file(_get_test_exr())
+        collector.add_img_file(_get_test_exr())
+        collector.save_exr(output_path)
+
+        result.load_from_file(output_path)
+        assert (result.to_array() == expected[:10] * 2).all()
@@ -0,0 +1,62 @@
+import random
+from unittest import TestCase
+
+from apps.rendering.resources.sampling import false_accept_bound, \
+    sample_boxes, samples_for_bound
+
+
+class TestFalseAcceptBound(TestCase):
+
+    def test_bound(self):
+        assert false_accept_bound(0.1, 0) == 1.0
+        assert false_accept_bound(1.0, 1) == 0.0
+        self.assertAlmostEqual(false_accept_bound(0.5, 3), 0.125)
+        with self.assertRaises(ValueError):
+            false_accept_bound(1.5, 3)
+        with self.assertRaises(ValueError):
+            false_accept_bound(0.1, -1)
+
+    def test_samples_for_bound(self):
+        # (wrong fraction, false accept, boxes)
+        bounds = [(0.1, 0.01, 44), (0.1, 0.05, 29), (0.05, 0.01, 90),
+                  (0.01, 0.01, 459), (0.5, 0.125, 3), (1.0, 0.01, 1)]
+        for wrong_fraction, false_accept, samples in bounds:
+            assert samples_for_bound(wrong_fraction, false_accept) == samples
+            assert false_accept_bound(wrong_fraction, samples) <= false_accept
+            assert false_accept_bound(wrong_fraction, samples - 1) > \
+                false_accept or samples == 1
+
+        for args in [(0, 0.01), (0.1, 0), (0.1, 1), (1.1, 0.01)]:
+            with self.assertRaises(ValueError):
+                samples_for_bound(*args)
+
+    def test_false_accepts(self):
+        # a result with a wrong band covering 10% of its area is accepted
+        # only if no box overlaps the band
+        area = (0, 0, 100, 100)
+        box_size = (1, 1)
+        samples = samples_for_bound(0.1, 0.05)
+        rng = random.Random(1)
+        runs = 2000
+        accepted = 0
+        for _ in range(runs):
+            boxes = sample_boxes(area, box_size, samples, rng)
+            if all(y >= 10 for _, y in boxes):
+                accepted += 1
+        assert accepted / runs <= 0.05
+
+
+class TestSampleBoxes(TestCase):
+
+    def test_boxes(self):
+        rng = random.Random(3)
+        boxes = sample_boxes((10, 20, 30, 25), (5, 5), 100, rng)
+        assert len(boxes) == 100
+        assert all(10 <= x <= 25 and y == 20 for x, y in boxes)
+        assert len(set(boxes)) > 1
+
+        # boxes bigger than the area are clipped
+        assert sample_boxes((0, 0, 3, 3), (5, 5), 2, rng) == [(0, 0)] * 2
+
+        assert sample_boxes((0, 0, 10, 10), (2, 2), 5, random.Random(7)) == \
+            sample_boxes((0, 0, 10, 10), (2, 2), 5, random.Random(7))
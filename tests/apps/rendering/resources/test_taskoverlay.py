@@ -0,0 +1,108 @@
+from unittest import TestCase
+
+from PIL import Image
+
+from apps.rendering.resources.taskoverlay import TaskAreaOverlay, \
+    clip_box, discard_overlay, fill_area, get_overlay
+
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+
+
+class TestFillArea(TestCase):
+
+    def test_clip_box(self):
+        assert clip_box((-1, 2, 20, 8), (10, 10)) == (0, 2, 10, 8)
+        assert clip_box((0, 8, 10, 4), (10, 10)) is None
+        assert clip_box((0, 12, 10, 14), (10, 10)) is None
+
+    def test_fill_area(self):
+        img = Image.new("RGB", (10, 10))
+        expected = img.copy()
+        for i in range(10):
+            for j in range(2, 5):
+                expected.putpixel((i, j), RED)
+
+        fill_area(img, (0, 2, 12, 5), RED)
+        fill_area(img, (0, 6, 10, 6), GREEN)
+        assert img.tobytes() == expected.tobytes()
+
+        img = Image.new("RGBA", (4, 4))
+        fill_area(img, (0, 0, 4, 4), GREEN)
+        assert img.getpixel((3, 3)) == GREEN + (255,)
+
+
+class TestTaskAreaOverlay(TestCase):
+
+    def setUp(self):
+        self.base = Image.new("RGB", (10, 10), (1, 2, 3))
+        self.overlay = TaskAreaOverlay()
+
+    def test_area(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 0, 0, 10, 5
+
+        assert self.overlay.area('a', compute) == (0, 0, 10, 5)
+        assert self.overlay.area('a', compute) == (0, 0, 10, 5)
+        assert len(calls) == 1
+
+    def test_compose(self):
+        top, bottom = (0, 0, 10, 5), (0, 5, 10, 10)
+
+        img, fresh, repainted = self.overlay.compose(self.base, 1,
+                                                     {top: GREEN})
+        assert fresh and repainted == 1
+        assert img is not self.base
+        assert img.getpixel((0, 0)) == GREEN
+        assert img.getpixel((0, 9)) == (1, 2, 3)
+        assert self.base.getpixel((0, 0)) == (1, 2, 3)
+
+        # the same image is updated, only changed areas are repainted
+        img2, fresh, repainted = self.overlay.compose(
+            self.base, 1, {top: GREEN, bottom: RED})
+        assert img2 is img and not fresh and repainted == 1
+        assert img.getpixel((0, 9)) == RED
+
+        img2, fresh, repainted = self.overlay.compose(self.base, 1,
+                                                      {bottom: RED})
+        assert img2 is img and repainted == 1
+        assert img.getpixel((0, 0)) == (1, 2, 3)
+
+        # the base changed
+        self.base.paste((7, 7, 7), top)
+        img2, fresh, repainted = self.overlay.compose(self.base, 2,
+                                                      {bottom: RED})
+        assert img2 is not img and fresh
+        assert img2.getpixel((0, 0)) == (7, 7, 7)
+        assert img2.getpixel((0, 9)) == RED
+
+    def test_paint(self):
+        top, bottom = (0, 0, 10, 5), (0, 5, 10, 10)
+
+        assert self.overlay.paint(self.base, 1, {top: GREEN}) == 1
+        self.overlay.painted(2)
+        assert self.overlay.paint(self.base, 2, {top: GREEN}) == 0
+        assert self.overlay.paint(self.base, 2,
+                                  {top: GREEN, bottom: RED}) == 1
+        assert self.base.getpixel((0, 0)) == GREEN
+        assert self.base.getpixel((0, 9)) == RED
+
+        # changed by someone else
+        self.base.paste((0, 0, 0), top)
+        assert self.overlay.paint(self.base, 3,
+                                  {top: GREEN, bottom: RED}) == 2
+        assert self.base.getpixel((0, 0)) == GREEN
+
+        # another image
+        other = Image.new("RGB", (10, 10))
+        assert self.overlay.paint(other, 3, {top: GREEN}) == 1
+
+    def test_registry(self):
+        overlay = get_overlay('preview')
+        assert get_overlay('preview') is overlay
+        discard_overlay('preview')
+        assert get_overlay('preview') is not overlay
+        discard_overlay('preview')
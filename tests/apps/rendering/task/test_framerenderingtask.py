@@ -154,12 +154,14 @@ class TestFrameRenderingTask(TestDirFixture, LogTestCase):
         task.scale_factor = 1
         preview_path = self.temp_file_name("image1.png")
         with self.assertLogs(logger, level="ERROR") as l:
-            assert task._paste_new_chunk("not an image", preview_path, 1, 10) is None
+            new_img = task._paste_new_chunk("not an image", preview_path, 1, 10)
+        assert isinstance(new_img, Image.Image)
         assert any("Can't generate preview" in log for log in l.output)
         with open(preview_path, 'w') as f:
             f.write("not an image, again not an image")
         with self.assertLogs(logger, level="ERROR") as l:
-            assert task._paste_new_chunk("not an image", preview_path, 1, 10) is None
+            new_img = task._paste_new_chunk("not an image", preview_path, 1, 10)
+        assert new_img.size == (10, 20)
         assert any("Can't add new chunk to preview" in log for log in l.output)
         assert any("Can't generate preview" in log for log in l.output)
 
@@ -172,6 +174,14 @@ class TestFrameRenderingTask(TestDirFixture, LogTestCase):
             new_img = task._paste_new_chunk(img, preview_path, 1, 10)
         assert isinstance(new_img, Image.Image)
 
+        # the chunk is pasted into the stored canvas at its offset
+        Image.new("RGB", (10, 20), (0, 122, 0)).save(preview_path)
+        chunk = Image.new("RGB", (10, 10), (0, 0, 255))
+        new_img = task._paste_new_chunk(chunk, preview_path, 2, 2)
+        assert new_img.getpixel((0, 0)) == (0, 122, 0)
+        assert new_img.getpixel((0, 10)) == (0, 0, 255)
+        assert task._paste_new_chunk(img, preview_path, 1, 2) is new_img
+
     def test_mark_task_area(self):
         task = self._get_frame_task()
         task.total_tasks = 4
@@ -2,7 +2,7 @@ import ntpath
 import os
 from os import makedirs, path, remove
 
-from unittest.mock import Mock, patch, ANY
+from unittest.mock import Mock, patch
 
 from apps.core.task.coretaskstate import TaskDefinition, TaskState, Options
 from apps.core.task.coretask import logger as core_logger
@@ -222,40 +222,68 @@ class TestRenderingTask(TestDirFixture, LogTestCase):
 
         output_file_name = "out.exr"
         files = ["file_1", "dir_1/file_2", "dir 2/file_3"]
-        arg = 'EXR'
-
-        def assert_command_line(exec_cmd):
-            args = exec_cmd.call_args[0][0]
-            assert args[1] == arg
-            assert args[2] == str(self.task.res_x)
-            assert args[3] == str(self.task.res_y)
-            assert args[4] == '"{}"'.format(output_file_name)
-            assert all([af == '"{}"'.format(f) for af, f in zip(args[5:], files)])
-
-        with patch('apps.rendering.task.renderingtask.is_windows', side_effect=lambda: True), \
-             patch('apps.rendering.task.renderingtask.exec_cmd') as exec_cmd:
-
-            self.task._put_collected_files_together(output_file_name, files, arg)
-
-            assert exec_cmd.call_args[0][0][0].endswith('.exe')
-            exec_cmd.assert_called_with([ANY, arg,
-                                         str(self.task.res_x), str(self.task.res_y),
-                                         output_file_name] + files)
-
-        with patch('apps.rendering.task.renderingtask.is_windows', side_effect=lambda: False), \
-             patch('apps.rendering.task.renderingtask.exec_cmd') as exec_cmd:
-
-            self.task._put_collected_files_together(output_file_name, files, arg)
-
-            args = exec_cmd.call_args[0][0]
-            assert args[0].startswith('"') and args[0].endswith('"')
-            assert args[1] == arg
-            assert args[2] == str(self.task.res_x)
-            assert args[3] == str(self.task.res_y)
-            assert args[4] == '"{}"'.format(output_file_name)
-            assert all([af == '"{}"'.format(f) for af, f in zip(args[5:], files)])
-            assert not args[0].endswith('.exe"')
-            assert not args[0].endswith('.exe')
+        arg = 'paste'
+
+        with patch('apps.rendering.task.renderingtask.merge_service') \
+                as merge_service:
+            assert self.task._put_collected_files_together(
+                output_file_name, files, arg)
+            merge_service.merge.assert_called_with(
+                output_file_name, files, arg,
+                self.task.res_x, self.task.res_y,
+                owner=self.task.header.task_id)
+            assert not self.task.output_errors
+
+            merge_service.merge.side_effect = IOError
+            with self.assertLogs(logger_render, level="ERROR"):
+                assert not self.task._put_collected_files_together(
+                    output_file_name, files, arg)
+            assert output_file_name in self.task.output_errors
+
+        # a task without its output is not accepted
+        with patch('apps.core.task.coretask.CoreTask.verify_task',
+                   return_value=True):
+            assert not self.task.verify_task()
+            self.task.restart()
+            assert self.task.verify_task()
+
+    def test_schedule_collected_file(self):
+        with patch('apps.rendering.task.renderingtask.merge_service') \
+                as merge_service:
+            self.task.output_format = "png"
+            self.task._schedule_collected_file("out.png", "file_1")
+            merge_service.add_part.assert_not_called()
+
+            self.task.output_format = "exr"
+            self.task._schedule_collected_file("out.exr", "file_1")
+            merge_service.add_part.assert_called_with(
+                "out.exr", "file_1", "paste",
+                self.task.res_x, self.task.res_y,
+                owner=self.task.header.task_id)
+
+            self.task.abort()
+            merge_service.discard_owner.assert_called_with(
+                self.task.header.task_id)
+
+    def test_abort_discards_previews(self):
+        task = self.task
+        task.preview_file_path = "preview.png"
+        task.preview_task_file_path = ["frame1.png", None]
+        with patch('apps.rendering.task.renderingtask.preview_store') \
+                as store, \
+                patch('apps.rendering.task.renderingtask.discard_overlay') \
+                as discard_overlay:
+            task.abort()
+        for path in ["preview.png", "frame1.png"]:
+            store.flush.assert_any_call(path)
+            store.discard.assert_any_call(path)
+            discard_overlay.assert_any_call(path)
+        assert store.discard.call_count == 2
+
+        with patch('apps.rendering.task.renderingtask.discard_overlay') \
+                as discard_overlay:
+            task.restart()
+        discard_overlay.assert_called_once_with("frame1.png")
 
     def test_get_outer_task(self):
         task = self.task
@@ -9,7 +9,8 @@ from golem.testutils import TempDirFixture, PEP8MixIn
 from golem.tools.assertlogs import LogTestCase
 
 from apps.core.task.verificator import SubtaskVerificationState
-from apps.rendering.task.verificator import RenderingVerificator, logger, FrameRenderingVerificator
+from apps.rendering.task.verificator import COVER_FACTOR, \
+    RenderingVerificator, logger, FrameRenderingVerificator
 from apps.rendering.task.renderingtaskstate import AdvanceRenderingVerificationOptions
 
 
@@ -142,6 +143,101 @@ class TestRenderingVerificator(TempDirFixture, LogTestCase, PEP8MixIn):
         rv.verification_options.probability = 0.0
         assert rv._choose_adv_ver_file(list(range(5)), {"node_id": "NodeX"}) is None
 
+    def test_sampled_verification(self):
+        rv = RenderingVerificator()
+        rv.res_x = 80
+        rv.res_y = 60
+        rv.total_tasks = 30
+        rv.verification_options = AdvanceRenderingVerificationOptions()
+        rv.verification_options.sampled = True
+        rv.verification_options.wrong_fraction = 0.5
+        rv.verification_options.false_accept = 0.1
+        subtask_info = {"start_task": 3}
+
+        # all 4 boxes agree and are cut from local renders which cover them
+        renders = dict()
+
+        def get_cmp_file(img_file, start, subtask_id, subtask_info, task,
+                         size):
+            cmp_file = "cmp{}".format(len(renders))
+            renders[cmp_file] = start, size
+            return cmp_file, (1, 2)
+
+        with patch.object(rv, '_get_cmp_file',
+                          side_effect=get_cmp_file), \
+                patch('apps.rendering.task.verificator.advance_verify_img',
+                      return_value=True) as verify:
+            assert rv.make_advance_verification("img", subtask_info,
+                                                "Subtask1", Mock())
+        assert 1 <= len(renders) <= 4
+        assert verify.call_count == 4
+        for call in verify.call_args_list:
+            x, y = call[0][3]
+            (start_x, start_y), (size_x, size_y) = renders[call[0][5]]
+            assert 0 <= x <= 75 and 4 <= y <= 6
+            assert start_x <= x and x + 5 <= start_x + size_x
+            assert start_y <= y and y + 2 <= start_y + size_y
+            assert call[0][4] == (5, 5)
+            assert call[0][6] == (1 + x - start_x, 2 + y - start_y)
+
+        # a differing box escalates to the whole part
+        with patch.object(rv, '_get_cmp_file', return_value=("cmp", (0, 0))), \
+                patch('apps.rendering.task.verificator.advance_verify_img',
+                      side_effect=[True, False]) as verify, \
+                patch.object(rv, '_verify_box', return_value=True) as whole:
+            assert rv.make_advance_verification("img", subtask_info,
+                                                "Subtask1", Mock())
+        assert verify.call_count == 2
+        assert whole.call_args[0][1:3] == ((0, 4), (80, 2))
+
+        with patch.object(rv, '_get_cmp_file', return_value=("cmp", (0, 0))), \
+                patch('apps.rendering.task.verificator.advance_verify_img',
+                      return_value=False), \
+                patch.object(rv, '_verify_box', return_value=False) as whole:
+            assert not rv.make_advance_verification("img", subtask_info,
+                                                    "Subtask1", Mock())
+        assert whole.call_count == 1
+
+    def test_sampled_verification_area(self):
+        rv = RenderingVerificator()
+        rv.res_x = 800
+        rv.res_y = 600
+        rv.total_tasks = 10
+        rv.verification_options = AdvanceRenderingVerificationOptions()
+        rv.verification_options.sampled = True
+        rv.verification_options.box_size = (8, 8)
+        rv.verification_options.wrong_fraction = 0.05
+        rv.verification_options.false_accept = 0.1
+        sizes = []
+
+        def get_cmp_file(img_file, start, subtask_id, subtask_info, task,
+                         size):
+            sizes.append(size)
+            return "cmp", start
+
+        with patch.object(rv, '_get_cmp_file', side_effect=get_cmp_file), \
+                patch('apps.rendering.task.verificator.advance_verify_img',
+                      return_value=True) as verify:
+            assert rv.make_advance_verification("img", {"start_task": 2},
+                                                "Subtask1", Mock())
+        # 45 boxes, rendered in groups instead of the whole 800x60 part
+        boxes = verify.call_count
+        assert boxes == 45
+        rendered = sum(x * y for x, y in sizes)
+        assert rendered <= COVER_FACTOR * boxes * 8 * 8 < 800 * 60 / 2
+
+    def test_group_boxes(self):
+        boxes = [(90, 90), (0, 0), (0, 90), (4, 0)]
+        groups = RenderingVerificator._group_boxes(boxes, (10, 10),
+                                                   (0, 0, 100, 100))
+        assert groups == [[(0, 0), (4, 0)], [(0, 90)], [(90, 90)]]
+
+    def test_covering_box(self):
+        start, size = RenderingVerificator._get_covering_box(
+            [(10, 4), (3, 6), (20, 5)], (5, 5), (0, 4, 80, 6))
+        assert start == (3, 4)
+        assert size == (22, 4)
+
     def test_error_in_change_scope(self):
         rv = RenderingVerificator()
         rv.tmp_dir = None
@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+from threading import Event
+from unittest import TestCase
+
+from golem.core.dbworker import DatabaseWorker
+
+
+class FakeDatabase(object):
+
+    def __init__(self):
+        self.depth = 0
+        self.transactions = 0
+        self.closed = False
+
+    @contextmanager
+    def atomic(self):
+        if self.depth == 0:
+            self.transactions += 1
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+def fails():
+    raise ValueError("write failed")
+
+
+class TestDatabaseWorker(TestCase):
+
+    def setUp(self):
+        self.database = FakeDatabase()
+        self.worker = DatabaseWorker(self.database)
+        self.results = []
+        self.errors = []
+
+    def tearDown(self):
+        self.worker.stop()
+
+    def write(self, func, *args):
+        deferred = self.worker.write(func, *args)
+        deferred.addCallbacks(self.results.append,
+                              lambda f: self.errors.append(f.value))
+
+    def test_not_started(self):
+        self.write(lambda x: x * 2, 2)
+        self.write(fails)
+        assert self.results == [4]
+        assert isinstance(self.errors[0], ValueError)
+        assert self.database.transactions == 2
+
+    def test_group_commit(self):
+        started, release = Event(), Event()
+
+        def blocking():
+            started.set()
+            release.wait(5)
+            return 'first'
+
+        self.worker.start()
+        self.write(blocking)
+        assert started.wait(5)
+        # queued while the first write is committed
+        for i in range(3):
+            self.write(lambda x: x, i)
+        self.write(fails)
+        release.set()
+        self.worker.stop()
+
+        assert not self.worker.running
+        assert self.results == ['first', 0, 1, 2]
+        assert len(self.errors) == 1
+        assert self.database.transactions == 2
+        assert self.database.closed
+
+    def test_max_batch(self):
+        self.worker.max_batch = 2
+        started, release = Event(), Event()
+
+        def blocking():
+            started.set()
+            release.wait(5)
+
+        self.worker.start()
+        self.write(blocking)
+        assert started.wait(5)
+        for i in range(5):
+            self.write(lambda x: x, i)
+        release.set()
+        self.worker.stop()
+
+        assert self.results[1:] == list(range(5))
+        assert self.database.transactions == 4
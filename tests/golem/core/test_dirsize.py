@@ -0,0 +1,129 @@
+import os
+
+from mock import patch
+
+from golem.core.dirsize import DirSizeAccountant, path_size, scan_dir_size
+from golem.testutils import TempDirFixture
+
+
+class TestScanDirSize(TempDirFixture):
+
+    def test_scan(self):
+        sub_dir = os.path.join(self.tempdir, 'sub')
+        os.makedirs(sub_dir)
+        for path, size in [(os.path.join(self.tempdir, 'a'), 10),
+                           (os.path.join(sub_dir, 'b'), 20)]:
+            with open(path, 'wb') as f:
+                f.write(b'\0' * size)
+
+        assert scan_dir_size(self.tempdir) == 30
+        assert scan_dir_size(os.path.join(self.tempdir, 'missing')) == 0
+        assert path_size(os.path.join(sub_dir, 'b')) == 20
+        assert path_size(sub_dir) == 20
+        assert path_size(os.path.join(self.tempdir, 'missing')) == 0
+
+    def test_scan_hardlinks(self):
+        path = os.path.join(self.tempdir, 'a')
+        with open(path, 'wb') as f:
+            f.write(b'\0' * 10)
+        try:
+            os.link(path, os.path.join(self.tempdir, 'b'))
+        except OSError:
+            self.skipTest("hardlinks are not supported")
+
+        assert scan_dir_size(self.tempdir) == 10
+
+
+class TestDirSizeAccountant(TempDirFixture):
+
+    def setUp(self):
+        super(TestDirSizeAccountant, self).setUp()
+        self.accountant = DirSizeAccountant()
+        self.root = os.path.join(self.tempdir, 'root')
+        os.makedirs(self.root)
+
+    def _write(self, name, size):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as f:
+            f.write(b'\0' * size)
+        return path
+
+    def test_total_scans_once(self):
+        self._write('a', 100)
+        assert self.accountant.total(self.root) == 100
+
+        # not reported, not visible until reconciled
+        self._write('b', 50)
+        assert self.accountant.total(self.root) == 100
+        self.accountant.reconcile()
+        assert self.accountant.total(self.root) == 150
+
+    def test_changes_during_scan(self):
+        self._write('a', 100)
+        assert self.accountant.total(self.root) == 100
+
+        def scan(path):
+            # reported after the scan has passed the file
+            self.accountant.add(self._write('b', 50), 50)
+            return 100
+
+        with patch('golem.core.dirsize.scan_dir_size', side_effect=scan):
+            self.accountant.reconcile()
+        assert self.accountant.total(self.root) == 150
+
+        def scan_removed(path):
+            self.accountant.remove(self.tempdir, 10)
+            return 150
+
+        with patch('golem.core.dirsize.scan_dir_size',
+                   side_effect=scan_removed):
+            self.accountant.reconcile()
+        assert self.accountant.total(self.root, scan=False) is None
+
+    def test_unknown_total(self):
+        self.accountant.track(self.root)
+        assert self.accountant.total(self.root, scan=False) is None
+        assert not self.accountant.covers(self.root)
+
+        # changes to directories with unknown totals are ignored
+        self.accountant.add(self.root, 100)
+        assert self.accountant.total(self.root) == 0
+
+    def test_add_remove(self):
+        assert self.accountant.total(self.root) == 0
+
+        path = self._write('a', 100)
+        self.accountant.added(path)
+        assert self.accountant.total(self.root) == 100
+
+        self.accountant.removing(path)
+        os.remove(path)
+        assert self.accountant.total(self.root) == 0
+
+        self.accountant.remove(self.root, 10)
+        assert self.accountant.total(self.root) == 0
+
+    def test_outside_changes(self):
+        assert self.accountant.total(self.root) == 0
+        self.accountant.add(os.path.join(self.tempdir, 'other'), 100)
+        self.accountant.add(self.root + '_2', 100)
+        assert self.accountant.total(self.root) == 0
+
+    def test_nested_roots(self):
+        nested = os.path.join(self.root, 'nested')
+        os.makedirs(nested)
+        assert self.accountant.total(self.root) == 0
+        assert self.accountant.total(nested) == 0
+
+        self.accountant.add(os.path.join(nested, 'file'), 100)
+        assert self.accountant.totals() == {self.root: 100, nested: 100}
+
+        # removal of a parent directory invalidates the total
+        self.accountant.remove(self.tempdir, 100)
+        assert self.accountant.total(self.root, scan=False) is None
+
+    def test_untrack(self):
+        assert self.accountant.total(self.root) == 0
+        assert self.accountant.tracked() == [self.root]
+        self.accountant.untrack(self.root)
+        assert self.accountant.tracked() == []
@@ -0,0 +1,140 @@
+import errno
+import os
+import stat
+
+from mock import patch
+
+from golem.core.filecopy import CopyMethod, CopyStrategy
+from golem.testutils import TempDirFixture
+
+
+def _unsupported(*_):
+    raise OSError(errno.EXDEV, "unsupported")
+
+
+class TestCopyStrategy(TempDirFixture):
+
+    def setUp(self):
+        super(TestCopyStrategy, self).setUp()
+        self.strategy = CopyStrategy()
+        self.src = os.path.join(self.tempdir, 'src')
+        self.dst = os.path.join(self.tempdir, 'dst')
+        with open(self.src, 'wb') as f:
+            f.write(b'contents')
+
+    def _read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_copy_file(self):
+        method = self.strategy.copy_file(self.src, self.dst)
+        assert method in (CopyMethod.reflink, CopyMethod.copy)
+        assert self._read(self.dst) == b'contents'
+        assert os.stat(self.dst).st_ino != os.stat(self.src).st_ino
+
+    def test_copy_file_replaces(self):
+        with open(self.dst, 'wb') as f:
+            f.write(b'old contents')
+        self.strategy.copy_file(self.src, self.dst)
+        assert self._read(self.dst) == b'contents'
+
+    def test_hardlink_read_only(self):
+        os.chmod(self.src, stat.S_IRUSR)
+        methods = ((CopyMethod.reflink, _unsupported),) + \
+            CopyStrategy.METHODS[1:]
+        with patch.object(CopyStrategy, 'METHODS', methods):
+            method = self.strategy.copy_file(self.src, self.dst,
+                                             read_only=True,
+                                             link_root=self.tempdir)
+
+        if method == CopyMethod.hardlink:
+            assert os.stat(self.dst).st_ino == os.stat(self.src).st_ino
+        assert self._read(self.dst) == b'contents'
+        assert not os.stat(self.dst).st_mode & stat.S_IWUSR
+
+    def test_read_only_keeps_source(self):
+        methods = ((CopyMethod.reflink, _unsupported),) + \
+            CopyStrategy.METHODS[1:]
+        with patch.object(CopyStrategy, 'METHODS', methods):
+            # a writable source is not linked, even from link_root
+            assert self.strategy.copy_file(
+                self.src, self.dst, read_only=True,
+                link_root=self.tempdir) == CopyMethod.copy
+
+            # a read-only source outside of link_root is not linked
+            os.chmod(self.src, stat.S_IRUSR)
+            link_root = os.path.join(self.tempdir, 'store')
+            os.mkdir(link_root)
+            assert self.strategy.copy_file(
+                self.src, self.dst, read_only=True,
+                link_root=link_root) == CopyMethod.copy
+
+        assert os.stat(self.dst).st_ino != os.stat(self.src).st_ino
+        assert not os.stat(self.dst).st_mode & stat.S_IWUSR
+        os.chmod(self.src, stat.S_IRUSR | stat.S_IWUSR)
+
+    def test_copy_writable(self):
+        self.strategy.copy_file(self.src, self.dst, read_only=True)
+        copy = os.path.join(self.tempdir, 'copy')
+
+        assert self.strategy.copy_file(self.dst, copy) != CopyMethod.hardlink
+        assert os.stat(copy).st_ino != os.stat(self.dst).st_ino
+        assert os.stat(copy).st_mode & stat.S_IWUSR
+
+    def test_unsupported_cached(self):
+        calls = []
+
+        def reflink(src, dst):
+            calls.append(src)
+            _unsupported()
+
+        methods = ((CopyMethod.reflink, reflink),) + CopyStrategy.METHODS[1:]
+        with patch.object(CopyStrategy, 'METHODS', methods):
+            self.strategy.copy_file(self.src, self.dst)
+            self.strategy.copy_file(self.src, self.dst)
+            assert CopyMethod.reflink not in self.strategy.supported(
+                self.src, self.dst)
+
+        assert len(calls) == 1
+        assert self._read(self.dst) == b'contents'
+
+    def test_file_error_not_cached(self):
+        def reflink(src, dst):
+            raise OSError(errno.ENOSPC, "no space")
+
+        methods = ((CopyMethod.reflink, reflink),) + CopyStrategy.METHODS[1:]
+        with patch.object(CopyStrategy, 'METHODS', methods):
+            assert self.strategy.copy_file(self.src, self.dst) == \
+                CopyMethod.copy
+            assert CopyMethod.reflink in self.strategy.supported(
+                self.src, self.dst)
+
+    def test_permission_error_not_cached(self):
+        os.chmod(self.src, stat.S_IRUSR)
+
+        def link(src, dst):
+            raise OSError(errno.EPERM, "not permitted")
+
+        methods = ((CopyMethod.reflink, _unsupported),
+                   (CopyMethod.hardlink, link)) + CopyStrategy.METHODS[2:]
+        with patch.object(CopyStrategy, 'METHODS', methods):
+            assert self.strategy.copy_file(
+                self.src, self.dst, read_only=True,
+                link_root=self.tempdir) == CopyMethod.copy
+            assert CopyMethod.hardlink in self.strategy.supported(
+                self.src, self.dst)
+
+    def test_copy_tree(self):
+        src_dir = os.path.join(self.tempdir, 'tree')
+        dst_dir = os.path.join(self.tempdir, 'tree_copy')
+        os.makedirs(os.path.join(src_dir, 'sub'))
+        for name in ['a.txt', 'b.log', os.path.join('sub', 'c.txt')]:
+            with open(os.path.join(src_dir, name), 'w') as f:
+                f.write(name)
+
+        self.strategy.copy_tree(src_dir, dst_dir, exclude=['.log'],
+                                read_only=True)
+
+        assert os.path.isfile(os.path.join(dst_dir, 'a.txt'))
+        assert os.path.isfile(os.path.join(dst_dir, 'sub', 'c.txt'))
+        assert not os.path.exists(os.path.join(dst_dir, 'b.log'))
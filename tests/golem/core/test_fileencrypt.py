@@ -1,9 +1,12 @@
 import os
 import random
+from mock import patch
 
 from io import IOBase
 
-from golem.core.fileencrypt import FileHelper, FileEncryptor, AESFileEncryptor
+from golem.core.fileencrypt import FileHelper, FileEncryptor, \
+    AESFileEncryptor, AESStreamEncryptor, AESParallelFileEncryptor, \
+    DecryptionError
 from golem.resource.dirmanager import DirManager
 from golem.tools.testdirfixture import TestDirFixture
 
@@ -115,6 +118,184 @@ class TestAESFileEncryptor(TestDirFixture):
         self.assertEqual(len(iv), iv_len)
 
 
+class TestAESStreamEncryptor(TestDirFixture):
+    """ Test encryption using AESStreamEncryptor """
+
+    def setUp(self):
+        TestDirFixture.setUp(self)
+
+        self.segment_size = 1024
+        self.data = os.urandom(5 * self.segment_size + 100)
+        self.secret = FileEncryptor.gen_secret(10, 20)
+
+        self.test_file_path = os.path.join(self.path, 'test_file')
+        self.enc_file_path = os.path.join(self.path, 'test_file.enc')
+        self.dec_file_path = os.path.join(self.path, 'test_file.dec')
+
+        with open(self.test_file_path, 'wb') as f:
+            f.write(self.data)
+
+    def _encrypt(self, data):
+        with AESStreamEncryptor.writer(self.enc_file_path, self.secret,
+                                       segment_size=self.segment_size) as dst:
+            dst.write(data)
+
+    def test_encrypt_decrypt(self):
+        AESStreamEncryptor.encrypt(self.test_file_path,
+                                   self.enc_file_path,
+                                   self.secret)
+
+        assert AESStreamEncryptor.recognizes(self.enc_file_path)
+        assert not AESStreamEncryptor.recognizes(self.test_file_path)
+
+        AESStreamEncryptor.decrypt(self.enc_file_path,
+                                   self.dec_file_path,
+                                   self.secret)
+
+        with open(self.dec_file_path, 'rb') as f:
+            assert f.read() == self.data
+
+    def test_segment_boundaries(self):
+        for size in [0, 1, self.segment_size - 1, self.segment_size,
+                     self.segment_size + 1, 3 * self.segment_size]:
+            self._encrypt(self.data[:size])
+
+            with AESStreamEncryptor.reader(self.enc_file_path,
+                                           self.secret) as src:
+                assert src.size == size
+                assert src.read() == self.data[:size]
+
+    def test_reader_seek(self):
+        self._encrypt(self.data)
+
+        with AESStreamEncryptor.reader(self.enc_file_path,
+                                       self.secret) as src:
+            src.seek(self.segment_size - 10)
+            assert src.read(20) == \
+                self.data[self.segment_size - 10:self.segment_size + 10]
+            assert src.tell() == self.segment_size + 10
+
+            src.seek(-5, os.SEEK_END)
+            assert src.read() == self.data[-5:]
+            assert src.read() == b''
+
+    def test_invalid_secret(self):
+        self._encrypt(self.data)
+
+        with self.assertRaises(DecryptionError):
+            AESStreamEncryptor.decrypt(self.enc_file_path,
+                                       self.dec_file_path,
+                                       self.secret + b'0')
+
+    def test_tampered(self):
+        self._encrypt(self.data)
+
+        with open(self.enc_file_path, 'rb') as f:
+            encrypted = bytearray(f.read())
+        encrypted[AESStreamEncryptor.header_len + 1] ^= 1
+
+        with open(self.enc_file_path, 'wb') as f:
+            f.write(encrypted)
+
+        with self.assertRaises(DecryptionError):
+            AESStreamEncryptor.decrypt(self.enc_file_path,
+                                       self.dec_file_path,
+                                       self.secret)
+
+    def test_truncated(self):
+        self._encrypt(self.data)
+
+        blob_size = self.segment_size + 32
+        with open(self.enc_file_path, 'rb+') as f:
+            f.truncate(AESStreamEncryptor.header_len + 2 * blob_size)
+
+        with self.assertRaises(DecryptionError):
+            AESStreamEncryptor.decrypt(self.enc_file_path,
+                                       self.dec_file_path,
+                                       self.secret)
+
+
+class TestAESParallelFileEncryptor(TestDirFixture):
+    """ Test encryption using AESParallelFileEncryptor """
+
+    def setUp(self):
+        TestDirFixture.setUp(self)
+
+        self.segment_size = 1024
+        self.data = os.urandom(20 * self.segment_size + 100)
+        self.secret = FileEncryptor.gen_secret(10, 20)
+
+        self.enc_file_path = os.path.join(self.path, 'test_file.enc')
+        self.dec_file_path = os.path.join(self.path, 'test_file.dec')
+
+    def _read_decrypted(self):
+        with open(self.dec_file_path, 'rb') as f:
+            return f.read()
+
+    def test_encrypt_decrypt(self):
+        with AESParallelFileEncryptor.writer(
+                self.enc_file_path, self.secret,
+                segment_size=self.segment_size) as dst:
+            for i in range(0, len(self.data), 1000):
+                dst.write(self.data[i:i + 1000])
+
+        AESParallelFileEncryptor.decrypt(self.enc_file_path,
+                                         self.dec_file_path,
+                                         self.secret)
+        assert self._read_decrypted() == self.data
+
+        AESStreamEncryptor.decrypt(self.enc_file_path,
+                                   self.dec_file_path,
+                                   self.secret)
+        assert self._read_decrypted() == self.data
+
+    def test_stream_format_compatibility(self):
+        with AESStreamEncryptor.writer(self.enc_file_path, self.secret,
+                                       segment_size=self.segment_size) as dst:
+            dst.write(self.data)
+
+        AESParallelFileEncryptor.decrypt(self.enc_file_path,
+                                         self.dec_file_path,
+                                         self.secret)
+        assert self._read_decrypted() == self.data
+
+    def test_decrypt_tampered(self):
+        with AESParallelFileEncryptor.writer(
+                self.enc_file_path, self.secret,
+                segment_size=self.segment_size) as dst:
+            dst.write(self.data)
+
+        with open(self.enc_file_path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            last = f.read(1)
+            f.seek(-1, os.SEEK_END)
+            f.write(bytes([last[0] ^ 1]))
+
+        with self.assertRaises(DecryptionError):
+            AESParallelFileEncryptor.decrypt(self.enc_file_path,
+                                             self.dec_file_path,
+                                             self.secret)
+
+    def test_reader_segment_cache(self):
+        with AESParallelFileEncryptor.writer(
+                self.enc_file_path, self.secret,
+                segment_size=self.segment_size) as dst:
+            dst.write(self.data)
+
+        with AESParallelFileEncryptor.reader(self.enc_file_path,
+                                             self.secret) as reader:
+            with patch.object(reader, 'decrypt_segment',
+                              wraps=reader.decrypt_segment) as decrypt:
+                # interleaved reads of members in different segments
+                for piece in range(4):
+                    for segment in (0, 5, 9):
+                        offset = segment * self.segment_size + piece * 100
+                        reader.seek(offset)
+                        assert reader.read(100) == \
+                            self.data[offset:offset + 100]
+                assert decrypt.call_count == 3
+
+
 class TestFileHelper(TestDirFixture):
     """ Tests for FileHelper class """
 
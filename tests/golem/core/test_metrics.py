@@ -0,0 +1,72 @@
+from threading import Thread
+from unittest import TestCase
+
+from golem.core.metrics import Counter, Histogram, MetricsRegistry, Timer
+
+
+class TestMetrics(TestCase):
+
+    def test_counter(self):
+        counter = Counter(3)
+        assert counter.increase() == 4
+        assert counter.increase(2) == 6
+        assert counter.take_unsaved() == 3
+        assert counter.take_unsaved() == 0
+        counter.increase()
+        counter.restore_unsaved(3)
+        assert counter.take_unsaved() == 4
+        assert counter.value == 7
+        counter.rebase(10)
+        assert counter.value == 17
+        assert counter.take_unsaved() == 0
+
+    def test_counter_threads(self):
+        counter = Counter()
+
+        def increase():
+            for _ in range(1000):
+                counter.increase()
+
+        threads = [Thread(target=increase) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert counter.value == 8000
+        assert counter.take_unsaved() == 8000
+
+    def test_timer(self):
+        timer = Timer()
+        assert timer.snapshot()['mean'] is None
+        timer.record(1.0)
+        timer.record(3.0)
+        with timer.time():
+            pass
+        snapshot = timer.snapshot()
+        assert snapshot['count'] == 3
+        assert snapshot['max'] == 3.0
+        assert 0.0 <= snapshot['min'] < 1.0
+        assert 4.0 <= snapshot['total'] < 5.0
+
+    def test_histogram(self):
+        histogram = Histogram((10, 1))
+        for value in (0.5, 1, 2, 10, 11):
+            histogram.observe(value)
+        assert histogram.snapshot() == {'buckets': (1, 10),
+                                        'counts': [2, 2, 1]}
+
+    def test_registry(self):
+        registry = MetricsRegistry()
+        counter = registry.counter('a')
+        assert registry.counter('a') is counter
+        assert registry.timer('b') is registry.timer('b')
+        registry.histogram('c', (1,)).observe(2)
+        with self.assertRaises(TypeError):
+            registry.timer('a')
+
+        counter.increase(2)
+        assert registry.counters() == {'a': counter}
+        assert registry.snapshot() == {
+            'a': 2,
+            'b': registry.timer('b').snapshot(),
+            'c': {'buckets': (1,), 'counts': [0, 1]}}
@@ -0,0 +1,192 @@
+import os
+import zipfile
+
+from golem.core.parallelzip import ParallelZipExtractor, ParallelZipFile, \
+    is_incompressible, member_path, should_store
+from golem.testutils import TempDirFixture
+
+
+class TestStoreDecision(TempDirFixture):
+
+    def test_is_incompressible(self):
+        assert not is_incompressible(b'')
+        assert not is_incompressible(b'a' * 4096)
+        assert is_incompressible(os.urandom(4096))
+
+    def test_should_store(self):
+        assert should_store('image.png', b'a' * 4096)
+        assert should_store('IMAGE.JPG', b'a' * 4096)
+        assert should_store('result.exr', os.urandom(4096))
+        assert not should_store('result.exr', b'a' * 4096)
+        assert not should_store('scene.blend', b'a' * 4096)
+
+
+class TestParallelZipFile(TempDirFixture):
+
+    def setUp(self):
+        super(TestParallelZipFile, self).setUp()
+        self.src_dir = os.path.join(self.tempdir, 'src')
+        os.makedirs(os.path.join(self.src_dir, 'sub'))
+
+        self.contents = {
+            'text.txt': b'text file contents ' * 1000,
+            'random.bin': os.urandom(100 * 1024),
+            'image.png': b'a' * 1000,
+            os.path.join('sub', 'nested.txt'): b'nested contents ' * 500,
+            'empty': b'',
+        }
+
+        for name, data in self.contents.items():
+            with open(os.path.join(self.src_dir, name), 'wb') as f:
+                f.write(data)
+
+        self.out_path = os.path.join(self.tempdir, 'out.zip')
+
+    def test_write(self):
+        names = sorted(self.contents)
+        cwd = os.getcwd()
+
+        with ParallelZipFile(self.out_path, workers=3, buffer_size=1024) as zf:
+            for name in names:
+                zf.write(os.path.join(self.src_dir, name), name)
+
+        assert os.getcwd() == cwd
+
+        with zipfile.ZipFile(self.out_path) as zf:
+            assert zf.testzip() is None
+            arcnames = [name.replace(os.sep, '/') for name in names]
+            assert zf.namelist() == arcnames
+
+            for name, arcname in zip(names, arcnames):
+                assert zf.read(arcname) == self.contents[name]
+
+            infos = {i.filename: i for i in zf.infolist()}
+            assert infos['text.txt'].compress_type == zipfile.ZIP_DEFLATED
+            assert infos['sub/nested.txt'].compress_type == \
+                zipfile.ZIP_DEFLATED
+            assert infos['random.bin'].compress_type == zipfile.ZIP_STORED
+            assert infos['image.png'].compress_type == zipfile.ZIP_STORED
+
+    def test_writestr(self):
+        data = [('a', b'a' * 1000), ('b', 'b' * 1000), ('c', os.urandom(512))]
+
+        with ParallelZipFile(self.out_path, workers=2) as zf:
+            for name, content in data:
+                zf.writestr(name, content)
+
+        with zipfile.ZipFile(self.out_path) as zf:
+            assert zf.namelist() == ['a', 'b', 'c']
+            assert zf.read('a') == b'a' * 1000
+            assert zf.read('b') == b'b' * 1000
+            assert zf.read('c') == data[2][1]
+
+    def test_buffered_and_streamed(self):
+        with ParallelZipFile(self.out_path, workers=2,
+                             buffer_size=1024) as zf:
+            zf.write(os.path.join(self.src_dir, 'text.txt'), 'streamed')
+            zf.write(os.path.join(self.src_dir, 'image.png'), 'buffered')
+
+        with zipfile.ZipFile(self.out_path) as zf:
+            assert zf.testzip() is None
+            assert zf.namelist() == ['streamed', 'buffered']
+            assert zf.read('streamed') == self.contents['text.txt']
+            assert zf.read('buffered') == self.contents['image.png']
+
+    def test_write_default_arcname(self):
+        with ParallelZipFile(self.out_path) as zf:
+            zf.write(os.path.join(self.src_dir, 'text.txt'))
+
+        with zipfile.ZipFile(self.out_path) as zf:
+            assert zf.namelist() == ['text.txt']
+
+    def test_write_missing_file(self):
+        zf = ParallelZipFile(self.out_path)
+        zf.write(os.path.join(self.src_dir, 'missing'))
+
+        with self.assertRaises(OSError):
+            zf.close()
+        with self.assertRaises(ValueError):
+            zf.write(os.path.join(self.src_dir, 'text.txt'))
+
+
+class TestParallelZipExtractor(TempDirFixture):
+
+    def setUp(self):
+        super(TestParallelZipExtractor, self).setUp()
+        self.zip_path = os.path.join(self.tempdir, 'in.zip')
+        self.out_dir = os.path.join(self.tempdir, 'out')
+        self.contents = {
+            'a.txt': b'a' * 10000,
+            'sub/b.bin': os.urandom(64 * 1024),
+            'sub/deeper/c': b'',
+        }
+
+        with zipfile.ZipFile(self.zip_path, 'w') as zf:
+            zf.writestr('sub/', b'')
+            for name, data in self.contents.items():
+                zf.writestr(name, data)
+
+    def _read(self, name):
+        with open(os.path.join(self.out_dir, name), 'rb') as f:
+            return f.read()
+
+    def test_extract(self):
+        result = ParallelZipExtractor(self.zip_path, workers=2) \
+            .extract(self.out_dir)
+
+        assert sorted(result.written) == sorted(self.contents)
+        assert result.skipped == []
+        assert result.size_delta == sum(map(len, self.contents.values()))
+        for name, data in self.contents.items():
+            assert self._read(name) == data
+        assert not [f for f in os.listdir(self.out_dir)
+                    if f.endswith('.tmp')]
+
+    def test_extract_file_object(self):
+        with open(self.zip_path, 'rb') as src:
+            result = ParallelZipExtractor(src).extract(self.out_dir)
+        assert sorted(result.names) == sorted(self.contents)
+        assert self._read('sub/b.bin') == self.contents['sub/b.bin']
+
+    def test_extract_selected(self):
+        result = ParallelZipExtractor(self.zip_path) \
+            .extract(self.out_dir, ['a.txt'])
+        assert result.written == ['a.txt']
+        assert os.listdir(self.out_dir) == ['a.txt']
+
+    def test_skip_unchanged(self):
+        extractor = ParallelZipExtractor(self.zip_path)
+        extractor.extract(self.out_dir)
+
+        modified = os.path.join(self.out_dir, 'a.txt')
+        with open(modified, 'wb') as f:
+            f.write(b'b' * 10)
+
+        result = extractor.extract(self.out_dir)
+        assert result.written == ['a.txt']
+        assert sorted(result.skipped) == ['sub/b.bin', 'sub/deeper/c']
+        assert result.names == list(self.contents)
+        assert result.size_delta == 10000 - 10
+        assert self._read('a.txt') == self.contents['a.txt']
+
+        result = ParallelZipExtractor(self.zip_path, skip_unchanged=False) \
+            .extract(self.out_dir)
+        assert len(result.written) == len(self.contents)
+        assert result.size_delta == 0
+
+    def test_path_traversal(self):
+        with zipfile.ZipFile(self.zip_path, 'a') as zf:
+            zf.writestr('../evil', b'evil')
+
+        with self.assertRaises(ValueError):
+            ParallelZipExtractor(self.zip_path).extract(self.out_dir)
+        assert not os.path.exists(os.path.join(self.tempdir, 'evil'))
+        assert not os.path.exists(self.out_dir)
+
+    def test_member_path(self):
+        root = os.path.abspath(self.out_dir)
+        assert member_path(root, 'a/b') == os.path.join(root, 'a', 'b')
+        assert member_path(root, 'a/./b') == os.path.join(root, 'a', 'b')
+        for name in ['../a', 'a/../../b', '/etc/passwd', '\\a', '.', '']:
+            with self.assertRaises(ValueError):
+                member_path(root, name)
@@ -1,6 +1,10 @@
 from threading import Thread
 
-from golem.core.statskeeper import IntStatsKeeper
+from mock import patch
+
+from golem.core.statskeeper import IntStatsKeeper, StatsRegistry, \
+    stats_registry
+from golem.model import Stats
 from golem.task.taskcomputer import CompStats
 from golem.tools.testwithdatabase import TestWithDatabase
 
@@ -58,3 +62,39 @@ class TestStatsKeeper(TestWithDatabase):
 
         self.assertEqual(sk.session_stats.computed_tasks, n_expected)
         self.assertEqual(sk.global_stats.computed_tasks, n_expected)
+
+    def test_flush(self):
+        st = IntStatsKeeper(CompStats)
+        st.increase_stat("computed_tasks")
+        st.increase_stat("computed_tasks", 2)
+        assert st.get_stats("computed_tasks") == (3, 3)
+
+        def saved():
+            return Stats.get(Stats.name == "computed_tasks").value
+
+        # increased in memory only
+        assert saved() == '0'
+        stats_registry.flush()
+        assert saved() == '3'
+        st.increase_stat("computed_tasks")
+        stats_registry.flush()
+        assert saved() == '4'
+        assert st.get_stats("unknown") == (None, None)
+
+    def test_flush_unloaded(self):
+        Stats.create(name="computed_tasks", value="10")
+        registry = StatsRegistry()
+
+        def saved():
+            return Stats.get(Stats.name == "computed_tasks").value
+
+        with patch.object(Stats, 'get_or_create', side_effect=OSError):
+            counter = registry.counter("computed_tasks")
+            counter.increase(2)
+            # the stored value is not overwritten
+            registry.flush()
+        assert saved() == '10'
+
+        registry.flush()
+        assert counter.value == 12
+        assert saved() == '12'
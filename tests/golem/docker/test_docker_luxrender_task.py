@@ -5,8 +5,10 @@ from os import makedirs, path, remove
 import shutil
 
 from mock import Mock
+import numpy
 import pytest
 
+from apps.lux.resources.flm import Film, FlmAccumulator
 from apps.lux.task.luxrendertask import LuxRenderTaskBuilder, LuxTask
 from golem.clientconfigdescriptor import ClientConfigDescriptor
 from golem.core.common import get_golem_path, timeout_to_deadline
@@ -341,6 +343,35 @@ class TestDockerLuxrenderTask(TempDirFixture, DockerTestCase):
         assert path.isfile(flm)
         assert path.isfile(png)
 
+    def test_luxrender_flm_reader(self):
+        """ Films rendered by LuxRender are read and merged without it """
+        task = self._test_task()
+
+        computer = TaskTester(task, self.tempdir, Mock(), Mock())
+        computer.run()
+        computer.tt.join(60.0)
+
+        dirname = os.path.dirname(computer.tt.result[0]['data'][0])
+        flm = find_file_with_ext(dirname, [".flm"])
+        assert path.isfile(flm)
+
+        film = Film.read(flm)
+        assert film.header.width > 0 and film.header.height > 0
+        assert film.pixels.shape == film.header.pixels_shape()
+        assert (film.samples > 0).any()
+
+        accumulator = FlmAccumulator(flm)
+        assert accumulator.add(film, flm)
+        assert accumulator.add(Film.read(flm), flm + ".copy")
+        merged_path = path.join(self.tempdir, "merged.flm")
+        accumulator.save(merged_path)
+
+        merged = Film.read(merged_path)
+        assert merged.header.params == film.header.params
+        assert numpy.array_equal(merged.samples, 2 * film.samples)
+        assert numpy.allclose(merged.pixels, 2 * film.pixels.astype(
+            numpy.float64), rtol=1e-6)
+
     def test_luxrender_subtask(self):
         task = self._test_task()
         task_thread, error_msg, out_dir = self._run_docker_task(task)
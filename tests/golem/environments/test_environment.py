@@ -51,3 +51,4 @@ class EnvTest(DatabaseFixture, PEP8MixIn):
         assert Environment.get_performance() == 0.0
         assert Environment.run_default_benchmark(save=True) > 0.0
         assert Environment.get_performance() > 0.0
+        assert Environment.get_single_core_performance() > 0.0
@@ -1,5 +1,9 @@
+import json
+import threading
 import unittest
 import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
 
 import mock
 
@@ -87,6 +91,77 @@ class TestHyperdriveClient(unittest.TestCase):
             assert client.pin_rm(multihash) == self.response['hash']
 
 
+class FakeHyperdriveServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+
+class FakeHyperdriveHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        request = json.loads(self.rfile.read(length).decode('utf-8'))
+        self.server.requests.append(request)
+        self.server.connections.add(self.client_address)
+
+        command = request['command']
+        if command == 'id':
+            response = dict(id='fake_id')
+        elif command == 'download':
+            response = dict(files=[request['hash']])
+        else:
+            response = dict(hash=request.get('hash') or 'fake_hash')
+
+        body = json.dumps(response).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+class TestHyperdriveClientSession(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeHyperdriveServer(('127.0.0.1', 0),
+                                           FakeHyperdriveHandler)
+        self.server.requests = []
+        self.server.connections = set()
+        self.port = self.server.server_address[1]
+
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        url = 'http://127.0.0.1:{}/api'.format(self.port)
+        session = HyperdriveClient._sessions.pop(url, None)
+        if session:
+            session.close()
+
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _client(self):
+        return HyperdriveClient(port=self.port, host='127.0.0.1',
+                                timeout=5)
+
+    def test_keep_alive(self):
+        for _ in range(10):
+            assert self._client().id() == 'fake_id'
+
+        assert len(self.server.requests) == 10
+        assert len(self.server.connections) == 1
+
+    def test_shared_session(self):
+        assert self._client()._session is self._client()._session
+
+
 class TestHyperdriveClientOptions(unittest.TestCase):
 
     def test_clone(self):
@@ -1,3 +1,4 @@
+from golem.model import LocalRank
 from golem.ranking.helper.trust import Trust
 from golem.ranking.manager import database_manager as dm
 from golem.testutils import DatabaseFixture
@@ -251,3 +252,51 @@ class TestDatabaseManager(DatabaseFixture):
         """Should throw exception for WRONG_COMPUTED increase."""
         with self.assertRaises(KeyError):
             Trust.WRONG_COMPUTED.increase('alpha', 0.3)
+
+
+class TestLocalRankCache(DatabaseFixture):
+    def setUp(self):
+        super(TestLocalRankCache, self).setUp()
+        self.cache = dm.LocalRankCache(flush_interval=1000,
+                                       max_unsaved_updates=3)
+
+    @staticmethod
+    def saved(node_id):
+        return LocalRank.select().where(LocalRank.node_id == node_id).first()
+
+    def test_write_behind(self):
+        LocalRank.create(node_id='alpha', positive_computed=1.0)
+        self.cache.increase('alpha', 'positive_computed', 0.5)
+        self.cache.increase('beta', 'negative_payment', 0.5)
+
+        # updated in memory only
+        assert self.cache.get('alpha').positive_computed == 1.5
+        assert self.cache.get('beta').negative_payment == 0.5
+        assert self.cache.get('gamma') is None
+        assert len(self.cache.get_all()) == 2
+        assert self.saved('alpha').positive_computed == 1.0
+        assert self.saved('beta') is None
+
+        self.cache.flush()
+        assert self.saved('alpha').positive_computed == 1.5
+        assert self.saved('beta').negative_payment == 0.5
+
+        self.cache.increase('beta', 'negative_payment', 0.5)
+        self.cache.flush()
+        assert self.saved('beta').negative_payment == 1.0
+        assert LocalRank.select().count() == 2
+
+    def test_unsaved_updates_bound(self):
+        self.cache.increase('alpha', 'positive_computed', 1.0)
+        self.cache.increase('alpha', 'positive_computed', 1.0)
+        assert self.saved('alpha') is None
+        self.cache.increase('alpha', 'positive_computed', 1.0)
+        assert self.saved('alpha').positive_computed == 3.0
+
+    def test_flush_if_due(self):
+        self.cache.increase('alpha', 'positive_computed', 1.0)
+        self.cache.flush_if_due()
+        assert self.saved('alpha') is None
+        self.cache.flush_interval = 0
+        self.cache.flush_if_due()
+        assert self.saved('alpha').positive_computed == 1.0
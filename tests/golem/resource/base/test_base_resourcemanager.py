@@ -2,9 +2,11 @@ import os
 import unittest
 import uuid
 
-from mock import patch
+from mock import Mock, patch
 
 from golem.resource.base import resourcesmanager
+from golem.resource.base.scheduler import DownloadPriority
+from golem.resource.client import AdaptiveConcurrency
 from golem.resource.dirmanager import DirManager
 from golem.tools.testdirfixture import TestDirFixture
 
@@ -228,6 +230,29 @@ class TestResourceStorage(_Common.ResourceSetUp):
             self.storage.copy(file_path, relative_path, new_category)
             assert os.path.exists(dst_path)
 
+    def test_store_and_restore(self):
+        files = self.joined_resources
+        bundle = resourcesmanager.ResourceBundle(
+            files, str(uuid.uuid4()), task_id=self.task_id,
+            path=self.resources_dir)
+        assert self.storage.store_resource(bundle)
+
+        new_task_id = str(uuid.uuid4())
+        restored = resourcesmanager.ResourceBundle(
+            files, bundle.hash, task_id=new_task_id,
+            path=self.storage.get_dir(new_task_id))
+
+        assert self.storage.restore_resource(restored)
+        for file_name in files:
+            assert os.path.isfile(os.path.join(restored.path, file_name))
+        assert self.storage.store.stats()['hits'] == 1
+
+        missing = resourcesmanager.ResourceBundle(
+            files, str(uuid.uuid4()), task_id=new_task_id,
+            path=restored.path)
+        assert not self.storage.restore_resource(missing)
+        assert self.storage.store.stats()['misses'] == 1
+
 
 class TestAbstractResourceManager(_Common.ResourceSetUp):
 
@@ -357,3 +382,37 @@ class TestAbstractResourceManager(_Common.ResourceSetUp):
             ['resource', '1'],
             [os.path.join('split', 'path'), '4']
         ]
+
+    def test_pull_priority(self):
+        manager = self.resource_manager
+        manager._download_concurrency = AdaptiveConcurrency(1, maximum=1)
+        pulled = []
+        downloaded = []
+
+        def pull(resource, task_id, success, error, **_):
+            pulled.append((resource.hash, success))
+
+        def pull_resource(name, priority):
+            manager.pull_resource(
+                (name, name), self.task_id,
+                success=lambda entry, _: downloaded.append(entry[1]),
+                error=Mock(), async=False, pin=False, priority=priority)
+
+        with patch.object(manager, '_AbstractResourceManager__pull',
+                          side_effect=pull):
+            pull_resource('subtask', DownloadPriority.subtask)
+            pull_resource('results_1', DownloadPriority.results)
+            pull_resource('results_2', DownloadPriority.results)
+            assert [h for h, _ in pulled] == ['subtask']
+
+            # queued after the results, started before them
+            pull_resource('handshake', DownloadPriority.handshake)
+            assert [h for h, _ in pulled] == ['subtask']
+
+            for name in ['subtask', 'handshake', 'results_1', 'results_2']:
+                assert pulled[-1][0] == name
+                pulled[-1][1](('path', name))
+
+        assert downloaded == ['subtask', 'handshake', 'results_1',
+                              'results_2']
+        assert manager.current_downloads == 0
@@ -0,0 +1,142 @@
+import os
+import stat
+
+from mock import patch
+
+from golem.resource.base.resourcestore import ResourceStore, TMP_PREFIX
+from golem.testutils import TempDirFixture
+
+
+class TestResourceStore(TempDirFixture):
+
+    def setUp(self):
+        super(TestResourceStore, self).setUp()
+        self.src_dir = os.path.join(self.tempdir, 'src')
+        self.store_dir = os.path.join(self.tempdir, 'store')
+        os.makedirs(os.path.join(self.src_dir, 'sub'))
+
+    def _file(self, name, size):
+        path = os.path.join(self.src_dir, name)
+        with open(path, 'wb') as f:
+            f.write(b'\0' * size)
+        return name
+
+    def test_put_get(self):
+        store = ResourceStore(self.store_dir, max_size=1000)
+        files = [self._file('a', 100), self._file(os.path.join('sub', 'b'), 50)]
+
+        assert store.get('hash') is None
+        assert store.put('hash', self.src_dir, files)
+        assert store.size == 150
+        assert 'hash' in store
+
+        path = store.get('hash')
+        assert os.path.isfile(os.path.join(path, 'a'))
+        assert os.path.isfile(os.path.join(path, 'sub', 'b'))
+
+        stats = store.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == .5
+        assert stats['entries'] == 1
+
+    def test_put_keeps_sources_writable(self):
+        store = ResourceStore(self.store_dir, max_size=1000)
+        files = [self._file('a', 100)]
+        src = os.path.join(self.src_dir, 'a')
+
+        assert store.put('hash', self.src_dir, files)
+        copy = os.path.join(store.get('hash'), 'a')
+        assert os.stat(src).st_mode & stat.S_IWUSR
+        assert not os.stat(copy).st_mode & stat.S_IWUSR
+        assert os.stat(copy).st_ino != os.stat(src).st_ino
+
+    def test_put_missing(self):
+        store = ResourceStore(self.store_dir, max_size=1000)
+        assert not store.put('hash', self.src_dir, ['missing'])
+        assert not store.put('hash', self.src_dir, [])
+        assert len(store) == 0
+
+    def test_put_concurrent(self):
+        store = ResourceStore(self.store_dir, max_size=1000)
+        files = [self._file('a', 100)]
+        entry_path = store._entry_path('hash')
+
+        def rename(src, dst):
+            # another put of the same resource renamed its copy first
+            os.makedirs(dst)
+            raise OSError(39, 'Directory not empty')
+
+        with patch('golem.resource.base.resourcestore.os.rename',
+                   side_effect=rename):
+            assert store.put('hash', self.src_dir, files)
+
+        assert store.get('hash') == entry_path
+        assert store.size == 100
+        assert not [n for n in os.listdir(self.store_dir)
+                    if n.startswith(TMP_PREFIX)]
+
+    def test_disabled(self):
+        store = ResourceStore(None, max_size=0)
+        assert not store.enabled
+        assert not store.put('hash', self.src_dir, [self._file('a', 10)])
+        assert store.get('hash') is None
+
+    def test_lru_eviction(self):
+        store = ResourceStore(self.store_dir, max_size=250)
+        for name in ['a', 'b']:
+            store.put(name, self.src_dir, [self._file(name, 100)])
+
+        # 'a' becomes the most recently used entry
+        assert store.get('a')
+        assert store.put('c', self.src_dir, [self._file('c', 100)])
+
+        assert 'a' in store
+        assert 'b' not in store
+        assert 'c' in store
+        assert store.size == 200
+        assert store.stats()['evictions'] == 1
+        assert not os.path.exists(os.path.join(self.store_dir, 'b'))
+
+    def test_too_large(self):
+        store = ResourceStore(self.store_dir, max_size=100)
+        store.put('a', self.src_dir, [self._file('a', 50)])
+        assert not store.put('b', self.src_dir, [self._file('b', 101)])
+        assert 'a' in store
+
+    def test_pinning(self):
+        store = ResourceStore(self.store_dir, max_size=200)
+        store.put('a', self.src_dir, [self._file('a', 100)])
+        store.put('b', self.src_dir, [self._file('b', 100)])
+
+        assert store.pin('a', 'task_1')
+        assert store.pin('b', 'task_2')
+        assert not store.pin('missing', 'task_1')
+        assert store.is_pinned('a')
+
+        assert not store.put('c', self.src_dir, [self._file('c', 100)])
+        assert 'a' in store and 'b' in store
+
+        store.unpin_all('task_1')
+        assert not store.is_pinned('a')
+        assert store.put('c', self.src_dir, [self._file('c', 100)])
+        assert 'a' not in store
+        assert 'b' in store
+
+        store.unpin('b', 'task_2')
+        store.remove('b')
+        assert 'b' not in store
+        assert store.size == 100
+
+    def test_reload(self):
+        store = ResourceStore(self.store_dir, max_size=1000)
+        store.put('old', self.src_dir, [self._file('old', 100)])
+        store.put('new/hash', self.src_dir, [self._file('new', 100)])
+        os.utime(os.path.join(self.store_dir, 'old'), (0, 0))
+        os.makedirs(os.path.join(self.store_dir, TMP_PREFIX + 'leftover'))
+
+        store = ResourceStore(self.store_dir, max_size=150)
+        assert 'new/hash' in store
+        assert 'old' not in store
+        assert store.size == 100
+        assert os.listdir(self.store_dir) == ['new%2Fhash']
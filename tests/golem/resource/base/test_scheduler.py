@@ -0,0 +1,172 @@
+import unittest
+
+from mock import Mock
+
+from golem.resource.base.scheduler import DownloadScheduler, \
+    DownloadPriority, TokenBucket
+
+
+class Clock(object):
+
+    def __init__(self, now=0.):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _concurrency(limit):
+    concurrency = Mock()
+    concurrency.limit = limit
+    return concurrency
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_debt(self):
+        clock = Clock()
+        bucket = TokenBucket(100, clock=clock)
+
+        assert bucket.delay() == 0
+        bucket.consume(300)
+        assert bucket.delay() == 2.
+
+        clock.now = 1.
+        assert bucket.delay() == 1.
+        clock.now = 2.
+        assert bucket.delay() == 0
+
+    def test_burst(self):
+        clock = Clock()
+        bucket = TokenBucket(100, burst=50, clock=clock)
+
+        clock.now = 100.
+        bucket.consume(100)
+        assert bucket.delay() == .5
+
+
+class TestDownloadScheduler(unittest.TestCase):
+
+    def test_priority_order(self):
+        scheduler = DownloadScheduler(_concurrency(0), clock=Clock())
+
+        scheduler.push(DownloadPriority.results, 'results')
+        scheduler.push(DownloadPriority.handshake, 'handshake')
+        scheduler.push(DownloadPriority.subtask, 'subtask_1')
+        scheduler.push(DownloadPriority.subtask, 'subtask_2')
+
+        assert len(scheduler) == 4
+        assert [scheduler.pop() for _ in range(5)] == [
+            'handshake', 'subtask_1', 'subtask_2', 'results', None
+        ]
+        assert scheduler.active == 4
+        assert scheduler.active_in(DownloadPriority.subtask) == 2
+
+    def test_aging(self):
+        clock = Clock()
+        scheduler = DownloadScheduler(_concurrency(0), aging_interval=10.,
+                                      clock=clock)
+
+        scheduler.push(DownloadPriority.results, 'results')
+        clock.now = 15.
+        scheduler.push(DownloadPriority.subtask, 'subtask')
+        # results: 2 - 1.5 = 0.5, subtask: 1 - 0
+        assert scheduler.pop() == 'results'
+        assert scheduler.pop() == 'subtask'
+
+    def test_global_limit(self):
+        concurrency = _concurrency(2)
+        scheduler = DownloadScheduler(concurrency, clock=Clock())
+
+        for i in range(3):
+            scheduler.push(DownloadPriority.subtask, i)
+
+        assert scheduler.pop() == 0
+        assert scheduler.pop() == 1
+        assert not concurrency.saturated.called
+
+        assert scheduler.pop() is None
+        assert concurrency.saturated.called
+
+        scheduler.finished(DownloadPriority.subtask)
+        assert scheduler.active == 1
+        assert scheduler.pop() == 2
+
+    def test_handshake_slot(self):
+        concurrency = _concurrency(1)
+        scheduler = DownloadScheduler(concurrency, clock=Clock())
+
+        scheduler.push(DownloadPriority.results, 'results')
+        scheduler.push(DownloadPriority.subtask, 'subtask')
+        assert scheduler.pop() == 'subtask'
+        assert scheduler.pop() is None
+
+        # a handshake does not wait for the global limit
+        scheduler.push(DownloadPriority.handshake, 'handshake_1')
+        scheduler.push(DownloadPriority.handshake, 'handshake_2')
+        assert scheduler.pop() == 'handshake_1'
+        assert scheduler.active == 2
+        # but only one of them
+        assert scheduler.pop() is None
+
+        scheduler.finished(DownloadPriority.handshake)
+        assert scheduler.pop() == 'handshake_2'
+        scheduler.finished(DownloadPriority.handshake)
+        scheduler.finished(DownloadPriority.subtask)
+        assert scheduler.pop() == 'results'
+
+    def test_class_limits(self):
+        scheduler = DownloadScheduler(
+            _concurrency(0),
+            class_limits={DownloadPriority.subtask: 1},
+            clock=Clock())
+
+        scheduler.push(DownloadPriority.subtask, 'subtask_1')
+        scheduler.push(DownloadPriority.subtask, 'subtask_2')
+        scheduler.push(DownloadPriority.results, 'results')
+
+        assert scheduler.pop() == 'subtask_1'
+        assert scheduler.pop() == 'results'
+        assert scheduler.pop() is None
+
+        scheduler.finished(DownloadPriority.subtask)
+        assert scheduler.pop() == 'subtask_2'
+
+    def test_bandwidth(self):
+        clock = Clock()
+        scheduler = DownloadScheduler(_concurrency(0), bandwidth=1000,
+                                      clock=clock)
+
+        scheduler.push(DownloadPriority.subtask, 'first')
+        scheduler.push(DownloadPriority.subtask, 'second')
+        assert scheduler.delay() is None
+
+        assert scheduler.pop() == 'first'
+        scheduler.finished(DownloadPriority.subtask, 3000)
+
+        assert scheduler.pop() is None
+        assert scheduler.delay() == 2.
+
+        clock.now = 2.
+        assert scheduler.delay() is None
+        assert scheduler.pop() == 'second'
+
+    def test_class_bandwidth(self):
+        clock = Clock()
+        scheduler = DownloadScheduler(
+            _concurrency(0),
+            class_bandwidth={DownloadPriority.results: 100},
+            clock=clock)
+
+        scheduler.push(DownloadPriority.results, 'results_1')
+        scheduler.push(DownloadPriority.results, 'results_2')
+        assert scheduler.pop() == 'results_1'
+        scheduler.finished(DownloadPriority.results, 200)
+
+        scheduler.push(DownloadPriority.subtask, 'subtask')
+        assert scheduler.pop() == 'subtask'
+        assert scheduler.pop() is None
+        assert scheduler.delay() == 1.
+
+        clock.now = 1.
+        assert scheduler.pop() == 'results_2'
@@ -0,0 +1,190 @@
+import io
+import os
+import random
+
+from golem.resource.chunking import GEAR, MAX_CHUNK_SIZE, MIN_CHUNK_SIZE, \
+    ChunkStore, MissingChunkError, chunk_id, file_chunks, iter_chunks, \
+    rolling_hashes
+from golem.testutils import TempDirFixture
+
+
+def _gear_reference(data, history=b''):
+    value = 0
+    for byte in history:
+        value = ((value << 1) + GEAR[byte]) & 0xFFFFFFFF
+    result = []
+    for byte in data:
+        value = ((value << 1) + GEAR[byte]) & 0xFFFFFFFF
+        result.append(value)
+    return result
+
+
+def _random_bytes(size, seed=0):
+    return random.Random(seed).getrandbits(size * 8).to_bytes(size, 'little')
+
+
+class TestRollingHash(TempDirFixture):
+
+    def test_reference(self):
+        data = _random_bytes(1000)
+        assert rolling_hashes(data).tolist() == _gear_reference(data)
+
+    def test_history(self):
+        data = _random_bytes(1000)
+        hashes = rolling_hashes(data[500:], history=data[:500])
+        assert hashes.tolist() == _gear_reference(data)[500:]
+
+    def test_short(self):
+        assert rolling_hashes(b'').tolist() == []
+        assert rolling_hashes(b'abc', b'xy').tolist() == \
+            _gear_reference(b'xyabc')[2:]
+
+
+class TestChunking(TempDirFixture):
+
+    def _chunks(self, data, read_size=1024 * 1024):
+        return list(iter_chunks(io.BytesIO(data), read_size=read_size))
+
+    def test_chunk_sizes(self):
+        data = _random_bytes(12 * 1024 * 1024)
+        chunks = self._chunks(data)
+
+        assert b''.join(c for _, c in chunks) == data
+        assert all(MIN_CHUNK_SIZE <= len(c) <= MAX_CHUNK_SIZE
+                   for _, c in chunks[:-1])
+        offset = 0
+        for chunk_offset, chunk in chunks:
+            assert chunk_offset == offset
+            offset += len(chunk)
+
+    def test_read_size_independent(self):
+        data = _random_bytes(6 * 1024 * 1024)
+        assert self._chunks(data, read_size=1024 * 1024) == \
+            self._chunks(data, read_size=333333)
+
+    def test_zeros(self):
+        chunks = self._chunks(bytes(9 * 1024 * 1024))
+        assert [len(c) for _, c in chunks] == \
+            [MAX_CHUNK_SIZE, MAX_CHUNK_SIZE, 1024 * 1024]
+
+    def test_empty(self):
+        assert self._chunks(b'') == []
+
+    def test_insertion_is_local(self):
+        data = _random_bytes(12 * 1024 * 1024)
+        modified = data[:5000000] + b'inserted' + data[5000000:]
+
+        before = {chunk_id(c) for _, c in self._chunks(data)}
+        after = [chunk_id(c) for _, c in self._chunks(modified)]
+
+        assert len([c for c in after if c not in before]) <= 2
+
+
+class TestChunkStore(TempDirFixture):
+
+    def setUp(self):
+        super(TestChunkStore, self).setUp()
+        self.store_dir = os.path.join(self.tempdir, 'store')
+        self.data = _random_bytes(3 * 1024 * 1024)
+        self.src = os.path.join(self.tempdir, 'src')
+        with open(self.src, 'wb') as f:
+            f.write(self.data)
+
+    def test_index_and_assemble(self):
+        store = ChunkStore(self.store_dir)
+        store.index_file(self.src)
+        chunks = file_chunks(self.src)
+        assert store.chunk_ids() == {c[0] for c in chunks}
+
+        dst = os.path.join(self.tempdir, 'out', 'dst')
+        store.assemble(dst, [[c[0], c[2]] for c in chunks])
+        with open(dst, 'rb') as f:
+            assert f.read() == self.data
+
+    def test_loose_chunks(self):
+        store = ChunkStore(self.store_dir)
+
+        with self.assertRaises(ValueError):
+            store.add_chunk('invalid', b'data')
+
+        chunks = file_chunks(self.src)
+        for cid, offset, size in chunks:
+            store.add_chunk(cid, self.data[offset:offset + size])
+
+        os.remove(self.src)
+        dst = os.path.join(self.tempdir, 'dst')
+        store.assemble(dst, [[c[0], c[2]] for c in chunks])
+        store.remove_loose()
+
+        assert not os.listdir(os.path.join(self.store_dir, 'loose'))
+        assert store.read_chunk(chunks[0][0]) == \
+            self.data[:chunks[0][2]]
+
+    def test_modified_file(self):
+        store = ChunkStore(self.store_dir)
+        store.index_file(self.src)
+        first = file_chunks(self.src)[0][0]
+
+        with open(self.src, 'r+b') as f:
+            f.write(b'modified')
+
+        with self.assertRaises(KeyError):
+            store.read_chunk(first)
+        assert first not in store
+
+    def test_shared_chunks(self):
+        copy = os.path.join(self.tempdir, 'copy')
+        with open(copy, 'wb') as f:
+            f.write(self.data)
+        store = ChunkStore(self.store_dir)
+        store.index_file(self.src)
+        store.index_file(copy)
+        first = file_chunks(self.src)[0]
+
+        # the chunk is still available in the other file
+        os.remove(self.src)
+        store.index_file(self.src)
+        assert store.read_chunk(first[0]) == self.data[:first[2]]
+
+        with open(copy, 'r+b') as f:
+            f.write(b'modified')
+        with self.assertRaises(MissingChunkError):
+            store.read_chunk(first[0])
+        assert first[0] not in store
+
+    def test_persistence(self):
+        store = ChunkStore(self.store_dir)
+        store.index_dir(self.tempdir)
+        ids = store.chunk_ids()
+
+        assert ChunkStore(self.store_dir).chunk_ids() == ids
+
+    def test_dir_chunk_ids(self):
+        task_dir = os.path.join(self.tempdir, 'task')
+        other_dir = os.path.join(self.tempdir, 'task_2')
+        os.makedirs(task_dir)
+        os.makedirs(other_dir)
+        task_file = os.path.join(task_dir, 'file')
+        other_file = os.path.join(other_dir, 'file')
+        with open(task_file, 'wb') as f:
+            f.write(self.data[:MIN_CHUNK_SIZE])
+        with open(other_file, 'wb') as f:
+            f.write(self.data[MIN_CHUNK_SIZE:])
+
+        store = ChunkStore(self.store_dir)
+        store.index_dir(task_dir)
+        store.index_dir(other_dir)
+        task_ids = {c[0] for c in file_chunks(task_file)}
+
+        assert store.chunk_ids(task_dir) == task_ids
+        assert len(store.chunk_ids(other_dir, limit=1)) == 1
+
+        # modified after being indexed
+        with open(task_file, 'r+b') as f:
+            f.write(b'modified')
+        assert store.chunk_ids(task_dir) == set()
+        assert not task_ids & store.chunk_ids()
+
+        store.remove_dir(other_dir)
+        assert store.chunk_ids() == set()
+        assert ChunkStore(self.store_dir).chunk_ids() == set()
@@ -1,6 +1,8 @@
 import os
 import shutil
 
+from mock import patch
+
 from golem.core.common import is_windows
 from golem.resource.dirmanager import DirManager, find_task_script, logger
 from golem.tools.assertlogs import LogTestCase
@@ -52,6 +54,17 @@ class TestDirManager(TestDirFixture):
         self.assertFalse(os.path.isfile(file4))
         self.assertFalse(os.path.isdir(dir2))
 
+    def testClearDirAccounting(self):
+        dm = DirManager(self.path)
+        res_dir = dm.get_task_resource_dir(self.node1)
+        with open(os.path.join(res_dir, 'file'), 'wb') as f:
+            f.write(b'\0' * 100)
+
+        with patch('golem.resource.dirmanager.size_accountant') as accountant:
+            dm.clear_resource(self.node1)
+        accountant.remove.assert_called_once_with(
+            os.path.join(self.path, self.node1, 'resources'), 100)
+
     def testGetTaskTemporaryDir(self):
         dm = DirManager(self.path)
         task_id = '12345'
@@ -1,5 +1,9 @@
 import os
-from golem.resource.resource import TaskResourceHeader, TaskResource
+import random
+from golem.resource.resource import TaskResourceHeader, TaskResource, \
+    compress_dir, compress_dir_chunked, decompress_dir
+from golem.resource.chunking import ChunkStore, MissingChunkError, \
+    file_chunks
 from golem.resource.dirmanager import DirManager
 from test_dirmanager import TestDirFixture
 
@@ -52,3 +56,74 @@ class TestTaskResource(TestDirFixture):
 
     def testInit(self):
         self.assertIsNotNone(TaskResource(self.path))
+
+
+class TestCompressDir(TestDirFixture):
+
+    def testCompressDecompress(self):
+        src_dir = os.path.join(self.path, 'src')
+        dst_dir = os.path.join(self.path, 'dst')
+        sub_dir = os.path.join(src_dir, 'dir1')
+        os.makedirs(sub_dir)
+
+        files = ['file1', os.path.join('dir1', 'file2')]
+        for file_name in files:
+            with open(os.path.join(src_dir, file_name), 'w') as f:
+                f.write(file_name * 100)
+
+        header = TaskResourceHeader.build("resource", src_dir)
+        cwd = os.getcwd()
+        zip_file = compress_dir(src_dir, header, self.path)
+        self.assertEqual(os.getcwd(), cwd)
+
+        decompress_dir(dst_dir, zip_file)
+        for file_name in files:
+            with open(os.path.join(dst_dir, file_name)) as f:
+                self.assertEqual(f.read(), file_name * 100)
+
+    def testCompressDecompressChunked(self):
+        src_dir = os.path.join(self.path, 'src')
+        dst_dir = os.path.join(self.path, 'dst')
+        os.makedirs(src_dir)
+
+        data = random.Random(0).getrandbits(3 * 1024 * 1024 * 8) \
+            .to_bytes(3 * 1024 * 1024, 'little')
+        with open(os.path.join(src_dir, 'large'), 'wb') as f:
+            f.write(data)
+        with open(os.path.join(src_dir, 'small'), 'wb') as f:
+            f.write(b'small')
+
+        # the receiver already has a file sharing the beginning
+        known_path = os.path.join(self.path, 'known')
+        with open(known_path, 'wb') as f:
+            f.write(data[:2 * 1024 * 1024])
+        store = ChunkStore(os.path.join(self.path, 'chunks'))
+        store.index_file(known_path)
+
+        header = TaskResourceHeader.build("resource", src_dir)
+        zip_file = compress_dir_chunked(src_dir, header, self.path,
+                                        store.chunk_ids())
+
+        shipped = sum(size for chunk_id, _, size
+                      in file_chunks(os.path.join(src_dir, 'large'))
+                      if chunk_id not in store)
+        self.assertLess(shipped, len(data))
+        self.assertLess(os.path.getsize(zip_file), len(data))
+
+        with self.assertRaises(ValueError):
+            decompress_dir(dst_dir, zip_file)
+
+        # the known file changed after the archive was built
+        with open(known_path, 'r+b') as f:
+            f.write(b'modified')
+        with self.assertRaises(MissingChunkError):
+            decompress_dir(dst_dir, zip_file, store)
+
+        with open(known_path, 'wb') as f:
+            f.write(data[:2 * 1024 * 1024])
+        store.index_file(known_path)
+        decompress_dir(dst_dir, zip_file, store)
+        with open(os.path.join(dst_dir, 'large'), 'rb') as f:
+            self.assertEqual(f.read(), data)
+        with open(os.path.join(dst_dir, 'small'), 'rb') as f:
+            self.assertEqual(f.read(), b'small')
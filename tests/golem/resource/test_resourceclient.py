@@ -7,7 +7,7 @@ from mock import Mock
 
 from golem.core.async import AsyncRequest, async_run
 from golem.resource.client import ClientHandler, ClientCommands, ClientError, \
-    ClientOptions, ClientConfig
+    ClientOptions, ClientConfig, AdaptiveConcurrency
 from golem.tools.testwithreactor import TestWithReactor
 
 
@@ -65,6 +65,61 @@ class TestClientHandler(unittest.TestCase):
         assert is_class(ClientHandler._exception_type(exc))
 
 
+class TestAdaptiveConcurrency(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.
+        self.concurrency = AdaptiveConcurrency(3, minimum=1, maximum=5,
+                                               window=1.,
+                                               clock=lambda: self.now)
+
+    def _window(self, size, saturated=True):
+        if saturated:
+            self.concurrency.saturated()
+        self.now += 1.
+        self.concurrency.record(size)
+
+    def test_grows_while_throughput_improves(self):
+        self._window(100)
+        assert self.concurrency.limit == 4
+        self._window(200)
+        assert self.concurrency.limit == 5
+        self._window(300)
+        assert self.concurrency.limit == 5
+
+    def test_does_not_grow_when_not_saturated(self):
+        self._window(100, saturated=False)
+        assert self.concurrency.limit == 3
+
+    def test_shrinks_when_throughput_drops(self):
+        self._window(100)
+        assert self.concurrency.limit == 4
+        self._window(50)
+        assert self.concurrency.limit == 3
+        self._window(80)
+        assert self.concurrency.limit == 2
+        self._window(10)
+        assert self.concurrency.limit == 3
+
+    def test_holds_on_stable_throughput(self):
+        self._window(100)
+        self._window(101)
+        assert self.concurrency.limit == 4
+
+    def test_min_limit(self):
+        self._window(100)
+        for size in (50, 60, 70, 80):
+            self._window(size)
+        assert self.concurrency.limit == 1
+
+    def test_unlimited(self):
+        concurrency = AdaptiveConcurrency(0, clock=lambda: self.now)
+        self.now += 10.
+        concurrency.saturated()
+        concurrency.record(100)
+        assert concurrency.limit == 0
+
+
 class TestClientOptions(unittest.TestCase):
 
     def test_init(self):
@@ -1,4 +1,7 @@
 import os
+
+from mock import patch
+
 from golem.resource.resourcesmanager import ResourcesManager
 from golem.resource.dirmanager import DirManager
 from test_dirmanager import TestDirFixture
@@ -33,6 +36,23 @@ class TestResourcesManager(TestDirFixture):
         self.assertEqual(len(header2.files_data), 0)
         self.assertEqual(len(header2.sub_dir_headers), 0)
 
+    def testGetResourceHeaderChunks(self):
+        rm = ResourcesManager(self.dir_manager, 'owner')
+        file1 = os.path.join(self.dir_manager.get_task_resource_dir('task2'),
+                             'file1')
+        with open(file1, 'wb') as f:
+            f.write(os.urandom(1024))
+
+        header = rm.get_resource_header('task2')
+        self.assertEqual(len(header.chunks), 1)
+        self.assertEqual(rm.get_resource_header('task3').chunks, [])
+
+        # the index entry is stale once the file changes
+        with open(file1, 'wb') as f:
+            f.write(os.urandom(2048))
+        with patch.object(rm.chunk_store, 'index_dir'):
+            self.assertEqual(rm.get_resource_header('task2').chunks, [])
+
     def testGetResourceDelta(self):
         rm = ResourcesManager(self.dir_manager, 'owner')
         header = rm.get_resource_header('task2')
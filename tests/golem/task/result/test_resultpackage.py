@@ -2,7 +2,8 @@ import os
 import shutil
 import uuid
 
-from golem.core.fileencrypt import FileEncryptor
+from golem.core.fileencrypt import FileEncryptor, AESFileEncryptor, \
+    AESStreamEncryptor
 from golem.resource.dirmanager import DirManager
 from golem.task.result.resultpackage import ZipPackager, EncryptingPackager, EncryptingTaskResultPackager, \
     ExtractedPackage
@@ -95,7 +96,14 @@ class TestZipPackager(TestDirFixture):
         zp.create(self.out_path, self.files, self.pickle_files)
         files, out_dir = zp.extract(self.out_path)
 
-        self.assertTrue(len(files) == len(self.file_list))
+        self.assertEqual(files, self.file_list)
+
+        # names keep the archive order when some files are unchanged
+        with open(os.path.join(out_dir, 'dir_file'), 'w') as f:
+            f.write("Modified")
+        files, out_dir = zp.extract(self.out_path)
+
+        self.assertEqual(files, self.file_list)
         shutil.rmtree(out_dir)
 
 
@@ -121,9 +129,21 @@ class TestEncryptingPackager(TestDirFixture):
         ep.create(self.out_path, self.files, self.pickle_files)
         files, outdir = ep.extract(self.out_path)
 
+        self.assertTrue(AESStreamEncryptor.recognizes(self.out_path))
         self.assertTrue(len(files) == len(self.file_list))
         shutil.rmtree(self.out_dir)
 
+    def testExtractLegacy(self):
+        zip_path = self.out_path + '.zip'
+        ZipPackager().create(zip_path, self.files, self.pickle_files)
+        AESFileEncryptor.encrypt(zip_path, self.out_path, self.secret)
+
+        ep = EncryptingPackager(self.secret)
+        files, outdir = ep.extract(self.out_path)
+
+        self.assertEqual(sorted(files), sorted(self.file_list))
+        shutil.rmtree(self.out_dir)
+
 
 class TestEncryptingTaskResultPackager(TestDirFixture):
 
@@ -1,26 +1,138 @@
-from mock import Mock
+from mock import Mock, patch
 
 from apps.appsmanager import AppsManager
 
+from golem.clientconfigdescriptor import ClientConfigDescriptor
 from golem.model import Performance
-from golem.task.benchmarkmanager import BenchmarkManager
+from golem.task import benchmarkmanager
+from golem.task.benchmarkmanager import BenchmarkManager, \
+    benchmark_fingerprint
 from golem.testutils import DatabaseFixture, PEP8MixIn
 
 
 class TestBenchmarkManager(DatabaseFixture, PEP8MixIn):
     PEP8_FILES = ['golem/task/benchmarkmanager.py']
 
-    def test_benchmarks_needed(self):
-        b = BenchmarkManager("NODE1", Mock(), self.path, [])
-        # No Benchmark, no benchmark needed
-        assert not b.benchmarks_needed()
+    def setUp(self):
+        super(TestBenchmarkManager, self).setUp()
+        self.task_server = Mock()
+        self.task_server.config_desc = ClientConfigDescriptor()
+        self.task_server.config_desc.num_cores = 2
+        self.task_server.get_environment_by_id.return_value = None
+        self.b = BenchmarkManager("NODE1", self.task_server, self.path, [])
 
+    def load_benchmarks(self):
         am = AppsManager()
         am.load_apps()
-        b.benchmarks = am.get_benchmarks()
-        assert b.benchmarks_needed()
+        self.b.benchmarks = am.get_benchmarks()
+
+    def test_benchmarks_needed(self):
+        # No Benchmark, no benchmark needed
+        assert not self.b.benchmarks_needed()
 
-        for b_id in b.benchmarks:
+        self.load_benchmarks()
+        assert self.b.benchmarks_needed()
+
+        # results of unknown hardware are not used
+        for b_id in self.b.benchmarks:
             Performance.update_or_create(b_id, 100)
+        assert self.b.benchmarks_needed()
+
+        for b_id in self.b.benchmarks:
+            Performance.update_or_create(
+                b_id, 100, fingerprint=self.b.get_fingerprint(b_id))
+        assert not self.b.benchmarks_needed()
+
+        # hardware preset changed
+        self.task_server.config_desc.num_cores = 3
+        assert self.b.benchmarks_needed()
+
+    def test_fingerprint(self):
+        config_desc = self.task_server.config_desc
+        fingerprint = benchmark_fingerprint(config_desc, ["a", "b"])
+        assert fingerprint == benchmark_fingerprint(config_desc, ["b", "a"])
+        assert fingerprint != benchmark_fingerprint(config_desc, ["a", "c"])
+        with patch.object(benchmarkmanager, 'cpu_model',
+                          return_value="other cpu"):
+            assert fingerprint != benchmark_fingerprint(config_desc,
+                                                        ["a", "b"])
+
+        image = Mock()
+        image.get_local_id.return_value = "a"
+        env = Mock(docker_images=[image])
+        self.task_server.get_environment_by_id.return_value = env
+        fingerprint = self.b.get_fingerprint("ENV")
+        image.get_local_id.return_value = "b"
+        assert fingerprint != self.b.get_fingerprint("ENV")
+        image.get_local_id.side_effect = Exception("no docker")
+        assert self.b.get_fingerprint("ENV")
+
+    def test_run_all_benchmarks(self):
+        self.load_benchmarks()
+        cached = next(iter(self.b.benchmarks))
+        Performance.update_or_create(
+            cached, 100, fingerprint=self.b.get_fingerprint(cached))
+
+        with patch.object(self.b, 'run_benchmarks') as run_benchmarks:
+            self.b.run_all_benchmarks()
+        benchmarks = run_benchmarks.call_args[0][0]
+        assert cached not in benchmarks
+        assert set(benchmarks) == set(self.b.benchmarks) - {cached}
+
+    def test_run_benchmark_for_env_id(self):
+        self.load_benchmarks()
+        env_id = next(iter(self.b.benchmarks))
+        callback, errback = Mock(), Mock()
+
+        with patch.object(self.b, 'run_benchmark') as run_benchmark:
+            self.b.run_benchmark_for_env_id(env_id, callback, errback)
+            assert run_benchmark.call_count == 1
+
+            Performance.update_or_create(
+                env_id, 100, fingerprint=self.b.get_fingerprint(env_id))
+            self.b.run_benchmark_for_env_id(env_id, callback, errback)
+            assert run_benchmark.call_count == 1
+            callback.assert_called_once_with(100)
+
+            self.b.run_benchmark_for_env_id(env_id, callback, errback,
+                                            force=True)
+            assert run_benchmark.call_count == 2
+
+    def test_revalidate_benchmarks(self):
+        self.load_benchmarks()
+        env_ids = list(self.b.benchmarks)
+        ages = {env_ids[0]: 2 * benchmarkmanager.REVALIDATION_AGE,
+                env_ids[1]: 3 * benchmarkmanager.REVALIDATION_AGE}
+        with patch.object(self.b, 'run_benchmark') as run_benchmark, \
+                patch.object(self.b, 'get_result_age', side_effect=ages.get):
+            self.b.revalidate_benchmarks()
+            # one benchmark at a time, the oldest result first
+            self.b.revalidate_benchmarks()
+            assert run_benchmark.call_count == 1
+            assert run_benchmark.call_args[0][2] == env_ids[1]
+            assert run_benchmark.call_args[1] == {'low_priority': True}
+
+            # finished
+            run_benchmark.call_args[0][3](100)
+            self.b.revalidate_benchmarks()
+            assert run_benchmark.call_count == 2
+            assert run_benchmark.call_args[0][2] == env_ids[0]
+
+            # stopped, so that it is re-validated again
+            self.b.stop_revalidation()
+            run_benchmark.return_value.end_comp.assert_called_once_with()
+            self.b.revalidate_benchmarks()
+            assert run_benchmark.call_count == 3
+            assert run_benchmark.call_args[0][2] == env_ids[0]
+
+            # results are re-validated once per start
+            run_benchmark.call_args[0][4]("error")
+            self.b.revalidate_benchmarks()
+            assert run_benchmark.call_count == 3
 
-        assert not b.benchmarks_needed()
+    def test_get_result_age(self):
+        env_id = "env"
+        assert self.b.get_result_age(env_id) is None
+        Performance.update_or_create(env_id, 100,
+                                     fingerprint=self.b.get_fingerprint(env_id))
+        assert 0 <= self.b.get_result_age(env_id) < 60
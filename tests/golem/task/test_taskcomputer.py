@@ -32,6 +32,25 @@ class TestTaskComputer(DatabaseFixture, LogTestCase):
         tc = TaskComputer("ABC", task_server, use_docker_machine_manager=False)
         self.assertIsInstance(tc, TaskComputer)
 
+    def test_run_revalidating(self):
+        task_server = self.task_server
+        task_server.config_desc.accept_tasks = True
+        benchmark_manager = task_server.benchmark_manager
+        tc = TaskComputer("ABC", task_server, use_docker_machine_manager=False)
+        tc.last_task_request = 0
+
+        # benchmarks are re-validated on an idle node, which still
+        # requests tasks
+        tc.run()
+        task_server.request_task.assert_called_with()
+        benchmark_manager.revalidate_benchmarks.assert_called_once_with()
+
+        # but not while a task is computed
+        benchmark_manager.revalidate_benchmarks.reset_mock()
+        tc.counting_task = "xyz"
+        tc.run()
+        benchmark_manager.revalidate_benchmarks.assert_not_called()
+
     def test_run(self):
         task_server = self.task_server
         task_server.config_desc.task_request_interval = 0.5
@@ -97,6 +116,26 @@ class TestTaskComputer(DatabaseFixture, LogTestCase):
 
         tc.resource_request_rejected(subtask_id, 'reason')
 
+    def test_request_full_resource(self):
+        task_server = self.task_server
+        tc = TaskComputer("ABC", task_server, use_docker_machine_manager=False)
+        tc.resource_manager = mock.Mock()
+
+        task_id = 'xyz'
+        subtask_id = 'xxyyzz'
+        assert not tc.request_full_resource(task_id)
+        assert not task_server.request_resource.called
+
+        tc.task_to_subtask_mapping[task_id] = subtask_id
+        tc.assigned_subtasks[subtask_id] = mock.Mock()
+        header = tc.resource_manager.get_resource_header.return_value
+        header.chunks = ['chunk']
+
+        assert tc.request_full_resource(task_id)
+        assert header.chunks is None
+        assert task_server.request_resource.call_args[0][:2] == \
+            (task_id, header)
+
     def test_computation(self):
         ctd = ComputeTaskDef()
         ctd.task_id = "xyz"
@@ -182,7 +182,9 @@ class TestTaskManager(LogTestCase, TestDirFixtureWithReactor):
             "DEF", "DEF", "xyz", 1000, 10, 5, 10, 2, "10.10.10.10")
         assert subtask is None
 
+        task_mock.abort = Mock()
         self.tm.delete_task("xyz")
+        task_mock.abort.assert_called_once_with()
         assert self.tm.tasks.get("xyz") is None
         assert self.tm.tasks_states.get("xyz") is None
 
@@ -354,6 +356,19 @@ class TestTaskManager(LogTestCase, TestDirFixtureWithReactor):
         assert ctd.subtask_id == "sss4"
         assert self.tm.computed_task_received("sss4", [], 0)
 
+        th.task_id = "task5"
+        t5 = TestTask(th, "print 'Hello world!", ["uuu5"], {"uuu5": True})
+        t5.verify_task = Mock(return_value=False)
+        self.tm.add_new_task(t5)
+        self.tm.start_task(t5.header.task_id)
+        ctd, wrong_task, _ = self.tm.get_next_subtask(
+            "DEF", "DEF", "task5", 1000, 10, 5, 10, 2, "10.10.10.10")
+        assert not wrong_task
+        assert ctd.subtask_id == "uuu5"
+        with self.assertLogs(logger, level="WARNING"):
+            assert self.tm.computed_task_received("uuu5", [], 0)
+        assert self.tm.tasks_states["task5"].status == TaskStatus.aborted
+
     def test_task_result_incoming(self):
         subtask_id = "xxyyzz"
         node_id = 'node'
@@ -439,9 +454,11 @@ class TestTaskManager(LogTestCase, TestDirFixtureWithReactor):
         self.tm.start_task(t.header.task_id)
         assert self.tm.tasks_states["xyz"].status in self.tm.activeStatus
         time.sleep(0.1)
+        t.abort = Mock()
         self.tm.check_timeouts()
         assert self.tm.tasks_states['xyz'].status == TaskStatus.timeout
         assert t.task_status == TaskStatus.timeout
+        t.abort.assert_called_once_with()
         # Task with subtask timeout
         with patch('golem.task.taskbase.Task.needs_computation', return_value=True):
             t2 = self._get_task_mock(task_id="abc", subtask_id="aabbcc", timeout=10, subtask_timeout=0.1)
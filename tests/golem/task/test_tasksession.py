@@ -3,8 +3,10 @@ import pickle
 import random
 import unittest
 import uuid
+import zipfile
 
-from mock import Mock, MagicMock, patch
+from mock import ANY, Mock, MagicMock, patch
+from twisted.python.failure import Failure
 
 from apps.core.task.coretask import TaskResourceHeader
 from golem import model
@@ -21,6 +23,7 @@ from golem.network.transport.message import (MessageWantToComputeTask, MessageCa
                                              MessageTaskResultHash, MessageGetTaskResult, MessageCannotComputeTask,
                                              Message)
 from golem.network.transport.tcpnetwork import BasicProtocol
+from golem.resource.chunking import MissingChunkError
 from golem.task.taskbase import ComputeTaskDef, ResultType
 from golem.task.taskserver import WaitingTaskResult
 from golem.task.tasksession import TaskSession, logger
@@ -592,6 +595,88 @@ def executor_error(req, success, error):
     error(Exception())
 
 
+def executor_run(req, success, error):
+    try:
+        result = req.method(*req.args, **req.kwargs)
+    except Exception:  # pylint: disable=broad-except
+        return error(Failure())
+    return success(result)
+
+
+@patch('golem.task.tasksession.async_run', side_effect=executor_run)
+class TestResourceReceived(testutils.TempDirFixture):
+    def setUp(self):
+        super(TestResourceReceived, self).setUp()
+        self.ts = TaskSession(Mock())
+        self.ts.dropped = Mock()
+        self.ts.task_computer = Mock()
+        self.ts.task_computer.resource_manager.chunk_store = None
+        self.output_dir = os.path.join(self.tempdir, 'output')
+        self.zip_path = os.path.join(self.tempdir, 'resources.zip')
+
+    def _receive(self, members):
+        with zipfile.ZipFile(self.zip_path, 'w') as zipf:
+            for name, data in members.items():
+                zipf.writestr(name, data)
+        self._receive_file()
+
+    def _receive_file(self):
+        self.ts.resource_received(dict(
+            file_sizes=[os.path.getsize(self.zip_path)],
+            file_received=[self.zip_path],
+            task_id='task',
+            output_dir=self.output_dir
+        ))
+
+    def test_success(self, _):
+        self._receive({'scene/file': b'data'})
+
+        with open(os.path.join(self.output_dir, 'scene', 'file'), 'rb') as f:
+            assert f.read() == b'data'
+        self.ts.task_computer.resource_given.assert_called_once_with('task')
+        assert not self.ts.task_computer.task_resource_failure.called
+        assert self.ts.dropped.called
+
+    def test_extraction_error(self, _):
+        with open(self.zip_path, 'wb') as f:
+            f.write(b'not an archive')
+        self._receive_file()
+
+        self.ts.task_computer.task_resource_failure.assert_called_once_with(
+            'task', ANY)
+        assert not self.ts.task_computer.resource_given.called
+        assert self.ts.dropped.called
+
+    def test_path_traversal(self, _):
+        self._receive({'file': b'data', '../outside': b'data'})
+
+        assert not os.path.exists(os.path.join(self.tempdir, 'outside'))
+        assert self.ts.task_computer.task_resource_failure.called
+        assert not self.ts.task_computer.resource_given.called
+        assert self.ts.dropped.called
+
+    @patch('golem.task.tasksession.decompress_dir',
+           side_effect=MissingChunkError('chunk'))
+    def test_missing_chunk(self, *_):
+        self._receive({'file': b'data'})
+
+        self.ts.task_computer.request_full_resource.assert_called_once_with(
+            'task')
+        assert not self.ts.task_computer.task_resource_failure.called
+        assert not self.ts.task_computer.resource_given.called
+        assert self.ts.dropped.called
+
+    @patch('golem.task.tasksession.decompress_dir',
+           side_effect=MissingChunkError('chunk'))
+    def test_missing_chunk_no_subtask(self, *_):
+        self.ts.task_computer.request_full_resource.return_value = False
+        self._receive({'file': b'data'})
+
+        self.ts.task_computer.task_resource_failure.assert_called_once_with(
+            'task', ANY)
+        assert not self.ts.task_computer.resource_given.called
+
+
 class TestCreatePackage(unittest.TestCase):
     def setUp(self):
         conn = Mock()
@@ -11,6 +11,7 @@ from golem.client import Client, ClientTaskComputerEventListener
 from golem.clientconfigdescriptor import ClientConfigDescriptor
 from golem.core.common import timestamp_to_datetime
 from golem.core.deferred import sync_wait
+from golem.core.dirsize import size_accountant
 from golem.core.keysauth import EllipticalKeysAuth
 from golem.core.simpleserializer import DictSerializer
 from golem.environments.environment import Environment as DefaultEnvironment
@@ -238,6 +239,8 @@ class TestClient(TestWithDatabase, TestWithReactor):
         self.additional_dir_content([3], d)
         c.remove_computed_files()
         self.assertEqual(os.listdir(d), [])
+        chunk_store = c.task_server.task_computer.resource_manager.chunk_store
+        chunk_store.remove_dir.assert_called_once_with(d)
 
         d = c.get_distributed_files_dir()
         self.assertIn(self.path, os.path.normpath(d))  # normpath for mingw
@@ -631,6 +634,15 @@ class TestClientRPCMethods(TestWithDatabase, LogTestCase):
             self.assertIsInstance(value, str)
             self.assertTrue(key in res_dirs)
 
+        # directories are scanned in the background, not when their sizes
+        # are read
+        with patch('golem.core.dirsize.scan_dir_size') as scan_dir_size:
+            c.get_res_dirs_totals()
+        scan_dir_size.assert_not_called()
+        tracked = size_accountant.tracked()
+        for value in res_dirs.values():
+            assert os.path.normpath(os.path.abspath(value)) in tracked
+
     def test_get_estimated_cost(self, *_):
         c = self.client
         assert c.get_estimated_cost(
@@ -776,10 +788,15 @@ class TestClientRPCMethods(TestWithDatabase, LogTestCase):
         assert isinstance(benchmark_manager.run_benchmark.call_args[0][0],
                           LuxBenchmark)
 
+        # benchmarks requested by the user are run despite cached results
+        benchmark_manager.get_cached_performance = Mock(return_value=100.0)
+        sync_wait(self.client.run_benchmark(LuxRenderEnvironment.get_id()))
+        assert benchmark_manager.run_benchmark.call_count == 3
+
         result = sync_wait(self.client.run_benchmark(
             DefaultEnvironment.get_id()))
         assert result > 100.0
-        assert benchmark_manager.run_benchmark.call_count == 2
+        assert benchmark_manager.run_benchmark.call_count == 3
 
 
     @patch("golem.task.benchmarkmanager.BenchmarkRunner")
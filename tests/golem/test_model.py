@@ -27,6 +27,67 @@ class TestDatabase(TempDirFixture, PEP8MixIn):
         self.assertEqual(db._get_user_version(), db.SCHEMA_VERSION)
         db.db.close()
 
+    def test_migrate(self):
+        db = m.Database(self.path)
+        m.Payment.create(payee="DEF", subtask="xyz", value=5)
+        # the schema of version 5
+        db.db.execute_sql('DROP TABLE "performance"')
+        db.db.execute_sql(
+            'CREATE TABLE "performance" ("id" INTEGER NOT NULL PRIMARY KEY, '
+            '"created_date" DATETIME NOT NULL, '
+            '"modified_date" DATETIME NOT NULL, '
+            '"environment_id" VARCHAR(255) NOT NULL, '
+            '"value" REAL NOT NULL)')
+        for index in ["expectedincome_subtask", "income_transaction"]:
+            db.db.execute_sql('DROP INDEX "{}"'.format(index))
+        db._set_user_version(5)
+        db.db.close()
+
+        db = m.Database(self.path)
+        self.assertEqual(db._get_user_version(), db.SCHEMA_VERSION)
+        # payment history is kept
+        self.assertEqual(m.Payment.get(m.Payment.subtask == "xyz").value, 5)
+        m.Performance.update_or_create("env", 1.0, 2.0, "fingerprint")
+        perf = m.Performance.get(m.Performance.environment_id == "env")
+        self.assertEqual(perf.fingerprint, "fingerprint")
+        for table, index in [("expectedincome", "expectedincome_subtask"),
+                             ("income", "income_transaction")]:
+            indices = db.db.execute_sql(
+                'PRAGMA index_list("{}")'.format(table)).fetchall()
+            self.assertIn(index, [row[1] for row in indices])
+        db.db.close()
+
+    def test_migrate_single_core(self):
+        db = m.Database(self.path)
+        # the schema of version 6, which added single_core_value
+        db.db.execute_sql('DROP TABLE "performance"')
+        db.db.execute_sql(
+            'CREATE TABLE "performance" ("id" INTEGER NOT NULL PRIMARY KEY, '
+            '"created_date" DATETIME NOT NULL, '
+            '"modified_date" DATETIME NOT NULL, '
+            '"environment_id" VARCHAR(255) NOT NULL, '
+            '"value" REAL NOT NULL, "single_core_value" REAL NOT NULL)')
+        db.db.execute_sql(
+            "INSERT INTO \"performance\" VALUES (1, '2017-01-01', "
+            "'2017-01-01', 'env', 4.0, 1.0)")
+        db._set_user_version(6)
+        db.db.close()
+
+        db = m.Database(self.path)
+        self.assertEqual(db._get_user_version(), db.SCHEMA_VERSION)
+        perf = m.Performance.get(m.Performance.environment_id == "env")
+        self.assertEqual(perf.single_core_value, 1.0)
+        self.assertEqual(perf.fingerprint, '')
+        db.db.close()
+
+    def test_pragmas(self):
+        db = m.Database(self.path)
+        self.assertEqual(
+            db.db.execute_sql('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.assertEqual(
+            db.db.execute_sql('PRAGMA synchronous').fetchone()[0], 1)
+        db.close()
+
 
 class TestPayment(DatabaseFixture):
     def test_default_fields(self):
@@ -140,6 +201,8 @@ class TestPerformance(DatabaseFixture):
         assert datetime.now() >= perf.created_date
         assert datetime.now() >= perf.modified_date
         assert perf.value == 0.0
+        assert perf.single_core_value == 0.0
+        assert perf.fingerprint == ''
 
     def test_constraints(self):
         perf = m.Performance()
@@ -178,4 +241,13 @@ class TestPerformance(DatabaseFixture):
         env = m.Performance.get(m.Performance.environment_id == "ENVXXX")
         assert env.value == 300
         env = m.Performance.get(m.Performance.environment_id == "ENVX")
-        assert env.value == 200
\ No newline at end of file
+        assert env.value == 200
+        assert env.single_core_value == 0.0
+        m.Performance.update_or_create("ENVX", 400, 100)
+        env = m.Performance.get(m.Performance.environment_id == "ENVX")
+        assert env.value == 400
+        assert env.single_core_value == 100
+        m.Performance.update_or_create("ENVX", 400, fingerprint="abc")
+        env = m.Performance.get(m.Performance.environment_id == "ENVX")
+        assert env.fingerprint == "abc"
+        assert env.single_core_value == 0.0
\ No newline at end of file